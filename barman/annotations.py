@@ -22,7 +22,7 @@ import os
 from abc import ABCMeta, abstractmethod
 
 from barman.exceptions import ArchivalBackupException
-from barman.utils import with_metaclass
+from barman.utils import map_concurrently, with_metaclass
 
 
 class AnnotationManager(with_metaclass(ABCMeta)):
@@ -165,6 +165,9 @@ class AnnotationManagerFile(AnnotationManager):
 
 
 class AnnotationManagerCloud(AnnotationManager):
+    #: The maximum number of annotations read concurrently
+    READ_JOBS = 16
+
     def __init__(self, cloud_interface, server_name):
         """
         Constructor for the cloud-based annotation manager.
@@ -196,12 +199,16 @@ class AnnotationManagerCloud(AnnotationManager):
 
     def _populate_annotation_cache(self):
         """
-        Build a cache of which annotations actually exist by walking the bucket.
-        This allows us to optimize get_annotation by just checking a (backup_id,key)
-        tuple here which is cheaper (in time and money) than going to the cloud
-        every time.
+        Build a cache of the annotations which actually exist by walking the
+        bucket, and of their values. This allows us to optimize get_annotation
+        by just checking a (backup_id,key) tuple here which is cheaper (in time
+        and money) than going to the cloud every time.
+
+        The annotations found are read up front, concurrently by a pool of
+        threads when the session of the cloud interface can be shared by
+        threads, as for the uploads, so their number does not add up latency.
         """
-        self.annotation_cache = {}
+        annotations = []
         for object_key in self.cloud_interface.list_bucket(
             os.path.join(self._get_base_path(), self.server_name, "base") + "/",
             delimiter="",
@@ -211,7 +218,27 @@ class AnnotationManagerCloud(AnnotationManager):
                 if key_parts[-2] == "annotations":
                     backup_id = key_parts[-3]
                     annotation_key = key_parts[-1]
-                    self.annotation_cache[(backup_id, annotation_key)] = True
+                    annotations.append((backup_id, annotation_key))
+        jobs = self.READ_JOBS if self.cloud_interface.THREAD_SAFE else 1
+        values = map_concurrently(
+            lambda annotation: self._read_annotation(*annotation), annotations, jobs
+        )
+        self.annotation_cache = dict(zip(annotations, values))
+
+    def _read_annotation(self, backup_id, key):
+        """
+        Reads the annotation `key` for the specified backup_id from cloud storage,
+        returning None if it does not exist.
+        """
+        annotation_path = self._get_annotation_path(backup_id, key)
+        annotation_fileobj = self.cloud_interface.remote_open(annotation_path)
+        if annotation_fileobj:
+            with annotation_fileobj:
+                annotation_bytes = annotation_fileobj.readline()
+                return annotation_bytes.decode("utf-8")
+        else:
+            # We intentionally return None if remote_open found nothing
+            return None
 
     def delete_annotation(self, backup_id, key):
         """
@@ -220,6 +247,8 @@ class AnnotationManagerCloud(AnnotationManager):
         """
         annotation_path = self._get_annotation_path(backup_id, key)
         self.cloud_interface.delete_objects([annotation_path])
+        if self.annotation_cache is not None:
+            self.annotation_cache.pop((backup_id, key), None)
 
     def get_annotation(self, backup_id, key, use_cache=True):
         """
@@ -228,8 +257,8 @@ class AnnotationManagerCloud(AnnotationManager):
 
         The default behaviour is that, when it is first run, it populates a
         cache of the annotations which exist for each backup by walking the
-        bucket. Subsequent operations can check that cache and avoid having to
-        call remote_open if an annotation is not found in the cache.
+        bucket, and of their values. Subsequent operations can check that cache
+        and avoid having to call remote_open at all.
 
         This optimises for the case where annotations are sparse and assumes the
         cost of walking the bucket is less than the cost of the remote_open calls
@@ -238,26 +267,11 @@ class AnnotationManagerCloud(AnnotationManager):
         In cases where we do not want to walk the bucket up front then the caching
         can be disabled.
         """
-        # Optimize for the most common case where there is no annotation
         if use_cache:
             if self.annotation_cache is None:
                 self._populate_annotation_cache()
-            if (
-                self.annotation_cache is not None
-                and (backup_id, key) not in self.annotation_cache
-            ):
-                return None
-        # We either know there's an annotation or we haven't used the cache so read
-        # it from the cloud
-        annotation_path = self._get_annotation_path(backup_id, key)
-        annotation_fileobj = self.cloud_interface.remote_open(annotation_path)
-        if annotation_fileobj:
-            with annotation_fileobj:
-                annotation_bytes = annotation_fileobj.readline()
-                return annotation_bytes.decode("utf-8")
-        else:
-            # We intentionally return None if remote_open found nothing
-            return None
+            return self.annotation_cache.get((backup_id, key))
+        return self._read_annotation(backup_id, key)
 
     def put_annotation(self, backup_id, key, value):
         """
@@ -268,6 +282,8 @@ class AnnotationManagerCloud(AnnotationManager):
         self.cloud_interface.upload_fileobj(
             io.BytesIO(value.encode("utf-8")), annotation_path
         )
+        if self.annotation_cache is not None:
+            self.annotation_cache[(backup_id, key)] = value
 
 
 class KeepManager(with_metaclass(ABCMeta, object)):
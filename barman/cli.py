@@ -38,6 +38,7 @@ from barman.backup_manifest import BackupManifest
 from barman.config import (
     ConfigChangesProcessor,
     RecoveryOptions,
+    global_config,
     parse_combine_mode,
     parse_staging_path,
 )
@@ -48,6 +49,7 @@ from barman.exceptions import (
     SyncError,
     WalArchiveContentError,
 )
+from barman.get_wal import get_wal_command
 from barman.infofile import BackupInfo, WalFileInfo
 from barman.lockfile import ConfigUpdateLock
 from barman.process import ProcessManager
@@ -61,12 +63,9 @@ from barman.utils import (
     check_non_negative,
     check_positive,
     check_tli,
-    configure_logging,
-    drop_privileges,
     force_str,
     get_backup_id_using_shortcut,
     get_log_levels,
-    parse_log_level,
     parse_target_tli,
 )
 from barman.xlog import check_archive_usable
@@ -1884,37 +1883,7 @@ def get_wal(args):
         inactive_is_error=False,
         disabled_is_error=True,
     )
-
-    if getattr(args, "test", None):
-        output.info(
-            "Ready to retrieve WAL files from the server %s", server.config.name
-        )
-        return
-
-    # Retrieve optional arguments. If an argument is not specified,
-    # the namespace doesn't contain it due to SUPPRESS default.
-    # In that case we pick 'None' using getattr third argument.
-    compression = getattr(args, "compression", None)
-    keep_compression = getattr(args, "keep_compression", False)
-    output_directory = getattr(args, "output_directory", None)
-    peek = getattr(args, "peek", None)
-
-    if compression and keep_compression:
-        output.error(
-            "argument `%s` not allowed with argument `keep-compression`" % compression
-        )
-        output.close_and_exit()
-
-    with closing(server):
-        server.get_wal(
-            args.wal_name,
-            compression=compression,
-            keep_compression=keep_compression,
-            output_directory=output_directory,
-            peek=peek,
-            partial=args.partial,
-        )
-    output.close_and_exit()
+    get_wal_command(server, args)
 
 
 @command(
@@ -2332,88 +2301,6 @@ def config_update(args):
                 server.restart_processes()
 
 
-def pretty_args(args):
-    """
-    Prettify the given argparse namespace to be human readable
-
-    :type args: argparse.Namespace
-    :return: the human readable content of the namespace
-    """
-    values = dict(vars(args))
-    # Retrieve the command name with recent argh versions
-    if "_functions_stack" in values:
-        values["command"] = values["_functions_stack"][0].__name__
-        del values["_functions_stack"]
-    # Older argh versions only have the matching function in the namespace
-    elif "function" in values:
-        values["command"] = values["function"].__name__
-        del values["function"]
-    return "%r" % values
-
-
-def global_config(args):
-    """
-    Set the configuration file
-    """
-    if hasattr(args, "config"):
-        filename = args.config
-    else:
-        try:
-            filename = os.environ["BARMAN_CONFIG_FILE"]
-        except KeyError:
-            filename = None
-    config = barman.config.Config(filename)
-    barman.__config__ = config
-
-    # change user if needed
-    try:
-        drop_privileges(config.user)
-    except OSError:
-        msg = "ERROR: please run barman as %r user" % config.user
-        raise SystemExit(msg)
-    except KeyError:
-        msg = "ERROR: the configured user %r does not exists" % config.user
-        raise SystemExit(msg)
-
-    # configure logging
-    if hasattr(args, "log_level"):
-        config.log_level = args.log_level
-    log_level = parse_log_level(config.log_level)
-    configure_logging(
-        config.log_file, log_level or barman.config.DEFAULT_LOG_LEVEL, config.log_format
-    )
-    if log_level is None:
-        _logger.warning("unknown log_level in config file: %s", config.log_level)
-
-    # Configure output
-    if args.format != output.DEFAULT_WRITER or args.quiet or args.debug:
-        output.set_output_writer(args.format, quiet=args.quiet, debug=args.debug)
-
-    # Configure color output
-    if args.color == "auto":
-        # Enable colored output if both stdout and stderr are TTYs
-        output.ansi_colors_enabled = sys.stdout.isatty() and sys.stderr.isatty()
-    else:
-        output.ansi_colors_enabled = args.color == "always"
-
-    # Load additional configuration files
-    config.load_configuration_files_directory()
-    # Handle the autoconf file, load it only if exists
-    autoconf_path = "%s/.barman.auto.conf" % config.get("barman", "barman_home")
-    if os.path.exists(autoconf_path):
-        config.load_config_file(autoconf_path)
-    # We must validate the configuration here in order to have
-    # both output and logging configured
-    config.validate_global_config()
-
-    _logger.debug(
-        "Initialised Barman version %s (config: %s, args: %s)",
-        barman.__version__,
-        config.config_file,
-        pretty_args(args),
-    )
-
-
 def get_server(
     args,
     skip_inactive=True,
@@ -31,26 +31,34 @@ from barman.clients.cloud_cli import (
     create_argument_parser,
 )
 from barman.cloud import (
+    CloudBackupCatalog,
     CloudBackupSnapshot,
     CloudBackupUploader,
     CloudBackupUploaderBarman,
+    CloudBackupUploaderPostgres,
+    CloudChunkStore,
+    CloudUploadJournal,
     configure_logging,
 )
 from barman.cloud_providers import get_cloud_interface, get_snapshot_interface
 from barman.exceptions import (
+    BackupPreconditionException,
     BarmanException,
     ConfigurationException,
     PostgresConnectionError,
     UnrecoverableHookScriptError,
 )
+from barman.infofile import BackupInfo
 from barman.postgres import PostgreSQLConnection
 from barman.utils import (
     check_aws_expiration_date_format,
     check_aws_snapshot_lock_cool_off_period_range,
     check_aws_snapshot_lock_duration_range,
     check_backup_name,
+    check_non_negative,
     check_positive,
     check_size,
+    check_tablespace_bandwidth,
     check_tag,
     force_str,
 )
@@ -115,6 +123,21 @@ def build_conninfo(config):
     return " ".join(conn_parts)
 
 
+def _get_backup_method(config):
+    """
+    Get the method used to take the backup
+
+    Block-level incremental backups are always taken with pg_basebackup.
+
+    :param argparse.Namespace config: The backup options provided at the command line.
+    :return str: ``postgres`` if the backup is taken with pg_basebackup,
+      ``concurrent`` if the files are copied using the PostgreSQL backup API
+    """
+    if getattr(config, "incremental", None):
+        return "postgres"
+    return getattr(config, "backup_method", None) or "concurrent"
+
+
 def _validate_config(config):
     """
     Additional validation for config such as mutually inclusive options.
@@ -134,6 +157,59 @@ def _validate_config(config):
         raise ConfigurationException(
             "Compression options cannot be used with snapshot backups"
         )
+    if getattr(config, "compression", None) != "zstd" and (
+        getattr(config, "zstd_workers", None) or getattr(config, "zstd_long", None)
+    ):
+        raise ConfigurationException(
+            "'zstd_workers' and 'zstd_long' can only be used with zstd compression"
+        )
+    if getattr(config, "incremental", None) and (
+        getattr(config, "backup_method", None) == "concurrent"
+    ):
+        raise ConfigurationException(
+            "'incremental' can only be used with the 'postgres' backup method"
+        )
+    if _get_backup_method(config) == "postgres":
+        if is_snapshot_backup:
+            raise ConfigurationException(
+                "'backup_method' = 'postgres' cannot be used with snapshot backups"
+            )
+        if __is_hook_script():
+            raise ConfigurationException(
+                "'backup_method' = 'postgres' cannot be used when running as "
+                "a hook script"
+            )
+        if getattr(config, "incremental_from", None):
+            raise ConfigurationException(
+                "'incremental_from' cannot be used with 'backup_method' = 'postgres'"
+            )
+    if getattr(config, "incremental_from", None):
+        if is_snapshot_backup:
+            raise ConfigurationException(
+                "'incremental_from' cannot be used with snapshot backups"
+            )
+        if getattr(config, "resume", False):
+            raise ConfigurationException(
+                "'incremental_from' cannot be used with 'resume'"
+            )
+    if getattr(config, "chunk_store", False):
+        if is_snapshot_backup:
+            raise ConfigurationException(
+                "'chunk_store' cannot be used with snapshot backups"
+            )
+        if getattr(config, "incremental_from", None):
+            raise ConfigurationException(
+                "'chunk_store' cannot be used with 'incremental_from'"
+            )
+        if getattr(config, "resume", False):
+            raise ConfigurationException("'chunk_store' cannot be used with 'resume'")
+    if getattr(config, "resume", False):
+        if not __is_hook_script():
+            raise ConfigurationException(
+                "'resume' can only be used when running as a hook script"
+            )
+        if getattr(config, "tar_streams", 1) > 1:
+            raise ConfigurationException("'resume' cannot be used with 'tar_streams'")
     if getattr(config, "aws_snapshot_lock_mode", None) == "governance" and getattr(
         config, "aws_snapshot_lock_cool_off_period", None
     ):
@@ -158,6 +234,42 @@ def _validate_config(config):
             seen.add(key)
 
 
+def _get_parent_manifest(cloud_interface, config):
+    """
+    Get the manifest of the parent of a file-level or block-level incremental
+    backup
+
+    :param CloudInterface cloud_interface: the cloud interface
+    :param argparse.Namespace config: The backup options provided at the command line.
+    :return CloudBackupManifest|None: the manifest of the parent backup, None if
+      a full backup is requested
+    """
+    parent = config.incremental_from or config.incremental
+    if not parent:
+        return None
+    catalog = CloudBackupCatalog(cloud_interface, config.server_name)
+    parent_backup_id = catalog.parse_backup_id(parent)
+    parent_backup_info = catalog.get_backup_info(parent_backup_id)
+    if parent_backup_info is None or parent_backup_info.status != BackupInfo.DONE:
+        raise BackupPreconditionException(
+            "Cannot take an incremental backup from backup %s: the backup does "
+            "not exist or it is not in DONE status" % parent_backup_id
+        )
+    parent_manifest = catalog.get_backup_manifest(parent_backup_id)
+    if parent_manifest is None:
+        raise BackupPreconditionException(
+            "Cannot take an incremental backup from backup %s: the backup has "
+            "no manifest" % parent_backup_id
+        )
+    if config.incremental and parent_manifest.backup_method != "postgres":
+        raise BackupPreconditionException(
+            "Cannot take a block-level incremental backup from backup %s: the "
+            "backup was not taken with the 'postgres' backup method" % parent_backup_id
+        )
+    _logger.info("Taking an incremental backup from backup %s", parent_backup_id)
+    return parent_manifest
+
+
 def main(args=None):
     """
     The main script entry point
@@ -182,12 +294,27 @@ def main(args=None):
                 raise SystemExit(0)
 
             # Perform the backup
+            parent_manifest = _get_parent_manifest(cloud_interface, config)
             uploader_kwargs = {
                 "server_name": config.server_name,
                 "compression": config.compression,
                 "max_archive_size": config.max_archive_size,
                 "min_chunk_size": config.min_chunk_size,
                 "max_bandwidth": config.max_bandwidth,
+                "tar_streams": config.tar_streams,
+                "compression_workers": config.zstd_workers,
+                "long_distance_matching": config.zstd_long,
+                "in_memory_buffers": config.in_memory_buffers,
+                "parent_manifest": parent_manifest if config.incremental_from else None,
+                "chunk_store": (
+                    CloudChunkStore(
+                        cloud_interface, config.server_name, config.compression
+                    )
+                    if config.chunk_store
+                    else None
+                ),
+                "drop_page_cache": config.drop_page_cache,
+                "tablespace_bandwidth": dict(config.tablespace_max_bandwidth),
                 "cloud_interface": cloud_interface,
             }
             if __is_hook_script():
@@ -208,10 +335,25 @@ def main(args=None):
                         "backup in '%s' has status '%s' (status should be: DONE)"
                         % (os.getenv("BARMAN_BACKUP_DIR"), os.getenv("BARMAN_STATUS"))
                     )
+                journal = None
+                if config.resume:
+                    if not os.path.isdir(config.journal_dir):
+                        os.makedirs(config.journal_dir)
+                    journal = CloudUploadJournal.open(
+                        os.path.join(
+                            config.journal_dir,
+                            "%s-%s.json"
+                            % (config.server_name, os.getenv("BARMAN_BACKUP_ID")),
+                        ),
+                        config.destination_url,
+                        os.getenv("BARMAN_BACKUP_ID"),
+                        config.compression,
+                    )
                 uploader = CloudBackupUploaderBarman(
                     backup_dir=os.getenv("BARMAN_BACKUP_DIR"),
                     backup_id=os.getenv("BARMAN_BACKUP_ID"),
                     backup_info_path=os.getenv("BARMAN_BACKUP_INFO_PATH"),
+                    journal=journal,
                     **uploader_kwargs,
                 )
                 uploader.backup()
@@ -244,6 +386,17 @@ def main(args=None):
                             config.backup_name,
                         )
                         snapshot_backup.backup()
+                    # Take the backup with pg_basebackup if requested
+                    elif _get_backup_method(config) == "postgres":
+                        uploader = CloudBackupUploaderPostgres(
+                            postgres=postgres,
+                            backup_name=config.backup_name,
+                            parent_backup_id=(
+                                parent_manifest.backup_id if parent_manifest else None
+                            ),
+                            **uploader_kwargs,
+                        )
+                        uploader.backup()
                     # Otherwise upload everything to the object store
                     else:
                         uploader = CloudBackupUploader(
@@ -308,6 +461,35 @@ def parse_arguments(args=None):
         const="snappy",
         dest="compression",
     )
+    compression.add_argument(
+        "--zstd",
+        help="zstd-compress the backup while uploading to the cloud "
+        "(requires optional zstandard library)",
+        action="store_const",
+        const="zstd",
+        dest="compression",
+    )
+    compression.add_argument(
+        "--lz4",
+        help="lz4-compress the backup while uploading to the cloud "
+        "(requires optional lz4 library)",
+        action="store_const",
+        const="lz4",
+        dest="compression",
+    )
+    parser.add_argument(
+        "--zstd-workers",
+        type=check_non_negative,
+        help="number of threads compressing each archive when using zstd "
+        "compression (default: 0, compress in the archiving thread)",
+        default=0,
+    )
+    parser.add_argument(
+        "--zstd-long",
+        help="enable long distance matching when using zstd compression",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "-h",
         "--host",
@@ -333,9 +515,18 @@ def parse_arguments(args=None):
         "-J",
         "--jobs",
         type=check_positive,
-        help="number of subprocesses to upload data to cloud storage (default: 2)",
+        help="number of subprocesses or threads to upload data to cloud storage "
+        "(default: 2)",
         default=2,
     )
+    parser.add_argument(
+        "--upload-engine",
+        choices=("thread", "process"),
+        help="run the upload jobs in threads sharing one session or in "
+        "subprocesses (default: process). google-cloud-storage only supports "
+        "process",
+        default=None,
+    )
     parser.add_argument(
         "-S",
         "--max-archive-size",
@@ -355,10 +546,57 @@ def parse_arguments(args=None):
     parser.add_argument(
         "--max-bandwidth",
         type=check_size,
-        help="the maximum amount of data to be uploaded per second when backing up to "
-        "either AWS S3 or Azure Blob Storage (default: no limit)",
+        help="the maximum amount of data to be uploaded per second, shared by all "
+        "the upload workers (default: no limit)",
         default=None,
     )
+    parser.add_argument(
+        "--tablespace-max-bandwidth",
+        type=check_tablespace_bandwidth,
+        action="append",
+        metavar="NAME:SIZE",
+        help="the maximum amount of data to be uploaded per second for the named "
+        "tablespace, in addition to --max-bandwidth. Can be specified multiple times",
+        default=[],
+    )
+    parser.add_argument(
+        "--tar-streams",
+        type=check_positive,
+        help="number of tar archives built concurrently for each directory, "
+        "spreading the files among them by size (default: 1)",
+        default=1,
+    )
+    parser.add_argument(
+        "--in-memory-buffers",
+        help="buffer the parts waiting to be uploaded in memory instead of "
+        "temporary files, using up to twice as many parts as the upload jobs "
+        "plus one part for each archive being built",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--drop-page-cache",
+        help="drop the pages of the uploaded files from the page cache once "
+        "they have been read, so that the backup does not fill the page cache "
+        "with data the database is not using. Pages cached before the backup "
+        "read them are dropped too",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--resume",
+        help="record the progress of the upload in a local journal and, if the "
+        "upload of the same backup was interrupted, resume it from the last "
+        "archive completed. Only supported when running as a hook script",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--journal-dir",
+        help="directory where the upload journals used by --resume are stored "
+        "(default: /var/tmp/barman-cloud-backup)",
+        default="/var/tmp/barman-cloud-backup",
+    )
     parser.add_argument(
         "-d",
         "--dbname",
@@ -374,6 +612,40 @@ def parse_arguments(args=None):
         type=check_backup_name,
         dest="backup_name",
     )
+    parser.add_argument(
+        "--incremental-from",
+        help="take a file-level incremental backup, uploading only the files "
+        "which changed since the given backup. Accepts a backup ID, a backup "
+        "name or a shortcut such as 'latest'",
+        metavar="BACKUP_ID",
+        default=None,
+    )
+    parser.add_argument(
+        "--backup-method",
+        help="how the backup is taken: 'concurrent' copies the files using the "
+        "PostgreSQL backup API, 'postgres' uses pg_basebackup and is required by "
+        "block-level incremental backups (default: concurrent)",
+        choices=["concurrent", "postgres"],
+        default=None,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="take a block-level incremental backup with pg_basebackup, "
+        "uploading only the blocks which changed since the given backup. "
+        "Requires PostgreSQL 17 or above with 'summarize_wal' enabled and a "
+        "parent backup taken with '--backup-method postgres'. Accepts a backup "
+        "ID, a backup name or a shortcut such as 'latest'",
+        metavar="BACKUP_ID",
+        default=None,
+    )
+    parser.add_argument(
+        "--chunk-store",
+        help="upload the relation files to a chunk store shared by all the "
+        "backups of the server, where each distinct chunk of data is stored "
+        "only once",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "--snapshot-instance",
         help="Instance where the disks to be backed up as snapshots are attached",
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import datetime
 import logging
 import os
 from contextlib import closing
@@ -29,7 +31,12 @@ from barman.clients.cloud_cli import (
     OperationErrorExit,
     create_argument_parser,
 )
-from barman.cloud import CloudBackupCatalog, configure_logging
+from barman.cloud import (
+    CloudBackupCatalog,
+    CloudBackupManifest,
+    CloudChunkStore,
+    configure_logging,
+)
 from barman.cloud_providers import (
     get_cloud_interface,
     get_snapshot_interface_from_backup_info,
@@ -37,7 +44,7 @@ from barman.cloud_providers import (
 from barman.cloud_providers.aws_s3 import S3CloudInterface
 from barman.exceptions import BadXlogPrefix, InvalidRetentionPolicy
 from barman.retention_policies import RetentionPolicyFactory
-from barman.utils import check_non_negative, force_str
+from barman.utils import check_non_negative, check_positive, force_str
 
 _logger = logging.getLogger(__name__)
 
@@ -66,33 +73,51 @@ def _get_files_for_backup(catalog, backup_info):
     return backup_files
 
 
-def _remove_wals_for_backup(
-    cloud_interface,
+def _get_wal_prefixes(catalog):
+    """
+    Get the prefixes under which the WALs are stored.
+
+    :param catalog: Cloud backup catalog containing backup and WAL metadata
+    :type catalog: :class:`CloudBackupCatalog`
+    :return: The prefixes, empty if the cloud provider cannot fetch them
+    :rtype: :class:`list`
+    """
+    try:
+        return list(catalog.get_wal_prefixes())
+    except NotImplementedError:
+        # If fetching WAL prefixes isn't supported by the cloud provider then
+        # the old method of checking each WAL must be used for all WALs.
+        return []
+
+
+def _plan_wal_removal(
     catalog,
     deleted_backup,
-    dry_run,
+    wal_prefixes,
     skip_wal_cleanup_if_standalone=True,
 ):
     """
-    Remove WAL files that are no longer needed after a backup deletion.
+    Find the WAL files that are no longer needed after a backup deletion.
 
-    This function implements WAL cleanup logic for cloud backups. It identifies and
-    deletes WAL files that are no longer required by any remaining backups while
+    This function implements WAL cleanup logic for cloud backups. It identifies
+    WAL files that are no longer required by any remaining backups while
     preserving WALs needed for archival standalone backups and other timelines.
+    Nothing is deleted, and the deleted backup must still be in the catalog.
 
-    :param cloud_interface: Interface for interacting with cloud storage
-    :type cloud_interface: :class:`CloudInterface`
     :param catalog: Cloud backup catalog containing backup and WAL metadata
     :type catalog: :class:`CloudBackupCatalog`
     :param deleted_backup: The backup that is being deleted
     :type deleted_backup: :class:`BackupInfo`
-    :param dry_run: If ``True``, identify objects for deletion but do not delete them
-    :type dry_run: :class:`bool`
+    :param wal_prefixes: The prefixes under which the WALs are stored
+    :type wal_prefixes: :class:`list`
     :param skip_wal_cleanup_if_standalone: If ``True``, skip WAL cleanup when deleting
         a standalone archival backup. Defaults to ``True``.
     :type skip_wal_cleanup_if_standalone: :class:`bool`
 
-    :return: ``None``. Exits early if an error occurs during WAL listing.
+    :return: The prefixes under which all WALs can be deleted, and the paths of the
+        other WALs to delete keyed by WAL name. Only the prefixes are returned if an
+        error occurs during WAL listing.
+    :rtype: :class:`tuple`
     """
     # An implementation of BackupManager.remove_wal_before_backup which does not
     # use xlogdb, since xlogdb is not available to barman-cloud
@@ -105,6 +130,7 @@ def _remove_wals_for_backup(
     next_backup = BackupManager.find_next_backup_in(
         catalog.get_backup_list(), deleted_backup.backup_id
     )
+    deletable_prefixes = []
     wals_to_delete = {}
     if should_remove_wals:
         # There is no previous backup or all previous backups are archival
@@ -120,6 +146,9 @@ def _remove_wals_for_backup(
             remove_until = next_backup
         else:
             remove_until = deleted_backup
+        if remove_until.begin_wal is None:
+            # Without a begin_wal there is no WAL we know to be unneeded
+            return deletable_prefixes, wals_to_delete
         # A WAL is only a candidate for deletion if it is on the same timeline so we
         # use BackupManager to get a set of all other timelines with backups so that
         # we can preserve all WALs on other timelines.
@@ -131,13 +160,6 @@ def _remove_wals_for_backup(
         # Identify any prefixes under which all WALs are no longer needed.
         # This is a shortcut which allows us to delete all WALs under a prefix without
         # checking each individual WAL.
-        try:
-            wal_prefixes = catalog.get_wal_prefixes()
-        except NotImplementedError:
-            # If fetching WAL prefixes isn't supported by the cloud provider then
-            # the old method of checking each WAL must be used for all WALs.
-            wal_prefixes = []
-        deletable_prefixes = []
         for wal_prefix in wal_prefixes:
             try:
                 tli_and_log = wal_prefix.split("/")[-2]
@@ -179,14 +201,6 @@ def _remove_wals_for_backup(
                     # All WALs under this prefix pre-date the backup being deleted so they
                     # can be deleted in one request.
                     deletable_prefixes.append(wal_prefix)
-        for wal_prefix in deletable_prefixes:
-            if not dry_run:
-                cloud_interface.delete_under_prefix(wal_prefix)
-            else:
-                print(
-                    "Skipping deletion of all objects under prefix %s "
-                    "due to --dry-run option" % wal_prefix
-                )
         try:
             wal_paths = catalog.get_wal_paths()
         except Exception as exc:
@@ -195,7 +209,7 @@ def _remove_wals_for_backup(
                 deleted_backup.backup_id,
                 force_str(exc),
             )
-            return
+            return deletable_prefixes, wals_to_delete
         for wal_name, wal in wal_paths.items():
             # If the wal starts with a prefix we deleted then ignore it so that the
             # dry-run output is accurate
@@ -223,16 +237,54 @@ def _remove_wals_for_backup(
 
             if wal_name < remove_until.begin_wal:
                 wals_to_delete[wal_name] = wal
-    # Explicitly sort because dicts are not ordered in python < 3.6
-    wal_paths_to_delete = sorted(wals_to_delete.values())
+    return deletable_prefixes, wals_to_delete
+
+
+def _remove_wals(
+    cloud_interface, catalog, backup_ids, deletable_prefixes, wals_to_delete, dry_run
+):
+    """
+    Remove the WAL files found by :func:`_plan_wal_removal`.
+
+    :param cloud_interface: Interface for interacting with cloud storage
+    :type cloud_interface: :class:`CloudInterface`
+    :param catalog: Cloud backup catalog containing backup and WAL metadata
+    :type catalog: :class:`CloudBackupCatalog`
+    :param backup_ids: The IDs of the deleted backups the WALs belonged to
+    :type backup_ids: :class:`list`
+    :param deletable_prefixes: The prefixes under which all WALs are deleted
+    :type deletable_prefixes: :class:`list`
+    :param wals_to_delete: The paths of the other WALs to delete keyed by WAL name
+    :type wals_to_delete: :class:`dict`
+    :param dry_run: If ``True``, identify objects for deletion but do not delete them
+    :type dry_run: :class:`bool`
+    """
+    # Sort the prefixes so that the --dry-run output is stable
+    deletable_prefixes = set(deletable_prefixes)
+    if not dry_run:
+        cloud_interface.delete_under_prefixes(sorted(deletable_prefixes))
+    else:
+        for wal_prefix in sorted(deletable_prefixes):
+            print(
+                "Skipping deletion of all objects under prefix %s "
+                "due to --dry-run option" % wal_prefix
+            )
+    # Explicitly sort because dicts are not ordered in python < 3.6. The WALs
+    # under a prefix we deleted are ignored so that the dry-run output is accurate
+    wal_paths_to_delete = sorted(
+        wal
+        for wal in wals_to_delete.values()
+        if os.path.dirname(wal) + "/" not in deletable_prefixes
+    )
     if len(wal_paths_to_delete) > 0:
         if not dry_run:
             try:
                 cloud_interface.delete_objects(wal_paths_to_delete)
             except Exception as exc:
                 _logger.error(
-                    "Could not delete the following WALs for backup %s: %s, Reason: %s",
-                    deleted_backup.backup_id,
+                    "Could not delete the following WALs for backup %s: %s, "
+                    "Reason: %s",
+                    ", ".join(backup_ids),
                     wal_paths_to_delete,
                     force_str(exc),
                 )
@@ -248,6 +300,189 @@ def _remove_wals_for_backup(
             catalog.remove_wal_from_cache(wal_name)
 
 
+def _remove_wals_for_backup(
+    cloud_interface,
+    catalog,
+    deleted_backup,
+    dry_run,
+    skip_wal_cleanup_if_standalone=True,
+):
+    """
+    Remove WAL files that are no longer needed after a backup deletion.
+
+    :param cloud_interface: Interface for interacting with cloud storage
+    :type cloud_interface: :class:`CloudInterface`
+    :param catalog: Cloud backup catalog containing backup and WAL metadata
+    :type catalog: :class:`CloudBackupCatalog`
+    :param deleted_backup: The backup that is being deleted
+    :type deleted_backup: :class:`BackupInfo`
+    :param dry_run: If ``True``, identify objects for deletion but do not delete them
+    :type dry_run: :class:`bool`
+    :param skip_wal_cleanup_if_standalone: If ``True``, skip WAL cleanup when deleting
+        a standalone archival backup. Defaults to ``True``.
+    :type skip_wal_cleanup_if_standalone: :class:`bool`
+    """
+    deletable_prefixes, wals_to_delete = _plan_wal_removal(
+        catalog,
+        deleted_backup,
+        _get_wal_prefixes(catalog),
+        skip_wal_cleanup_if_standalone,
+    )
+    _remove_wals(
+        cloud_interface,
+        catalog,
+        [deleted_backup.backup_id],
+        deletable_prefixes,
+        wals_to_delete,
+        dry_run,
+    )
+
+
+def _uses_chunk_store(catalog, backup_id):
+    """
+    Whether a backup references chunks of the chunk store
+
+    :param CloudBackupCatalog catalog: the backup catalog
+    :param str backup_id: the backup ID
+    :rtype: bool
+    """
+    manifest = catalog.get_backup_manifest(backup_id)
+    return manifest is not None and bool(manifest.get_chunked_files())
+
+
+def _remove_unreferenced_chunks(cloud_interface, catalog, deleted_backup_ids, config):
+    """
+    Remove the chunks of the chunk store no longer referenced by any backup
+
+    The references to each chunk are counted in the manifests of the backups
+    left in the catalog, so this must run after the deleted backups have been
+    removed from it. The manifest of a running backup is not stored yet, so
+    no chunk is removed while the chunk store holds the marker of a backup
+    which is neither in the catalog nor deleted, unless the marker is older
+    than ``--pending-backup-timeout``. The markers of the other backups are
+    removed.
+
+    :param CloudInterface cloud_interface: the cloud interface
+    :param CloudBackupCatalog catalog: the backup catalog
+    :param list[str] deleted_backup_ids: the IDs of the deleted backups
+    :param argparse.Namespace config: the configuration of the command
+    """
+    chunk_store = CloudChunkStore(cloud_interface, config.server_name)
+    manifests = [
+        manifest
+        for _, manifest in sorted(
+            catalog.get_backup_manifests(list(catalog.get_backup_list())).items()
+        )
+        if manifest is not None
+    ]
+    unreferenced_chunks = chunk_store.get_unreferenced_chunks(manifests)
+
+    # The markers are read after listing the chunks: the backups writing their
+    # marker later check that the chunks they reused still exist at their end
+    known_backup_ids = set(catalog.get_backup_list()) | set(deleted_backup_ids)
+    timeout = datetime.timedelta(hours=config.pending_backup_timeout)
+    now = datetime.datetime.now()
+    running_backup_ids = []
+    finished_backup_ids = []
+    for backup_id, marker_time in sorted(chunk_store.get_pending_backups().items()):
+        if backup_id in known_backup_ids:
+            finished_backup_ids.append(backup_id)
+        elif now - marker_time > timeout:
+            _logger.warning(
+                "Ignoring the marker of backup %s written at %s, "
+                "the backup is assumed to have failed",
+                backup_id,
+                marker_time,
+            )
+            finished_backup_ids.append(backup_id)
+        else:
+            running_backup_ids.append(backup_id)
+    if finished_backup_ids and not config.dry_run:
+        try:
+            chunk_store.unregister_backups(finished_backup_ids)
+        except Exception as exc:
+            # The markers left behind are removed by the next deletion
+            _logger.error(
+                "Could not remove the markers of backups %s: %s",
+                ", ".join(finished_backup_ids),
+                force_str(exc),
+            )
+    if running_backup_ids:
+        _logger.warning(
+            "Skipping removal of unreferenced chunks as the backups %s "
+            "may still be adding chunks to the chunk store",
+            ", ".join(running_backup_ids),
+        )
+        return
+
+    if not unreferenced_chunks:
+        return
+    _logger.info("Found %s unreferenced chunks", len(unreferenced_chunks))
+    if not config.dry_run:
+        try:
+            cloud_interface.delete_objects(unreferenced_chunks)
+        except Exception as exc:
+            # The chunks left behind are removed by the next deletion
+            _logger.error("Could not delete unreferenced chunks: %s", force_str(exc))
+    else:
+        print(
+            "Skipping deletion of objects %s due to --dry-run option"
+            % unreferenced_chunks
+        )
+
+
+def _delete_snapshots(backup_info, config):
+    """
+    Delete the snapshots of a snapshot backup
+
+    :param BackupInfo backup_info: the backup information
+    :param argparse.Namespace config: the configuration of the command
+    """
+    _logger.debug(
+        "Will delete the following snapshots: %s",
+        ", ".join(
+            snapshot.identifier for snapshot in backup_info.snapshots_info.snapshots
+        ),
+    )
+    if not config.dry_run:
+        snapshot_interface = get_snapshot_interface_from_backup_info(
+            backup_info, config
+        )
+        snapshot_interface.delete_snapshot_backup(backup_info)
+    else:
+        print("Skipping deletion of snapshots due to --dry-run option")
+
+
+def _get_objects_for_backup(catalog, backup_info):
+    """
+    Get the objects of a backup to delete before its backup.info file
+
+    :param CloudBackupCatalog catalog: the backup catalog
+    :param BackupInfo backup_info: the backup information
+    :rtype: list[str]
+    """
+    objects_to_delete = _get_files_for_backup(catalog, backup_info)
+    manifest = catalog.get_backup_manifest(backup_info.backup_id)
+    if manifest is not None:
+        manifest_path = os.path.join(
+            catalog.prefix, backup_info.backup_id, CloudBackupManifest.NAME
+        )
+        _logger.debug("Will delete manifest file at %s" % manifest_path)
+        objects_to_delete.append(manifest_path)
+        # Backups taken with pg_basebackup also store the PostgreSQL manifest
+        if manifest.backup_method == "postgres":
+            backup_manifest_path = os.path.join(
+                catalog.prefix,
+                backup_info.backup_id,
+                CloudBackupManifest.BACKUP_MANIFEST_NAME,
+            )
+            _logger.debug(
+                "Will delete backup_manifest file at %s" % backup_manifest_path
+            )
+            objects_to_delete.append(backup_manifest_path)
+    return objects_to_delete
+
+
 def _delete_backup(
     cloud_interface,
     catalog,
@@ -261,19 +496,7 @@ def _delete_backup(
         return
 
     if backup_info.snapshots_info:
-        _logger.debug(
-            "Will delete the following snapshots: %s",
-            ", ".join(
-                snapshot.identifier for snapshot in backup_info.snapshots_info.snapshots
-            ),
-        )
-        if not config.dry_run:
-            snapshot_interface = get_snapshot_interface_from_backup_info(
-                backup_info, config
-            )
-            snapshot_interface.delete_snapshot_backup(backup_info)
-        else:
-            print("Skipping deletion of snapshots due to --dry-run option")
+        _delete_snapshots(backup_info, config)
         # Delete the backup_label for snapshots backups as this is not stored in the
         # same format used by the non-snapshot backups.
         backup_label_path = os.path.join(
@@ -284,7 +507,7 @@ def _delete_backup(
         else:
             print("Skipping deletion of %s due to --dry-run option" % backup_label_path)
 
-    objects_to_delete = _get_files_for_backup(catalog, backup_info)
+    objects_to_delete = _get_objects_for_backup(catalog, backup_info)
     backup_info_path = os.path.join(
         catalog.prefix, backup_info.backup_id, "backup.info"
     )
@@ -325,6 +548,175 @@ def _delete_backup(
     catalog.remove_backup_from_cache(backup_id)
 
 
+def _get_referencing_backups(catalog):
+    """
+    Get the incremental backups referencing the files of each backup
+
+    :param CloudBackupCatalog catalog: the backup catalog
+    :return dict[str,set[str]]: the IDs of the backups which cannot be
+      restored without each backup, keyed by backup ID
+    """
+    referencing_backups = collections.defaultdict(set)
+    for backup_id, referenced_backup_ids in catalog.get_referenced_backups().items():
+        for referenced_backup_id in referenced_backup_ids:
+            if referenced_backup_id != backup_id:
+                referencing_backups[referenced_backup_id].add(backup_id)
+    return referencing_backups
+
+
+def _get_deletion_waves(referenced_backups):
+    """
+    Group the backups to delete so that the files of each backup are deleted
+    after the backup.info files of the deleted backups referencing them
+
+    :param dict[str,list[str]] referenced_backups: the IDs of the backups whose
+      files are referenced by each deleted backup, keyed by the ID of the
+      deleted backup
+    :return list[list[str]]: the IDs of the deleted backups of each wave, the
+      incremental backups coming before the backups they reference
+    """
+    referencing_backups = collections.defaultdict(list)
+    for backup_id, referenced_backup_ids in referenced_backups.items():
+        for referenced_backup_id in referenced_backup_ids:
+            if referenced_backup_id in referenced_backups:
+                referencing_backups[referenced_backup_id].append(backup_id)
+
+    levels = {}
+
+    def get_level(backup_id):
+        if backup_id not in levels:
+            levels[backup_id] = max(
+                [get_level(child) + 1 for child in referencing_backups[backup_id]]
+                or [0]
+            )
+        return levels[backup_id]
+
+    waves = []
+    for backup_id in referenced_backups:
+        level = get_level(backup_id)
+        while len(waves) <= level:
+            waves.append([])
+        waves[level].append(backup_id)
+    return waves
+
+
+def _delete_backups(cloud_interface, catalog, backup_ids, config):
+    """
+    Delete several backups, and the WALs no longer needed, in one pass
+
+    The WALs to remove are planned as if the backups were deleted one at a time
+    in the supplied order, each backup being removed from the catalog once its
+    WALs have been planned, so the result is the same. The objects of the
+    backups are then deleted in waves, each wave deleting the objects of its
+    backups in one stream of batches followed by their backup.info files, and
+    finally all the planned WALs are deleted. The WAL archive is only listed
+    once.
+
+    The backups referenced by incremental backups which are also deleted are
+    deleted in a later wave, once the backup.info files of the incremental
+    backups are gone, so that a failed deletion never leaves a backup whose
+    referenced files have been deleted.
+
+    :param CloudInterface cloud_interface: the cloud interface
+    :param CloudBackupCatalog catalog: the backup catalog
+    :param list[str] backup_ids: the IDs of the backups, in the order they
+      would be deleted one at a time
+    :param argparse.Namespace config: the configuration of the command
+    """
+    # The backups to delete with their objects and backup.info file
+    deleted_backups = []
+    # The backups whose files are referenced by each deleted backup
+    referenced_backups = collections.OrderedDict()
+    deletable_prefixes = []
+    wals_to_delete = {}
+    wal_prefixes = None
+    all_referenced_backups = catalog.get_referenced_backups()
+    for backup_id in backup_ids:
+        backup_info = catalog.get_backup_info(backup_id)
+        if not backup_info:
+            _logger.warning("Backup %s does not exist", backup_id)
+            continue
+        objects_to_delete = []
+        if backup_info.snapshots_info:
+            # Delete the backup_label for snapshots backups as this is not stored
+            # in the same format used by the non-snapshot backups.
+            objects_to_delete.append(
+                os.path.join(catalog.prefix, backup_id, "backup_label")
+            )
+        objects_to_delete.extend(_get_objects_for_backup(catalog, backup_info))
+        backup_info_path = os.path.join(catalog.prefix, backup_id, "backup.info")
+        deleted_backups.append((backup_info, objects_to_delete, backup_info_path))
+        referenced_backups[backup_id] = all_referenced_backups[backup_id]
+        if wal_prefixes is None:
+            wal_prefixes = _get_wal_prefixes(catalog)
+        prefixes, wals = _plan_wal_removal(
+            catalog, backup_info, wal_prefixes, skip_wal_cleanup_if_standalone=False
+        )
+        deletable_prefixes.extend(prefixes)
+        wals_to_delete.update(wals)
+        # The WALs of the next backup are planned as if this one was deleted
+        catalog.remove_backup_from_cache(backup_id)
+    if not deleted_backups:
+        return
+
+    deleted_backup_ids = [
+        backup_info.backup_id for backup_info, _, _ in deleted_backups
+    ]
+    for backup_info, _, _ in deleted_backups:
+        if backup_info.snapshots_info:
+            _delete_snapshots(backup_info, config)
+    if not config.dry_run:
+        deleted_objects = dict(
+            (backup_info.backup_id, (objects_to_delete, backup_info_path))
+            for backup_info, objects_to_delete, backup_info_path in deleted_backups
+        )
+        try:
+            for wave in _get_deletion_waves(referenced_backups):
+                # Check Object Lock only on base backup files.
+                # If these are unlocked and deletable, we proceed to delete
+                # everything.
+                cloud_interface.delete_objects(
+                    [
+                        path
+                        for backup_id in wave
+                        for path in deleted_objects[backup_id][0]
+                    ],
+                    check_locks=config.check_object_lock,
+                    atomic=True,
+                )
+                # Do not try to delete any backup.info until we have successfully
+                # deleted everything else so that it is possible to retry the
+                # operation should we fail to delete any backup file
+                cloud_interface.delete_objects(
+                    [deleted_objects[backup_id][1] for backup_id in wave]
+                )
+        except Exception as exc:
+            _logger.error(
+                "Could not delete backups %s: %s",
+                ", ".join(deleted_backup_ids),
+                force_str(exc),
+            )
+            raise OperationErrorExit()
+    else:
+        for _, objects_to_delete, backup_info_path in deleted_backups:
+            print(
+                "Skipping deletion of objects %s due to --dry-run option"
+                % (objects_to_delete + [backup_info_path])
+            )
+
+    # Remove WALs without checking locks. Since base backups are already gone,
+    # the WALs no longer have value, and it's not worth the overhead of checking
+    # their lock status.
+    _remove_wals(
+        cloud_interface,
+        catalog,
+        deleted_backup_ids,
+        deletable_prefixes,
+        wals_to_delete,
+        config.dry_run,
+    )
+
+
 def main(args=None):
     """
     The main script entry point
@@ -355,7 +747,10 @@ def main(args=None):
                 raise SystemExit(0)
 
             catalog = CloudBackupCatalog(
-                cloud_interface=cloud_interface, server_name=config.server_name
+                cloud_interface=cloud_interface,
+                server_name=config.server_name,
+                wal_cache_path=config.wal_listing_cache,
+                refresh_wal_cache=config.refresh_wal_listing_cache,
             )
             # Call catalog.get_backup_list now so we know we can read the whole catalog
             # (the results are cached so this does not result in extra calls to cloud
@@ -395,7 +790,23 @@ def main(args=None):
                             len(catalog.get_backup_list()),
                         )
                         raise OperationErrorExit()
+                referencing_backups = catalog.get_referencing_backups(backup_id)
+                if referencing_backups:
+                    _logger.error(
+                        "Skipping delete of backup %s for server %s "
+                        "as the incremental backups %s reference its files. "
+                        "Delete them first.",
+                        backup_id,
+                        config.server_name,
+                        ", ".join(referencing_backups),
+                    )
+                    raise OperationErrorExit()
+                uses_chunk_store = _uses_chunk_store(catalog, backup_id)
                 _delete_backup(cloud_interface, catalog, backup_id, config)
+                if uses_chunk_store:
+                    _remove_unreferenced_chunks(
+                        cloud_interface, catalog, [backup_id], config
+                    )
             elif config.retention_policy:
                 try:
                     retention_policy = RetentionPolicyFactory.create(
@@ -422,14 +833,51 @@ def main(args=None):
                         if status == "OBSOLETE"
                     ]
                 )
+                # A backup whose files are referenced by incremental backups
+                # is only deleted once all of them have been deleted, so the
+                # final set of deleted backups is planned before deleting any
+                referencing_backups = _get_referencing_backups(catalog)
+                planned_backups = []
+                while backups_to_delete:
+                    planned_backup_ids = set(planned_backups)
+                    deletable_backups = [
+                        backup_id
+                        for backup_id in backups_to_delete
+                        if referencing_backups[backup_id] <= planned_backup_ids
+                    ]
+                    if not deletable_backups:
+                        break
+                    for backup_id in deletable_backups:
+                        planned_backups.append(backup_id)
+                        backups_to_delete.remove(backup_id)
+                uses_chunk_store = any(
+                    _uses_chunk_store(catalog, backup_id)
+                    for backup_id in planned_backups
+                )
+                _delete_backups(cloud_interface, catalog, planned_backups, config)
                 for backup_id in backups_to_delete:
-                    _delete_backup(
-                        cloud_interface,
-                        catalog,
+                    _logger.warning(
+                        "Skipping delete of backup %s for server %s "
+                        "as the incremental backups %s reference its files",
                         backup_id,
-                        config,
-                        skip_wal_cleanup_if_standalone=False,
+                        config.server_name,
+                        ", ".join(
+                            sorted(
+                                referencing_backups[backup_id] - set(planned_backups)
+                            )
+                        ),
+                    )
+                # The chunks are garbage collected once, after all the backups
+                # have been deleted
+                if uses_chunk_store:
+                    _remove_unreferenced_chunks(
+                        cloud_interface, catalog, planned_backups, config
                     )
+            # Drop the deleted backups from the index of the catalog and the
+            # deleted WALs from the WAL listing cache
+            if not config.dry_run:
+                catalog.update_index()
+                catalog.save_wal_cache()
     except Exception as exc:
         _logger.error("Barman cloud backup delete exception: %s", force_str(exc))
         _logger.debug("Exception details:", exc_info=exc)
@@ -488,6 +936,36 @@ def parse_arguments(args=None):
         "objects. This option adds overhead as it requires a request to the object "
         "store for each object of the base backup to delete.",
     )
+    parser.add_argument(
+        "--delete-jobs",
+        type=check_positive,
+        help="The number of batches of objects deleted concurrently, the batches "
+        "throttled by the cloud provider being retried with an exponential backoff "
+        "(default: 1)",
+        default=1,
+    )
+    parser.add_argument(
+        "--wal-listing-cache",
+        metavar="FILE",
+        help="Path of a local file caching the listing of the WAL archive, so that "
+        "only the WALs archived since the previous run are listed. By default the "
+        "whole WAL archive is listed.",
+    )
+    parser.add_argument(
+        "--refresh-wal-listing-cache",
+        action="store_true",
+        help="Ignore the content of the WAL listing cache, list the whole WAL "
+        "archive and rewrite the cache",
+    )
+    parser.add_argument(
+        "--pending-backup-timeout",
+        metavar="HOURS",
+        type=check_positive,
+        help="The number of hours after which a backup which has not been "
+        "completed no longer prevents the removal of the unreferenced chunks of "
+        "the chunk store. It must be longer than the longest backup (default: 24)",
+        default=24,
+    )
     return parser.parse_args(args=args)
 
 
@@ -57,7 +57,12 @@ def main(args=None):
         with closing(cloud_interface):
             cloud_interface.setup_bucket()
 
-            catalog = CloudBackupCatalog(cloud_interface, config.server_name)
+            catalog = CloudBackupCatalog(
+                cloud_interface,
+                config.server_name,
+                wal_cache_path=config.wal_listing_cache,
+                refresh_wal_cache=config.refresh_wal_listing_cache,
+            )
             wals = list(catalog.get_wal_paths().keys())
             check_archive_usable(
                 wals,
@@ -93,6 +98,19 @@ def parse_arguments(args=None):
         help="The earliest timeline whose WALs should cause the check to fail",
         type=check_positive,
     )
+    parser.add_argument(
+        "--wal-listing-cache",
+        metavar="FILE",
+        help="Path of a local file caching the listing of the WAL archive, so that "
+        "only the WALs archived since the previous run are listed. By default the "
+        "whole WAL archive is listed.",
+    )
+    parser.add_argument(
+        "--refresh-wal-listing-cache",
+        action="store_true",
+        help="Ignore the content of the WAL listing cache, list the whole WAL "
+        "archive and rewrite the cache",
+    )
     return parser.parse_args(args=args)
 
 
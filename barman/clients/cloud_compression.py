@@ -17,9 +17,17 @@
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import bz2
+import lzma
+import zlib
 from abc import ABCMeta, abstractmethod
 
-from barman.compression import _try_import_snappy, get_internal_compressor
+from barman.compression import (
+    _try_import_lz4,
+    _try_import_snappy,
+    _try_import_zstd,
+    get_internal_compressor,
+)
 from barman.utils import with_metaclass
 
 
@@ -49,6 +57,16 @@ class ChunkedCompressor(with_metaclass(ABCMeta, object)):
         :rtype: bytes
         """
 
+    def flush(self):
+        """
+        Returns the compressed bytes still buffered by the compressor, ending
+        the compressed stream.
+
+        :return: The remaining compressed data
+        :rtype: bytes
+        """
+        return b""
+
 
 class SnappyCompressor(ChunkedCompressor):
     """
@@ -82,23 +100,168 @@ class SnappyCompressor(ChunkedCompressor):
         return self.decompressor.decompress(data)
 
 
-def get_compressor(compression):
+class ZstdCompressor(ChunkedCompressor):
+    """
+    A ChunkedCompressor implementation based on zstandard
+    """
+
+    # The default level of the zstd command line tool
+    DEFAULT_LEVEL = 3
+    # The window size used by the zstd command line tool in long mode, which
+    # decompressors accept without any additional setting
+    LONG_DISTANCE_WINDOW_LOG = 27
+
+    def __init__(self, workers=0, long_distance=False):
+        """
+        :param int workers: The number of threads compressing the data in
+          parallel, 0 to compress in the calling thread
+        :param bool long_distance: Whether long distance matching is enabled,
+          improving the compression ratio of large inputs with repeated data
+        """
+        zstd = _try_import_zstd()
+        params = zstd.ZstdCompressionParameters.from_level(
+            self.DEFAULT_LEVEL,
+            threads=workers,
+            enable_ldm=long_distance,
+            window_log=self.LONG_DISTANCE_WINDOW_LOG if long_distance else 0,
+        )
+        self.compressor = zstd.ZstdCompressor(compression_params=params).compressobj()
+        self.decompressor = zstd.ZstdDecompressor().decompressobj()
+
+    def add_chunk(self, data):
+        """
+        Compresses the supplied data and returns all the compressed bytes.
+
+        :param bytes data: The chunk of data to be compressed
+        :return: The compressed data
+        :rtype: bytes
+        """
+        return self.compressor.compress(data)
+
+    def decompress(self, data):
+        """
+        Decompresses the supplied chunk of data and returns at least part of the
+        uncompressed data.
+
+        :param bytes data: The chunk of data to be decompressed
+        :return: The decompressed data
+        :rtype: bytes
+        """
+        # The decompressor refuses any call after the end of the frame
+        if not data:
+            return b""
+        return self.decompressor.decompress(data)
+
+    def flush(self):
+        """
+        Returns the compressed bytes still buffered by the compressor, ending
+        the compressed stream.
+
+        :return: The remaining compressed data
+        :rtype: bytes
+        """
+        return self.compressor.flush()
+
+
+class LZ4Compressor(ChunkedCompressor):
+    """
+    A ChunkedCompressor implementation based on lz4
+    """
+
+    def __init__(self):
+        lz4 = _try_import_lz4()
+        self.compressor = lz4.frame.LZ4FrameCompressor()
+        self.decompressor = lz4.frame.LZ4FrameDecompressor()
+        self.started = False
+
+    def add_chunk(self, data):
+        """
+        Compresses the supplied data and returns all the compressed bytes.
+
+        :param bytes data: The chunk of data to be compressed
+        :return: The compressed data
+        :rtype: bytes
+        """
+        header = b""
+        if not self.started:
+            header = self.compressor.begin()
+            self.started = True
+        return header + self.compressor.compress(data)
+
+    def decompress(self, data):
+        """
+        Decompresses the supplied chunk of data and returns at least part of the
+        uncompressed data.
+
+        :param bytes data: The chunk of data to be decompressed
+        :return: The decompressed data
+        :rtype: bytes
+        """
+        # The decompressor refuses any call after the end of the frame
+        if not data:
+            return b""
+        return self.decompressor.decompress(data)
+
+    def flush(self):
+        """
+        Returns the compressed bytes still buffered by the compressor, ending
+        the compressed stream.
+
+        :return: The remaining compressed data
+        :rtype: bytes
+        """
+        if not self.started:
+            return self.add_chunk(b"") + self.compressor.flush()
+        return self.compressor.flush()
+
+
+def get_compressor(compression, workers=0, long_distance=False):
     """
     Helper function which returns a ChunkedCompressor for the specified compression
-    algorithm. Currently only snappy is supported. The other compression algorithms
-    supported by barman cloud use the decompression built into TarFile.
+    algorithm. Currently snappy, zstd and lz4 are supported. The other compression
+    algorithms supported by barman cloud use the decompression built into TarFile.
 
-    :param str compression: The compression algorithm to use. Can be set to snappy
-      or any compression supported by the TarFile mode string.
+    :param str compression: The compression algorithm to use. Can be set to snappy,
+      zstd, lz4 or any compression supported by the TarFile mode string.
+    :param int workers: The number of compression threads, only used by zstd
+    :param bool long_distance: Whether long distance matching is enabled, only
+      used by zstd
     :return: A ChunkedCompressor capable of compressing and decompressing using the
       specified compression.
     :rtype: ChunkedCompressor
     """
     if compression == "snappy":
         return SnappyCompressor()
+    if compression == "zstd":
+        return ZstdCompressor(workers, long_distance)
+    if compression == "lz4":
+        return LZ4Compressor()
     return None
 
 
+def get_stream_decompressor(compression):
+    """
+    Helper function which returns an object decompressing a stream chunk by chunk
+    through its decompress(bytes) method.
+
+    Unlike get_compressor, this also covers the compression algorithms which are
+    otherwise left to TarFile, so that the stream can be decompressed before it
+    is handed to TarFile.
+
+    :param str compression: The compression algorithm of the stream. Can be set
+      to snappy, zstd, lz4, gz, bz2 or xz.
+    :return: An object with a decompress(bytes) method, or None if compression
+      is not a known compression algorithm.
+    """
+    if compression == "gz":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+    if compression == "xz":
+        return lzma.LZMADecompressor()
+    return get_compressor(compression)
+
+
 def get_streaming_tar_mode(mode, compression):
     """
     Helper function used in streaming uploads and downloads which appends the supplied
@@ -107,12 +270,12 @@ def get_streaming_tar_mode(mode, compression):
     ignored so that barman-cloud can apply them itself.
 
     :param str mode: The file mode to use, either r or w.
-    :param str compression: The compression algorithm to use. Can be set to snappy
-      or any compression supported by the TarFile mode string.
+    :param str compression: The compression algorithm to use. Can be set to snappy,
+      zstd, lz4 or any compression supported by the TarFile mode string.
     :return: The full filemode for a streaming tar file
     :rtype: str
     """
-    if compression == "snappy" or compression is None:
+    if compression in ("snappy", "zstd", "lz4") or compression is None:
         return "%s|" % mode
     else:
         return "%s|%s" % (mode, compression)
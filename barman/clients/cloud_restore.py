@@ -16,7 +16,11 @@
 # You should have received a copy of the GNU General Public License
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 import logging
+import multiprocessing
 import os
+import shutil
+import signal
+import tempfile
 from abc import ABCMeta, abstractmethod
 from contextlib import closing
 
@@ -26,15 +30,17 @@ from barman.clients.cloud_cli import (
     OperationErrorExit,
     create_argument_parser,
 )
-from barman.cloud import CloudBackupCatalog, configure_logging
+from barman.cloud import CloudBackupCatalog, CloudChunkStore, configure_logging
 from barman.cloud_providers import (
     get_cloud_interface,
     get_snapshot_interface_from_backup_info,
 )
+from barman.command_wrappers import PgCombineBackup
 from barman.exceptions import ConfigurationException
 from barman.fs import UnixLocalCommand
 from barman.recovery_executor import SnapshotRecoveryExecutor
 from barman.utils import (
+    check_positive,
     check_tli,
     force_str,
     get_backup_id_from_target_lsn,
@@ -47,6 +53,69 @@ from barman.utils import (
 
 _logger = logging.getLogger(__name__)
 
+_worker_callable = None
+"""
+Global variable containing a callable used to execute the jobs.
+Initialized by `_init_worker` and used by `_run_worker` function.
+This variable must be None outside a multiprocessing worker Process.
+"""
+
+_worker_jobs = None
+"""
+Global variable containing the jobs executed by the worker processes,
+which receive only their indexes.
+"""
+
+_worker_cancelled = None
+"""
+Global variable containing the event set when a job has failed, so that
+the jobs not started yet are skipped.
+"""
+
+
+def _init_worker(func, jobs, cancelled, cloud_interface):
+    """
+    Store the callable and the jobs used by `_run_worker` function
+
+    :param callable func: the callable to invoke for every job
+    :param list jobs: the arguments of the jobs
+    :param multiprocessing.Event cancelled: the event set when a job failed
+    :param CloudInterface cloud_interface: the cloud interface used by the
+      jobs, whose session is created again in each worker process
+    """
+    global _worker_callable, _worker_jobs, _worker_cancelled
+    _worker_callable = func
+    _worker_jobs = jobs
+    _worker_cancelled = cancelled
+    # Since the KeyboardInterrupt exception is handled by the main process,
+    # let's forget about Ctrl-C here.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # We create a new session instead of reusing the one from the parent
+    # process to avoid any race condition
+    cloud_interface._reinit_session()
+
+
+def _run_worker(index):
+    """
+    Execute a job using the callable set using `_init_worker` function
+
+    :param int index: the index of the job
+    :rtype: str|None
+    :return: the error message if the job failed, None otherwise
+    """
+    assert (
+        _worker_callable is not None
+    ), "Worker has not been initialized with `_init_worker`"
+    if _worker_cancelled.is_set():
+        return None
+    try:
+        _worker_callable(*_worker_jobs[index])
+    except Exception as exc:
+        _worker_cancelled.set()
+        _logger.debug("Exception details:", exc_info=exc)
+        return force_str(exc)
+    return None
+
 
 def _validate_config(config, backup_info):
     """
@@ -148,11 +217,18 @@ def main(args=None):
                     config.snapshot_recovery_instance,
                 )
             else:
-                downloader = CloudBackupDownloaderObjectStore(cloud_interface, catalog)
+                downloader = CloudBackupDownloaderObjectStore(
+                    cloud_interface,
+                    catalog,
+                    config.jobs,
+                    config.write_jobs,
+                    config.preallocate,
+                )
                 downloader.download_backup(
                     backup_info,
                     config.recovery_dir,
                     tablespace_map(config.tablespace),
+                    config.staging_dir,
                 )
 
     except KeyboardInterrupt as exc:
@@ -186,6 +262,41 @@ def parse_arguments(args=None):
         action="append",
         default=[],
     )
+    parser.add_argument(
+        "--staging-dir",
+        help="directory where the backups of a block-level incremental backup "
+        "are downloaded before being combined with pg_combinebackup "
+        "(default: the system temporary directory)",
+        default=None,
+    )
+    parser.add_argument(
+        "-J",
+        "--jobs",
+        type=check_positive,
+        help="number of subprocesses extracting the tar archives of the backup "
+        "concurrently (default: 1)",
+        default=1,
+    )
+    parser.add_argument(
+        "--read-jobs",
+        type=check_positive,
+        help="number of concurrent ranged reads used to download each tar "
+        "archive larger than 8MB (default: 1)",
+        default=1,
+    )
+    parser.add_argument(
+        "--write-jobs",
+        type=check_positive,
+        help="number of threads writing the files extracted from each tar "
+        "archive (default: 1)",
+        default=1,
+    )
+    parser.add_argument(
+        "--preallocate",
+        action="store_true",
+        help="allocate the blocks of each extracted file before writing it",
+        default=False,
+    )
     parser.add_argument(
         "--snapshot-recovery-instance",
         help="Instance where the disks recovered from the snapshots are attached",
@@ -279,12 +390,42 @@ class CloudBackupDownloaderObjectStore(CloudBackupDownloader):
     Cloud storage download client for an object store backup
     """
 
-    def download_backup(self, backup_info, destination_dir, tablespaces):
+    def __init__(
+        self, cloud_interface, catalog, jobs=1, write_jobs=1, preallocate=False
+    ):
+        """
+        Object responsible for handling interactions with cloud storage
+
+        :param CloudInterface cloud_interface: The interface to use to
+          download the backup
+        :param CloudBackupCatalog catalog: The cloud backup catalog
+        :param int jobs: the number of tar archives extracted concurrently
+        :param int write_jobs: the number of threads writing the files
+          extracted from each tar archive
+        :param bool preallocate: whether the blocks of the extracted files are
+          allocated before they are written
+        """
+        super(CloudBackupDownloaderObjectStore, self).__init__(cloud_interface, catalog)
+        self.jobs = jobs
+        self.write_jobs = write_jobs
+        self.preallocate = preallocate
+
+    def download_backup(
+        self, backup_info, destination_dir, tablespaces, staging_dir=None
+    ):
         """
         Download a backup from cloud storage
 
+        A block-level incremental backup is combined with the backups it is
+        built upon using pg_combinebackup.
+
         :param BackupInfo backup_info: The backup info for the backup to restore
         :param str destination_dir: Path to the destination directory
+        :param dict[str,str] tablespaces: the tablespace relocation rules,
+          indexed by tablespace name
+        :param str|None staging_dir: the directory where the backups of a
+          block-level incremental backup are downloaded before being combined,
+          None for the system temporary directory
         """
         # Validate the destination directory before starting recovery
         if os.path.exists(destination_dir) and os.listdir(destination_dir):
@@ -293,6 +434,21 @@ class CloudBackupDownloaderObjectStore(CloudBackupDownloader):
             )
             raise OperationErrorExit()
 
+        manifest = self.catalog.get_backup_manifest(backup_info.backup_id)
+        if manifest is not None and manifest.is_block_incremental:
+            self._combine_backup(backup_info, destination_dir, tablespaces, staging_dir)
+        else:
+            self._extract_backup(backup_info, destination_dir, tablespaces)
+
+    def _extract_backup(self, backup_info, destination_dir, tablespaces):
+        """
+        Extract the archives of a backup from cloud storage
+
+        :param BackupInfo backup_info: The backup info for the backup to restore
+        :param str destination_dir: Path to the destination directory
+        :param dict[str,str] tablespaces: the tablespace relocation rules,
+          indexed by tablespace name
+        """
         backup_files = self.catalog.get_backup_files(backup_info)
 
         # We must download and restore a bunch of .tar files that contain PGDATA
@@ -305,6 +461,7 @@ class CloudBackupDownloaderObjectStore(CloudBackupDownloader):
 
         copy_jobs = []
         link_jobs = []
+        target_dirs = {}
         for oid in backup_files:
             file_info = backup_files[oid]
             # PGDATA is restored where requested (destination_dir)
@@ -338,24 +495,21 @@ class CloudBackupDownloaderObjectStore(CloudBackupDownloader):
                     "Destination %s already exists and it is not empty", target_dir
                 )
                 raise OperationErrorExit()
-            copy_jobs.append([file_info, target_dir])
+            target_dirs[oid] = target_dir
+            copy_jobs.append([file_info, target_dir, None])
             for additional_file in file_info.additional_files:
-                copy_jobs.append([additional_file, target_dir])
+                copy_jobs.append([additional_file, target_dir, None])
+
+        # The files of an incremental backup which did not change since its
+        # parent are extracted from the backups holding their content
+        copy_jobs += self._get_referenced_copy_jobs(backup_info, target_dirs)
 
         # Now it's time to download the files
-        for file_info, target_dir in copy_jobs:
-            # Download the file
-            _logger.debug(
-                "Extracting %s to %s (%s)",
-                file_info.path,
-                target_dir,
-                (
-                    "decompressing " + file_info.compression
-                    if file_info.compression
-                    else "no compression"
-                ),
-            )
-            self.cloud_interface.extract_tar(file_info.path, target_dir)
+        self._run_copy_jobs(copy_jobs)
+
+        # The relation files uploaded to the chunk store are not in the tar
+        # archives and are rebuilt from their chunks
+        self._restore_chunked_files(backup_info, target_dirs)
 
         for link, target in link_jobs:
             os.symlink(target, link)
@@ -368,6 +522,237 @@ class CloudBackupDownloaderObjectStore(CloudBackupDownloader):
         if not os.path.exists(wal_path):
             os.mkdir(wal_path)
 
+    def _extract_file(self, file_info, target_dir, members):
+        """
+        Extract a tar archive of a backup
+
+        :param BackupFileInfo file_info: the tar archive
+        :param str target_dir: the directory the archive is extracted into
+        :param set[str]|None members: the names of the members to extract, all
+          the members are extracted if None
+        """
+        _logger.debug(
+            "Extracting %s to %s (%s)",
+            file_info.path,
+            target_dir,
+            (
+                "decompressing " + file_info.compression
+                if file_info.compression
+                else "no compression"
+            ),
+        )
+        self.cloud_interface.extract_tar(
+            file_info.path,
+            target_dir,
+            members,
+            write_jobs=self.write_jobs,
+            preallocate=self.preallocate,
+        )
+
+    def _run_copy_jobs(self, copy_jobs):
+        """
+        Extract the tar archives of the copy jobs
+
+        With several jobs the archives are extracted concurrently by a pool of
+        worker processes. Once an archive fails the archives not started yet
+        are skipped, while the ones being extracted are completed, and all
+        the errors are reported.
+
+        :param list copy_jobs: the copy jobs, as lists of the file to extract,
+          the target directory and the names of the members to extract
+        """
+        if self.jobs <= 1 or len(copy_jobs) <= 1:
+            for file_info, target_dir, members in copy_jobs:
+                self._extract_file(file_info, target_dir, members)
+            return
+
+        cancelled = multiprocessing.Event()
+        pool = multiprocessing.Pool(
+            processes=min(self.jobs, len(copy_jobs)),
+            initializer=_init_worker,
+            initargs=(self._extract_file, copy_jobs, cancelled, self.cloud_interface),
+        )
+        errors = []
+        try:
+            results = pool.imap(_run_worker, range(len(copy_jobs)))
+            for (file_info, _, _), error in zip(copy_jobs, results):
+                if error is not None:
+                    _logger.error("Cannot extract %s: %s", file_info.path, error)
+                    errors.append(file_info.path)
+        finally:
+            pool.terminate()
+            pool.join()
+        if errors:
+            _logger.error(
+                "%s of %s archives could not be extracted", len(errors), len(copy_jobs)
+            )
+            raise OperationErrorExit()
+
+    def _restore_chunked_files(self, backup_info, target_dirs):
+        """
+        Rebuild the files of a backup uploaded to the chunk store
+
+        :param BackupInfo backup_info: The backup info for the backup to restore
+        :param dict[int|None,str] target_dirs: the directory each tar is
+          extracted into, indexed by tablespace oid (None for PGDATA)
+        """
+        manifest = self.catalog.get_backup_manifest(backup_info.backup_id)
+        if manifest is None:
+            return
+        chunk_store = CloudChunkStore(
+            self.cloud_interface, self.catalog.server_name, manifest.chunk_compression
+        )
+        for name, files in sorted(manifest.get_chunked_files().items()):
+            target_dir = target_dirs[None if name == "data" else int(name)]
+            _logger.info(
+                "Restoring %s files of '%s' from the chunk store", len(files), name
+            )
+            for arcname, entry in sorted(files.items()):
+                path = os.path.join(target_dir, arcname)
+                _logger.debug("Restoring %s from %s chunks", path, len(entry["chunks"]))
+                with open(path, "wb") as fileobj:
+                    chunk_store.read_file(entry["chunks"], fileobj)
+                os.chmod(path, entry["mode"])
+                os.utime(path, (entry["mtime"], entry["mtime"]))
+
+    def _get_backup_chain(self, backup_info):
+        """
+        Get the backups a block-level incremental backup is built upon
+
+        :param BackupInfo backup_info: The backup info for the backup to restore
+        :return list[BackupInfo]: the backups of the chain, from the full
+          backup to the given backup
+        """
+        chain = [backup_info]
+        manifest = self.catalog.get_backup_manifest(backup_info.backup_id)
+        while manifest is not None and manifest.is_block_incremental:
+            parent_backup_info = self.catalog.get_backup_info(manifest.parent_backup_id)
+            if parent_backup_info is None:
+                _logger.error(
+                    "Backup %s is an incremental backup of backup %s which "
+                    "does not exist",
+                    chain[0].backup_id,
+                    manifest.parent_backup_id,
+                )
+                raise OperationErrorExit()
+            chain.insert(0, parent_backup_info)
+            manifest = self.catalog.get_backup_manifest(parent_backup_info.backup_id)
+        return chain
+
+    def _combine_backup(self, backup_info, destination_dir, tablespaces, staging_dir):
+        """
+        Download the backups a block-level incremental backup is built upon
+        and combine them with pg_combinebackup
+
+        :param BackupInfo backup_info: The backup info for the backup to restore
+        :param str destination_dir: Path to the destination directory
+        :param dict[str,str] tablespaces: the tablespace relocation rules,
+          indexed by tablespace name
+        :param str|None staging_dir: the directory where the backups are
+          downloaded, None for the system temporary directory
+        """
+        version_info = PgCombineBackup.get_version_info()
+        if version_info["full_path"] is None:
+            _logger.error("pg_combinebackup could not be found")
+            raise OperationErrorExit()
+        if str(version_info["major_version"]) != backup_info.pg_major_version():
+            _logger.error(
+                "Backup %s was taken with PostgreSQL %s but pg_combinebackup "
+                "version is %s",
+                backup_info.backup_id,
+                backup_info.pg_major_version(),
+                version_info["major_version"],
+            )
+            raise OperationErrorExit()
+
+        chain = self._get_backup_chain(backup_info)
+        staging_dir = tempfile.mkdtemp(prefix="barman-cloud-restore-", dir=staging_dir)
+        try:
+            backup_dirs = []
+            for chain_backup_info in chain:
+                backup_dir = os.path.join(staging_dir, chain_backup_info.backup_id)
+                _logger.info(
+                    "Downloading backup %s to %s",
+                    chain_backup_info.backup_id,
+                    backup_dir,
+                )
+                self._extract_backup(
+                    chain_backup_info,
+                    os.path.join(backup_dir, "data"),
+                    dict(
+                        (tblspc.name, os.path.join(backup_dir, str(tblspc.oid)))
+                        for tblspc in chain_backup_info.tablespaces or []
+                    ),
+                )
+                backup_dirs.append(os.path.join(backup_dir, "data"))
+
+            # Tablespaces are relocated from their location in the last backup
+            # of the chain
+            tbs_mapping = {}
+            for tblspc in backup_info.tablespaces or []:
+                target_dir = tblspc.location
+                if tblspc.name in tablespaces:
+                    target_dir = os.path.realpath(tablespaces[tblspc.name])
+                tbs_mapping[
+                    os.path.join(staging_dir, backup_info.backup_id, str(tblspc.oid))
+                ] = target_dir
+
+            _logger.info(
+                "Combining backups %s into %s",
+                ", ".join(b.backup_id for b in chain),
+                destination_dir,
+            )
+            pg_combinebackup = PgCombineBackup(
+                destination=destination_dir,
+                command=version_info["full_path"],
+                version=version_info["full_version"],
+                tbs_mapping=tbs_mapping,
+                out_handler=PgCombineBackup.make_logging_handler(logging.INFO),
+                args=backup_dirs,
+            )
+            pg_combinebackup()
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _get_referenced_copy_jobs(self, backup_info, target_dirs):
+        """
+        Get the extraction jobs of the files an incremental backup references
+        from other backups
+
+        :param BackupInfo backup_info: The backup info for the backup to restore
+        :param dict[int|None,str] target_dirs: the directory each tar is
+          extracted into, indexed by tablespace oid (None for PGDATA)
+        :return list: the copy jobs, as lists of the file to extract, the
+          target directory and the names of the members to extract
+        """
+        manifest = self.catalog.get_backup_manifest(backup_info.backup_id)
+        if manifest is None:
+            return []
+        copy_jobs = []
+        for backup_id in manifest.referenced_backup_ids:
+            referenced_backup_info = self.catalog.get_backup_info(backup_id)
+            if referenced_backup_info is None:
+                _logger.error(
+                    "Backup %s references files of backup %s which does not exist",
+                    backup_info.backup_id,
+                    backup_id,
+                )
+                raise OperationErrorExit()
+            referenced_files = manifest.get_referenced_files(backup_id)
+            backup_files = self.catalog.get_backup_files(referenced_backup_info)
+            for oid, file_info in backup_files.items():
+                members = referenced_files.get("data" if oid is None else str(oid))
+                if not members:
+                    continue
+                _logger.info(
+                    "Restoring %s unchanged files from backup %s",
+                    len(members),
+                    backup_id,
+                )
+                for referenced_file in [file_info] + file_info.additional_files:
+                    copy_jobs.append([referenced_file, target_dirs[oid], members])
+        return copy_jobs
+
 
 class CloudBackupDownloaderSnapshot(CloudBackupDownloader):
     """A minimal downloader for cloud backups which just retrieves the backup label."""
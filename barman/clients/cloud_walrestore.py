@@ -18,8 +18,11 @@
 
 import logging
 import os
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
+from itertools import islice
 
 from barman.clients.cloud_cli import (
     CLIErrorExit,
@@ -27,11 +30,21 @@ from barman.clients.cloud_cli import (
     OperationErrorExit,
     create_argument_parser,
 )
+from barman.clients.cloud_compression import decompress_to_file
 from barman.cloud import ALLOWED_COMPRESSIONS, configure_logging
 from barman.cloud_providers import get_cloud_interface
 from barman.exceptions import BarmanException
-from barman.utils import force_str
-from barman.xlog import hash_dir, is_any_xlog_file, is_backup_file, is_partial_file
+from barman.utils import check_non_negative, force_str
+from barman.xlog import (
+    generate_segment_names,
+    hash_dir,
+    is_any_xlog_file,
+    is_backup_file,
+    is_partial_file,
+    is_wal_file,
+)
+
+DEFAULT_SPOOL_DIR = "/var/tmp/barman-cloud-wal-restore"
 
 _logger = logging.getLogger(__name__)
 
@@ -52,6 +65,17 @@ def main(args=None):
         raise CLIErrorExit()
 
     try:
+        # If the WAL file has been prefetched by a previous run, deliver it
+        # without even connecting to the cloud provider
+        if (
+            config.parallel > 1
+            and not config.test
+            and try_deliver_from_spool(
+                config.spool_dir, config.wal_name, config.wal_dest
+            )
+        ):
+            return
+
         cloud_interface = get_cloud_interface(config)
 
         with closing(cloud_interface):
@@ -61,10 +85,23 @@ def main(args=None):
                 raise SystemExit(0)
 
             downloader = CloudWalDownloader(
-                cloud_interface=cloud_interface, server_name=config.server_name
+                cloud_interface=cloud_interface,
+                server_name=config.server_name,
+                compression_hint=config.compression_hint,
             )
 
-            downloader.download_wal(config.wal_name, config.wal_dest, config.no_partial)
+            if config.parallel > 1:
+                downloader.download_wal_and_prefetch(
+                    config.wal_name,
+                    config.wal_dest,
+                    config.no_partial,
+                    config.parallel,
+                    config.spool_dir,
+                )
+            else:
+                downloader.download_wal(
+                    config.wal_name, config.wal_dest, config.no_partial
+                )
 
     except Exception as exc:
         _logger.error("Barman cloud WAL restore exception: %s", force_str(exc))
@@ -92,6 +129,31 @@ def parse_arguments(args=None):
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--compression-hint",
+        choices=["none"] + sorted(set(ALLOWED_COMPRESSIONS.values())),
+        help="The compression WAL files are expected to be archived with. "
+        "WAL files are downloaded directly using the name implied by this "
+        "compression, falling back to listing the archive only if they are "
+        "not found. By default the archive is always listed.",
+    )
+    parser.add_argument(
+        "--parallel",
+        default=0,
+        type=check_non_negative,
+        metavar="JOBS",
+        help="Specifies the number of WAL files to download in parallel, "
+        "including the requested one. The following WAL files are stored "
+        "in the spool directory and delivered from there when requested. "
+        "Defaults to 0 (disabled).",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default=DEFAULT_SPOOL_DIR,
+        metavar="SPOOL_DIR",
+        help="Specifies spool directory for WAL files. Defaults to "
+        "'{0}'.".format(DEFAULT_SPOOL_DIR),
+    )
     parser.add_argument(
         "wal_name",
         help="The value of the '%%f' keyword (according to 'restore_command').",
@@ -108,27 +170,33 @@ class CloudWalDownloader(object):
     Cloud storage download client
     """
 
-    def __init__(self, cloud_interface, server_name):
+    def __init__(self, cloud_interface, server_name, compression_hint=None):
         """
         Object responsible for handling interactions with cloud storage
 
         :param CloudInterface cloud_interface: The interface to use to
           upload the backup
         :param str server_name: The name of the server as configured in Barman
+        :param str|None compression_hint: The compression WAL files are
+          expected to be archived with, "none" for uncompressed WAL files.
+          When set, WAL files are downloaded without listing the archive first.
         """
 
         self.cloud_interface = cloud_interface
         self.server_name = server_name
+        self.compression_hint = compression_hint
+        # The compression of the last WAL file found in the archive, as a
+        # (compression,) tuple so that uncompressed files can be told apart
+        # from an unknown compression
+        self._last_seen_compression = None
 
-    def download_wal(self, wal_name, wal_dest, no_partial):
+    def _wal_path(self, wal_name):
         """
-        Download a WAL file from cloud storage
+        Build the key of an uncompressed WAL file in cloud storage
 
         :param str wal_name: Name of the WAL file
-        :param str wal_dest: Full path of the destination WAL file
-        :param bool no_partial: Do not download partial WAL files
+        :rtype: str
         """
-
         # Correctly format the source path on s3
         source_dir = os.path.join(
             self.cloud_interface.path, self.server_name, "wals", hash_dir(wal_name)
@@ -137,7 +205,35 @@ class CloudWalDownloader(object):
         if not source_dir.endswith(os.path.sep):
             source_dir += os.path.sep
 
-        wal_path = os.path.join(source_dir, wal_name)
+        return os.path.join(source_dir, wal_name)
+
+    def _guessed_compressions(self):
+        """
+        The compressions a WAL file is likely to be archived with, in the
+        order they should be tried
+
+        :rtype: list[str|None]
+        """
+        compressions = []
+        if self._last_seen_compression is not None:
+            compressions.append(self._last_seen_compression[0])
+        if self.compression_hint is not None:
+            hint = None if self.compression_hint == "none" else self.compression_hint
+            if hint not in compressions:
+                compressions.append(hint)
+        return compressions
+
+    def _find_wal(self, wal_name, no_partial):
+        """
+        Find the object storing a WAL file in cloud storage
+
+        :param str wal_name: Name of the WAL file
+        :param bool no_partial: Do not consider partial WAL files
+        :rtype: tuple[str|None,str|None]
+        :return: the key of the object and its compression, or None as key
+            if the WAL file does not exist
+        """
+        wal_path = self._wal_path(wal_name)
 
         remote_name = None
         # Automatically detect compression based on the file extension
@@ -181,17 +277,67 @@ class CloudWalDownloader(object):
             )
             break
 
-        if not remote_name:
-            _logger.info(
-                "WAL file %s for server %s does not exists", wal_name, self.server_name
-            )
-            raise OperationErrorExit()
+        return remote_name, compression
 
-        if compression and sys.version_info < (3, 0, 0):
-            raise BarmanException(
-                "Compressed WALs cannot be restored with Python 2.x - "
-                "please upgrade to a supported version of Python 3"
+    def _fetch_guessed_wal(self, wal_name, wal_dest):
+        """
+        Download a WAL file guessing its key from the expected compressions,
+        without listing the archive
+
+        :param str wal_name: Name of the WAL file
+        :param str wal_dest: Full path of the destination WAL file
+        :rtype: bool
+        :return: True if the WAL file has been downloaded, False if none of
+            the guessed keys exists
+        """
+        wal_path = self._wal_path(wal_name)
+        for compression in self._guessed_compressions():
+            remote_name = wal_path + self._suffix(compression)
+            remote_file = self.cloud_interface.remote_open(remote_name)
+            if remote_file is None:
+                _logger.debug("WAL file %s not found as %s", wal_name, remote_name)
+                continue
+            self._check_compression(compression)
+            _logger.debug(
+                "Downloading %s to %s (%s)",
+                remote_name,
+                wal_dest,
+                "decompressing " + compression if compression else "no compression",
             )
+            with closing(remote_file), open(wal_dest, "wb") as dest_file:
+                if compression is None:
+                    shutil.copyfileobj(remote_file, dest_file)
+                else:
+                    decompress_to_file(remote_file, dest_file, compression)
+            return True
+        return False
+
+    def _fetch_wal(self, wal_name, wal_dest, no_partial):
+        """
+        Download a WAL file from cloud storage
+
+        The keys implied by the expected compressions are tried first, and the
+        archive is listed only if none of them exists.
+
+        :param str wal_name: Name of the WAL file
+        :param str wal_dest: Full path of the destination WAL file
+        :param bool no_partial: Do not download partial WAL files
+        :rtype: bool
+        :return: True if the WAL file has been downloaded, False if it does
+            not exist
+        """
+        if self._fetch_guessed_wal(wal_name, wal_dest):
+            return True
+
+        remote_name, compression = self._find_wal(wal_name, no_partial)
+        if not remote_name:
+            return False
+
+        self._check_compression(compression)
+        # Remember the compression of complete WAL files, so that the
+        # following ones can be downloaded without listing the archive
+        if remote_name == self._wal_path(wal_name) + self._suffix(compression):
+            self._last_seen_compression = (compression,)
 
         # Download the file
         _logger.debug(
@@ -201,6 +347,135 @@ class CloudWalDownloader(object):
             "decompressing " + compression if compression else "no compression",
         )
         self.cloud_interface.download_file(remote_name, wal_dest, compression)
+        return True
+
+    @staticmethod
+    def _suffix(compression):
+        """
+        The extension of WAL files archived with the given compression
+
+        :param str|None compression: the compression of the WAL file
+        :rtype: str
+        """
+        for extension, allowed_compression in ALLOWED_COMPRESSIONS.items():
+            if allowed_compression == compression:
+                return extension
+        return ""
+
+    @staticmethod
+    def _check_compression(compression):
+        """
+        Make sure a WAL file archived with the given compression can be restored
+
+        :param str|None compression: the compression of the WAL file
+        """
+        if compression and sys.version_info < (3, 0, 0):
+            raise BarmanException(
+                "Compressed WALs cannot be restored with Python 2.x - "
+                "please upgrade to a supported version of Python 3"
+            )
+
+    def download_wal(self, wal_name, wal_dest, no_partial):
+        """
+        Download a WAL file from cloud storage
+
+        :param str wal_name: Name of the WAL file
+        :param str wal_dest: Full path of the destination WAL file
+        :param bool no_partial: Do not download partial WAL files
+        """
+        if not self._fetch_wal(wal_name, wal_dest, no_partial):
+            _logger.info(
+                "WAL file %s for server %s does not exists", wal_name, self.server_name
+            )
+            raise OperationErrorExit()
+
+    def download_wal_and_prefetch(
+        self, wal_name, wal_dest, no_partial, parallel, spool_dir
+    ):
+        """
+        Download a WAL file from cloud storage, while prefetching the
+        following ones into the spool directory.
+
+        The names of the following WAL files are predicted from the requested
+        one. As the size of the WAL segments is unknown, some of the predicted
+        names may not exist, and they are simply skipped. Partial WAL files are
+        never prefetched.
+
+        :param str wal_name: Name of the WAL file
+        :param str wal_dest: Full path of the destination WAL file
+        :param bool no_partial: Do not download partial WAL files
+        :param int parallel: number of WAL files to download concurrently,
+            including the requested one
+        :param str spool_dir: the directory where prefetched WAL files are stored
+        """
+        # Only the names following a regular WAL segment can be predicted
+        if not is_wal_file(wal_name):
+            self.download_wal(wal_name, wal_dest, no_partial)
+            return
+
+        if not os.path.isdir(spool_dir):
+            os.makedirs(spool_dir)
+
+        next_wal_names = islice(generate_segment_names(wal_name), 1, parallel)
+        with ThreadPoolExecutor(max_workers=parallel - 1) as executor:
+            futures = [
+                executor.submit(self._prefetch_wal, next_wal_name, spool_dir)
+                for next_wal_name in next_wal_names
+            ]
+            try:
+                self.download_wal(wal_name, wal_dest, no_partial)
+            except BaseException:
+                # No point in waiting for WAL files which follow a missing one
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _prefetch_wal(self, wal_name, spool_dir):
+        """
+        Download a WAL file from cloud storage into the spool directory.
+
+        Any error is logged and ignored, because the WAL file will be
+        downloaded again when it is requested.
+
+        :param str wal_name: Name of the WAL file
+        :param str spool_dir: the directory where prefetched WAL files are stored
+        """
+        spool_file = os.path.join(spool_dir, wal_name)
+        if os.path.exists(spool_file):
+            return
+        # Download into a temporary file, so that a concurrent restore never
+        # delivers a WAL file which has not been completely written yet
+        temp_file = os.path.join(spool_dir, ".%s.part" % wal_name)
+        try:
+            if not self._fetch_wal(wal_name, temp_file, no_partial=True):
+                _logger.debug("WAL file %s not found, skipping prefetch", wal_name)
+                return
+            os.rename(temp_file, spool_file)
+            _logger.info("Prefetched WAL %s into %s", wal_name, spool_dir)
+        except Exception as exc:
+            _logger.warning("Error prefetching WAL %s: %s", wal_name, force_str(exc))
+            _logger.debug("Exception details:", exc_info=exc)
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+
+def try_deliver_from_spool(spool_dir, wal_name, wal_dest):
+    """
+    Move a WAL file prefetched in the spool directory to its destination
+
+    :param str spool_dir: the directory where prefetched WAL files are stored
+    :param str wal_name: Name of the WAL file
+    :param str wal_dest: Full path of the destination WAL file
+    :rtype: bool
+    :return: True if the WAL file has been delivered, False if it is not
+        available in the spool directory
+    """
+    spool_file = os.path.join(spool_dir, wal_name)
+    if not os.path.exists(spool_file):
+        return False
+    _logger.info("Delivering WAL %s from %s", wal_name, spool_dir)
+    shutil.move(spool_file, wal_dest)
+    return True
 
 
 if __name__ == "__main__":
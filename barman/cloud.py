@@ -20,44 +20,64 @@ import collections
 import copy
 import datetime
 import errno
+import hashlib
+import heapq
 import json
 import logging
 import multiprocessing
 import operator
 import os
+import queue
+import random
 import shutil
 import signal
+import stat
 import tarfile
+import tempfile
+import threading
 import time
 from abc import ABCMeta, abstractmethod, abstractproperty
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from functools import partial
-from io import BytesIO, RawIOBase
+from io import SEEK_CUR, SEEK_END, SEEK_SET, BytesIO, RawIOBase
+from multiprocessing import resource_tracker, shared_memory
 from tempfile import NamedTemporaryFile
 
 from barman import xlog
 from barman.annotations import KeepManagerMixinCloud
-from barman.backup_executor import ConcurrentBackupStrategy, SnapshotBackupExecutor
+from barman.backup_executor import (
+    ConcurrentBackupStrategy,
+    PostgresBackupStrategy,
+    SnapshotBackupExecutor,
+)
 from barman.clients import cloud_compression
 from barman.clients.cloud_cli import (
     NetworkErrorExit,
     OperationErrorExit,
     get_missing_attrs,
 )
+from barman.command_wrappers import PgBaseBackup
 from barman.exceptions import (
     BackupException,
     BackupPreconditionException,
     BarmanException,
+    CommandFailedException,
     ConfigurationException,
+    DataTransferFailure,
 )
 from barman.fs import UnixLocalCommand, path_allowed
 from barman.infofile import BackupInfo, WalFileInfo
+from barman.postgres import StreamingConnection
 from barman.postgres_plumbing import EXCLUDE_LIST, PGDATA_EXCLUDE_LIST
 from barman.utils import (
     BarmanEncoder,
     force_str,
+    fsync_file,
     get_backup_info_from_name,
     human_readable_timedelta,
     is_backup_id,
+    map_concurrently,
     pretty_size,
     range_fun,
     total_seconds,
@@ -76,6 +96,8 @@ except ImportError:
 
 
 BUFSIZE = 16 * 1024
+# The size of the reads of the files uploaded by barman-cloud-backup
+READ_BUFSIZE = 1 << 20
 LOGGING_FORMAT = "%(asctime)s [%(process)s] %(levelname)s: %(message)s"
 
 # Allowed compression algorithms
@@ -131,6 +153,40 @@ def copyfileobj_pad_truncate(src, dst, length=None):
             dst.write(tarfile.NUL * (remainder - len(buf)))
 
 
+def fadvise(fd, advice, offset=0, length=0):
+    """
+    Give the kernel an advice about the access pattern of a file, ignoring
+    the platforms and file systems which do not support it
+
+    :param int fd: the file descriptor
+    :param str advice: the name of the advice, e.g. ``POSIX_FADV_DONTNEED``
+    :param int offset: the start of the range the advice applies to
+    :param int length: the length of the range, 0 for the rest of the file
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, getattr(os, advice))
+    except EnvironmentError as e:
+        _logger.debug("Cannot apply %s: %s", advice, force_str(e))
+
+
+def fallocate(fd, length):
+    """
+    Preallocate the blocks of a file, ignoring the platforms and file
+    systems which do not support it
+
+    :param int fd: the file descriptor
+    :param int length: the length of the file
+    """
+    if not hasattr(os, "posix_fallocate") or length <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, length)
+    except EnvironmentError as e:
+        _logger.debug("Cannot preallocate %s bytes: %s", length, force_str(e))
+
+
 class CloudProviderError(BarmanException):
     """
     This exception is raised when we get an error in the response from the
@@ -138,6 +194,23 @@ class CloudProviderError(BarmanException):
     """
 
 
+class CloudThrottlingError(CloudProviderError):
+    """
+    This exception is raised when the cloud provider throttled the deletion of
+    some of the objects of a batch, the others having been deleted
+    """
+
+    def __init__(self, paths):
+        """
+        :param List[str] paths: the paths of the objects which have not been
+          deleted because of the throttling
+        """
+        super(CloudThrottlingError, self).__init__(
+            "deletion of %s objects throttled by the cloud provider" % len(paths)
+        )
+        self.paths = paths
+
+
 class CloudUploadingError(BarmanException):
     """
     This exception is raised when there are upload errors
@@ -178,6 +251,115 @@ class TarFileIgnoringTruncate(tarfile.TarFile):
         self.members.append(tarinfo)
 
 
+class FileReadahead(object):
+    """
+    Ask the kernel to read ahead the files which are about to be uploaded
+
+    A helper thread advises ``POSIX_FADV_WILLNEED`` on the queued files, so
+    that their pages are read from disk while the previous files are being
+    uploaded. The helper thread stays at most ``window`` bytes ahead of the
+    files already uploaded and only prefetches the first ``window`` bytes of
+    each file, the rest being read ahead by the kernel because the files are
+    read sequentially.
+    """
+
+    #: The default amount of data read ahead
+    WINDOW = 64 << 20
+
+    def __init__(self, window=WINDOW):
+        """
+        :param int window: the maximum amount of data read ahead
+        """
+        self.window = window
+        self._cond = threading.Condition()
+        # The files waiting to be read ahead
+        self._queue = collections.deque()
+        # The sizes of the files read ahead and not uploaded yet
+        self._sizes = collections.deque()
+        self._ahead = 0
+        self._prefetched = 0
+        self._done = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="barman-readahead")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (
+                    not self._queue or self._ahead >= self.window
+                ):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._queue.popleft()
+                index = self._prefetched
+                self._prefetched += 1
+                # Skip the files which have already been uploaded
+                if index < self._done:
+                    continue
+                # The size is only known once the file has been read ahead
+                entry = [0]
+                self._sizes.append(entry)
+            size = self._prefetch(path)
+            with self._cond:
+                entry[0] = size
+                if index >= self._done:
+                    self._ahead += size
+
+    def _prefetch(self, path):
+        """
+        Advise the kernel to read the first ``window`` bytes of a file
+
+        :param str path: the path of the file
+        :return int: the amount of data read ahead
+        """
+        if not hasattr(os, "posix_fadvise"):
+            return 0
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except EnvironmentError:
+            # The file disappeared, it will be skipped by the upload
+            return 0
+        try:
+            size = min(os.fstat(fd).st_size, self.window)
+            fadvise(fd, "POSIX_FADV_WILLNEED", length=size)
+            return size
+        finally:
+            os.close(fd)
+
+    def add(self, path):
+        """
+        Queue a file to be read ahead
+
+        :param str path: the path of the file
+        """
+        with self._cond:
+            self._queue.append(path)
+            self._cond.notify_all()
+
+    def done(self):
+        """
+        Record that the first queued file not uploaded yet has been uploaded
+        or skipped
+        """
+        with self._cond:
+            if self._done < self._prefetched:
+                self._ahead -= self._sizes.popleft()[0]
+            self._done += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        Stop the helper thread
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
 class CloudTarUploader(object):
     # This is the method we use to create new buffers
     # We use named temporary files, so we can pass them by name to
@@ -187,7 +369,17 @@ class CloudTarUploader(object):
     )
 
     def __init__(
-        self, cloud_interface, key, chunk_size, compression=None, max_bandwidth=None
+        self,
+        cloud_interface,
+        key,
+        chunk_size,
+        compression=None,
+        bandwidth_group=None,
+        lock=None,
+        compression_workers=0,
+        long_distance_matching=False,
+        in_memory_buffers=False,
+        on_upload_created=None,
     ):
         """
         A tar archive that resides on cloud storage
@@ -196,20 +388,38 @@ class CloudTarUploader(object):
         :param str key: path inside the bucket
         :param str compression: required compression
         :param int chunk_size: the upload chunk size
-        :param int max_bandwidth: the maximum amount of data per second that
-          should be uploaded by this tar uploader
+        :param str|None bandwidth_group: the bandwidth group of the parts, whose
+          upload is throttled by the cloud interface workers according to the
+          limit set for the group in addition to the global one
+        :param threading.RLock|None lock: a lock serialising the calls to the
+          cloud interface, required when several tar uploaders sharing the same
+          cloud interface are written by different threads
+        :param int compression_workers: the number of compression threads,
+          only used by zstd
+        :param bool long_distance_matching: whether long distance matching is
+          enabled, only used by zstd
+        :param bool in_memory_buffers: whether the parts are buffered in memory
+          instead of temporary files
+        :param callable|None on_upload_created: a function called with this
+          uploader once its multipart upload has been created
         """
         self.cloud_interface = cloud_interface
+        self.shared_lock = lock
+        self.lock = lock if lock is not None else nullcontext()
+        self.in_memory_buffers = in_memory_buffers
+        self.on_upload_created = on_upload_created
         self.key = key
         self.chunk_size = chunk_size
-        self.max_bandwidth = max_bandwidth
+        self.bandwidth_group = bandwidth_group
         self.upload_metadata = None
         self.buffer = None
         self.counter = 0
         self.compressor = None
         # Some supported compressions (e.g. snappy) require CloudTarUploader to apply
         # compression manually rather than relying on the tar file.
-        self.compressor = cloud_compression.get_compressor(compression)
+        self.compressor = cloud_compression.get_compressor(
+            compression, compression_workers, long_distance_matching
+        )
         # If the compression is supported by tar then it will be added to the filemode
         # passed to tar_mode.
         tar_mode = cloud_compression.get_streaming_tar_mode("w", compression)
@@ -221,14 +431,25 @@ class CloudTarUploader(object):
         )
         self.size = 0
         self.stats = None
-        self.time_of_last_upload = None
-        self.size_of_last_upload = None
+
+    def _create_buffer(self):
+        """
+        Create the buffer holding the next part to be uploaded.
+
+        In memory buffers are handed over to the cloud interface, which passes
+        them to the worker processes without writing them to the local disk.
+
+        :rtype: BytesIO|tempfile.NamedTemporaryFile
+        """
+        if self.in_memory_buffers:
+            return BytesIO()
+        return self._buffer()
 
     def write(self, buf):
         if self.buffer and self.buffer.tell() > self.chunk_size:
             self.flush()
         if not self.buffer:
-            self.buffer = self._buffer()
+            self.buffer = self._create_buffer()
         if self.compressor:
             # If we have a custom compressor we must use it here
             compressed_buf = self.compressor.add_chunk(buf)
@@ -241,66 +462,215 @@ class CloudTarUploader(object):
             self.buffer.write(buf)
             self.size += len(buf)
 
-    def _throttle_upload(self, part_size):
-        """
-        Throttles the upload according to the value of `self.max_bandwidth`.
-
-        Waits until enough time has passed since the last upload that a new part can
-        be uploaded without exceeding `self.max_bandwidth`. If sufficient time has
-        already passed then this function will return without waiting.
-
-        :param int part_size: Size in bytes of the part which is to be uplaoded.
-        """
-        if (self.time_of_last_upload and self.size_of_last_upload) is not None:
-            min_time_to_next_upload = self.size_of_last_upload / self.max_bandwidth
-            seconds_since_last_upload = (
-                datetime.datetime.now() - self.time_of_last_upload
-            ).total_seconds()
-            if seconds_since_last_upload < min_time_to_next_upload:
-                _logger.info(
-                    f"Uploaded {self.size_of_last_upload} bytes "
-                    f"{seconds_since_last_upload} seconds ago which exceeds "
-                    f"limit of {self.max_bandwidth} bytes/s"
-                )
-                time_to_wait = min_time_to_next_upload - seconds_since_last_upload
-                _logger.info(f"Throttling upload by waiting for {time_to_wait} seconds")
-                time.sleep(time_to_wait)
-        self.time_of_last_upload = datetime.datetime.now()
-        self.size_of_last_upload = part_size
-
     def flush(self):
         if not self.upload_metadata:
-            self.upload_metadata = self.cloud_interface.create_multipart_upload(
-                self.key
-            )
+            with self.lock:
+                self.upload_metadata = self.cloud_interface.create_multipart_upload(
+                    self.key
+                )
+            if self.on_upload_created:
+                self.on_upload_created(self)
 
-        part_size = self.buffer.tell()
         self.buffer.flush()
         self.buffer.seek(0, os.SEEK_SET)
         self.counter += 1
-        if self.max_bandwidth:
-            # Upload throttling is applied just before uploading the next part so that
-            # compression and flushing have already happened before we start waiting.
-            self._throttle_upload(part_size)
-        self.cloud_interface.async_upload_part(
-            upload_metadata=self.upload_metadata,
-            key=self.key,
-            body=self.buffer,
-            part_number=self.counter,
-        )
+        with self.lock:
+            self.cloud_interface.async_upload_part(
+                upload_metadata=self.upload_metadata,
+                key=self.key,
+                body=self.buffer,
+                part_number=self.counter,
+                bandwidth_group=self.bandwidth_group,
+            )
         self.buffer.close()
         self.buffer = None
 
     def close(self):
         if self.tar:
             self.tar.close()
+        if self.compressor:
+            # Write the end of the stream still buffered by the compressor
+            remaining = self.compressor.flush()
+            if remaining:
+                if not self.buffer:
+                    self.buffer = self._create_buffer()
+                self.buffer.write(remaining)
+                self.size += len(remaining)
         self.flush()
-        self.cloud_interface.async_complete_multipart_upload(
-            upload_metadata=self.upload_metadata,
-            key=self.key,
-            parts_count=self.counter,
+        with self.lock:
+            self.cloud_interface.async_complete_multipart_upload(
+                upload_metadata=self.upload_metadata,
+                key=self.key,
+                parts_count=self.counter,
+            )
+        # The other tar streams keep uploading their parts while we wait
+        self.stats = self.cloud_interface.wait_for_multipart_upload(
+            self.key, lock=self.shared_lock
         )
-        self.stats = self.cloud_interface.wait_for_multipart_upload(self.key)
+
+
+class CloudUploadJournal(object):
+    """
+    A local checkpoint journal recording the progress of a backup upload.
+
+    The journal records the multipart upload metadata of every archive whose
+    upload has started and, once an archive has been completed, the last file
+    it contains and its upload statistics. An interrupted upload can then be
+    resumed from the first archive which has not been completed.
+    """
+
+    def __init__(self, path, destination_url, backup_id, compression=None):
+        """
+        Create an empty journal
+
+        :param str path: the path of the journal file
+        :param str destination_url: the URL the backup is uploaded to
+        :param str backup_id: the ID of the backup being uploaded
+        :param str|None compression: the compression of the archives
+        """
+        self.path = path
+        self.destination_url = destination_url
+        self.backup_id = backup_id
+        self.compression = compression
+        # The archives indexed by key, in the order their upload started
+        self.archives = {}
+
+    @classmethod
+    def open(cls, path, destination_url, backup_id, compression=None):
+        """
+        Load the journal stored at the given path, or create an empty one if
+        there is none
+
+        :param str path: the path of the journal file
+        :param str destination_url: the URL the backup is uploaded to
+        :param str backup_id: the ID of the backup being uploaded
+        :param str|None compression: the compression of the archives
+        :rtype: CloudUploadJournal
+        """
+        journal = cls(path, destination_url, backup_id, compression)
+        try:
+            with open(path) as journal_file:
+                content = json.load(journal_file)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return journal
+        for attribute in ("destination_url", "backup_id", "compression"):
+            if content.get(attribute) != getattr(journal, attribute):
+                raise ConfigurationException(
+                    "Cannot resume the upload recorded in '%s' using a different "
+                    "%s (%s)" % (path, attribute, content.get(attribute))
+                )
+        journal.archives = content["archives"]
+        return journal
+
+    def save(self):
+        """
+        Atomically write the journal to disk
+        """
+        content = {
+            "destination_url": self.destination_url,
+            "backup_id": self.backup_id,
+            "compression": self.compression,
+            "archives": self.archives,
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as journal_file:
+            json.dump(content, journal_file, default=self._json_default)
+        fsync_file(temp_path)
+        os.rename(temp_path, self.path)
+
+    def remove(self):
+        """
+        Remove the journal once the upload is complete
+        """
+        try:
+            os.unlink(self.path)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    @staticmethod
+    def _json_default(obj):
+        """
+        Serialise the datetimes in the upload metadata and statistics
+
+        :param object obj: the object json cannot serialise
+        :rtype: str
+        """
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+        raise TypeError("%r is not JSON serializable" % obj)
+
+    def archive_started(self, key, name, upload_metadata):
+        """
+        Record that the upload of an archive has started
+
+        :param str key: the key of the archive
+        :param str name: the name of the tar the archive belongs to
+        :param object upload_metadata: the metadata of the multipart upload
+        """
+        self.archives[key] = {
+            "name": name,
+            "status": "uploading",
+            "upload_metadata": upload_metadata,
+        }
+        self.save()
+
+    def archive_completed(self, key, name, last_entry, stats, final=False):
+        """
+        Record that the upload of an archive has been completed
+
+        :param str key: the key of the archive
+        :param str name: the name of the tar the archive belongs to
+        :param str|None last_entry: the last path added to the archive
+        :param FileUploadStatistics stats: the upload statistics
+        :param bool final: whether no more archives follow for the same name
+        """
+        self.archives[key] = {
+            "name": name,
+            "status": "done",
+            "last_entry": last_entry,
+            "final": final,
+            # Keep the statistics in the same form they are stored on disk
+            "stats": json.loads(json.dumps(stats, default=self._json_default)),
+        }
+        self.save()
+
+    @staticmethod
+    def load_stats(stats):
+        """
+        Rebuild the upload statistics of an archive read from the journal
+
+        :param dict stats: the statistics as stored in the journal
+        :rtype: FileUploadStatistics
+        """
+        stats = FileUploadStatistics(stats)
+        for attribute in ("start_time", "end_time"):
+            if attribute in stats:
+                stats[attribute] = datetime.datetime.fromisoformat(stats[attribute])
+        parts = {}
+        for part in stats["parts"].values():
+            for attribute in ("start_time", "end_time"):
+                if attribute in part:
+                    part[attribute] = datetime.datetime.fromisoformat(part[attribute])
+            parts[part["part_number"]] = part
+        stats["parts"] = parts
+        return stats
+
+
+class CompletedTarUpload(object):
+    """
+    An archive uploaded by a previous run of an interrupted backup upload
+    """
+
+    def __init__(self, key, stats):
+        """
+        :param str key: the key of the archive
+        :param FileUploadStatistics stats: the upload statistics
+        """
+        self.key = key
+        self.stats = stats
 
 
 class CloudUploadController(object):
@@ -312,6 +682,15 @@ class CloudUploadController(object):
         compression,
         min_chunk_size=None,
         max_bandwidth=None,
+        tar_streams=1,
+        compression_workers=0,
+        long_distance_matching=False,
+        in_memory_buffers=False,
+        journal=None,
+        parent_manifest=None,
+        chunk_store=None,
+        drop_page_cache=False,
+        tablespace_bandwidth=None,
     ):
         """
         Create a new controller that upload the backup in cloud storage
@@ -322,7 +701,27 @@ class CloudUploadController(object):
         :param str|None compression: required compression
         :param int|None min_chunk_size: the minimum size of a single upload part
         :param int|None max_bandwidth: the maximum amount of data per second that
-          should be uploaded during the backup
+          should be uploaded during the backup, enforced across all the upload
+          workers of the cloud interface
+        :param int tar_streams: the number of tar archives built concurrently
+          when uploading a directory
+        :param int compression_workers: the number of compression threads for
+          each tar archive, only used by zstd
+        :param bool long_distance_matching: whether long distance matching is
+          enabled, only used by zstd
+        :param bool in_memory_buffers: whether the parts are buffered in memory
+          instead of temporary files
+        :param CloudUploadJournal|None journal: the journal recording the
+          progress of the upload, which is resumed if the journal is not empty.
+          Only supported with a single tar stream.
+        :param CloudBackupManifest|None parent_manifest: the manifest of the
+          parent backup, if this is a file-level incremental backup
+        :param CloudChunkStore|None chunk_store: the chunk store where the
+          relation files are uploaded, None to upload them in the tar archives
+        :param bool drop_page_cache: whether the pages of the uploaded files
+          are dropped from the page cache once they have been read
+        :param dict[str,int]|None tablespace_bandwidth: the maximum amount of
+          data per second that should be uploaded for each named tablespace
         """
 
         self.cloud_interface = cloud_interface
@@ -352,7 +751,47 @@ class CloudUploadController(object):
         self.chunk_size = max(possible_min_chunk_sizes)
         self.compression = compression
         self.max_bandwidth = max_bandwidth
+        self.tablespace_bandwidth = tablespace_bandwidth or {}
+        # The limits are enforced by the workers of the cloud interface, so
+        # they must be set before the first part is uploaded
+        if max_bandwidth:
+            cloud_interface.set_bandwidth_limit(max_bandwidth)
+        for tablespace, bandwidth in self.tablespace_bandwidth.items():
+            cloud_interface.set_bandwidth_limit(bandwidth, group=tablespace)
+        # The bandwidth group of the named tars of the tablespaces which have
+        # their own limit
+        self._bandwidth_groups = {}
+        self.tar_streams = tar_streams
+        self.compression_workers = compression_workers
+        self.long_distance_matching = long_distance_matching
+        self.in_memory_buffers = in_memory_buffers
         self.tar_list = {}
+        # The tar uploader currently being written by each stream of each
+        # named tar, indexed by (name, stream)
+        self._open_tars = {}
+        # Serialises the access to tar_list and to the cloud interface when
+        # several tar streams are written concurrently
+        self._lock = threading.RLock()
+        # The last path added to the tar uploader of each stream
+        self._last_entries = {}
+        # When resuming, the last path uploaded for each named tar, and the
+        # named tars which have been entirely uploaded
+        self._resume_points = {}
+        self._completed_names = set()
+        # The files uploaded by the backup and, for incremental backups, the
+        # files which have not changed since the parent backup
+        self.parent_manifest = parent_manifest
+        self.chunk_store = chunk_store
+        self.drop_page_cache = drop_page_cache
+        self.manifest = CloudBackupManifest(
+            parent_backup_id=parent_manifest.backup_id if parent_manifest else None,
+            chunk_compression=chunk_store.compression if chunk_store else None,
+        )
+        self.journal = journal
+        if journal is not None:
+            if tar_streams > 1:
+                raise ValueError("Cannot resume uploads using several tar streams")
+            self._resume()
 
         self.upload_stats = {}
         """Already finished uploads list"""
@@ -363,6 +802,173 @@ class CloudUploadController(object):
         self.copy_end_time = None
         """Copy end time"""
 
+    def _resume(self):
+        """
+        Resume the upload recorded in the journal
+
+        The archives which have been completed are kept, the paths they contain
+        are skipped and the uploads which were still running are aborted, so
+        that their archives are uploaded again.
+        """
+        for key, archive in list(self.journal.archives.items()):
+            name = archive["name"]
+            if archive["status"] == "done":
+                _logger.info("Resuming upload after '%s'", key)
+                self.tar_list.setdefault(name, []).append(
+                    CompletedTarUpload(key, self.journal.load_stats(archive["stats"]))
+                )
+                if archive["final"]:
+                    self._completed_names.add(name)
+                else:
+                    self._resume_points[name] = archive["last_entry"]
+            else:
+                _logger.info("Aborting interrupted upload of '%s'", key)
+                try:
+                    self.cloud_interface._abort_multipart_upload(
+                        archive["upload_metadata"], key
+                    )
+                except Exception as exc:
+                    _logger.warning(
+                        "Unable to abort interrupted upload of '%s': %s",
+                        key,
+                        force_str(exc),
+                    )
+                del self.journal.archives[key]
+        self.journal.save()
+
+    def _skip_uploaded(self, name, arcname):
+        """
+        Whether a path has already been uploaded before the upload was resumed
+
+        :param str name: tar name
+        :param str arcname: the name of the path inside the tar
+        :rtype: bool
+        """
+        if name in self._completed_names:
+            return True
+        if name not in self._resume_points:
+            return False
+        if self._resume_points[name] == arcname:
+            # This is the last path uploaded, the following ones are not
+            del self._resume_points[name]
+        return True
+
+    @contextmanager
+    def _open_file(self, path):
+        """
+        Open a file to be uploaded
+
+        The file is read sequentially with large reads and, if requested, its
+        pages are dropped from the page cache once it has been read, so that
+        the backup does not evict the pages used by the database.
+
+        :param str path: the path of the file
+        """
+        with open(path, "rb", buffering=READ_BUFSIZE) as fileobj:
+            fadvise(fileobj.fileno(), "POSIX_FADV_SEQUENTIAL")
+            yield fileobj
+            if self.drop_page_cache:
+                fadvise(fileobj.fileno(), "POSIX_FADV_DONTNEED")
+
+    def _add_file_to_tar(self, name, path, arcname, stream, file_stat):
+        """
+        Add a regular file to a named tar, recording it in the manifest
+
+        If the file has not changed since the parent backup it is not uploaded
+        again, and the manifest records the backup holding its content.
+
+        :param str name: tar name
+        :param str path: the path of the file
+        :param str arcname: the name of the file inside the tar
+        :param int stream: the tar stream
+        :param os.stat_result file_stat: the status of the file
+        """
+        if self.parent_manifest is not None:
+            entry = self.parent_manifest.find_unchanged(name, arcname, file_stat)
+            if entry is not None:
+                _logger.debug("Skipping unchanged file %s", arcname)
+                with self._lock:
+                    self.manifest.add_file(name, arcname, **entry)
+                return
+        if self._is_chunked(name, arcname, file_stat):
+            self._add_file_to_chunk_store(name, path, arcname, file_stat)
+            return
+        tar = self._get_tar(name, stream)
+        tarinfo = tar.gettarinfo(path, arcname=arcname)
+        with self._open_file(path) as fileobj:
+            tar.addfile(tarinfo, fileobj)
+        with self._lock:
+            self.manifest.add_file(name, arcname, tarinfo.size, file_stat.st_mtime)
+
+    def _is_chunked(self, name, arcname, file_stat):
+        """
+        Whether a file is uploaded to the chunk store instead of a tar archive
+
+        Only the relation files at least as large as a chunk are chunked, the
+        smaller files would add more requests than they save.
+
+        :param str name: tar name
+        :param str arcname: the name of the file inside the tar
+        :param os.stat_result file_stat: the status of the file
+        :rtype: bool
+        """
+        if self.chunk_store is None or file_stat.st_size < self.chunk_store.CHUNK_SIZE:
+            return False
+        # Tablespaces only contain relation files
+        return name != "data" or arcname.startswith(("base/", "global/"))
+
+    def _add_file_to_chunk_store(self, name, path, arcname, file_stat):
+        """
+        Upload a file to the chunk store, recording its chunks in the manifest
+
+        :param str name: tar name
+        :param str path: the path of the file
+        :param str arcname: the name of the file inside the tar
+        :param os.stat_result file_stat: the status of the file
+        """
+        with self._open_file(path) as fileobj:
+            chunks = self.chunk_store.add_file(fileobj, lock=self._lock)
+            size = fileobj.tell()
+        with self._lock:
+            self.manifest.add_file(
+                name,
+                arcname,
+                size,
+                file_stat.st_mtime,
+                chunks=chunks,
+                mode=stat.S_IMODE(file_stat.st_mode),
+            )
+
+    def _upload_created(self, name, uploader):
+        """
+        Record the start of the upload of an archive in the journal
+
+        :param str name: tar name
+        :param CloudTarUploader uploader: the tar uploader
+        """
+        # Tar streams may update the journal concurrently
+        with self._lock:
+            self.journal.archive_started(uploader.key, name, uploader.upload_metadata)
+
+    def _upload_completed(self, name, stream, uploader, final=False):
+        """
+        Record the completion of the upload of an archive in the journal
+
+        :param str name: tar name
+        :param int stream: the tar stream
+        :param CloudTarUploader uploader: the tar uploader
+        :param bool final: whether no more archives follow for the same name
+        """
+        if self.journal is not None:
+            with self._lock:
+                self.journal.archive_completed(
+                    uploader.key,
+                    name,
+                    self._last_entries.get((name, stream)),
+                    uploader.stats,
+                    final,
+                )
+
     def _build_dest_name(self, name, count=0):
         """
         Get the destination tar name
@@ -380,43 +986,117 @@ class CloudUploadController(object):
             components.append(".bz2")
         elif self.compression == "snappy":
             components.append(".snappy")
+        elif self.compression == "zstd":
+            components.append(".zst")
+        elif self.compression == "lz4":
+            components.append(".lz4")
         return "".join(components)
 
-    def _get_tar(self, name):
+    def _get_tar(self, name, stream=0):
         """
         Get a named tar file from cloud storage.
-        Subsequent call with the same name return the same name
+        Subsequent call with the same name and stream return the same tar file
         :param str name: tar name
+        :param int stream: the tar stream, when the named tar is written
+          by several streams concurrently
         :rtype: tarfile.TarFile
         """
-        if name not in self.tar_list or not self.tar_list[name]:
-            self.tar_list[name] = [
-                CloudTarUploader(
+        full_uploader = None
+        with self._lock:
+            if name not in self.tar_list or not self.tar_list[name]:
+                self.tar_list[name] = []
+            uploader = self._open_tars.get((name, stream))
+            # If the current uploading file size is over DEFAULT_MAX_TAR_SIZE
+            # Close the current file and open the next part
+            if uploader is not None and uploader.size > self.max_archive_size:
+                full_uploader = uploader
+                uploader = None
+            if uploader is None:
+                # The first file is the main one, the others get the number
+                # of files already created for the same name as suffix
+                uploader = CloudTarUploader(
                     cloud_interface=self.cloud_interface,
-                    key=os.path.join(self.key_prefix, self._build_dest_name(name)),
+                    key=os.path.join(
+                        self.key_prefix,
+                        self._build_dest_name(name, len(self.tar_list[name])),
+                    ),
                     chunk_size=self.chunk_size,
                     compression=self.compression,
-                    max_bandwidth=self.max_bandwidth,
+                    bandwidth_group=self._bandwidth_groups.get(name),
+                    lock=self._lock if self.tar_streams > 1 else None,
+                    compression_workers=self.compression_workers,
+                    long_distance_matching=self.long_distance_matching,
+                    in_memory_buffers=self.in_memory_buffers,
+                    on_upload_created=(
+                        partial(self._upload_created, name)
+                        if self.journal is not None
+                        else None
+                    ),
                 )
-            ]
-        # If the current uploading file size is over DEFAULT_MAX_TAR_SIZE
-        # Close the current file and open the next part
-        uploader = self.tar_list[name][-1]
-        if uploader.size > self.max_archive_size:
-            uploader.close()
-            uploader = CloudTarUploader(
-                cloud_interface=self.cloud_interface,
-                key=os.path.join(
-                    self.key_prefix,
-                    self._build_dest_name(name, len(self.tar_list[name])),
-                ),
-                chunk_size=self.chunk_size,
-                compression=self.compression,
-                max_bandwidth=self.max_bandwidth,
-            )
-            self.tar_list[name].append(uploader)
+                self.tar_list[name].append(uploader)
+                self._open_tars[(name, stream)] = uploader
+        if full_uploader is not None:
+            # Closed without holding the lock, so that the other tar streams
+            # keep uploading while we wait for the full archive to be uploaded
+            full_uploader.close()
+            self._upload_completed(name, stream, full_uploader)
         return uploader.tar
 
+    def _add_to_tar(self, name, path, arcname, stream=0, recursive=True):
+        """
+        Add a path to a named tar, ignoring paths which have disappeared
+
+        :param str name: tar name
+        :param str path: the path to add
+        :param str arcname: the name of the path inside the tar
+        :param int stream: the tar stream
+        :param bool recursive: whether the content of a directory is added
+        :rtype: bool
+        :return: False if the path disappeared, True otherwise
+        """
+        if self._skip_uploaded(name, arcname):
+            return True
+        try:
+            file_stat = os.lstat(path)
+            if stat.S_ISREG(file_stat.st_mode):
+                self._add_file_to_tar(name, path, arcname, stream, file_stat)
+            else:
+                self._get_tar(name, stream).add(
+                    path, arcname=arcname, recursive=recursive
+                )
+        except EnvironmentError as e:
+            if e.errno == errno.ENOENT:
+                # If a file disappeared just skip it,
+                # WAL reply will take care during recovery.
+                return False
+            else:
+                raise
+        self._last_entries[(name, stream)] = arcname
+        return True
+
+    @staticmethod
+    def _walk_directory(src, exclude=None, include=None):
+        """
+        Walk a directory, yielding the allowed directories and their files
+
+        :param str src: the directory to walk
+        :param list[str]|None exclude: the paths to exclude
+        :param list[str]|None include: the paths to include
+        :return: an iterator of (path, arcname, files) tuples, one for each
+          directory, where files is a list of (path, arcname) tuples
+        """
+        for root, dirs, files in os.walk(src):
+            tar_root = os.path.relpath(root, src)
+            if not path_allowed(exclude, include, tar_root, True):
+                continue
+            allowed_files = []
+            for item in files:
+                tar_item = os.path.join(tar_root, item)
+                if not path_allowed(exclude, include, tar_item, False):
+                    continue
+                allowed_files.append((os.path.join(root, item), tar_item))
+            yield root, tar_root, allowed_files
+
     def upload_directory(self, label, src, dst, exclude=None, include=None):
         _logger.info(
             "Uploading '%s' directory '%s' as '%s'",
@@ -424,38 +1104,119 @@ class CloudUploadController(object):
             src,
             self._build_dest_name(dst),
         )
-        for root, dirs, files in os.walk(src):
-            tar_root = os.path.relpath(root, src)
-            if not path_allowed(exclude, include, tar_root, True):
-                continue
-            try:
-                self._get_tar(dst).add(root, arcname=tar_root, recursive=False)
-            except EnvironmentError as e:
-                if e.errno == errno.ENOENT:
-                    # If a directory disappeared just skip it,
-                    # WAL reply will take care during recovery.
-                    continue
-                else:
-                    raise
+        if label in self.tablespace_bandwidth:
+            self._bandwidth_groups[dst] = label
+        if self.tar_streams > 1:
+            self._upload_directory_streams(src, dst, exclude, include)
+            return
 
-            for item in files:
-                tar_item = os.path.join(tar_root, item)
-                if not path_allowed(exclude, include, tar_item, False):
+        # The files of each directory are read ahead while they are uploaded
+        readahead = FileReadahead()
+        try:
+            for root, tar_root, files in self._walk_directory(src, exclude, include):
+                # If a directory disappeared just skip it,
+                # WAL reply will take care during recovery.
+                if not self._add_to_tar(dst, root, tar_root, recursive=False):
                     continue
-                logging.debug("Uploading %s", tar_item)
+
+                for path, _ in files:
+                    readahead.add(path)
+                for path, arcname in files:
+                    logging.debug("Uploading %s", arcname)
+                    self._add_to_tar(dst, path, arcname)
+                    readahead.done()
+        finally:
+            readahead.close()
+
+        if dst in self._resume_points:
+            raise BackupException(
+                "Cannot resume the upload of '%s': '%s' not found in '%s'"
+                % (label, self._resume_points[dst], src)
+            )
+
+    def _upload_directory_streams(self, src, dst, exclude=None, include=None):
+        """
+        Upload a directory writing several tar streams concurrently
+
+        The directories are added to the main tar stream, which is the first
+        one extracted during the restore, while the files are spread among all
+        the streams balancing their total size.
+
+        :param str src: the directory to upload
+        :param str dst: the name of the tar
+        :param list[str]|None exclude: the paths to exclude
+        :param list[str]|None include: the paths to include
+        """
+        files = []
+        for root, tar_root, dir_files in self._walk_directory(src, exclude, include):
+            if not self._add_to_tar(dst, root, tar_root, recursive=False):
+                continue
+            for path, arcname in dir_files:
                 try:
-                    self._get_tar(dst).add(os.path.join(root, item), arcname=tar_item)
+                    size = os.lstat(path).st_size
                 except EnvironmentError as e:
                     if e.errno == errno.ENOENT:
-                        # If a file disappeared just skip it,
-                        # WAL reply will take care during recovery.
                         continue
-                    else:
+                    raise
+                files.append((size, path, arcname))
+
+        streams = self._balance_streams(files, self.tar_streams)
+        aborted = threading.Event()
+
+        def upload_stream(stream, stream_files):
+            # Each stream reads ahead its own files
+            readahead = FileReadahead()
+            try:
+                for path, _ in stream_files:
+                    readahead.add(path)
+                for path, arcname in stream_files:
+                    if aborted.is_set():
+                        return
+                    logging.debug("Uploading %s (stream %s)", arcname, stream)
+                    try:
+                        self._add_to_tar(dst, path, arcname, stream)
+                    except BaseException:
+                        aborted.set()
                         raise
+                    readahead.done()
+            finally:
+                readahead.close()
+
+        with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+            futures = [
+                executor.submit(upload_stream, stream, stream_files)
+                for stream, stream_files in enumerate(streams)
+            ]
+            for future in futures:
+                future.result()
+
+    @staticmethod
+    def _balance_streams(files, count):
+        """
+        Split a list of files in streams of similar total size
+
+        The largest files are assigned first, each one to the stream with the
+        smallest total size so far. The files of each stream are then sorted by
+        path, so that each stream reads the directories in order.
+
+        :param list[tuple[int,str,str]] files: (size, path, arcname) tuples
+        :param int count: the number of streams
+        :rtype: list[list[tuple[str,str]]]
+        :return: the (path, arcname) tuples of each stream
+        """
+        streams = [[] for _ in range(count)]
+        heap = [(0, stream) for stream in range(count)]
+        for size, path, arcname in sorted(files, reverse=True):
+            total, stream = heapq.heappop(heap)
+            streams[stream].append((path, arcname))
+            heapq.heappush(heap, (total + size, stream))
+        return [sorted(stream_files) for stream_files in streams]
 
     def add_file(self, label, src, dst, path, optional=False):
         if optional and not os.path.exists(src):
             return
+        if self._skip_uploaded(dst, path):
+            return
         _logger.info(
             "Uploading '%s' file from '%s' to '%s' with path '%s'",
             label,
@@ -465,8 +1226,11 @@ class CloudUploadController(object):
         )
         tar = self._get_tar(dst)
         tar.add(src, arcname=path)
+        self._last_entries[(dst, 0)] = path
 
     def add_fileobj(self, label, fileobj, dst, path, mode=None, uid=None, gid=None):
+        if self._skip_uploaded(dst, path):
+            return
         _logger.info(
             "Uploading '%s' file to '%s' with path '%s'",
             label,
@@ -485,16 +1249,35 @@ class CloudUploadController(object):
             tarinfo.gid = gid
         fileobj.seek(0, os.SEEK_SET)
         tar.addfile(tarinfo, fileobj)
+        self._last_entries[(dst, 0)] = path
 
     def close(self):
         _logger.info("Marking all the uploaded archives as 'completed'")
+        open_tars = dict(
+            (uploader, stream) for (_, stream), uploader in self._open_tars.items()
+        )
         for name in self.tar_list:
             if self.tar_list[name]:
-                # Tho only opened file is the last one, all the others
-                # have been already closed
-                self.tar_list[name][-1].close()
+                # Only the last file of each stream is still open, all the
+                # others have been already closed
+                for uploader in self.tar_list[name]:
+                    if uploader in open_tars:
+                        uploader.close()
+                        self._upload_completed(
+                            name, open_tars[uploader], uploader, final=True
+                        )
                 self.upload_stats[name] = [tar.stats for tar in self.tar_list[name]]
             self.tar_list[name] = None
+        self._open_tars = {}
+        if self.chunk_store is not None:
+            self.chunk_store.close()
+            _logger.info(
+                "Uploaded %s new chunks (%s), reused %s stored chunks (%s)",
+                self.chunk_store.uploaded_chunks,
+                pretty_size(self.chunk_store.uploaded_size),
+                self.chunk_store.reused_chunks,
+                pretty_size(self.chunk_store.reused_size),
+            )
 
         # Store the end time
         self.copy_end_time = datetime.datetime.now()
@@ -578,11 +1361,213 @@ class FileUploadStatistics(dict):
         part = self["parts"].setdefault(part_number, {"part_number": part_number})
         part["start_time"] = start_time
 
+    def set_part_size(self, part_number, size):
+        part = self["parts"].setdefault(part_number, {"part_number": part_number})
+        part["size"] = size
+
+    def set_throughput(self):
+        """
+        Set the size of the upload and the throughput it achieved, in bytes
+        per second, from its parts and its start and end times
+        """
+        self["size"] = sum(part.get("size", 0) for part in self["parts"].values())
+        elapsed = total_seconds(self["end_time"] - self["start_time"])
+        self["throughput"] = self["size"] / elapsed if elapsed > 0 else None
+
+
+class BandwidthLimiter(object):
+    """
+    A token bucket limiting the rate of the uploads of several workers
+
+    The bucket is filled at the rate of the limit, up to one second worth of
+    bytes, and each uploaded byte consumes a token. A worker consuming more
+    tokens than available sleeps until the bucket would have been refilled, so
+    the bytes are spread evenly over time whatever the number of workers.
+
+    The state of the bucket lives in shared memory, so the limiter must be
+    created before the worker processes are started to be inherited by them.
+    """
+
+    def __init__(self, rate):
+        """
+        :param int rate: the maximum number of bytes per second
+        """
+        self.rate = rate
+        self._lock = multiprocessing.Lock()
+        # The available tokens and the time they have been computed at
+        self._state = multiprocessing.RawArray("d", [rate, time.monotonic()])
+
+    def consume(self, size):
+        """
+        Consume the tokens for the given number of bytes, waiting until they
+        are available
+
+        :param int size: the number of bytes
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.rate, self._state[0] + (now - self._state[1]) * self.rate)
+            # The tokens are reserved even if not available yet, so that the
+            # workers are served in the order they asked for them
+            tokens -= size
+            self._state[0] = tokens
+            self._state[1] = now
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+
+class ThrottledReader(RawIOBase):
+    """
+    A seekable file-like object consuming tokens of bandwidth limiters
+    for each byte read
+
+    Client libraries can read a body more than once, e.g. to compute its
+    checksum before sending it or to retry a request, so only the bytes past
+    the furthest position read so far are accounted for.
+    """
+
+    def __init__(self, fileobj, limiters):
+        """
+        :param io.IOBase fileobj: the file-like object being read
+        :param list[BandwidthLimiter] limiters: the limiters to consume
+        """
+        self.fileobj = fileobj
+        self.limiters = limiters
+        self._accounted = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        position = self.fileobj.tell()
+        if position > self._accounted:
+            for limiter in self.limiters:
+                limiter.consume(position - self._accounted)
+            self._accounted = position
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=SEEK_SET):
+        return self.fileobj.seek(offset, whence)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+
+class RangedReadIO(RawIOBase):
+    """
+    Provide an IOBase interface which reads a remote object with concurrent
+    ranged GETs.
+
+    The object is split in ranges which are fetched by a pool of threads, each
+    using its own connection. At most ``2 * jobs`` ranges are fetched ahead of
+    the one being read, and they are returned in order, so the memory used is
+    bounded whatever the size of the object.
+    """
+
+    # The size of each ranged GET
+    RANGE_SIZE = 8 << 20
+
+    def __init__(self, read_range, size, jobs, range_size=None):
+        """
+        Create a new RangedReadIO object.
+
+        :param callable read_range: a function returning the content of the
+          object given an offset and a length
+        :param int size: the size of the object
+        :param int jobs: the number of ranges fetched concurrently
+        :param int|None range_size: the size of each range, RANGE_SIZE if None
+        """
+        self.read_range = read_range
+        self.size = size
+        self.range_size = range_size or self.RANGE_SIZE
+        self._max_pending = 2 * jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=jobs, thread_name_prefix="barman-read"
+        )
+        # The ranges being fetched, in order, and the offset of the next one
+        self._pending = collections.deque()
+        self._next_offset = 0
+        self._current_range = BytesIO()
+        self._schedule()
+
+    def _schedule(self):
+        """
+        Start fetching the next ranges, until the reorder buffer is full
+        """
+        while len(self._pending) < self._max_pending and self._next_offset < self.size:
+            length = min(self.range_size, self.size - self._next_offset)
+            self._pending.append(
+                (
+                    length,
+                    self._executor.submit(self.read_range, self._next_offset, length),
+                )
+            )
+            self._next_offset += length
+
+    def _next_range(self):
+        """
+        Wait for the next range of the object
+
+        :rtype: bytes|None
+        :return: the content of the range, None at the end of the object
+        """
+        if not self._pending:
+            return None
+        length, future = self._pending.popleft()
+        data = future.result()
+        if len(data) != length:
+            raise CloudProviderError(
+                "Expected %s bytes from a ranged read but got %s" % (length, len(data))
+            )
+        self._schedule()
+        return data
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        """
+        Read at most n bytes from the object, all of them if n is negative.
+
+        :param int n: Number of bytes to read from the object
+        :return: Up to n bytes from the object
+        :rtype: bytes
+        """
+        if n is None or n < 0:
+            n = self.size
+        data = self._current_range.read(n)
+        while len(data) < n:
+            next_range = self._next_range()
+            if next_range is None:
+                break
+            self._current_range = BytesIO(next_range)
+            data += self._current_range.read(n - len(data))
+        return data
+
+    def close(self):
+        """
+        Stop fetching the ranges which are no longer needed
+        """
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+        super(RangedReadIO, self).close()
+
+
+class DecompressingStreamingIO(RawIOBase):
+    """
+    Provide an IOBase interface which decompresses streaming cloud responses.
 
-class DecompressingStreamingIO(RawIOBase):
-    """
-    Provide an IOBase interface which decompresses streaming cloud responses.
-
     This is intended to wrap azure_blob_storage.StreamingBlobIO and
     aws_s3.StreamingBodyIO objects, transparently decompressing chunks while
     continuing to expose them via the read method of the IOBase interface.
@@ -664,6 +1649,454 @@ class DecompressingStreamingIO(RawIOBase):
         return return_bytes
 
 
+class PipelinedStreamingIO(RawIOBase):
+    """
+    Provide an IOBase interface which downloads and decompresses a streaming
+    cloud response in two background threads.
+
+    The download, the decompression and the consumer of the uncompressed data,
+    typically a TarFile extracting files, run concurrently and are connected
+    by bounded queues of chunks. A stall of the network, of the CPU or of the
+    disk only stops the other stages once the queues are full, while the
+    memory used is bounded whatever the size of the stream.
+
+    The bytes handled by each stage and the time it was busy are collected
+    in the ``stats`` attribute, so that their throughput can be reported.
+    """
+
+    # The size of the chunks read from the cloud provider
+    CHUNK_SIZE = 1 << 20
+
+    # The number of chunks held by each queue
+    QUEUE_SIZE = 16
+
+    # The stages of the pipeline, in order
+    STAGES = ("download", "decompress", "extract")
+
+    def __init__(self, streaming_response, decompressor=None, chunk_size=None):
+        """
+        Create a new PipelinedStreamingIO object and start its threads.
+
+        :param RawIOBase streaming_response: A file-like object which provides the
+          data in the response streamed from the cloud provider.
+        :param decompressor: An object which provides a decompress(bytes) method
+          to return the decompressed bytes, None if the data is not compressed.
+        :param int|None chunk_size: the size of the chunks read from the cloud
+          provider, CHUNK_SIZE if None
+        """
+        self.streaming_response = streaming_response
+        self.decompressor = decompressor
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.stats = dict((stage, {"size": 0, "time": 0.0}) for stage in self.STAGES)
+        self._downloaded = queue.Queue(self.QUEUE_SIZE)
+        self._decompressed = queue.Queue(self.QUEUE_SIZE)
+        self._cancelled = threading.Event()
+        self._errors = []
+        self._buffer = BytesIO()
+        self._eof = False
+        self._start_time = time.time()
+        self._threads = [
+            threading.Thread(target=self._download, name="barman-download"),
+            threading.Thread(target=self._decompress, name="barman-decompress"),
+        ]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _put(self, chunk_queue, chunk):
+        """
+        Put a chunk in a queue, waiting while the queue is full
+
+        :param queue.Queue chunk_queue: the queue
+        :param bytes|None chunk: the chunk, None at the end of the stream
+        :rtype: bool
+        :return: False if the pipeline has been closed in the meantime
+        """
+        while not self._cancelled.is_set():
+            try:
+                chunk_queue.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, chunk_queue):
+        """
+        Get a chunk from a queue, waiting while the queue is empty
+
+        :param queue.Queue chunk_queue: the queue
+        :rtype: bytes|None
+        :return: the chunk, None at the end of the stream or if the pipeline
+          has been closed in the meantime
+        """
+        while not self._cancelled.is_set():
+            try:
+                return chunk_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _download(self):
+        """
+        Read the chunks of the streaming response, first stage of the pipeline
+        """
+        stats = self.stats["download"]
+        try:
+            while True:
+                start = time.time()
+                chunk = self.streaming_response.read(self.chunk_size)
+                stats["time"] += time.time() - start
+                if not chunk:
+                    break
+                stats["size"] += len(chunk)
+                if not self._put(self._downloaded, chunk):
+                    return
+        except Exception as exc:
+            self._errors.append(exc)
+        finally:
+            self._put(self._downloaded, None)
+
+    def _decompress(self):
+        """
+        Decompress the downloaded chunks, second stage of the pipeline
+        """
+        stats = self.stats["decompress"]
+        try:
+            while True:
+                chunk = self._get(self._downloaded)
+                if chunk is None:
+                    break
+                if self.decompressor is not None:
+                    start = time.time()
+                    chunk = self.decompressor.decompress(chunk)
+                    stats["time"] += time.time() - start
+                stats["size"] += len(chunk)
+                if chunk and not self._put(self._decompressed, chunk):
+                    return
+        except Exception as exc:
+            self._errors.append(exc)
+        finally:
+            self._put(self._decompressed, None)
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        """
+        Read up to n bytes of uncompressed data, all of them if n is negative.
+
+        :param int n: The number of uncompressed bytes required
+        :return: Up to n uncompressed bytes from the pipeline
+        :rtype: bytes
+        """
+        data = self._buffer.read(n)
+        while (n is None or n < 0 or len(data) < n) and not self._eof:
+            start = time.time()
+            chunk = self._get(self._decompressed)
+            # The time spent waiting for data is not spent extracting it
+            self._start_time += time.time() - start
+            if chunk is None:
+                self._eof = True
+                if self._errors:
+                    raise self._errors[0]
+                break
+            self._buffer = BytesIO(chunk)
+            data += self._buffer.read(-1 if n is None or n < 0 else n - len(data))
+        self.stats["extract"]["size"] += len(data)
+        return data
+
+    def close(self):
+        """
+        Stop the threads of the pipeline and record the time spent by the
+        consumer of the data
+        """
+        if not self.closed:
+            self._cancelled.set()
+            for thread in self._threads:
+                thread.join()
+            self.stats["extract"]["time"] = time.time() - self._start_time
+        super(PipelinedStreamingIO, self).close()
+
+    def throughput(self):
+        """
+        The throughput of each stage of the pipeline, in bytes per second of
+        the time the stage was busy
+
+        :rtype: dict[str,float|None]
+        """
+        return dict(
+            (
+                stage,
+                stats["size"] / stats["time"] if stats["time"] > 0 else None,
+            )
+            for stage, stats in self.stats.items()
+        )
+
+
+class SharedMemoryPart(RawIOBase):
+    """
+    Provide a read-only file-like interface to an upload part which is held
+    in a shared memory segment.
+
+    Parts buffered in memory are copied into a shared memory segment by the
+    process writing the backup, so that the upload worker processes can read
+    them without the part ever being written to the local disk. The segment is
+    owned by the process which created it, which unlinks it once the part has
+    been uploaded.
+    """
+
+    def __init__(self, name, size):
+        """
+        Attach to the shared memory segment holding an upload part.
+
+        :param str name: The name of the shared memory segment
+        :param int size: The size of the part in bytes, which can be smaller
+          than the size of the segment
+        """
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._view = self._shm.buf[:size]
+        self._position = 0
+
+    @staticmethod
+    def create(buf):
+        """
+        Copy the supplied in-memory buffer into a new shared memory segment.
+
+        The segment stays registered with the resource tracker, which unlinks
+        it should this process exit without calling :meth:`unlink`.
+
+        :param BytesIO buf: The buffer holding the part
+        :rtype: str
+        :return: The name of the new shared memory segment
+        """
+        with buf.getbuffer() as view:
+            # Zero-sized segments are not allowed
+            shm = shared_memory.SharedMemory(create=True, size=max(view.nbytes, 1))
+            shm.buf[: view.nbytes] = view
+        shm.close()
+        return shm.name
+
+    @staticmethod
+    def unlink(name):
+        """
+        Remove a shared memory segment created by :meth:`create`.
+
+        :param str name: The name of the shared memory segment
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        size = max(0, min(len(b), len(self._view) - self._position))
+        b[:size] = self._view[self._position : self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            offset += self._position
+        elif whence == SEEK_END:
+            offset += len(self._view)
+        elif whence != SEEK_SET:
+            raise ValueError("Invalid whence (%r)" % whence)
+        if offset < 0:
+            raise ValueError("Negative seek position %d" % offset)
+        self._position = offset
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._shm.close()
+        super(SharedMemoryPart, self).close()
+
+
+class CloudTarExtractor(object):
+    """
+    Extract the members of a streamed tar archive, writing the files with a
+    pool of threads.
+
+    TarFile.extractall writes the members one at a time, with small buffers,
+    and sets the mode and the times of each member as soon as it is written,
+    so extracting many small files is bound by the system calls. Here the
+    content of the small files is read from the archive and handed to the
+    writer threads, the parent directories are created once, and the
+    ownership, the mode and the times are applied in a final pass, the
+    directories last so their times are not changed by their content.
+    """
+
+    # Files larger than this are written by the thread reading the archive,
+    # so the memory used by the queued files stays bounded
+    MAX_QUEUED_FILE_SIZE = 8 << 20
+
+    # The size of the writes of the files
+    WRITE_BUFSIZE = 1 << 20
+
+    def __init__(self, dst, write_jobs=1, preallocate=False):
+        """
+        Create a new CloudTarExtractor object.
+
+        :param str dst: Path of the directory into which the members are extracted
+        :param int write_jobs: the number of threads writing the files
+        :param bool preallocate: whether the blocks of the files are allocated
+          before they are written
+        """
+        self.dst = dst
+        self.write_jobs = write_jobs
+        self.preallocate = preallocate
+        self._created_dirs = set()
+        self._errors = []
+
+    def _target_path(self, name):
+        """
+        Get the path a member is extracted to, refusing members outside of
+        the destination directory
+
+        :param str name: the name of the member in the archive
+        :rtype: str
+        """
+        path = os.path.normpath(name)
+        if (
+            os.path.isabs(path)
+            or path == os.pardir
+            or path.startswith(os.pardir + os.sep)
+        ):
+            raise tarfile.ExtractError(
+                "Refusing to extract %s outside of %s" % (name, self.dst)
+            )
+        return os.path.join(self.dst, path)
+
+    def _makedirs(self, path):
+        """
+        Create a directory and its parents, unless it has already been created
+
+        Other archives can be extracted concurrently into the same directory,
+        so the directories created by them are tolerated.
+
+        :param str path: the directory
+        """
+        if path in self._created_dirs:
+            return
+        os.makedirs(path, exist_ok=True)
+        while path not in self._created_dirs:
+            self._created_dirs.add(path)
+            path = os.path.dirname(path)
+
+    def _write_file(self, path, fileobj, size):
+        """
+        Write the content of a member to a file
+
+        :param str path: the file
+        :param fileobj: a file-like object with the content of the member
+        :param int size: the size of the member
+        """
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            if self.preallocate:
+                fallocate(fd, size)
+            while True:
+                buf = fileobj.read(self.WRITE_BUFSIZE)
+                if not buf:
+                    break
+                view = memoryview(buf)
+                while view:
+                    view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+
+    def _queued_write(self, path, data, slots):
+        """
+        Write a file in a writer thread, recording any error
+
+        :param str path: the file
+        :param bytes data: the content of the file
+        :param threading.Semaphore slots: the semaphore released once the
+          file is written
+        """
+        try:
+            self._write_file(path, BytesIO(data), len(data))
+        except Exception as exc:
+            self._errors.append(exc)
+        finally:
+            slots.release()
+
+    def extract(self, tf, members=None):
+        """
+        Extract the members of a tar archive
+
+        :param tarfile.TarFile tf: the tar archive, opened in streaming mode
+        :param set[str]|None members: the names of the members to extract, all
+          the members are extracted if None
+        """
+        files = []
+        dirs = []
+        # At most two files per writer are held in memory
+        queued_files = 2 * self.write_jobs
+        slots = threading.Semaphore(queued_files)
+        with ThreadPoolExecutor(
+            max_workers=self.write_jobs, thread_name_prefix="barman-write"
+        ) as executor:
+            for member in tf:
+                if self._errors:
+                    break
+                if members is not None and member.name not in members:
+                    continue
+                path = self._target_path(member.name)
+                if member.isdir():
+                    self._makedirs(path)
+                    dirs.append((member, path))
+                    continue
+                self._makedirs(os.path.dirname(path))
+                if member.islnk():
+                    # The archive is streamed, so TarFile cannot read the
+                    # target of a hard link back from it: the link is created
+                    # once the queued files, the target included, are written
+                    target = self._target_path(member.linkname)
+                    for _ in range(queued_files):
+                        slots.acquire()
+                    for _ in range(queued_files):
+                        slots.release()
+                    if self._errors:
+                        break
+                    if os.path.lexists(path):
+                        os.unlink(path)
+                    os.link(target, path)
+                    files.append((member, path))
+                    continue
+                if not member.isreg():
+                    # Symlinks and special files are left to TarFile
+                    tf.extract(member, self.dst)
+                    continue
+                fileobj = tf.extractfile(member)
+                if member.size > self.MAX_QUEUED_FILE_SIZE:
+                    self._write_file(path, fileobj, member.size)
+                else:
+                    data = fileobj.read()
+                    slots.acquire()
+                    executor.submit(self._queued_write, path, data, slots)
+                files.append((member, path))
+        if self._errors:
+            raise self._errors[0]
+
+        for member, path in files + sorted(dirs, key=lambda item: item[1])[::-1]:
+            tf.chown(member, path, False)
+            tf.chmod(member, path)
+            tf.utime(member, path)
+
+
 class CloudInterface(with_metaclass(ABCMeta)):
     """
     Abstract base class which provides the interface between barman and cloud
@@ -674,14 +2107,20 @@ class CloudInterface(with_metaclass(ABCMeta)):
 
     This class provides generic boilerplate for the asynchronous and parallel
     upload of objects to cloud providers which support multipart uploads.
-    These uploads are carried out by worker processes which are spawned by
+    These uploads are carried out by workers which are started by
     _ensure_async and consume upload jobs from a queue. The public
     async_upload_part and async_complete_multipart_upload methods add jobs
-    to this queue. When the worker processes consume the jobs they execute
+    to this queue. When the workers consume the jobs they execute
     the synchronous counterparts to the async_* methods (_upload_part and
     _complete_multipart_upload) which must be implemented in CloudInterface
     sub-classes.
 
+    Workers are either processes, each with its own session, or threads of a
+    ThreadPoolExecutor sharing the session of the cloud interface. Only the
+    cloud providers whose uploads can share a session support the latter, by
+    listing it in UPLOAD_ENGINES. The listings, reads and deletions are sent
+    from several threads sharing the session when THREAD_SAFE is set.
+
     Additional boilerplate for creating buckets and streaming objects as tar
     files is also provided.
     """
@@ -725,20 +2164,75 @@ class CloudInterface(with_metaclass(ABCMeta)):
         """
         pass
 
-    def __init__(self, url, jobs=2, tags=None, delete_batch_size=None):
+    # The engines which can run the upload workers, the first one being the
+    # default: "process" runs them in sub-processes, "thread" in threads
+    # sharing the session of the cloud interface
+    UPLOAD_ENGINES = ("process",)
+
+    #: Whether the session of the cloud interface can be shared by threads
+    #: sending independent requests, such as listings, reads and deletions
+    THREAD_SAFE = False
+
+    #: The number of times a request throttled by the cloud provider is retried
+    THROTTLING_RETRIES = 8
+
+    #: The delay in seconds before the first retry of a throttled request,
+    #: doubled at each retry up to THROTTLING_MAX_DELAY
+    THROTTLING_DELAY = 0.5
+
+    #: The maximum delay in seconds before the retry of a throttled request
+    THROTTLING_MAX_DELAY = 30
+
+    #: The interval in seconds between two polls of the results of the workers
+    #: while waiting for an upload shared with other threads
+    RESULTS_POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        url,
+        jobs=2,
+        tags=None,
+        delete_batch_size=None,
+        upload_engine=None,
+        read_jobs=1,
+        delete_jobs=1,
+    ):
         """
         Base constructor
 
         :param str url: url for the cloud storage resource
-        :param int jobs: How many sub-processes to use for asynchronous
-          uploading, defaults to 2.
+        :param int jobs: How many sub-processes or threads to use for
+          asynchronous uploading, defaults to 2.
         :param List[tuple] tags: List of tags as k,v tuples to be added to all
           uploaded objects
         :param int|None delete_batch_size: the maximum number of objects to be
           deleted in a single request
+        :param str|None upload_engine: the engine running the upload workers,
+          either "process" or "thread". Defaults to the first of UPLOAD_ENGINES.
+        :param int read_jobs: the number of concurrent ranged GETs used by
+          remote_open to read a large object, 1 to read it in a single stream
+        :param int delete_jobs: the number of batches of objects, or prefixes,
+          deleted concurrently
         """
         self.url = url
         self.tags = tags
+        self.read_jobs = read_jobs
+        self.delete_jobs = delete_jobs
+        # The time before which no request is sent after the cloud provider
+        # throttled one, shared by all the threads deleting objects
+        self._throttled_until = 0
+
+        if upload_engine is None:
+            upload_engine = self.UPLOAD_ENGINES[0]
+        elif upload_engine not in self.UPLOAD_ENGINES:
+            _logger.warning(
+                "The '%s' upload engine is not supported by %s, using '%s'",
+                upload_engine,
+                self.__class__.__name__,
+                self.UPLOAD_ENGINES[0],
+            )
+            upload_engine = self.UPLOAD_ENGINES[0]
+        self.upload_engine = upload_engine
 
         # We use the maximum allowed batch size by default.
         self.delete_batch_size = self.MAX_DELETE_BATCH_SIZE
@@ -760,6 +2254,7 @@ class CloudInterface(with_metaclass(ABCMeta)):
         self.abort_requested = False
         self.worker_processes_count = jobs
         self.worker_processes = []
+        self.worker_threads = None
 
         # The parts DB is a dictionary mapping each bucket key name to a list
         # of uploaded parts.
@@ -769,22 +2264,69 @@ class CloudInterface(with_metaclass(ABCMeta)):
         # Statistics about uploads
         self.upload_stats = collections.defaultdict(FileUploadStatistics)
 
+        # The shared memory segments holding the parts which are being
+        # uploaded by the worker processes, indexed by key and part number,
+        # None for the objects uploaded as a whole
+        self.shared_memory_parts = {}
+
+        # The bandwidth limiters applied by the workers, indexed by the
+        # bandwidth group, None being the global one
+        self.bandwidth_limiters = {}
+
+    def set_bandwidth_limit(self, rate, group=None):
+        """
+        Limit the bandwidth used by the upload workers
+
+        The parts of every upload are throttled by the global limit, while the
+        limit of a group only applies to the parts uploaded for that group.
+
+        :param int rate: the maximum number of bytes uploaded per second
+        :param str|None group: the bandwidth group, None for the global limit
+        """
+        if self.worker_processes:
+            raise ValueError(
+                "Cannot set a bandwidth limit once the upload workers are running"
+            )
+        self.bandwidth_limiters[group] = BandwidthLimiter(rate)
+
     def close(self):
         """
         Wait for all the asynchronous operations to be done
         """
-        if self.queue:
+        if self.worker_threads:
+            for _ in range(self.worker_processes_count):
+                self.queue.put(None)
+
+            self.worker_threads.shutdown(wait=True)
+        elif self.queue:
             for _ in self.worker_processes:
                 self.queue.put(None)
 
             for process in self.worker_processes:
                 process.join()
 
+        # Remove the segments of the parts which were skipped, or whose
+        # result was never read
+        for name in self.shared_memory_parts.values():
+            SharedMemoryPart.unlink(name)
+        self.shared_memory_parts.clear()
+
+        # The workers are gone, so any later upload starts new ones which
+        # must not skip their parts
+        self.queue = None
+        self.worker_threads = None
+        self.worker_processes = []
+        self.abort_requested = False
+
     def _abort(self):
         """
         Abort all the operations
         """
-        if self.queue:
+        if self.worker_threads:
+            # Worker threads share this object, so they will skip the
+            # remaining parts and abort the pending uploads
+            self.abort_requested = True
+        elif self.queue:
             for process in self.worker_processes:
                 os.kill(process.pid, signal.SIGINT)
         self.close()
@@ -792,11 +2334,32 @@ class CloudInterface(with_metaclass(ABCMeta)):
     def _ensure_async(self):
         """
         Ensure that the asynchronous execution infrastructure is up
-        and the worker process is running
+        and the workers are running
         """
         if self.queue:
             return
 
+        if self.upload_engine == "thread":
+            # Plain queues are enough for threads, which avoids the round
+            # trips to a manager process for every job
+            self.queue = queue.Queue(maxsize=self.worker_processes_count)
+            self.result_queue = queue.Queue()
+            self.errors_queue = queue.Queue()
+            self.done_queue = queue.Queue()
+            self.worker_threads = ThreadPoolExecutor(
+                max_workers=self.worker_processes_count,
+                thread_name_prefix="barman-upload",
+            )
+            for worker_number in range(self.worker_processes_count):
+                self.worker_threads.submit(
+                    self._worker_process_main, worker_number, reinit_session=False
+                )
+            return
+
+        # Start the resource tracker before the workers, so that they share it
+        # with this process rather than starting their own, which would unlink
+        # the shared memory segments they attach to when they exit
+        resource_tracker.ensure_running()
         manager = multiprocessing.Manager()
         self.queue = manager.JoinableQueue(maxsize=self.worker_processes_count)
         self.result_queue = manager.Queue()
@@ -822,12 +2385,23 @@ class CloudInterface(with_metaclass(ABCMeta)):
 
         # Wait for all the current jobs to be completed
         self.queue.join()
+        self._collect_results()
 
+    def _collect_results(self):
+        """
+        Update the local parts DB with the results already sent by the
+        workers, without waiting for the current jobs to be completed
+        """
         touched_keys = []
         while not self.result_queue.empty():
             result = self.result_queue.get()
             touched_keys.append(result["key"])
             self.parts_db[result["key"]].append(result["part"])
+            name = self.shared_memory_parts.pop(
+                (result["key"], result["part_number"]), None
+            )
+            if name:
+                SharedMemoryPart.unlink(name)
 
             # Save the upload end time of the part
             stats = self.upload_stats[result["key"]]
@@ -841,7 +2415,15 @@ class CloudInterface(with_metaclass(ABCMeta)):
         # Read the results of completed uploads
         while not self.done_queue.empty():
             result = self.done_queue.get()
-            self.upload_stats[result["key"]].update(result)
+            name = self.shared_memory_parts.pop((result["key"], None), None)
+            if name:
+                SharedMemoryPart.unlink(name)
+            # Only multipart uploads keep statistics
+            if result["key"] not in self.upload_stats:
+                continue
+            stats = self.upload_stats[result["key"]]
+            stats.update(result)
+            stats.set_throughput()
 
         # Raise an error if a job failed
         self._handle_async_errors()
@@ -867,18 +2449,21 @@ class CloudInterface(with_metaclass(ABCMeta)):
         self._abort()
         raise CloudUploadingError(self.error)
 
-    def _worker_process_main(self, process_number):
+    def _worker_process_main(self, process_number, reinit_session=True):
         """
         Repeatedly grab a task from the queue and execute it, until a task
         containing "None" is grabbed, indicating that the process must stop.
 
         :param int process_number: the process number, used in the logging output
+        :param bool reinit_session: whether a new session is created, which is
+          not the case for worker threads sharing the session of the parent
         """
         _logger.info("Upload process started (worker %s)", process_number)
 
-        # We create a new session instead of reusing the one
-        # from the parent process to avoid any race condition
-        self._reinit_session()
+        if reinit_session:
+            # We create a new session instead of reusing the one
+            # from the parent process to avoid any race condition
+            self._reinit_session()
 
         while True:
             task = self.queue.get()
@@ -919,18 +2504,26 @@ class CloudInterface(with_metaclass(ABCMeta)):
                     "Skipping '%s', part '%s' (worker %s)"
                     % (task["key"], task["part_number"], process_number)
                 )
-                os.unlink(task["body"])
+                # Shared memory segments are unlinked by the parent process
+                if "body" in task:
+                    os.unlink(task["body"])
                 return
             else:
                 _logger.info(
                     "Uploading '%s', part '%s' (worker %s)"
                     % (task["key"], task["part_number"], process_number)
                 )
-                with open(task["body"], "rb") as fp:
+                limiters = [
+                    self.bandwidth_limiters[group]
+                    for group in {None, task.get("bandwidth_group")}
+                    if group in self.bandwidth_limiters
+                ]
+                with self._open_part(task) as fp:
+                    if limiters:
+                        fp = ThrottledReader(fp, limiters)
                     part = self._upload_part(
                         task["upload_metadata"], task["key"], fp, task["part_number"]
                     )
-                os.unlink(task["body"])
                 self.result_queue.put(
                     {
                         "key": task["key"],
@@ -939,6 +2532,30 @@ class CloudInterface(with_metaclass(ABCMeta)):
                         "part": part,
                     }
                 )
+        elif task["job_type"] == "upload_fileobj":
+            if self.abort_requested:
+                _logger.info(
+                    "Skipping '%s' (worker %s)" % (task["key"], process_number)
+                )
+                if "body" in task:
+                    os.unlink(task["body"])
+                return
+            else:
+                _logger.info(
+                    "Uploading '%s' (worker %s)" % (task["key"], process_number)
+                )
+                limiter = self.bandwidth_limiters.get(None)
+                with self._open_part(task) as fp:
+                    if limiter is not None:
+                        fp = ThrottledReader(fp, [limiter])
+                    self.upload_fileobj(fp, task["key"])
+                self.done_queue.put(
+                    {
+                        "key": task["key"],
+                        "end_time": datetime.datetime.now(),
+                        "status": "done",
+                    }
+                )
         elif task["job_type"] == "complete_multipart_upload":
             if self.abort_requested:
                 _logger.info("Aborting %s (worker %s)" % (task["key"], process_number))
@@ -967,15 +2584,39 @@ class CloudInterface(with_metaclass(ABCMeta)):
         else:
             raise ValueError("Unknown task: %s", repr(task))
 
-    def async_upload_part(self, upload_metadata, key, body, part_number):
+    @staticmethod
+    @contextmanager
+    def _open_part(task):
+        """
+        Open the body of an upload_part task, removing it once uploaded
+
+        :param Dict task: the upload_part task
+        :rtype: io.IOBase
+        """
+        if "shared_memory" in task:
+            with SharedMemoryPart(task["shared_memory"], task["size"]) as fp:
+                yield fp
+        elif "buffer" in task:
+            yield BytesIO(task["buffer"])
+        else:
+            with open(task["body"], "rb") as fp:
+                yield fp
+            os.unlink(task["body"])
+
+    def async_upload_part(
+        self, upload_metadata, key, body, part_number, bandwidth_group=None
+    ):
         """
         Asynchronously upload a part into a multipart upload
 
         :param dict upload_metadata: Provider-specific metadata for this upload
           e.g. the multipart upload handle in AWS S3
         :param str key: The key to use in the cloud service
-        :param any body: A stream-like object to upload
+        :param any body: A stream-like object to upload, either a named file
+          or a BytesIO buffer
         :param int part_number: Part number, starting from 1
+        :param str|None bandwidth_group: the bandwidth group whose limit is
+          applied to the part in addition to the global one
         """
 
         # If an error has already been reported, do nothing
@@ -989,16 +2630,74 @@ class CloudInterface(with_metaclass(ABCMeta)):
         stats = self.upload_stats[key]
         stats.set_part_start_time(part_number, datetime.datetime.now())
 
+        task = {
+            "job_type": "upload_part",
+            "upload_metadata": upload_metadata,
+            "key": key,
+            "part_number": part_number,
+            "bandwidth_group": bandwidth_group,
+        }
+        if isinstance(body, BytesIO):
+            # In memory parts are handed to worker threads as they are and
+            # reach worker processes through shared memory. As the queue is
+            # bounded and the segments of the uploaded parts are released
+            # before a new one is created, only a few parts per worker are
+            # kept in memory at any time.
+            size = body.getbuffer().nbytes
+            if self.worker_threads:
+                task["buffer"] = body.getvalue()
+            else:
+                # Release the segments of the parts already uploaded
+                self._collect_results()
+                task["shared_memory"] = SharedMemoryPart.create(body)
+                task["size"] = size
+                self.shared_memory_parts[(key, part_number)] = task["shared_memory"]
+        else:
+            task["body"] = body.name
+            size = os.fstat(body.fileno()).st_size
+        stats.set_part_size(part_number, size)
+
         # Pass the job to the uploader process
-        self.queue.put(
-            {
-                "job_type": "upload_part",
-                "upload_metadata": upload_metadata,
-                "key": key,
-                "body": body.name,
-                "part_number": part_number,
-            }
-        )
+        self.queue.put(task)
+
+    def async_upload_fileobj(self, body, key):
+        """
+        Asynchronously upload a whole object with the upload workers
+
+        The upload is throttled by the global bandwidth limit. Use
+        :meth:`wait_for_async_uploads` to wait for it to be completed.
+
+        :param BytesIO body: the content of the object
+        :param str key: The key to use in the cloud service
+        """
+
+        # If an error has already been reported, do nothing
+        if self.error:
+            return
+
+        self._ensure_async()
+        self._handle_async_errors()
+
+        task = {"job_type": "upload_fileobj", "key": key}
+        if self.worker_threads:
+            task["buffer"] = body.getvalue()
+        else:
+            # Release the segments of the objects already uploaded
+            self._collect_results()
+            task["shared_memory"] = SharedMemoryPart.create(body)
+            task["size"] = body.getbuffer().nbytes
+            self.shared_memory_parts[(key, None)] = task["shared_memory"]
+
+        # Pass the job to the uploader process
+        self.queue.put(task)
+
+    def wait_for_async_uploads(self):
+        """
+        Wait for all the jobs already passed to the upload workers to be
+        completed, raising an exception if any of them failed
+        """
+        if self.queue is not None:
+            self._retrieve_results()
 
     def async_complete_multipart_upload(self, upload_metadata, key, parts_count):
         """
@@ -1037,17 +2736,32 @@ class CloudInterface(with_metaclass(ABCMeta)):
         )
         del self.parts_db[key]
 
-    def wait_for_multipart_upload(self, key):
+    def wait_for_multipart_upload(self, key, lock=None):
         """
         Wait for a multipart upload to be completed and return the result
 
+        When a lock is given, other threads keep queueing jobs while waiting,
+        so rather than waiting for all the current jobs to be completed the
+        results of the workers are polled, holding the lock only while they
+        are read.
+
         :param str key: The key to use in the cloud service
+        :param threading.Lock|None lock: the lock serialising the calls made
+          to this interface by several threads
         """
         # The upload must exist
         assert key in self.upload_stats
         # async_complete_multipart_upload must have been called
         assert key not in self.parts_db
 
+        if lock is not None:
+            while True:
+                with lock:
+                    self._collect_results()
+                    if self.upload_stats[key]["status"] != "uploading":
+                        return self.upload_stats[key]
+                time.sleep(self.RESULTS_POLL_INTERVAL)
+
         # If status is still uploading the upload has not finished yet
         while self.upload_stats[key]["status"] == "uploading":
             # Wait for all the current jobs to be completed and
@@ -1068,20 +2782,38 @@ class CloudInterface(with_metaclass(ABCMeta)):
             self._create_bucket()
             self.bucket_exists = True
 
-    def extract_tar(self, key, dst):
+    def extract_tar(self, key, dst, members=None, write_jobs=1, preallocate=False):
         """
         Extract a tar archive from cloud to the local directory
 
         :param str key: The key identifying the tar archive
         :param str dst: Path of the directory into which the tar archive should
           be extracted
+        :param set[str]|None members: the names of the members to extract, all
+          the members are extracted if None
+        :param int write_jobs: the number of threads writing the extracted files
+        :param bool preallocate: whether the blocks of the extracted files are
+          allocated before they are written
         """
         extension = os.path.splitext(key)[-1]
         compression = "" if extension == ".tar" else extension[1:]
-        tar_mode = cloud_compression.get_streaming_tar_mode("r", compression)
-        fileobj = self.remote_open(key, cloud_compression.get_compressor(compression))
-        with tarfile.open(fileobj=fileobj, mode=tar_mode) as tf:
-            tf.extractall(path=dst)
+        if compression == "zst":
+            compression = "zstd"
+        fileobj = self.remote_open(key)
+        with PipelinedStreamingIO(
+            fileobj, cloud_compression.get_stream_decompressor(compression)
+        ) as pipeline:
+            with tarfile.open(fileobj=pipeline, mode="r|") as tf:
+                CloudTarExtractor(dst, write_jobs, preallocate).extract(tf, members)
+        logging.info(
+            "Extracted %s (%s)",
+            key,
+            ", ".join(
+                "%s %s/s" % (stage, pretty_size(rate))
+                for stage, rate in pipeline.throughput().items()
+                if rate is not None
+            ),
+        )
 
     @abstractmethod
     def _reinit_session(self):
@@ -1137,6 +2869,41 @@ class CloudInterface(with_metaclass(ABCMeta)):
         :param str|None decompress: Compression scheme to use for decompression
         """
 
+    def _open_ranged(self, key, size, decompressor=None):
+        """
+        Open a remote object reading it with concurrent ranged GETs, if
+        enabled and if the object spans several ranges
+
+        :param str key: The key identifying the object to open
+        :param int size: The size of the object
+        :param barman.clients.cloud_compression.ChunkedCompressor decompressor:
+          A ChunkedCompressor object which will be used to decompress chunks of bytes
+          as they are read from the stream
+        :return: A file-like object from which the object can be read or None
+          if it must be read in a single stream
+        """
+        if self.read_jobs <= 1 or size <= RangedReadIO.RANGE_SIZE:
+            return None
+        _logger.debug("Reading %s with %s concurrent ranged reads", key, self.read_jobs)
+        resp = RangedReadIO(partial(self._read_range, key), size, self.read_jobs)
+        if decompressor:
+            return DecompressingStreamingIO(resp, decompressor)
+        return resp
+
+    @abstractmethod
+    def _read_range(self, key, offset, length):
+        """
+        Read a range of a remote object in cloud storage
+
+        Called concurrently by the threads of RangedReadIO, so it must only use
+        thread-safe clients.
+
+        :param str key: The key identifying the object
+        :param int offset: The offset of the first byte of the range
+        :param int length: The length of the range
+        :rtype: bytes
+        """
+
     @abstractmethod
     def remote_open(self, key, decompressor=None):
         """
@@ -1237,38 +3004,121 @@ class CloudInterface(with_metaclass(ABCMeta)):
 
         :param List[str] paths:
         :param dict kwargs: Provider-specific keyword arguments.
+        :raises CloudThrottlingError: if the only objects which have not been
+          deleted are the ones whose deletion has been throttled
         """
         if len(paths) > self.MAX_DELETE_BATCH_SIZE:
             raise ValueError("Max batch size exceeded")
 
+    def _is_throttling_error(self, exc):
+        """
+        Whether an exception means the cloud provider throttled the request
+
+        :param Exception exc: the exception raised by the request
+        :rtype: bool
+        """
+        return isinstance(exc, CloudThrottlingError)
+
+    def _retry_throttled(self, func, *args, **kwargs):
+        """
+        Call a function sending a request to the cloud provider, retrying it
+        with an exponential backoff while the request is throttled
+
+        Once a request is throttled, every thread waits for the backoff
+        delay before sending its next request, so the request rate drops for
+        the whole pool of workers and not only for the throttled one.
+
+        :param callable func: the function sending the request
+        :return: the result of the function
+        """
+        attempt = 0
+        while True:
+            wait = self._throttled_until - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                if attempt >= self.THROTTLING_RETRIES or not self._is_throttling_error(
+                    exc
+                ):
+                    raise
+                # Half of the delay is random, so the workers throttled at the
+                # same time do not retry at the same time
+                delay = min(
+                    self.THROTTLING_DELAY * 2**attempt, self.THROTTLING_MAX_DELAY
+                )
+                delay = random.uniform(delay / 2, delay)
+                _logger.warning(
+                    "Request throttled by the cloud provider (%s), "
+                    "retrying in %.1f seconds",
+                    force_str(exc),
+                    delay,
+                )
+                self._throttled_until = max(self._throttled_until, time.time() + delay)
+                attempt += 1
+
     def delete_objects(self, paths, **kwargs):
         """
         Delete the objects at the specified paths
 
         Deletes the objects defined by the supplied list of paths in batches
         specified by either batch_size or MAX_DELETE_BATCH_SIZE, whichever is
-        lowest.
+        lowest. Up to delete_jobs batches are deleted concurrently, and the
+        batches throttled by the cloud provider are retried.
 
         :param List[str] paths:
         :param dict kwargs: Provider-specific keyword arguments.
         """
-        errors = False
-        for i in range_fun(0, len(paths), self.delete_batch_size):
+        batches = [
+            paths[i : i + self.delete_batch_size]
+            for i in range_fun(0, len(paths), self.delete_batch_size)
+        ]
+
+        def delete_batch(batch):
+            remaining = [batch]
+
+            def delete_remaining():
+                try:
+                    self._delete_objects_batch(remaining[0], **kwargs)
+                except CloudThrottlingError as exc:
+                    # Only the objects whose deletion was throttled are retried
+                    remaining[0] = exc.paths
+                    raise
+
             try:
-                self._delete_objects_batch(
-                    paths[i : i + self.delete_batch_size], **kwargs
-                )
+                self._retry_throttled(delete_remaining)
             except CloudProviderError:
                 # Don't let one error stop us from trying to delete any remaining
                 # batches.
-                errors = True
+                return False
+            return True
 
-        if errors:
+        if not all(map_concurrently(delete_batch, batches, self.delete_jobs)):
             raise CloudProviderError(
                 "Error from cloud provider while deleting objects - "
                 "please check the command output."
             )
 
+    def delete_under_prefixes(self, prefixes, **kwargs):
+        """
+        Delete all objects under each of the specified prefixes
+
+        Up to delete_jobs prefixes are deleted concurrently, and the deletions
+        throttled by the cloud provider are retried.
+
+        :param List[str] prefixes: The object key prefixes under which all
+            objects should be deleted.
+        :param dict kwargs: Provider-specific keyword arguments.
+        """
+        map_concurrently(
+            lambda prefix: self._retry_throttled(
+                self.delete_under_prefix, prefix, **kwargs
+            ),
+            prefixes,
+            self.delete_jobs,
+        )
+
     @abstractmethod
     def get_prefixes(self, prefix):
         """
@@ -1429,6 +3279,7 @@ class CloudBackup(with_metaclass(ABCMeta)):
             backup_info_file.seek(0, os.SEEK_SET)
             _logger.info("Uploading '%s'", key)
             self.cloud_interface.upload_fileobj(backup_info_file, key)
+        CloudBackupCatalog(self.cloud_interface, self.server_name).update_index()
 
     def _check_postgres_version(self):
         """
@@ -1546,6 +3397,14 @@ class CloudBackupUploader(CloudBackup):
         backup_name=None,
         min_chunk_size=None,
         max_bandwidth=None,
+        tar_streams=1,
+        compression_workers=0,
+        long_distance_matching=False,
+        in_memory_buffers=False,
+        parent_manifest=None,
+        chunk_store=None,
+        drop_page_cache=False,
+        tablespace_bandwidth=None,
     ):
         """
         Base constructor.
@@ -1562,6 +3421,22 @@ class CloudBackupUploader(CloudBackup):
         :param int min_chunk_size: the minimum size of a single upload part
         :param int max_bandwidth: the maximum amount of data per second that should
           be uploaded during the backup
+        :param int tar_streams: the number of tar archives built concurrently for
+          each directory
+        :param int compression_workers: the number of compression threads for each
+          tar archive, only used by zstd
+        :param bool long_distance_matching: whether long distance matching is
+          enabled, only used by zstd
+        :param bool in_memory_buffers: whether the upload parts are buffered in
+          memory instead of temporary files
+        :param CloudBackupManifest|None parent_manifest: the manifest of the
+          parent backup, to take a file-level incremental backup
+        :param CloudChunkStore|None chunk_store: the chunk store where the
+          relation files are uploaded, None to upload them in the tar archives
+        :param bool drop_page_cache: whether the pages of the uploaded files
+          are dropped from the page cache once they have been read
+        :param dict[str,int]|None tablespace_bandwidth: the maximum amount of
+          data per second that should be uploaded for each named tablespace
         """
         super(CloudBackupUploader, self).__init__(
             server_name,
@@ -1574,6 +3449,17 @@ class CloudBackupUploader(CloudBackup):
         self.max_archive_size = max_archive_size
         self.min_chunk_size = min_chunk_size
         self.max_bandwidth = max_bandwidth
+        self.tar_streams = tar_streams
+        self.compression_workers = compression_workers
+        self.long_distance_matching = long_distance_matching
+        self.in_memory_buffers = in_memory_buffers
+        self.parent_manifest = parent_manifest
+        self.chunk_store = chunk_store
+        self.drop_page_cache = drop_page_cache
+        self.tablespace_bandwidth = tablespace_bandwidth
+        # The journal recording the progress of the upload, only used when
+        # uploading a backup made by Barman
+        self.journal = None
 
         # Object properties set at backup time
         self.controller = None
@@ -1608,6 +3494,8 @@ class CloudBackupUploader(CloudBackup):
             "base",
             backup_id,
         )
+        if self.chunk_store is not None:
+            self.chunk_store.register_backup(backup_id)
         return CloudUploadController(
             self.cloud_interface,
             key_prefix,
@@ -1615,6 +3503,28 @@ class CloudBackupUploader(CloudBackup):
             self.compression,
             self.min_chunk_size,
             self.max_bandwidth,
+            self.tar_streams,
+            self.compression_workers,
+            self.long_distance_matching,
+            self.in_memory_buffers,
+            self.journal,
+            self.parent_manifest,
+            self.chunk_store,
+            self.drop_page_cache,
+            self.tablespace_bandwidth,
+        )
+
+    def _upload_manifest(self):
+        """
+        Upload the manifest of the files uploaded by the controller
+        """
+        manifest = self.controller.manifest
+        manifest.backup_id = self.backup_info.backup_id
+        if self.backup_info.begin_time is not None:
+            manifest.begin_time = self.backup_info.begin_time.timestamp()
+        self.cloud_interface.upload_fileobj(
+            BytesIO(manifest.dumps()),
+            key=os.path.join(self.controller.key_prefix, CloudBackupManifest.NAME),
         )
 
     def _backup_data_files(
@@ -1756,9 +3666,11 @@ class CloudBackupUploader(CloudBackup):
 
     def _finalise_copy(self):
         """
-        Close the upload controller, forcing the flush of any buffered uploads.
+        Close the upload controller, forcing the flush of any buffered uploads,
+        and upload the manifest of the backup.
         """
         self.controller.close()
+        self._upload_manifest()
 
     def _upload_backup_label(self):
         """
@@ -1813,6 +3725,15 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
         compression=None,
         min_chunk_size=None,
         max_bandwidth=None,
+        tar_streams=1,
+        compression_workers=0,
+        long_distance_matching=False,
+        in_memory_buffers=False,
+        journal=None,
+        parent_manifest=None,
+        chunk_store=None,
+        drop_page_cache=False,
+        tablespace_bandwidth=None,
     ):
         """
         Create the cloud storage upload client for a backup in the specified
@@ -1830,6 +3751,24 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
         :param int min_chunk_size: the minimum size of a single upload part
         :param int max_bandwidth: the maximum amount of data per second that
           should be uploaded during the backup
+        :param int tar_streams: the number of tar archives built concurrently
+          for each directory
+        :param int compression_workers: the number of compression threads for
+          each tar archive, only used by zstd
+        :param bool long_distance_matching: whether long distance matching is
+          enabled, only used by zstd
+        :param bool in_memory_buffers: whether the upload parts are buffered in
+          memory instead of temporary files
+        :param CloudUploadJournal|None journal: the journal recording the
+          progress of the upload, used to resume an interrupted upload
+        :param CloudBackupManifest|None parent_manifest: the manifest of the
+          parent backup, to take a file-level incremental backup
+        :param CloudChunkStore|None chunk_store: the chunk store where the
+          relation files are uploaded, None to upload them in the tar archives
+        :param bool drop_page_cache: whether the pages of the uploaded files
+          are dropped from the page cache once they have been read
+        :param dict[str,int]|None tablespace_bandwidth: the maximum amount of
+          data per second that should be uploaded for each named tablespace
         """
         super(CloudBackupUploaderBarman, self).__init__(
             server_name,
@@ -1839,10 +3778,19 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
             postgres=None,
             min_chunk_size=min_chunk_size,
             max_bandwidth=max_bandwidth,
+            tar_streams=tar_streams,
+            compression_workers=compression_workers,
+            long_distance_matching=long_distance_matching,
+            in_memory_buffers=in_memory_buffers,
+            parent_manifest=parent_manifest,
+            chunk_store=chunk_store,
+            drop_page_cache=drop_page_cache,
+            tablespace_bandwidth=tablespace_bandwidth,
         )
         self.backup_dir = backup_dir
         self.backup_id = backup_id
         self.backup_info_path = backup_info_path
+        self.journal = journal
 
     def handle_backup_errors(self, action, exc):
         """
@@ -1915,6 +3863,7 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
 
             # Closing the controller will finalize all the running uploads
             self.controller.close()
+            self._upload_manifest()
 
             # Store the end time
             self.copy_end_time = datetime.datetime.now()
@@ -1925,6 +3874,11 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
                     backup_info_file,
                     key=os.path.join(self.controller.key_prefix, "backup.info"),
                 )
+            CloudBackupCatalog(self.cloud_interface, self.server_name).update_index()
+
+            # The upload is complete, there is nothing left to resume
+            if self.journal is not None:
+                self.journal.remove()
 
         # Use BaseException instead of Exception to catch events like
         # KeyboardInterrupt (e.g.: CTRL-C)
@@ -1940,6 +3894,254 @@ class CloudBackupUploaderBarman(CloudBackupUploader):
         )
 
 
+class CloudPostgresBackupStrategy(PostgresBackupStrategy):
+    """
+    Postgres backup strategy for backups taken with pg_basebackup into a
+    staging directory before being uploaded to cloud storage.
+    """
+
+    def __init__(self, postgres, server_name, data_dir):
+        """
+        :param barman.postgres.PostgreSQLConnection postgres: the PostgreSQL
+            connection
+        :param str server_name: The name of the server
+        :param str data_dir: the directory where pg_basebackup copies PGDATA
+        """
+        super(CloudPostgresBackupStrategy, self).__init__(postgres, server_name)
+        self.data_dir = data_dir
+
+    def _read_backup_label(self, backup_info):
+        """
+        Read the backup_label file written by pg_basebackup.
+
+        :param barman.infofile.BackupInfo backup_info: backup information
+        """
+        self.current_action = "reading the backup label"
+        with open(os.path.join(self.data_dir, "backup_label"), "r") as f:
+            backup_info.set_attribute("backup_label", f.read())
+
+
+class CloudBackupUploaderPostgres(CloudBackupUploader):
+    """
+    Uploads backups taken with pg_basebackup to cloud object storage.
+
+    The backup is copied by pg_basebackup into a local staging directory and
+    then uploaded. With PostgreSQL 17 or later, the backup can be a block-level
+    incremental backup of a previous backup taken with pg_basebackup, in which
+    case only the blocks changed since that backup are copied and uploaded.
+    """
+
+    def __init__(
+        self,
+        server_name,
+        cloud_interface,
+        max_archive_size,
+        postgres,
+        parent_backup_id=None,
+        **kwargs,
+    ):
+        """
+        :param str server_name: The name of the server as configured in Barman
+        :param CloudInterface cloud_interface: The interface to use to
+          upload the backup
+        :param int max_archive_size: the maximum size of an uploading archive
+        :param barman.postgres.PostgreSQLConnection postgres: A connection to the
+            PostgreSQL instance being backed up.
+        :param str|None parent_backup_id: the ID of the backup taken with
+          pg_basebackup this backup is a block-level incremental of, None for
+          a full backup
+        :param kwargs: the other arguments accepted by
+          :class:`CloudBackupUploader`
+        """
+        super(CloudBackupUploaderPostgres, self).__init__(
+            server_name, cloud_interface, max_archive_size, postgres, **kwargs
+        )
+        self.parent_backup_id = parent_backup_id
+        # Object properties set at backup time
+        self.staging_dir = None
+
+    def _get_key(self, backup_id, name):
+        """
+        Get the key of an object stored next to the backup.info of a backup
+
+        :param str backup_id: the ID of the backup
+        :param str name: the name of the object
+        :rtype: str
+        """
+        return os.path.join(
+            self.cloud_interface.path, self.server_name, "base", backup_id, name
+        )
+
+    def _check_incremental_backup(self):
+        """
+        Verify a block-level incremental backup can be taken.
+
+        :raises BackupException: if the server does not summarize WALs or the
+          parent backup was not taken with pg_basebackup
+        """
+        if self.postgres.server_version < 170000:
+            raise BackupException(
+                "block-level incremental backups require PostgreSQL 17 or above"
+            )
+        if self.postgres.get_setting("summarize_wal") != "on":
+            raise BackupException(
+                "block-level incremental backups require 'summarize_wal' "
+                "to be enabled on the PostgreSQL server"
+            )
+        backup_manifest = self.cloud_interface.remote_open(
+            self._get_key(
+                self.parent_backup_id, CloudBackupManifest.BACKUP_MANIFEST_NAME
+            )
+        )
+        if backup_manifest is None:
+            raise BackupException(
+                "backup %s has no backup_manifest, it was not taken with "
+                "pg_basebackup" % self.parent_backup_id
+            )
+        backup_manifest.close()
+
+    def _run_pg_basebackup(self):
+        """
+        Copy the backup into the staging directory with pg_basebackup.
+        """
+        tbs_map = {}
+        if self.backup_info.tablespaces:
+            for tablespace in self.backup_info.tablespaces:
+                tbs_map[tablespace.location] = self._get_tablespace_location(tablespace)
+
+        parent_backup_manifest_path = None
+        if self.parent_backup_id is not None:
+            parent_backup_manifest_path = os.path.join(
+                self.staging_dir, "parent_backup_manifest"
+            )
+            self.cloud_interface.download_file(
+                self._get_key(
+                    self.parent_backup_id, CloudBackupManifest.BACKUP_MANIFEST_NAME
+                ),
+                parent_backup_manifest_path,
+                None,
+            )
+
+        version_info = PgBaseBackup.get_version_info()
+        if version_info["full_path"] is None:
+            raise BackupException("pg_basebackup could not be found")
+        pg_basebackup = PgBaseBackup(
+            connection=StreamingConnection(self.postgres.conninfo),
+            destination=self._pgdata_dir,
+            command=version_info["full_path"],
+            version=version_info["full_version"],
+            app_name="barman_cloud_backup",
+            tbs_mapping=tbs_map,
+            immediate=self.postgres.immediate_checkpoint,
+            out_handler=PgBaseBackup.make_logging_handler(logging.INFO),
+            parent_backup_manifest_path=parent_backup_manifest_path,
+        )
+        try:
+            pg_basebackup()
+        except CommandFailedException as e:
+            msg = "data transfer failure on directory '%s'" % self._pgdata_dir
+            raise DataTransferFailure.from_command_error("pg_basebackup", e, msg)
+
+    def _get_tablespace_location(self, tablespace):
+        """
+        Return the location of the supplied tablespace in the staging directory.
+
+        :param infofile.Tablespace tablespace: The tablespace whose location should be
+            returned.
+        :rtype: str
+        :return: The path of the supplied tablespace.
+        """
+        return os.path.join(self.staging_dir, str(tablespace.oid))
+
+    @property
+    def _pgdata_dir(self):
+        """
+        The location of the PGDATA directory in the staging directory.
+        """
+        return os.path.join(self.staging_dir, "data")
+
+    def _start_backup(self):
+        """
+        Gather the information about the PostgreSQL server and the start of
+        the backup.
+        """
+        self.strategy = CloudPostgresBackupStrategy(
+            self.postgres, self.server_name, self._pgdata_dir
+        )
+        _logger.info("Starting backup '%s'", self.backup_info.backup_id)
+        self.strategy.start_backup(self.backup_info)
+
+    def _take_backup(self):
+        """
+        Take the backup with pg_basebackup and upload it to cloud storage with
+        any config files outside PGDATA.
+
+        The backup is stopped as soon as pg_basebackup exits, so that its end
+        position is not pushed forward by the time taken by the upload.
+        """
+        self._run_pg_basebackup()
+        super(CloudBackupUploaderPostgres, self)._stop_backup()
+        super(CloudBackupUploaderPostgres, self)._take_backup()
+
+    def _stop_backup(self):
+        """
+        Stop the backup.
+
+        This is a no-op because the backup has already been stopped by
+        :meth:`_take_backup` when pg_basebackup exited.
+        """
+        pass
+
+    def _upload_backup_label(self):
+        """
+        Upload the backup label to cloud storage.
+
+        This is a no-op because pg_basebackup writes the backup label in the
+        PGDATA directory, which has already been uploaded.
+        """
+        pass
+
+    def _finalise_copy(self):
+        """
+        Close the upload controller, upload the manifest of the backup and the
+        PostgreSQL backup_manifest needed by the incremental backups of this
+        backup.
+        """
+        super(CloudBackupUploaderPostgres, self)._finalise_copy()
+        with open(
+            os.path.join(self._pgdata_dir, CloudBackupManifest.BACKUP_MANIFEST_NAME),
+            "rb",
+        ) as backup_manifest:
+            self.cloud_interface.upload_fileobj(
+                backup_manifest,
+                key=os.path.join(
+                    self.controller.key_prefix,
+                    CloudBackupManifest.BACKUP_MANIFEST_NAME,
+                ),
+            )
+
+    def backup(self):
+        """
+        Take a backup with pg_basebackup and upload it to cloud storage.
+        """
+        server_name = "cloud"
+        self.backup_info = self._get_backup_info(server_name)
+
+        self._check_postgres_version()
+        if self.parent_backup_id is not None:
+            self._check_incremental_backup()
+
+        self.controller = self._create_upload_controller(self.backup_info.backup_id)
+        self.controller.manifest.backup_method = "postgres"
+        self.controller.manifest.parent_backup_id = self.parent_backup_id
+
+        self.staging_dir = tempfile.mkdtemp(prefix="barman-cloud-pg_basebackup-")
+        try:
+            self._coordinate_backup()
+        finally:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
 class CloudBackupSnapshot(CloudBackup):
     """
     A cloud backup client using disk snapshots to create the backup.
@@ -2098,18 +4300,508 @@ class BackupFileInfo(object):
         self.additional_files = []
 
 
+class CloudBackupManifest(object):
+    """
+    The list of the files uploaded by a backup, with their size and
+    modification time.
+
+    A file-level incremental backup only uploads the files which changed since
+    its parent backup, and records in its manifest the ID of the backup holding
+    the content of each unchanged file.
+
+    A backup taken with pg_basebackup (``backup_method`` is ``postgres``) also
+    stores the PostgreSQL ``backup_manifest`` next to backup.info. If it has a
+    parent it is a block-level incremental backup, which can only be restored
+    by combining it with all the backups it is built upon.
+
+    The relation files uploaded to the chunk store are not in the tar archives:
+    the manifest lists the checksums of their chunks instead, which are also
+    the references counted when the chunks are garbage collected.
+    """
+
+    #: The name of the manifest object, stored next to backup.info
+    NAME = "manifest.json"
+
+    #: The name of the PostgreSQL backup manifest object of backups taken with
+    #: pg_basebackup, stored next to backup.info
+    BACKUP_MANIFEST_NAME = "backup_manifest"
+
+    def __init__(
+        self,
+        backup_id=None,
+        parent_backup_id=None,
+        begin_time=None,
+        backup_method=None,
+        chunk_compression=None,
+    ):
+        """
+        :param str|None backup_id: the ID of the backup
+        :param str|None parent_backup_id: the ID of the parent backup, if this
+          is an incremental backup
+        :param float|None begin_time: the start time of the backup, as seconds
+          since the epoch
+        :param str|None backup_method: ``postgres`` if the backup was taken
+          with pg_basebackup, None if the files were copied by barman-cloud-backup
+        :param str|None chunk_compression: the compression of the chunks of
+          the files uploaded to the chunk store
+        """
+        self.backup_id = backup_id
+        self.parent_backup_id = parent_backup_id
+        self.begin_time = begin_time
+        self.backup_method = backup_method
+        self.chunk_compression = chunk_compression
+        # The files indexed by tar name and path inside the tar
+        self.files = {}
+
+    def add_file(
+        self,
+        name,
+        arcname,
+        size,
+        mtime,
+        backup_id=None,
+        chunks=None,
+        mode=None,
+    ):
+        """
+        Record a file of the backup
+
+        :param str name: the name of the tar containing the file
+        :param str arcname: the path of the file inside the tar
+        :param int size: the size of the file
+        :param float mtime: the modification time of the file
+        :param str|None backup_id: the ID of the backup holding the content of
+          the file, None if the file is uploaded by this backup
+        :param list[str]|None chunks: the checksums of the chunks of the file,
+          if it is uploaded to the chunk store
+        :param int|None mode: the permissions of a file uploaded to the chunk
+          store
+        """
+        entry = {"size": size, "mtime": mtime}
+        if backup_id is not None:
+            entry["backup_id"] = backup_id
+        if chunks is not None:
+            entry["chunks"] = chunks
+            entry["mode"] = mode
+        self.files.setdefault(name, {})[arcname] = entry
+
+    def find_unchanged(self, name, arcname, file_stat):
+        """
+        Look up a file which has not changed since this backup was taken
+
+        A file is unchanged if its size and modification time match and it was
+        last modified before the start of this backup, so that it could not
+        be modified while it was being uploaded. The files uploaded to the
+        chunk store are never reported, since they are not in any tar archive.
+
+        :param str name: the name of the tar containing the file
+        :param str arcname: the path of the file inside the tar
+        :param os.stat_result file_stat: the current status of the file
+        :return dict|None: the entry of the file with the ID of the backup
+          holding its content, None if the file changed
+        """
+        entry = self.files.get(name, {}).get(arcname)
+        if (
+            entry is None
+            or "chunks" in entry
+            or self.begin_time is None
+            or entry["size"] != file_stat.st_size
+            or entry["mtime"] != file_stat.st_mtime
+            or file_stat.st_mtime >= self.begin_time
+        ):
+            return None
+        return {
+            "size": entry["size"],
+            "mtime": entry["mtime"],
+            "backup_id": entry.get("backup_id", self.backup_id),
+        }
+
+    @property
+    def is_block_incremental(self):
+        """
+        Whether the backup is a block-level incremental backup taken with
+        pg_basebackup
+
+        :rtype: bool
+        """
+        return self.backup_method == "postgres" and self.parent_backup_id is not None
+
+    @property
+    def referenced_backup_ids(self):
+        """
+        The IDs of the backups holding the content of unchanged files, or the
+        parent of a block-level incremental backup
+
+        :rtype: list[str]
+        """
+        referenced_backup_ids = set(
+            entry["backup_id"]
+            for files in self.files.values()
+            for entry in files.values()
+            if "backup_id" in entry
+        )
+        if self.is_block_incremental:
+            referenced_backup_ids.add(self.parent_backup_id)
+        return sorted(referenced_backup_ids)
+
+    def get_referenced_files(self, backup_id):
+        """
+        The files whose content is held by the given backup
+
+        :param str backup_id: the ID of a referenced backup
+        :return dict[str,set[str]]: the paths of the files indexed by tar name
+        """
+        referenced_files = {}
+        for name, files in self.files.items():
+            for arcname, entry in files.items():
+                if entry.get("backup_id") == backup_id:
+                    referenced_files.setdefault(name, set()).add(arcname)
+        return referenced_files
+
+    def get_chunked_files(self):
+        """
+        The files uploaded to the chunk store
+
+        :return dict[str,dict[str,dict]]: the entries of the files indexed by
+          tar name and path inside the tar
+        """
+        chunked_files = {}
+        for name, files in self.files.items():
+            for arcname, entry in files.items():
+                if "chunks" in entry:
+                    chunked_files.setdefault(name, {})[arcname] = entry
+        return chunked_files
+
+    @property
+    def chunks(self):
+        """
+        The checksums of the chunks referenced by the backup, once for each
+        reference
+
+        :rtype: list[str]
+        """
+        return [
+            checksum
+            for files in self.get_chunked_files().values()
+            for entry in files.values()
+            for checksum in entry["chunks"]
+        ]
+
+    def dumps(self):
+        """
+        Serialise the manifest
+
+        :rtype: bytes
+        """
+        return json.dumps(
+            {
+                "backup_id": self.backup_id,
+                "parent_backup_id": self.parent_backup_id,
+                "begin_time": self.begin_time,
+                "backup_method": self.backup_method,
+                "chunk_compression": self.chunk_compression,
+                "referenced_backup_ids": self.referenced_backup_ids,
+                "files": self.files,
+            },
+            sort_keys=True,
+        ).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Load a manifest serialised with :meth:`dumps`
+
+        :param bytes data: the serialised manifest
+        :rtype: CloudBackupManifest
+        """
+        content = json.loads(data)
+        manifest = cls(
+            content["backup_id"],
+            content["parent_backup_id"],
+            content["begin_time"],
+            content.get("backup_method"),
+            content.get("chunk_compression"),
+        )
+        manifest.files = content["files"]
+        return manifest
+
+
+class CloudChunkStore(object):
+    """
+    A content-addressed store of the chunks of the relation files of a server,
+    shared by all its backups
+
+    Each distinct chunk is uploaded once, under ``chunks/<xx>/<checksum>`` in
+    the server prefix, where ``<checksum>`` is the SHA-256 checksum of its
+    content and ``<xx>`` its first two characters, followed by the extension
+    of its compression. The manifest of each backup lists the chunks of its
+    files, so a chunk can be deleted once no manifest references it.
+
+    The manifest of a backup is only stored at its end, so each backup also
+    writes a marker under ``chunks_pending/<backup_id>`` before listing the
+    store. The chunks are not deleted while the marker of a backup missing
+    from the catalog exists, as they may be referenced by its manifest.
+    """
+
+    #: The name of the prefix holding the chunks, inside the server prefix
+    NAME = "chunks"
+
+    #: The name of the prefix holding the markers of the backups which are
+    #: adding chunks to the store, inside the server prefix
+    PENDING_NAME = "chunks_pending"
+
+    #: The size of the chunks, a multiple of the PostgreSQL page size.
+    #: Relation files are updated in place one page at a time, so the content
+    #: of a page never moves to another chunk and fixed-size chunks find the
+    #: same duplicates as content-defined ones.
+    CHUNK_SIZE = 8 << 20
+
+    #: The internal compression and the extension of the chunks for each
+    #: compression supported by barman-cloud-backup
+    COMPRESSIONS = {
+        "gz": ("gzip", ".gz"),
+        "bz2": ("bzip2", ".bz2"),
+        "snappy": ("snappy", ".snappy"),
+        "zstd": ("zstd", ".zst"),
+        "lz4": ("lz4", ".lz4"),
+    }
+
+    def __init__(self, cloud_interface, server_name, compression=None):
+        """
+        :param CloudInterface cloud_interface: the cloud interface
+        :param str server_name: the name of the server
+        :param str|None compression: the compression of the chunks
+        """
+        self.cloud_interface = cloud_interface
+        self.prefix = os.path.join(cloud_interface.path, server_name, self.NAME)
+        self.pending_prefix = os.path.join(
+            cloud_interface.path, server_name, self.PENDING_NAME
+        )
+        self.compression = compression
+        self._lock = threading.Lock()
+        # The keys of the chunks already stored, listed on the first upload
+        self._stored_chunks = None
+        # The keys of the stored chunks which have not been uploaded again
+        self._reused_keys = set()
+        self.uploaded_chunks = 0
+        self.uploaded_size = 0
+        self.reused_chunks = 0
+        self.reused_size = 0
+
+    def get_chunk_key(self, checksum, compression=None):
+        """
+        Get the key of a chunk
+
+        :param str checksum: the checksum of the chunk
+        :param str|None compression: the compression of the chunk
+        :rtype: str
+        """
+        extension = self.COMPRESSIONS[compression][1] if compression else ""
+        return os.path.join(self.prefix, checksum[:2], checksum + extension)
+
+    def list_chunks(self):
+        """
+        List the keys of the chunks in the store
+
+        :rtype: set[str]
+        """
+        return set(self.cloud_interface.list_bucket(self.prefix + "/", delimiter=""))
+
+    def register_backup(self, backup_id):
+        """
+        Write the marker of a backup which is going to add chunks to the store
+
+        The marker must be written before the store is listed. It is removed
+        by the garbage collection of the chunks once the backup is in the
+        catalog, see :meth:`get_pending_backups`.
+
+        :param str backup_id: the backup ID
+        """
+        marker = {"backup_id": backup_id, "time": time.time()}
+        self.cloud_interface.upload_fileobj(
+            BytesIO(json.dumps(marker).encode("utf-8")),
+            os.path.join(self.pending_prefix, backup_id),
+        )
+
+    def get_pending_backups(self):
+        """
+        Get the backups whose marker is in the store
+
+        :return dict[str,datetime.datetime]: the time each marker has been
+          written, keyed by backup ID
+        """
+        pending_backups = {}
+        for key in self.cloud_interface.list_bucket(
+            self.pending_prefix + "/", delimiter=""
+        ):
+            marker_file = self.cloud_interface.remote_open(key)
+            if marker_file is None:
+                continue
+            marker = json.loads(force_str(marker_file.read()))
+            pending_backups[marker["backup_id"]] = datetime.datetime.fromtimestamp(
+                marker["time"]
+            )
+        return pending_backups
+
+    def unregister_backups(self, backup_ids):
+        """
+        Remove the markers of some backups
+
+        :param list[str] backup_ids: the backup IDs
+        """
+        self.cloud_interface.delete_objects(
+            [os.path.join(self.pending_prefix, backup_id) for backup_id in backup_ids]
+        )
+
+    def add_file(self, fileobj, lock=None):
+        """
+        Store the content of a file, uploading only the chunks not already
+        in the store
+
+        The new chunks are uploaded by the upload workers of the cloud
+        interface, :meth:`close` waits for them to be stored.
+
+        :param fileobj: the file object to read the content from
+        :param threading.RLock|None lock: a lock serialising the calls to the
+          cloud interface, required when it is shared with other threads
+        :return list[str]: the checksums of the chunks of the file
+        """
+        with self._lock:
+            if self._stored_chunks is None:
+                self._stored_chunks = self.list_chunks()
+        checksums = []
+        while True:
+            data = fileobj.read(self.CHUNK_SIZE)
+            if not data:
+                break
+            checksum = hashlib.sha256(data).hexdigest()
+            key = self.get_chunk_key(checksum, self.compression)
+            with self._lock:
+                stored = key in self._stored_chunks
+                self._stored_chunks.add(key)
+            if stored:
+                with self._lock:
+                    self._reused_keys.add(key)
+                    self.reused_chunks += 1
+                    self.reused_size += len(data)
+            else:
+                body = BytesIO(data)
+                if self.compression:
+                    body = cloud_compression.compress(
+                        body, self.COMPRESSIONS[self.compression][0], None
+                    )
+                with lock if lock is not None else nullcontext():
+                    self.cloud_interface.async_upload_fileobj(body, key)
+                with self._lock:
+                    self.uploaded_chunks += 1
+                    self.uploaded_size += len(data)
+            checksums.append(checksum)
+        return checksums
+
+    def close(self):
+        """
+        Wait for the new chunks to be uploaded and check that the reused
+        chunks are still in the store
+
+        A chunk listed before the marker of the backup was visible can be
+        deleted by a concurrent garbage collection, in which case the backup
+        cannot be used.
+
+        :raises BackupException: if a reused chunk has been deleted
+        """
+        self.cloud_interface.wait_for_async_uploads()
+        if self._reused_keys:
+            missing_chunks = self._reused_keys - self.list_chunks()
+            if missing_chunks:
+                raise BackupException(
+                    "%s reused chunks have been deleted from the chunk store "
+                    "while the backup was running, e.g. %s"
+                    % (len(missing_chunks), min(missing_chunks))
+                )
+
+    def read_file(self, checksums, fileobj):
+        """
+        Write the content of a file from its chunks, checking their checksums
+
+        :param list[str] checksums: the checksums of the chunks of the file
+        :param fileobj: the file object to write the content to
+        """
+        for checksum in checksums:
+            key = self.get_chunk_key(checksum, self.compression)
+            chunk = self.cloud_interface.remote_open(key)
+            if chunk is None:
+                raise BarmanException("Chunk %s not found" % key)
+            data = BytesIO()
+            if self.compression:
+                cloud_compression.decompress_to_file(
+                    chunk, data, self.COMPRESSIONS[self.compression][0]
+                )
+            else:
+                shutil.copyfileobj(chunk, data)
+            if hashlib.sha256(data.getvalue()).hexdigest() != checksum:
+                raise BarmanException("Chunk %s is corrupted" % key)
+            fileobj.write(data.getvalue())
+
+    def get_unreferenced_chunks(self, manifests):
+        """
+        Get the chunks in the store which are not referenced by any manifest
+
+        :param list[CloudBackupManifest] manifests: the manifests of all the
+          backups of the server
+        :return list[str]: the keys of the unreferenced chunks
+        """
+        references = collections.Counter()
+        for manifest in manifests:
+            for checksum in manifest.chunks:
+                references[
+                    self.get_chunk_key(checksum, manifest.chunk_compression)
+                ] += 1
+        return sorted(key for key in self.list_chunks() if references[key] == 0)
+
+
 class CloudBackupCatalog(KeepManagerMixinCloud):
     """
     Cloud storage backup catalog
+
+    The content of the backup.info files of the backups is also kept in an
+    index object, ``base/catalog.json``, so the whole catalog can be loaded
+    with one request instead of one per backup. The backup.info files are
+    never changed once uploaded, so the index is only checked against the
+    listing of the backups: the backups missing from the index are read from
+    their own backup.info files, and the ones no longer listed are ignored.
+    The index also records the backups referenced by the manifest of each
+    backup, so finding the incremental backups which reference a backup does
+    not need to read every manifest.
     """
 
-    def __init__(self, cloud_interface, server_name):
+    #: The name of the index of the catalog, inside the base prefix
+    INDEX_NAME = "catalog.json"
+
+    #: The version of the format of the index
+    INDEX_VERSION = 1
+
+    #: The maximum number of backup.info and manifest files read concurrently
+    READ_JOBS = 16
+
+    #: The maximum number of WAL directories listed concurrently
+    LIST_JOBS = 16
+
+    #: The version of the format of the local cache of the WAL listing
+    WAL_CACHE_VERSION = 1
+
+    def __init__(
+        self, cloud_interface, server_name, wal_cache_path=None, refresh_wal_cache=False
+    ):
         """
         Object responsible for retrieving backup catalog from cloud storage
 
         :param CloudInterface cloud_interface: The interface to use to
           upload the backup
         :param str server_name: The name of the server as configured in Barman
+        :param str|None wal_cache_path: the path of a local file caching the
+          listing of the WAL archive, None to always list the whole archive
+        :param bool refresh_wal_cache: whether to ignore the content of the
+          local cache and list the whole WAL archive
         """
         super(CloudBackupCatalog, self).__init__(
             cloud_interface=cloud_interface, server_name=server_name
@@ -2120,10 +4812,48 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
         self.wal_prefix = os.path.join(
             self.cloud_interface.path, self.server_name, "wals"
         )
+        self.index_path = os.path.join(self.prefix, self.INDEX_NAME)
         self._backup_list = None
+        # The content of the backup.info files of the listed backups
+        self._backup_info_files = {}
+        # The IDs of the backups referenced by the manifests of the listed backups
+        self._referenced_backups = {}
+        # Whether the index differs from the listing of the backups
+        self._index_stale = False
+        self.wal_cache_path = wal_cache_path
+        self.refresh_wal_cache = refresh_wal_cache
         self._wal_paths = None
+        # The WAL directories found by the listing of the WAL archive
+        self._wal_dirs = None
+        self._manifests = {}
         self.unreadable_backups = []
 
+    def _read_index(self):
+        """
+        Read the index of the catalog
+
+        :rtype: tuple[dict[str,str],dict[str,list[str]]]
+        :return: the content of the backup.info files and the IDs of the
+          backups referenced by the manifests of the backups, both keyed by
+          backup ID, both empty if the index cannot be read
+        """
+        try:
+            index_file = self.cloud_interface.remote_open(self.index_path)
+            if index_file is None:
+                return {}, {}
+            index = json.loads(force_str(index_file.read()))
+            if index.get("version") != self.INDEX_VERSION:
+                _logger.warning(
+                    "Ignoring catalog index with unknown version %s",
+                    index.get("version"),
+                )
+                return {}, {}
+            # The indexes written before the references were recorded lack them
+            return index["backups"], index.get("referenced_backups", {})
+        except Exception as exc:
+            _logger.warning("Unable to read catalog index %s: %s", self.index_path, exc)
+            return {}, {}
+
     def get_backup_list(self):
         """
         Retrieve the list of available backup from cloud storage
@@ -2132,15 +4862,33 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
         """
         if self._backup_list is None:
             backup_list = {}
+            listing = list(self.cloud_interface.list_bucket(self.prefix + "/"))
+            index, index_references = (
+                self._read_index() if self.index_path in listing else ({}, {})
+            )
+            # We want only the directories
+            backup_ids = [
+                os.path.basename(backup_dir.rstrip("/"))
+                for backup_dir in listing
+                if backup_dir[-1] == "/"
+            ]
+            backup_info_files = self._read_backup_info_files(
+                [backup_id for backup_id in backup_ids if backup_id not in index]
+            )
 
             # get backups metadata
-            for backup_dir in self.cloud_interface.list_bucket(self.prefix + "/"):
-                # We want only the directories
-                if backup_dir[-1] != "/":
-                    continue
-                backup_id = os.path.basename(backup_dir.rstrip("/"))
+            for backup_id in backup_ids:
                 try:
-                    backup_info = self.get_backup_info(backup_id)
+                    content = index.get(backup_id)
+                    if content is None:
+                        content, exc = backup_info_files[backup_id]
+                        if exc is not None:
+                            raise exc
+                    backup_info = (
+                        self._load_backup_info(backup_id, content)
+                        if content is not None
+                        else None
+                    )
                 except Exception as exc:
                     _logger.warning(
                         "Unable to open backup.info file for %s: %s" % (backup_id, exc)
@@ -2150,9 +4898,37 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
 
                 if backup_info:
                     backup_list[backup_id] = backup_info
+                    self._backup_info_files[backup_id] = content
+                    if backup_id in index and backup_id in index_references:
+                        self._referenced_backups[backup_id] = index_references[
+                            backup_id
+                        ]
             self._backup_list = backup_list
+            self._index_stale = set(index) != set(self._backup_info_files)
         return self._backup_list
 
+    def _read_backup_info_files(self, backup_ids):
+        """
+        Read the backup.info files of several backups
+
+        The files are read concurrently by a pool of threads when the session
+        of the cloud interface can be shared by threads.
+
+        :param list[str] backup_ids: the backup ids
+        :rtype: dict[str,tuple[str|None,Exception|None]]
+        :return: the content of each file, None if it does not exist, and the
+          error raised reading it, keyed by backup id
+        """
+
+        def read(backup_id):
+            try:
+                return self._read_backup_info_file(backup_id), None
+            except Exception as exc:
+                return None, exc
+
+        jobs = self.READ_JOBS if self.cloud_interface.THREAD_SAFE else 1
+        return dict(zip(backup_ids, map_concurrently(read, backup_ids, jobs)))
+
     def remove_backup_from_cache(self, backup_id):
         """
         Remove backup with backup_id from the cached list. This is intended for
@@ -2161,6 +4937,46 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
         """
         if self._backup_list:
             self._backup_list.pop(backup_id)
+            self._referenced_backups.pop(backup_id, None)
+            if self._backup_info_files.pop(backup_id, None) is not None:
+                self._index_stale = True
+
+    def update_index(self):
+        """
+        Upload the index of the catalog if it differs from the listing of the
+        backups
+
+        The index is only an optimization for the readers of the catalog, so
+        any error is logged and ignored.
+
+        :rtype: bool
+        :return: True if the index has been uploaded
+        """
+        try:
+            self.get_backup_list()
+            if not self._index_stale:
+                return False
+            index = {
+                "version": self.INDEX_VERSION,
+                "backups": self._backup_info_files,
+                "referenced_backups": self._referenced_backups,
+            }
+            self.cloud_interface.upload_fileobj(
+                BytesIO(json.dumps(index, sort_keys=True).encode("utf-8")),
+                self.index_path,
+            )
+        except Exception as exc:
+            _logger.warning(
+                "Unable to update catalog index %s: %s", self.index_path, force_str(exc)
+            )
+            return False
+        self._index_stale = False
+        _logger.info(
+            "Updated the catalog index of server %s with %s backups",
+            self.server_name,
+            len(self._backup_info_files),
+        )
+        return True
 
     def get_wal_prefixes(self):
         """
@@ -2168,15 +4984,180 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
         """
         return self.cloud_interface.get_prefixes(self.wal_prefix)
 
+    def _read_wal_cache(self):
+        """
+        Read the local cache of the WAL listing
+
+        :rtype: dict[str,list[str]]
+        :return: the names of the WALs keyed by the name of their directory,
+          empty if the cache cannot be used
+        """
+        if self.refresh_wal_cache or not os.path.exists(self.wal_cache_path):
+            return {}
+        try:
+            with open(self.wal_cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except (IOError, OSError, ValueError) as exc:
+            _logger.warning(
+                "Ignoring unreadable WAL listing cache %s: %s",
+                self.wal_cache_path,
+                force_str(exc),
+            )
+            return {}
+        if (
+            cache.get("version") != self.WAL_CACHE_VERSION
+            or cache.get("source") != self._wal_cache_source()
+        ):
+            _logger.warning(
+                "Ignoring WAL listing cache %s which does not belong to server %s",
+                self.wal_cache_path,
+                self.server_name,
+            )
+            return {}
+        return cache["directories"]
+
+    def _wal_cache_source(self):
+        """
+        Identify the WAL archive the local cache of the WAL listing belongs to
+
+        :rtype: str
+        """
+        return "%s/%s" % (str(self.cloud_interface.url).rstrip("/"), self.server_name)
+
+    def _list_wal_keys(self):
+        """
+        List the objects of the WAL archive one WAL directory at a time
+
+        Only the names of the WAL directories are listed first, along with the
+        history files stored right under the wals prefix. The WAL directories
+        are then listed concurrently, as a single listing of the whole archive
+        only retrieves one page of keys per request.
+
+        If the catalog has a local cache of the WAL listing, a cached directory
+        which is not the newest one of its timeline has not changed since the
+        cache was written, because WALs are archived in order, and its content
+        is taken from the cache. Only the newest cached directory of each
+        timeline and the directories missing from the cache are listed.
+
+        Without a cache, a cloud interface whose session cannot be shared by
+        threads lists the whole archive as a single stream instead, as listing
+        the directories one after the other would only add requests.
+
+        :rtype: list[str]
+        :return: the keys of the objects under the wals prefix, in the order of
+          their WAL directories
+        """
+        cache = self._read_wal_cache() if self.wal_cache_path is not None else {}
+        jobs = self.LIST_JOBS if self.cloud_interface.THREAD_SAFE else 1
+        if jobs == 1 and not cache:
+            keys = list(
+                self.cloud_interface.list_bucket(self.wal_prefix + "/", delimiter="")
+            )
+            self._wal_dirs = set(
+                os.path.basename(os.path.dirname(key))
+                for key in keys
+                if os.path.dirname(key) != self.wal_prefix
+            )
+            return keys
+        wal_dirs = {}
+        keys = []
+        for item in self.cloud_interface.list_bucket(
+            self.wal_prefix + "/", delimiter="/"
+        ):
+            if item.endswith("/"):
+                wal_dirs[os.path.basename(item.rstrip("/"))] = item
+            else:
+                keys.append(item)
+        # The newest cached directory of each timeline, which can still be
+        # receiving WALs
+        newest_dirs = {}
+        for wal_dir in wal_dirs:
+            if wal_dir in cache and wal_dir > newest_dirs.get(wal_dir[:8], ""):
+                newest_dirs[wal_dir[:8]] = wal_dir
+        prefixes = [
+            prefix
+            for wal_dir, prefix in sorted(wal_dirs.items())
+            if wal_dir not in cache or newest_dirs[wal_dir[:8]] == wal_dir
+        ]
+        listings = dict(
+            zip(
+                prefixes,
+                map_concurrently(
+                    lambda prefix: list(
+                        self.cloud_interface.list_bucket(prefix, delimiter="")
+                    ),
+                    prefixes,
+                    jobs,
+                ),
+            )
+        )
+        for wal_dir, prefix in sorted(wal_dirs.items()):
+            if prefix in listings:
+                keys.extend(listings[prefix])
+            else:
+                keys.extend(os.path.join(prefix, name) for name in cache[wal_dir])
+        _logger.debug(
+            "Listed %s of %s WAL directories of server %s",
+            len(prefixes),
+            len(wal_dirs),
+            self.server_name,
+        )
+        self._wal_dirs = set(wal_dirs)
+        return keys
+
+    def save_wal_cache(self):
+        """
+        Write the WALs known to the catalog to the local cache of the WAL
+        listing
+
+        Nothing is written if the catalog has no cache or the WAL archive has
+        not been listed. Failures are logged and ignored, as the cache is only
+        an optimisation.
+
+        :rtype: bool
+        :return: True if the cache has been written, False otherwise
+        """
+        if self.wal_cache_path is None or self._wal_dirs is None:
+            return False
+        directories = dict((wal_dir, []) for wal_dir in self._wal_dirs)
+        for wal in self._wal_paths.values():
+            wal_dir = os.path.basename(os.path.dirname(wal))
+            if wal_dir in directories:
+                directories[wal_dir].append(os.path.basename(wal))
+        for names in directories.values():
+            names.sort()
+        temp_path = self.wal_cache_path + ".tmp"
+        try:
+            with open(temp_path, "w") as cache_file:
+                json.dump(
+                    {
+                        "version": self.WAL_CACHE_VERSION,
+                        "source": self._wal_cache_source(),
+                        "directories": directories,
+                    },
+                    cache_file,
+                )
+            os.rename(temp_path, self.wal_cache_path)
+        except (IOError, OSError) as exc:
+            _logger.warning(
+                "Could not write WAL listing cache %s: %s",
+                self.wal_cache_path,
+                force_str(exc),
+            )
+            return False
+        return True
+
     def get_wal_paths(self):
         """
         Retrieve a dict of WAL paths keyed by the WAL name from cloud storage
+
+        If the catalog has a local cache of the WAL listing, only the WALs
+        archived since the cache was written are listed, and the cache is
+        updated with the result.
         """
         if self._wal_paths is None:
             wal_paths = {}
-            for wal in self.cloud_interface.list_bucket(
-                self.wal_prefix + "/", delimiter=""
-            ):
+            for wal in self._list_wal_keys():
                 wal_basename = os.path.basename(wal)
                 if xlog.is_any_xlog_file(wal_basename):
                     # We have an uncompressed xlog of some kind
@@ -2193,6 +5174,7 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
                         continue
 
             self._wal_paths = wal_paths
+            self.save_wal_cache()
         return self._wal_paths
 
     def remove_wal_from_cache(self, wal_name):
@@ -2289,14 +5271,131 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
         :param str backup_id: The backup id to load
         :rtype: BackupInfo
         """
+        content = self._read_backup_info_file(backup_id)
+        if content is None:
+            return None
+        return self._load_backup_info(backup_id, content)
+
+    def _read_backup_info_file(self, backup_id):
+        """
+        Read the backup.info file of a backup from cloud storage
+
+        :param str backup_id: The backup id
+        :return str|None: the content of the file, None if it does not exist
+        """
         backup_info_path = os.path.join(self.prefix, backup_id, "backup.info")
         backup_info_file = self.cloud_interface.remote_open(backup_info_path)
         if backup_info_file is None:
             return None
+        return force_str(backup_info_file.read())
+
+    @staticmethod
+    def _load_backup_info(backup_id, content):
+        """
+        Load a BackupInfo from the content of its backup.info file
+
+        :param str backup_id: The backup id
+        :param str content: the content of the backup.info file
+        :rtype: BackupInfo
+        """
         backup_info = BackupInfo(backup_id)
-        backup_info.load(file_object=backup_info_file)
+        backup_info.load(file_object=BytesIO(content.encode("utf-8")))
         return backup_info
 
+    def get_backup_manifest(self, backup_id):
+        """
+        Load the manifest of a backup from cloud storage
+
+        :param str backup_id: The backup id
+        :return CloudBackupManifest|None: the manifest, None if the backup has
+          no manifest
+        """
+        if backup_id not in self._manifests:
+            self._manifests[backup_id] = self._read_manifest(backup_id)
+        return self._manifests[backup_id]
+
+    def _read_manifest(self, backup_id):
+        """
+        Read the manifest of a backup from cloud storage
+
+        :param str backup_id: The backup id
+        :return CloudBackupManifest|None: the manifest, None if the backup has
+          no manifest
+        """
+        manifest_file = self.cloud_interface.remote_open(
+            os.path.join(self.prefix, backup_id, CloudBackupManifest.NAME)
+        )
+        if manifest_file is None:
+            return None
+        return CloudBackupManifest.loads(manifest_file.read())
+
+    def get_backup_manifests(self, backup_ids):
+        """
+        Load the manifests of several backups from cloud storage
+
+        The manifests which have not been loaded yet are read concurrently by
+        a pool of threads when the session of the cloud interface can be
+        shared by threads.
+
+        :param list[str] backup_ids: the backup ids
+        :return dict[str,CloudBackupManifest|None]: the manifests, None for the
+          backups without manifest, keyed by backup id
+        """
+        missing_backup_ids = [
+            backup_id for backup_id in backup_ids if backup_id not in self._manifests
+        ]
+        jobs = self.READ_JOBS if self.cloud_interface.THREAD_SAFE else 1
+        self._manifests.update(
+            zip(
+                missing_backup_ids,
+                map_concurrently(self._read_manifest, missing_backup_ids, jobs),
+            )
+        )
+        return dict((backup_id, self._manifests[backup_id]) for backup_id in backup_ids)
+
+    def get_referenced_backups(self):
+        """
+        Get the backups whose files are referenced by each backup
+
+        The references are taken from the index of the catalog, the manifests
+        are only read for the backups missing from it. The references read
+        from the manifests are recorded by the next update of the index.
+
+        :return dict[str,list[str]]: the IDs of the backups holding files of
+          each backup, keyed by backup id
+        """
+        backup_ids = [
+            backup_id
+            for backup_id in sorted(self.get_backup_list())
+            if backup_id not in self._referenced_backups
+        ]
+        if backup_ids:
+            for backup_id, manifest in self.get_backup_manifests(backup_ids).items():
+                self._referenced_backups[backup_id] = (
+                    manifest.referenced_backup_ids if manifest is not None else []
+                )
+            self._index_stale = True
+        return dict(
+            (backup_id, self._referenced_backups[backup_id])
+            for backup_id in sorted(self.get_backup_list())
+        )
+
+    def get_referencing_backups(self, backup_id):
+        """
+        Get the incremental backups referencing files held by a backup
+
+        :param str backup_id: The backup id
+        :return list[str]: the IDs of the backups which cannot be restored
+          without the given backup
+        """
+        return [
+            other_backup_id
+            for other_backup_id, referenced_backup_ids in (
+                self.get_referenced_backups().items()
+            )
+            if other_backup_id != backup_id and backup_id in referenced_backup_ids
+        ]
+
     def get_backup_files(self, backup_info, allow_missing=False):
         """
         Get the list of expected files part of a backup
@@ -2350,6 +5449,10 @@ class CloudBackupCatalog(KeepManagerMixinCloud):
                         info.compression = "bzip2"
                     elif ext == "tar.snappy":
                         info.compression = "snappy"
+                    elif ext == "tar.zst":
+                        info.compression = "zstd"
+                    elif ext == "tar.lz4":
+                        info.compression = "lz4"
                     else:
                         _logger.warning("Skipping unknown extension: %s", ext)
                         continue
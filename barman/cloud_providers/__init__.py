@@ -149,7 +149,16 @@ def get_cloud_interface(config):
         "url": config.source_url if "source_url" in config else config.destination_url
     }
     _update_kwargs(
-        cloud_interface_kwargs, config, ("jobs", "tags", "delete_batch_size")
+        cloud_interface_kwargs,
+        config,
+        (
+            "jobs",
+            "tags",
+            "delete_batch_size",
+            "upload_engine",
+            "read_jobs",
+            "delete_jobs",
+        ),
     )
 
     if config.cloud_provider == "aws-s3":
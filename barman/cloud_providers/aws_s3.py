@@ -32,6 +32,7 @@ from barman.cloud import (
     CloudInterface,
     CloudProviderError,
     CloudSnapshotInterface,
+    CloudThrottlingError,
     DecompressingStreamingIO,
     SnapshotMetadata,
     SnapshotsInfo,
@@ -94,6 +95,12 @@ class S3CloudInterface(CloudInterface):
 
     MAX_DELETE_BATCH_SIZE = 1000
 
+    # The parts can be uploaded with the boto3 client, which is thread-safe,
+    # from threads, which is opt-in as it changes the CPU parallelism
+    UPLOAD_ENGINES = ("process", "thread")
+
+    THREAD_SAFE = True
+
     # The minimum size for a file to be uploaded using multipart upload in upload_fileobj
     # 100MB is the AWS recommendation for when to start considering using multipart upload
     # https://docs.aws.amazon.com/AmazonS3/latest/userguide/mpuoverview.html
@@ -123,6 +130,9 @@ class S3CloudInterface(CloudInterface):
         delete_batch_size=None,
         read_timeout=None,
         sse_kms_key_id=None,
+        upload_engine=None,
+        read_jobs=1,
+        delete_jobs=1,
     ):
         """
         Create a new S3 interface given the S3 destination url and the profile
@@ -130,8 +140,8 @@ class S3CloudInterface(CloudInterface):
 
         :param str url: Full URL of the cloud destination/source
         :param str|None encryption: Encryption type string
-        :param int jobs: How many sub-processes to use for asynchronous
-          uploading, defaults to 2.
+        :param int jobs: How many sub-processes or threads to use for
+          asynchronous uploading, defaults to 2.
         :param str profile_name: Amazon auth profile identifier
         :param str endpoint_url: override default endpoint detection strategy
           with this one
@@ -141,12 +151,21 @@ class S3CloudInterface(CloudInterface):
           raised when waiting to read from a connection
         :param str|None sse_kms_key_id: the AWS KMS key ID that should be used
           for encrypting uploaded data in S3
+        :param str|None upload_engine: the engine running the upload workers,
+          either "thread" (the default) or "process"
+        :param int read_jobs: the number of concurrent ranged GETs used to read
+          a large object
+        :param int delete_jobs: the number of batches of objects, or prefixes,
+          deleted concurrently
         """
         super(S3CloudInterface, self).__init__(
             url=url,
             jobs=jobs,
             tags=tags,
             delete_batch_size=delete_batch_size,
+            upload_engine=upload_engine,
+            read_jobs=read_jobs,
+            delete_jobs=delete_jobs,
         )
         self.profile_name = profile_name
         self.encryption = encryption
@@ -321,6 +340,10 @@ class S3CloudInterface(CloudInterface):
         """
         try:
             obj = self.s3.Object(self.bucket_name, key)
+            if self.read_jobs > 1:
+                ranged = self._open_ranged(key, obj.content_length, decompressor)
+                if ranged is not None:
+                    return ranged
             resp = StreamingBodyIO(obj.get()["Body"])
             if decompressor:
                 return DecompressingStreamingIO(resp, decompressor)
@@ -328,11 +351,31 @@ class S3CloudInterface(CloudInterface):
                 return resp
         except ClientError as exc:
             error_code = exc.response["Error"]["Code"]
-            if error_code == "NoSuchKey":
+            # The HEAD request reading the size of the object returns a
+            # plain 404 error code
+            if error_code in ("NoSuchKey", "404"):
                 return None
             else:
                 raise
 
+    def _read_range(self, key, offset, length):
+        """
+        Read a range of a remote S3 object
+
+        The ranges are read with the boto3 client, which is thread-safe.
+
+        :param str key: The key identifying the object
+        :param int offset: The offset of the first byte of the range
+        :param int length: The length of the range
+        :rtype: bytes
+        """
+        response = self.s3.meta.client.get_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Range="bytes=%d-%d" % (offset, offset + length - 1),
+        )
+        return response["Body"].read()
+
     def upload_fileobj(self, fileobj, key, override_tags=None):
         """
         Synchronously upload the content of a file-like object to a cloud key
@@ -418,6 +461,30 @@ class S3CloudInterface(CloudInterface):
             Bucket=self.bucket_name, Key=key, UploadId=upload_metadata["UploadId"]
         )
 
+    #: The error codes S3 returns when it throttles a request
+    THROTTLING_ERROR_CODES = (
+        "SlowDown",
+        "ServiceUnavailable",
+        "Throttling",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+    )
+
+    def _is_throttling_error(self, exc):
+        """
+        Whether an exception means S3 throttled the request
+
+        :param Exception exc: the exception raised by the request
+        :rtype: bool
+        """
+        if super(S3CloudInterface, self)._is_throttling_error(exc):
+            return True
+        if not isinstance(exc, ClientError):
+            return False
+        code = exc.response.get("Error", {}).get("Code")
+        status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return code in self.THROTTLING_ERROR_CODES or status in (429, 503)
+
     def _delete_objects_batch(self, paths, **kwargs):
         """
         Deletes multiple objects from the S3 bucket at the specified paths.
@@ -428,13 +495,17 @@ class S3CloudInterface(CloudInterface):
         individually using `delete_object()`.
 
         Logs errors for any objects that fail to be deleted in bulk. Raises
-        :exc:`CloudProviderError` if any bulk deletion errors occur.
+        :exc:`CloudThrottlingError` if the deletion of the objects which failed
+        was throttled by S3, :exc:`CloudProviderError` for any other bulk
+        deletion errors.
 
         :param paths: List of object paths (keys) to delete from the S3 bucket.
         :param dict kwargs: Provider-specific keyword arguments. Supports:
             - check_locks (bool): If ``True``, check for Object Lock before deletion
             - atomic (bool): If ``True``, abort deletion if any objects are locked; if ``False``,
               skip locked objects and continue with unlocked ones
+        :raises CloudThrottlingError: If S3 throttled the deletion of the only
+            objects which failed to be deleted
         :raises CloudProviderError: If bulk deletion fails for any object, if object lock
             checking fails, or if atomic deletion encounters a locked object
         :raises botocore.exceptions.ClientError:
@@ -465,6 +536,15 @@ class S3CloudInterface(CloudInterface):
                 },
             )
             if "Errors" in resp:
+                # S3 throttles the deletion of single objects of the batch with
+                # the same error codes it uses for the whole requests
+                throttled_paths = [
+                    error_dict["Key"]
+                    for error_dict in resp["Errors"]
+                    if error_dict["Code"] in self.THROTTLING_ERROR_CODES
+                ]
+                if len(throttled_paths) == len(resp["Errors"]):
+                    raise CloudThrottlingError(throttled_paths)
                 for error_dict in resp["Errors"]:
                     _logger.error(
                         'Bulk deletion of object %s failed with error code: "%s", '
@@ -29,6 +29,7 @@ from barman.cloud import (
     CloudInterface,
     CloudProviderError,
     CloudSnapshotInterface,
+    CloudThrottlingError,
     DecompressingStreamingIO,
     SnapshotMetadata,
     SnapshotsInfo,
@@ -114,6 +115,12 @@ class AzureCloudInterface(CloudInterface):
 
     MAX_DELETE_BATCH_SIZE = 256
 
+    # The blocks can be staged with the Azure clients, which are thread-safe,
+    # from threads, which is opt-in as it changes the CPU parallelism
+    UPLOAD_ENGINES = ("process", "thread")
+
+    THREAD_SAFE = True
+
     # The size of each chunk in a single object upload when the size of the
     # object exceeds max_single_put_size. We default to 2MB in order to
     # allow the default max_concurrency of 8 to be achieved when uploading
@@ -145,21 +152,33 @@ class AzureCloudInterface(CloudInterface):
         max_block_size=DEFAULT_MAX_BLOCK_SIZE,
         max_concurrency=DEFAULT_MAX_CONCURRENCY,
         max_single_put_size=DEFAULT_MAX_SINGLE_PUT_SIZE,
+        upload_engine=None,
+        read_jobs=1,
+        delete_jobs=1,
     ):
         """
         Create a new Azure Blob Storage interface given the supplied account url
 
         :param str url: Full URL of the cloud destination/source
-        :param int jobs: How many sub-processes to use for asynchronous
-          uploading, defaults to 2.
+        :param int jobs: How many sub-processes or threads to use for
+          asynchronous uploading, defaults to 2.
         :param int|None delete_batch_size: the maximum number of objects to be
           deleted in a single request
+        :param str|None upload_engine: the engine running the upload workers,
+          either "thread" (the default) or "process"
+        :param int read_jobs: the number of concurrent ranged GETs used to read
+          a large object
+        :param int delete_jobs: the number of batches of objects, or prefixes,
+          deleted concurrently
         """
         super(AzureCloudInterface, self).__init__(
             url=url,
             jobs=jobs,
             tags=tags,
             delete_batch_size=delete_batch_size,
+            upload_engine=upload_engine,
+            read_jobs=read_jobs,
+            delete_jobs=delete_jobs,
         )
         self.encryption_scope = encryption_scope
         self.credential = credential
@@ -336,6 +355,15 @@ class AzureCloudInterface(CloudInterface):
           the key does not exist
         """
         try:
+            if self.read_jobs > 1:
+                size = (
+                    self.container_client.get_blob_client(key)
+                    .get_blob_properties()
+                    .size
+                )
+                ranged = self._open_ranged(key, size, decompressor)
+                if ranged is not None:
+                    return ranged
             obj = self.container_client.download_blob(key)
             resp = StreamingBlobIO(obj)
             if decompressor:
@@ -345,6 +373,21 @@ class AzureCloudInterface(CloudInterface):
         except ResourceNotFoundError:
             return None
 
+    def _read_range(self, key, offset, length):
+        """
+        Read a range of a remote Azure Blob Storage object
+
+        The ranges are read with the container client, which is thread-safe.
+
+        :param str key: The key identifying the object
+        :param int offset: The offset of the first byte of the range
+        :param int length: The length of the range
+        :rtype: bytes
+        """
+        return self.container_client.download_blob(
+            key, offset=offset, length=length
+        ).readall()
+
     def upload_fileobj(
         self,
         fileobj,
@@ -447,6 +490,17 @@ class AzureCloudInterface(CloudInterface):
         blob_client.commit_block_list([], **self._extra_upload_args)
         blob_client.delete_blob()
 
+    def _is_throttling_error(self, exc):
+        """
+        Whether an exception means Azure Blob Storage throttled the request
+
+        :param Exception exc: the exception raised by the request
+        :rtype: bool
+        """
+        if super(AzureCloudInterface, self)._is_throttling_error(exc):
+            return True
+        return isinstance(exc, HttpResponseError) and exc.status_code in (429, 503)
+
     def _delete_objects_batch(self, paths, **kwargs):
         """
         Delete the objects at the specified paths
@@ -455,6 +509,8 @@ class AzureCloudInterface(CloudInterface):
         :param dict kwargs: Provider-specific keyword arguments. Currently unused
             for Azure Blob Storage; this parameter exists only to comply with the
             base class interface.
+        :raises CloudThrottlingError: if Azure throttled the deletion of the only
+            objects which failed to be deleted
         """
         super(AzureCloudInterface, self)._delete_objects_batch(paths)
 
@@ -474,15 +530,20 @@ class AzureCloudInterface(CloudInterface):
             )
             responses = exc.parts
 
-        # resp is an iterator of HttpResponse objects so we check the status codes
-        # which should all be 202 if successful
+        # resp is an iterator of HttpResponse objects, in the same order as the
+        # paths, so we check the status codes which should all be 202 if
+        # successful
         errors = False
-        for resp in responses:
+        throttled_paths = []
+        for path, resp in zip(paths, responses):
             if resp.status_code == 404:
                 _logger.warning(
                     "Deletion of object %s failed because it could not be found"
                     % resp.request.url
                 )
+            elif resp.status_code in (429, 503):
+                # The sub-requests of a batch are throttled one by one
+                throttled_paths.append(path)
             elif resp.status_code != 202:
                 errors = True
                 _logger.error(
@@ -491,7 +552,11 @@ class AzureCloudInterface(CloudInterface):
                 )
 
         if errors:
+            for path in throttled_paths:
+                _logger.error("Deletion of object %s was throttled" % path)
             raise CloudProviderError()
+        if throttled_paths:
+            raise CloudThrottlingError(throttled_paths)
 
     def get_prefixes(self, prefix):
         """
@@ -19,6 +19,7 @@
 import logging
 import os
 import posixpath
+import threading
 
 from barman.clients.cloud_compression import decompress_to_file
 from barman.cloud import (
@@ -26,6 +27,7 @@ from barman.cloud import (
     CloudInterface,
     CloudProviderError,
     CloudSnapshotInterface,
+    CloudThrottlingError,
     DecompressingStreamingIO,
     SnapshotMetadata,
     SnapshotsInfo,
@@ -44,7 +46,13 @@ except ImportError:
     from urlparse import urlparse
 
 try:
-    from google.api_core.exceptions import Conflict, GoogleAPIError, NotFound
+    from google.api_core.exceptions import (
+        Conflict,
+        GoogleAPIError,
+        NotFound,
+        ServiceUnavailable,
+        TooManyRequests,
+    )
     from google.cloud import storage
 except ImportError:
     raise SystemExit("Missing required python module: google-cloud-storage")
@@ -76,8 +84,20 @@ class GoogleCloudInterface(CloudInterface):
 
     MAX_DELETE_BATCH_SIZE = 100
 
+    # The storage client can be shared by threads, like the transfer manager of
+    # google-cloud-storage does, but its batches cannot, see _delete_objects_batch
+    THREAD_SAFE = True
+
     def __init__(
-        self, url, jobs=1, tags=None, delete_batch_size=None, kms_key_name=None
+        self,
+        url,
+        jobs=1,
+        tags=None,
+        delete_batch_size=None,
+        kms_key_name=None,
+        upload_engine=None,
+        read_jobs=1,
+        delete_jobs=1,
     ):
         """
         Create a new Google cloud Storage interface given the supplied account url
@@ -91,6 +111,12 @@ class GoogleCloudInterface(CloudInterface):
           deleted in a single request
         :param str|None kms_key_name: the name of the KMS key which should be used for
           encrypting the uploaded data in GCS
+        :param str|None upload_engine: the engine running the upload workers, only
+          "process" is supported
+        :param int read_jobs: the number of concurrent ranged GETs used to read
+          a large object
+        :param int delete_jobs: the number of batches of objects, or prefixes,
+          deleted concurrently
         """
         self.bucket_name, self.path = self._parse_url(url)
         super(GoogleCloudInterface, self).__init__(
@@ -98,9 +124,14 @@ class GoogleCloudInterface(CloudInterface):
             jobs=jobs,
             tags=tags,
             delete_batch_size=delete_batch_size,
+            upload_engine=upload_engine,
+            read_jobs=read_jobs,
+            delete_jobs=delete_jobs,
         )
         self.kms_key_name = kms_key_name
         self.bucket_exists = None
+        # The batch of requests being sent is a state of the storage client
+        self._batch_lock = threading.Lock()
         self._reinit_session()
 
     @staticmethod
@@ -222,6 +253,14 @@ class GoogleCloudInterface(CloudInterface):
           the stream can be read or None if the key does not exist
         """
         _logger.debug("GCS.remote_open")
+        if self.read_jobs > 1:
+            blob = self.container_client.get_blob(key)
+            if blob is None:
+                _logger.debug("Key: {} does not exist".format(key))
+                return None
+            ranged = self._open_ranged(key, blob.size, decompressor)
+            if ranged is not None:
+                return ranged
         blob = storage.Blob(key, self.container_client)
         if not blob.exists():
             _logger.debug("Key: {} does not exist".format(key))
@@ -231,6 +270,21 @@ class GoogleCloudInterface(CloudInterface):
             return DecompressingStreamingIO(blob_reader, decompressor)
         return blob_reader
 
+    def _read_range(self, key, offset, length):
+        """
+        Read a range of a remote object in cloud storage
+
+        The ranges are read with the storage client, which is shared by the
+        threads like the transfer manager of google-cloud-storage does.
+
+        :param str key: The key identifying the object
+        :param int offset: The offset of the first byte of the range
+        :param int length: The length of the range
+        :rtype: bytes
+        """
+        blob = storage.Blob(key, self.container_client)
+        return blob.download_as_bytes(start=offset, end=offset + length - 1)
+
     def upload_fileobj(self, fileobj, key, override_tags=None):
         """
         Synchronously upload the content of a file-like object to a cloud key
@@ -329,6 +383,17 @@ class GoogleCloudInterface(CloudInterface):
             _logger.error(e)
             raise e
 
+    def _is_throttling_error(self, exc):
+        """
+        Whether an exception means Google Cloud Storage throttled the request
+
+        :param Exception exc: the exception raised by the request
+        :rtype: bool
+        """
+        if super(GoogleCloudInterface, self)._is_throttling_error(exc):
+            return True
+        return isinstance(exc, (TooManyRequests, ServiceUnavailable))
+
     def _delete_objects_batch(self, paths, **kwargs):
         """
         Delete the objects at the specified paths.
@@ -337,19 +402,29 @@ class GoogleCloudInterface(CloudInterface):
         :param dict kwargs: Provider-specific keyword arguments. Currently unused
             for Google Cloud Storage; this parameter exists only to comply with the
             base class interface.
+        :raises CloudThrottlingError: if Google Cloud Storage throttled the
+            deletion of the only objects which failed to be deleted
         """
         super(GoogleCloudInterface, self)._delete_objects_batch(paths)
 
         failures = {}
+        throttled_paths = []
 
-        with self.client.batch():
+        # The requests of the threads deleting other batches would be added to
+        # the current batch of the shared storage client, so only one batch is
+        # sent at a time
+        with self._batch_lock, self.client.batch():
             for path in list(set(paths)):
                 try:
                     blob = self.container_client.blob(path)
                     blob.delete()
                 except GoogleAPIError as e:
+                    if self._is_throttling_error(e):
+                        throttled_paths.append(path)
                     failures[path] = [str(e.__class__), e.__str__()]
 
+        if failures and len(throttled_paths) == len(failures):
+            raise CloudThrottlingError(throttled_paths)
         if failures:
             _logger.error(failures)
             raise CloudProviderError()
@@ -32,7 +32,6 @@ import signal
 import subprocess
 import sys
 import time
-from distutils.version import LooseVersion as Version
 
 import barman.utils
 from barman.exceptions import (
@@ -768,6 +767,8 @@ class PostgreSQLClient(Command):
         :param str app_name: the application name to use for the connection
         :param str path: additional path for executable retrieval
         """
+        from distutils.version import LooseVersion as Version
+
         Command.__init__(self, command, path=path, **kwargs)
         if not connection:
             self.enable_signal_forwarding(signal.SIGINT)
@@ -867,6 +868,8 @@ class PostgreSQLClient(Command):
 
         :param str path: the PATH env
         """
+        from distutils.version import LooseVersion as Version
+
         if cls.COMMAND_ALTERNATIVES is None:
             raise NotImplementedError(
                 "get_version_info cannot be invoked on %s" % cls.__name__
@@ -952,6 +955,8 @@ class PgBaseBackup(PostgreSQLClient):
           be used to perform an incremental backup
         :param List[str] args: additional arguments
         """
+        from distutils.version import LooseVersion as Version
+
         PostgreSQLClient.__init__(
             self,
             connection=connection,
@@ -1011,6 +1016,8 @@ class PgBaseBackup(PostgreSQLClient):
         :param barman.compression.PgBaseBackupCompression compression:
           the pg_basebackup compression options used for this backup
         """
+        from distutils.version import LooseVersion as Version
+
         compression_args = []
 
         if compression is not None:
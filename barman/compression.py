@@ -28,7 +28,6 @@ import lzma
 import shutil
 from abc import ABCMeta, abstractmethod, abstractproperty
 from contextlib import closing
-from distutils.version import LooseVersion as Version
 from io import BytesIO
 from types import SimpleNamespace
 
@@ -817,6 +816,8 @@ class PgBaseBackupCompressionOption(object):
         :param dict remote_status: the status of the pg_basebackup command
         :return List: List of Issues (str) or empty list
         """
+        from distutils.version import LooseVersion as Version
+
         issues = []
         if self.config.location is not None and self.config.location == "server":
             # "backup_location = server" requires pg_basebackup >= 15
@@ -851,6 +852,8 @@ class GZipPgBaseBackupCompressionOption(PgBaseBackupCompressionOption):
         :param dict remote_status: the status of the pg_basebackup command
         :return List: List of Issues (str) or empty list
         """
+        from distutils.version import LooseVersion as Version
+
         issues = super(GZipPgBaseBackupCompressionOption, self).validate(
             pg_server_version, remote_status
         )
@@ -898,6 +901,8 @@ class LZ4PgBaseBackupCompressionOption(PgBaseBackupCompressionOption):
         :param dict remote_status: the status of the pg_basebackup command
         :return List: List of Issues (str) or empty list
         """
+        from distutils.version import LooseVersion as Version
+
         issues = super(LZ4PgBaseBackupCompressionOption, self).validate(
             pg_server_version, remote_status
         )
@@ -934,6 +939,8 @@ class ZSTDPgBaseBackupCompressionOption(PgBaseBackupCompressionOption):
         :param dict remote_status: the status of the pg_basebackup command
         :return List: List of Issues (str) or empty list
         """
+        from distutils.version import LooseVersion as Version
+
         issues = super(ZSTDPgBaseBackupCompressionOption, self).validate(
             pg_server_version, remote_status
         )
@@ -36,6 +36,7 @@ from copy import deepcopy
 from glob import iglob
 from typing import List
 
+import barman
 from barman import output, utils
 from barman.compression import compression_registry
 
@@ -1905,6 +1906,88 @@ class Config(object):
                 )
 
 
+def pretty_args(args):
+    """
+    Prettify the given argparse namespace to be human readable
+
+    :type args: argparse.Namespace
+    :return: the human readable content of the namespace
+    """
+    values = dict(vars(args))
+    # Retrieve the command name with recent argh versions
+    if "_functions_stack" in values:
+        values["command"] = values["_functions_stack"][0].__name__
+        del values["_functions_stack"]
+    # Older argh versions only have the matching function in the namespace
+    elif "function" in values:
+        values["command"] = values["function"].__name__
+        del values["function"]
+    return "%r" % values
+
+
+def global_config(args):
+    """
+    Set the configuration file
+    """
+    if hasattr(args, "config"):
+        filename = args.config
+    else:
+        try:
+            filename = os.environ["BARMAN_CONFIG_FILE"]
+        except KeyError:
+            filename = None
+    config = Config(filename)
+    barman.__config__ = config
+
+    # change user if needed
+    try:
+        utils.drop_privileges(config.user)
+    except OSError:
+        msg = "ERROR: please run barman as %r user" % config.user
+        raise SystemExit(msg)
+    except KeyError:
+        msg = "ERROR: the configured user %r does not exists" % config.user
+        raise SystemExit(msg)
+
+    # configure logging
+    if hasattr(args, "log_level"):
+        config.log_level = args.log_level
+    log_level = utils.parse_log_level(config.log_level)
+    utils.configure_logging(
+        config.log_file, log_level or DEFAULT_LOG_LEVEL, config.log_format
+    )
+    if log_level is None:
+        _logger.warning("unknown log_level in config file: %s", config.log_level)
+
+    # Configure output
+    if args.format != output.DEFAULT_WRITER or args.quiet or args.debug:
+        output.set_output_writer(args.format, quiet=args.quiet, debug=args.debug)
+
+    # Configure color output
+    if args.color == "auto":
+        # Enable colored output if both stdout and stderr are TTYs
+        output.ansi_colors_enabled = sys.stdout.isatty() and sys.stderr.isatty()
+    else:
+        output.ansi_colors_enabled = args.color == "always"
+
+    # Load additional configuration files
+    config.load_configuration_files_directory()
+    # Handle the autoconf file, load it only if exists
+    autoconf_path = "%s/.barman.auto.conf" % config.get("barman", "barman_home")
+    if os.path.exists(autoconf_path):
+        config.load_config_file(autoconf_path)
+    # We must validate the configuration here in order to have
+    # both output and logging configured
+    config.validate_global_config()
+
+    _logger.debug(
+        "Initialised Barman version %s (config: %s, args: %s)",
+        barman.__version__,
+        config.config_file,
+        pretty_args(args),
+    )
+
+
 class BaseChange:
     """
     Base class for change objects.
@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+# © Copyright EnterpriseDB UK Limited 2011-2025
+#
+# This file is part of Barman.
+#
+# Barman is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Barman is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module implements the retrieval of WAL files from the archive of a
+server, as performed by the ``get-wal`` command.
+
+Only the configuration, compression, encryption and xlog modules are
+required here, so ``get-wal`` requests can be served without loading the
+rest of Barman (see :mod:`barman.launcher`).
+"""
+
+import errno
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import closing
+from tempfile import NamedTemporaryFile
+
+from barman import fs, output, xlog
+from barman.compression import CompressionManager, CustomCompressor
+from barman.encryption import EncryptionManager, get_passphrase_from_command
+from barman.exceptions import CommandFailedException
+from barman.infofile import WalFileInfo
+from barman.utils import is_power_of_two, zero_copy_file
+
+PARTIAL_EXTENSION = ".partial"
+
+_logger = logging.getLogger(__name__)
+
+
+def _list_directory_names(path):
+    """
+    Return the names of the entries of a directory with a single scan.
+
+    :param str|None path: the directory to read
+    :rtype: set[str]
+    :return: the entry names, or an empty set if the directory does not exist
+    """
+    if path is None:
+        return set()
+    try:
+        with os.scandir(path) as entries:
+            return set(entry.name for entry in entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+class GetWalMixin(object):
+    """
+    Retrieval of WAL files from the archive of a server.
+
+    The class using this mixin must provide a ``config`` attribute holding
+    the :class:`barman.config.ServerConfig` of the server, and a
+    ``backup_manager`` attribute exposing the ``compression_manager`` and
+    ``encryption_manager`` of the server and a ``get_wal_file_info`` method.
+    """
+
+    def get_wal_possible_paths(self, wal_name, partial=False):
+        """
+        Build a list of possible positions of a WAL file
+
+        :param str wal_name: WAL file name
+        :param bool partial: add also the '.partial' paths
+        """
+        paths = list()
+
+        # Path in the archive
+        hash_dir = os.path.join(self.config.wals_directory, xlog.hash_dir(wal_name))
+        full_path = os.path.join(hash_dir, wal_name)
+        paths.append(full_path)
+
+        # Path in incoming directory
+        incoming_path = os.path.join(self.config.incoming_wals_directory, wal_name)
+        paths.append(incoming_path)
+
+        # Path in streaming directory
+        streaming_path = os.path.join(self.config.streaming_wals_directory, wal_name)
+        paths.append(streaming_path)
+
+        # If partial files are required check also the '.partial' path
+        if partial:
+            paths.append(streaming_path + PARTIAL_EXTENSION)
+            # Add the streaming_path again to handle races with pg_receivewal
+            # completing the WAL file
+            paths.append(streaming_path)
+            # The following two path are only useful to retrieve the last
+            # incomplete segment archived before a promotion.
+            paths.append(full_path + PARTIAL_EXTENSION)
+            paths.append(incoming_path + PARTIAL_EXTENSION)
+
+        # Append the archive path again, to handle races with the archiver
+        paths.append(full_path)
+
+        return paths
+
+    def get_wal(
+        self,
+        wal_name,
+        compression=None,
+        keep_compression=False,
+        output_directory=None,
+        peek=None,
+        partial=False,
+    ):
+        """
+        Retrieve a WAL file from the archive
+
+        :param str wal_name: id of the WAL file to find into the WAL archive
+        :param str|None compression: compression format for the output
+        :param bool keep_compression: if True, do not decompress compressed WAL files
+        :param str|None output_directory: directory where to deposit the
+            WAL file
+        :param int|None peek: if defined list the next N WAL file
+        :param bool partial: retrieve also partial WAL files
+        """
+
+        # If used through SSH identify the client to add it to logs
+        source_suffix = ""
+        ssh_connection = os.environ.get("SSH_CONNECTION")
+        if ssh_connection:
+            # The client IP is the first value contained in `SSH_CONNECTION`
+            # which contains four space-separated values: client IP address,
+            # client port number, server IP address, and server port number.
+            source_suffix = " (SSH host: %s)" % (ssh_connection.split()[0],)
+
+        # Sanity check
+        if not xlog.is_any_xlog_file(wal_name):
+            output.error(
+                "'%s' is not a valid wal file name%s",
+                wal_name,
+                source_suffix,
+                exit_code=3,
+            )
+            return
+
+        # If peek is requested we only output a list of files
+        if peek:
+            # Get the next ``peek`` files following the provided ``wal_name``.
+            # If ``wal_name`` is not a simple wal file,
+            # we cannot guess the names of the following WAL files.
+            # So ``wal_name`` is the only possible result, if exists.
+            if xlog.is_wal_file(wal_name):
+                # We can't know what was the segment size of PostgreSQL WAL
+                # files at backup time. Because of this, we generate all
+                # the possible names for a WAL segment, and then we check
+                # if the requested one is included.
+                wal_peek_list = xlog.generate_segment_names(wal_name)
+            else:
+                wal_peek_list = iter([wal_name])
+
+            # Read each directory where the WAL files may be found only once,
+            # instead of probing every possible path of every peeked file.
+            # The incoming and streaming directories are read before the
+            # archive, so a file moved by the archiver in the meantime is
+            # still found in one of the two places. We do not prefetch
+            # partial files, so their paths are not considered.
+            wal_peek_pending = _list_directory_names(
+                self.config.incoming_wals_directory
+            ) | _list_directory_names(self.config.streaming_wals_directory)
+            wal_peek_archived = {}
+
+            # Output the content of wal_peek_list until we have displayed
+            # enough files or find a missing file
+            count = 0
+            while count < peek:
+                try:
+                    wal_peek_name = next(wal_peek_list)
+                except StopIteration:
+                    # No more item in wal_peek_list
+                    break
+
+                hash_dir = xlog.hash_dir(wal_peek_name)
+                if hash_dir not in wal_peek_archived:
+                    wal_peek_archived[hash_dir] = _list_directory_names(
+                        os.path.join(self.config.wals_directory, hash_dir)
+                    )
+
+                # If the next WAL file is found, output the name
+                # and continue to the next one
+                if (
+                    wal_peek_name in wal_peek_archived[hash_dir]
+                    or wal_peek_name in wal_peek_pending
+                ):
+                    count += 1
+                    output.info(wal_peek_name, log=False)
+                    continue
+
+                # If ``wal_peek_file`` doesn't exist, check if we need to
+                # look in the following segment
+                tli, log, seg = xlog.decode_segment_name(wal_peek_name)
+
+                # If `seg` is not a power of two, it is not possible that we
+                # are at the end of a WAL group, so we are done
+                if not is_power_of_two(seg):
+                    break
+
+                # This is a possible WAL group boundary, let's try the
+                # following group
+                seg = 0
+                log += 1
+
+                # Install a new generator from the start of the next segment.
+                # If the file doesn't exists we will terminate because
+                # zero is not a power of two
+                wal_peek_name = xlog.encode_segment_name(tli, log, seg)
+                wal_peek_list = xlog.generate_segment_names(wal_peek_name)
+
+            # Do not output anything else
+            return
+
+        # If an output directory was provided write the file inside it
+        # otherwise we use standard output
+        if output_directory is not None:
+            destination_path = os.path.join(output_directory, wal_name)
+            destination_description = "into '%s' file" % destination_path
+            # Use the standard output for messages
+            logger = output
+            try:
+                destination = open(destination_path, "wb")
+            except IOError as e:
+                output.error(
+                    "Unable to open '%s' file%s: %s",
+                    destination_path,
+                    source_suffix,
+                    e,
+                    exit_code=3,
+                )
+                return
+        else:
+            destination_description = "to standard output"
+            # Do not use the standard output for messages, otherwise we would
+            # taint the output stream
+            logger = _logger
+            try:
+                # Python 3.x
+                destination = sys.stdout.buffer
+            except AttributeError:
+                # Python 2.x
+                destination = sys.stdout
+
+        # Get the list of WAL file possible paths
+        wal_paths = self.get_wal_possible_paths(wal_name, partial)
+
+        for wal_file in wal_paths:
+            # Check for file existence
+            if not os.path.exists(wal_file):
+                continue
+
+            logger.info(
+                "Sending WAL '%s' for server '%s' %s%s",
+                os.path.basename(wal_file),
+                self.config.name,
+                destination_description,
+                source_suffix,
+            )
+
+            try:
+                # Try returning the wal_file to the client
+                self.get_wal_sendfile(
+                    wal_file, compression, keep_compression, destination
+                )
+                # We are done, return to the caller
+                return
+            except CommandFailedException:
+                # If an external command fails we cannot really know why,
+                # but if the WAL file disappeared, we assume
+                # it has been moved in the archive so we ignore the error.
+                # This file will be retrieved later, as the last entry
+                # returned by get_wal_possible_paths() is the archive position
+                if not os.path.exists(wal_file):
+                    pass
+                else:
+                    raise
+            except OSError as exc:
+                # If the WAL file disappeared just ignore the error
+                # This file will be retrieved later, as the last entry
+                # returned by get_wal_possible_paths() is the archive
+                # position
+                if exc.errno == errno.ENOENT and exc.filename == wal_file:
+                    pass
+                else:
+                    raise
+
+            logger.info("Skipping vanished WAL file '%s'%s", wal_file, source_suffix)
+
+        output.error(
+            "WAL file '%s' not found in server '%s'%s",
+            wal_name,
+            self.config.name,
+            source_suffix,
+        )
+
+    def get_wal_sendfile(self, wal_file, compression, keep_compression, destination):
+        """
+        Send a WAL file to the destination file, using the required compression
+
+        :param str wal_file: WAL file path
+        :param str compression: required compression
+        :param bool keep_compression: if True, do not decompress compressed WAL files
+        :param destination: file stream to use to write the data
+        """
+        backup_manager = self.backup_manager
+        # Identify the wal file
+        wal_info = backup_manager.get_wal_file_info(wal_file)
+
+        # Initially our source is the stored WAL file and we do not have
+        # any temporary file.
+        source_file = wal_file
+        uncompressed_file = None
+        compressed_file = None
+        tempdir = None
+
+        # Check if it is not a partial file. In this case, the WAL file is still being
+        # written by pg_receivewal, and surely has not yet been compressed nor encrypted
+        # by the Barman archiver.
+        if not xlog.is_partial_file(wal_info.fullpath(self)):
+            wal_file_compression = None
+            # Before any decompression operation, check for encryption.
+            if wal_info.encryption:
+                # We need to check if `encryption_passphrase_command` is set.
+                if not self.config.encryption_passphrase_command:
+                    output.error(
+                        "Encrypted WAL file '%s' detected, but no "
+                        "'encryption_passphrase_command' is configured. "
+                        "Please set 'encryption_passphrase_command' in the configuration "
+                        "so the correct private key can be identified for decryption.",
+                        wal_info.name,
+                    )
+                    output.close_and_exit()
+
+                passphrase = get_passphrase_from_command(
+                    self.config.encryption_passphrase_command
+                )
+
+                encryption_handler = backup_manager.encryption_manager.get_encryption(
+                    encryption=wal_info.encryption
+                )
+
+                tempdir = tempfile.mkdtemp(
+                    dir=self.config.wals_directory,
+                    prefix=".%s." % os.path.basename(wal_file),
+                )
+                # Decrypt wal to a tmp directory.
+                decrypted_file = encryption_handler.decrypt(
+                    file=source_file, dest=tempdir, passphrase=passphrase
+                )
+                # Now, check compression info.
+                wal_file_compression = (
+                    backup_manager.compression_manager.identify_compression(
+                        decrypted_file
+                    )
+                )
+
+                source_file = decrypted_file
+
+            wal_info_compression = wal_info.compression or wal_file_compression
+            # Get a decompressor for the file (None if not compressed)
+            wal_compressor = backup_manager.compression_manager.get_compressor(
+                wal_info_compression
+            )
+
+            # Get a compressor for the output (None if not compressed)
+            out_compressor = backup_manager.compression_manager.get_compressor(
+                compression
+            )
+
+            # Ignore compression/decompression when:
+            # * It's a partial WAL file; and
+            # * The user wants to decompress on the client side.
+            if not keep_compression:
+                # If the required compression is different from the source we
+                # decompress/compress it into the required format (getattr is
+                # used here to gracefully handle None objects)
+                if getattr(wal_compressor, "compression", None) != getattr(
+                    out_compressor, "compression", None
+                ):
+                    # If source is compressed, decompress it into a temporary file
+                    if wal_compressor is not None:
+                        uncompressed_file = NamedTemporaryFile(
+                            dir=self.config.wals_directory,
+                            prefix=".%s." % os.path.basename(wal_file),
+                            suffix=".uncompressed",
+                        )
+                        # If a custom decompression filter is set, we prioritize using it
+                        # instead of the compression guessed by Barman based on the magic
+                        # number.
+                        is_decompressed = False
+                        if (
+                            self.config.custom_decompression_filter is not None
+                            and not isinstance(wal_compressor, CustomCompressor)
+                        ):
+                            try:
+                                backup_manager.compression_manager.get_compressor(
+                                    "custom"
+                                ).decompress(source_file, uncompressed_file.name)
+                            except CommandFailedException as exc:
+                                output.debug("Error decompressing WAL: %s", str(exc))
+                            else:
+                                is_decompressed = True
+                        # But if a custom decompression filter is not set, or if using the
+                        # custom decompression filter was not successful, then try using
+                        # the decompressor identified by the magic number
+                        if not is_decompressed:
+                            try:
+                                wal_compressor.decompress(
+                                    source_file, uncompressed_file.name
+                                )
+                            except CommandFailedException as exc:
+                                output.error("Error decompressing WAL: %s", str(exc))
+                                return
+
+                        source_file = uncompressed_file.name
+
+                    # If output compression is required compress the source
+                    # into a temporary file
+                    if out_compressor is not None:
+                        compressed_file = NamedTemporaryFile(
+                            dir=self.config.wals_directory,
+                            prefix=".%s." % os.path.basename(wal_file),
+                            suffix=".compressed",
+                        )
+                        out_compressor.compress(source_file, compressed_file.name)
+                        source_file = compressed_file.name
+
+        # Copy the prepared source file to destination, in kernel space
+        # when the destination allows it
+        with open(source_file, "rb") as input_file:
+            if not zero_copy_file(input_file, destination):
+                shutil.copyfileobj(input_file, destination)
+
+        # Remove file
+        if tempdir is not None:
+            fs.LocalLibPathDeletionCommand(tempdir).delete()
+        # Remove temp files
+        if uncompressed_file is not None:
+            uncompressed_file.close()
+        if compressed_file is not None:
+            compressed_file.close()
+
+
+class WalFileManager(object):
+    """
+    Read-only subset of :class:`barman.backup.BackupManager` needed to
+    identify the WAL files stored in the archive of a server.
+    """
+
+    def __init__(self, config, path=None):
+        """
+        Constructor
+
+        :param barman.config.ServerConfig config: the server configuration
+        :param str|None path: the PATH used to run external commands
+        """
+        self.config = config
+        self.compression_manager = CompressionManager(config, path)
+        self.encryption_manager = EncryptionManager(config, path)
+
+    def get_wal_file_info(self, filename):
+        """
+        Populate a WalFileInfo object taking into account the server
+        configuration.
+
+        :param str filename: the path of the file to identify
+        :rtype: barman.infofile.WalFileInfo
+        """
+        return WalFileInfo.from_file(
+            filename,
+            compression_manager=self.compression_manager,
+            unidentified_compression=self.compression_manager.unidentified_compression,
+            encryption_manager=self.encryption_manager,
+        )
+
+
+class GetWalServer(GetWalMixin):
+    """
+    Minimal read-only view of a server, able to serve ``get-wal`` requests.
+
+    Unlike :class:`barman.server.Server`, it does not set up the PostgreSQL
+    connections, the archivers and the retention policies of the server,
+    which are never used to read WAL files from the archive.
+    """
+
+    def __init__(self, config):
+        """
+        Constructor
+
+        :param barman.config.ServerConfig config: the server configuration
+        """
+        self.config = config
+        self.path = None
+        if config.path_prefix:
+            self.path = "%s%s%s" % (
+                config.path_prefix,
+                os.pathsep,
+                os.environ.get("PATH"),
+            )
+        self._backup_manager = None
+
+    @property
+    def backup_manager(self):
+        """
+        The :class:`WalFileManager` of the server, built on first access.
+        """
+        if self._backup_manager is None:
+            self._backup_manager = WalFileManager(self.config, self.path)
+        return self._backup_manager
+
+    def close(self):
+        """
+        Nothing to release, as no connection is ever opened.
+        """
+
+
+def get_wal_command(server, args):
+    """
+    Run the ``get-wal`` command for the given server.
+
+    :param GetWalMixin server: the server to retrieve the WAL file from
+    :param argparse.Namespace args: the ``get-wal`` command line arguments
+    """
+    if getattr(args, "test", None):
+        output.info(
+            "Ready to retrieve WAL files from the server %s", server.config.name
+        )
+        return
+
+    # Retrieve optional arguments. If an argument is not specified,
+    # the namespace doesn't contain it due to SUPPRESS default.
+    # In that case we pick 'None' using getattr third argument.
+    compression = getattr(args, "compression", None)
+    keep_compression = getattr(args, "keep_compression", False)
+    output_directory = getattr(args, "output_directory", None)
+    peek = getattr(args, "peek", None)
+
+    if compression and keep_compression:
+        output.error(
+            "argument `%s` not allowed with argument `keep-compression`" % compression
+        )
+        output.close_and_exit()
+
+    with closing(server):
+        server.get_wal(
+            args.wal_name,
+            compression=compression,
+            keep_compression=keep_compression,
+            output_directory=output_directory,
+            peek=peek,
+            partial=args.partial,
+        )
+    output.close_and_exit()
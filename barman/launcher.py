@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# © Copyright EnterpriseDB UK Limited 2011-2025
+#
+# This file is part of Barman.
+#
+# Barman is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Barman is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Entry point of the ``barman`` command.
+
+``barman get-wal`` is executed by ``barman-wal-restore`` for every WAL file
+requested by PostgreSQL during a recovery, so its startup time adds up to
+the replay latency. This module serves ``get-wal`` requests loading only the
+modules needed to read the WAL archive, and hands any other command line
+over to :mod:`barman.cli`.
+"""
+
+import os
+import sys
+from argparse import SUPPRESS, ArgumentParser
+
+import barman
+from barman import output
+from barman.config import global_config
+from barman.get_wal import GetWalServer, get_wal_command
+from barman.utils import check_positive, get_log_levels
+
+
+class _UnsupportedArguments(Exception):
+    """
+    The command line cannot be handled without the full Barman CLI.
+    """
+
+
+class _GetWalArgumentParser(ArgumentParser):
+    """
+    Argument parser which never exits, so that any command line it does
+    not understand can be handed over to the full Barman CLI, which takes
+    care of the usage and help messages.
+    """
+
+    def error(self, message):
+        raise _UnsupportedArguments(message)
+
+
+def build_get_wal_parser():
+    """
+    Build a parser accepting the global options and the ``get-wal`` command,
+    with the same meaning they have in :mod:`barman.cli`.
+
+    :rtype: ArgumentParser
+    """
+    parser = _GetWalArgumentParser(add_help=False)
+    parser.add_argument("-c", "--config", default=SUPPRESS)
+    parser.add_argument(
+        "--color",
+        "--colour",
+        choices=["never", "always", "auto"],
+        default="auto",
+    )
+    parser.add_argument("--log-level", choices=list(get_log_levels()), default=SUPPRESS)
+    parser.add_argument("-q", "--quiet", action="store_true")
+    parser.add_argument("-d", "--debug", action="store_true")
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=output.AVAILABLE_WRITERS.keys(),
+        default=output.DEFAULT_WRITER,
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    get_wal_parser = subparsers.add_parser("get-wal", add_help=False)
+    get_wal_parser.add_argument("server_name")
+    get_wal_parser.add_argument("wal_name")
+    get_wal_parser.add_argument("--output-directory", "-o", default=SUPPRESS)
+    get_wal_parser.add_argument(
+        "--partial", "-P", action="store_true", dest="partial", default=False
+    )
+    get_wal_parser.add_argument(
+        "--gzip",
+        "-z",
+        "-x",
+        action="store_const",
+        const="gzip",
+        dest="compression",
+        default=SUPPRESS,
+    )
+    get_wal_parser.add_argument(
+        "--bzip2",
+        "-j",
+        action="store_const",
+        const="bzip2",
+        dest="compression",
+        default=SUPPRESS,
+    )
+    get_wal_parser.add_argument(
+        "--keep-compression", action="store_true", dest="keep_compression"
+    )
+    get_wal_parser.add_argument("--peek", "-p", type=check_positive, default=SUPPRESS)
+    get_wal_parser.add_argument("--test", "-t", action="store_true", default=SUPPRESS)
+    return parser
+
+
+def parse_get_wal_arguments(argv):
+    """
+    Parse a ``get-wal`` command line.
+
+    :param list[str] argv: the command line arguments, without the program name
+    :rtype: argparse.Namespace|None
+    :return: the parsed arguments, or None if the command line is not a
+        ``get-wal`` request that can be served by :func:`get_wal`
+    """
+    # Shell completion always needs the full parser
+    if "get-wal" not in argv or "_ARGCOMPLETE" in os.environ:
+        return None
+    try:
+        return build_get_wal_parser().parse_args(argv)
+    except _UnsupportedArguments:
+        return None
+
+
+def get_server(args):
+    """
+    Build the :class:`GetWalServer` for the server requested by ``get-wal``.
+
+    The configuration errors are reported like :func:`barman.cli.get_server`
+    does for the ``get-wal`` command: inactive servers are served, while
+    disabled servers and unknown servers are errors.
+
+    :param argparse.Namespace args: the ``get-wal`` command line arguments
+    :rtype: GetWalServer
+    """
+    name = args.server_name
+    if name == "all":
+        output.error("You cannot use 'all' in a single server context")
+        output.close_and_exit()
+
+    config = barman.__config__
+    # Populating the server list also validates the paths of the servers
+    config.server_names()
+    if config.servers_msg_list:
+        for error in config.servers_msg_list:
+            output.error(error)
+        output.close_and_exit()
+
+    server_config = config.get_server(name)
+    if server_config is None:
+        output.error("Unknown server '%s'" % name)
+        output.close_and_exit()
+    if server_config.disabled:
+        for message in server_config.msg_list:
+            output.error(message)
+        output.close_and_exit()
+    return GetWalServer(server_config)
+
+
+def get_wal(args):
+    """
+    Retrieve WAL_NAME file from SERVER_NAME archive.
+    """
+    get_wal_command(get_server(args), args)
+
+
+def main():
+    """
+    The main method of Barman
+    """
+    args = parse_get_wal_arguments(sys.argv[1:])
+    if args is None:
+        # Only now pay for loading the whole Barman CLI
+        from barman import cli
+
+        cli.main()
+        return
+
+    # noinspection PyBroadException
+    try:
+        global_config(args)
+        get_wal(args)
+    except KeyboardInterrupt:
+        msg = "Process interrupted by user (KeyboardInterrupt)"
+        output.error(msg)
+    except Exception as e:
+        msg = "%s\nSee log file for more details." % e
+        output.exception(msg)
+
+    # cleanup output API and exit honoring output.error_occurred and
+    # output.error_exit_code
+    output.close_and_exit()
@@ -34,17 +34,14 @@ import time
 from collections import namedtuple
 from contextlib import closing, contextmanager
 from glob import glob
-from tempfile import NamedTemporaryFile
 
 import dateutil.tz
 
 import barman
-from barman import fs, output, xlog
+from barman import output, xlog
 from barman.backup import BackupManager
 from barman.command_wrappers import BarmanSubProcess, Command, Rsync
-from barman.compression import CustomCompressor
 from barman.copy_controller import RsyncCopyController
-from barman.encryption import get_passphrase_from_command
 from barman.exceptions import (
     ArchiverFailure,
     BackupException,
@@ -71,6 +68,7 @@ from barman.exceptions import (
     TimeoutError,
     UnknownBackupIdException,
 )
+from barman.get_wal import GetWalMixin
 from barman.infofile import BackupInfo, LocalBackupInfo, WalFileInfo
 from barman.lockfile import (
     ServerBackupIdLock,
@@ -98,7 +96,6 @@ from barman.utils import (
     fsync_dir,
     fsync_file,
     human_readable_timedelta,
-    is_power_of_two,
     mkpath,
     muted,
     parse_target_tli,
@@ -107,7 +104,6 @@ from barman.utils import (
 )
 from barman.wal_archiver import FileWalArchiver, StreamingWalArchiver, WalArchiver
 
-PARTIAL_EXTENSION = ".partial"
 PRIMARY_INFO_FILE = "primary.info"
 SYNC_WALS_INFO_FILE = "sync-wals.info"
 
@@ -239,7 +235,7 @@ class CheckOutputStrategy(CheckStrategy):
         output.result("check", server_name, check, status, hint, perfdata)
 
 
-class Server(RemoteStatusMixin):
+class Server(RemoteStatusMixin, GetWalMixin):
     """
     This class represents the PostgreSQL server to backup.
     """
@@ -2162,44 +2158,6 @@ class Server(RemoteStatusMixin):
         full_path = os.path.join(hash_dir, wal_name)
         return full_path
 
-    def get_wal_possible_paths(self, wal_name, partial=False):
-        """
-        Build a list of possible positions of a WAL file
-
-        :param str wal_name: WAL file name
-        :param bool partial: add also the '.partial' paths
-        """
-        paths = list()
-
-        # Path in the archive
-        hash_dir = os.path.join(self.config.wals_directory, xlog.hash_dir(wal_name))
-        full_path = os.path.join(hash_dir, wal_name)
-        paths.append(full_path)
-
-        # Path in incoming directory
-        incoming_path = os.path.join(self.config.incoming_wals_directory, wal_name)
-        paths.append(incoming_path)
-
-        # Path in streaming directory
-        streaming_path = os.path.join(self.config.streaming_wals_directory, wal_name)
-        paths.append(streaming_path)
-
-        # If partial files are required check also the '.partial' path
-        if partial:
-            paths.append(streaming_path + PARTIAL_EXTENSION)
-            # Add the streaming_path again to handle races with pg_receivewal
-            # completing the WAL file
-            paths.append(streaming_path)
-            # The following two path are only useful to retrieve the last
-            # incomplete segment archived before a promotion.
-            paths.append(full_path + PARTIAL_EXTENSION)
-            paths.append(incoming_path + PARTIAL_EXTENSION)
-
-        # Append the archive path again, to handle races with the archiver
-        paths.append(full_path)
-
-        return paths
-
     def get_wal_info(self, backup_info):
         """
         Returns information about WALs for the given backup
@@ -2333,334 +2291,6 @@ class Server(RemoteStatusMixin):
             backup_info, dest, wal_dest, tablespaces, remote_command, **kwargs
         )
 
-    def get_wal(
-        self,
-        wal_name,
-        compression=None,
-        keep_compression=False,
-        output_directory=None,
-        peek=None,
-        partial=False,
-    ):
-        """
-        Retrieve a WAL file from the archive
-
-        :param str wal_name: id of the WAL file to find into the WAL archive
-        :param str|None compression: compression format for the output
-        :param bool keep_compression: if True, do not decompress compressed WAL files
-        :param str|None output_directory: directory where to deposit the
-            WAL file
-        :param int|None peek: if defined list the next N WAL file
-        :param bool partial: retrieve also partial WAL files
-        """
-
-        # If used through SSH identify the client to add it to logs
-        source_suffix = ""
-        ssh_connection = os.environ.get("SSH_CONNECTION")
-        if ssh_connection:
-            # The client IP is the first value contained in `SSH_CONNECTION`
-            # which contains four space-separated values: client IP address,
-            # client port number, server IP address, and server port number.
-            source_suffix = " (SSH host: %s)" % (ssh_connection.split()[0],)
-
-        # Sanity check
-        if not xlog.is_any_xlog_file(wal_name):
-            output.error(
-                "'%s' is not a valid wal file name%s",
-                wal_name,
-                source_suffix,
-                exit_code=3,
-            )
-            return
-
-        # If peek is requested we only output a list of files
-        if peek:
-            # Get the next ``peek`` files following the provided ``wal_name``.
-            # If ``wal_name`` is not a simple wal file,
-            # we cannot guess the names of the following WAL files.
-            # So ``wal_name`` is the only possible result, if exists.
-            if xlog.is_wal_file(wal_name):
-                # We can't know what was the segment size of PostgreSQL WAL
-                # files at backup time. Because of this, we generate all
-                # the possible names for a WAL segment, and then we check
-                # if the requested one is included.
-                wal_peek_list = xlog.generate_segment_names(wal_name)
-            else:
-                wal_peek_list = iter([wal_name])
-
-            # Output the content of wal_peek_list until we have displayed
-            # enough files or find a missing file
-            count = 0
-            while count < peek:
-                try:
-                    wal_peek_name = next(wal_peek_list)
-                except StopIteration:
-                    # No more item in wal_peek_list
-                    break
-
-                # Get list of possible location. We do not prefetch
-                # partial files
-                wal_peek_paths = self.get_wal_possible_paths(
-                    wal_peek_name, partial=False
-                )
-
-                # If the next WAL file is found, output the name
-                # and continue to the next one
-                if any(os.path.exists(path) for path in wal_peek_paths):
-                    count += 1
-                    output.info(wal_peek_name, log=False)
-                    continue
-
-                # If ``wal_peek_file`` doesn't exist, check if we need to
-                # look in the following segment
-                tli, log, seg = xlog.decode_segment_name(wal_peek_name)
-
-                # If `seg` is not a power of two, it is not possible that we
-                # are at the end of a WAL group, so we are done
-                if not is_power_of_two(seg):
-                    break
-
-                # This is a possible WAL group boundary, let's try the
-                # following group
-                seg = 0
-                log += 1
-
-                # Install a new generator from the start of the next segment.
-                # If the file doesn't exists we will terminate because
-                # zero is not a power of two
-                wal_peek_name = xlog.encode_segment_name(tli, log, seg)
-                wal_peek_list = xlog.generate_segment_names(wal_peek_name)
-
-            # Do not output anything else
-            return
-
-        # If an output directory was provided write the file inside it
-        # otherwise we use standard output
-        if output_directory is not None:
-            destination_path = os.path.join(output_directory, wal_name)
-            destination_description = "into '%s' file" % destination_path
-            # Use the standard output for messages
-            logger = output
-            try:
-                destination = open(destination_path, "wb")
-            except IOError as e:
-                output.error(
-                    "Unable to open '%s' file%s: %s",
-                    destination_path,
-                    source_suffix,
-                    e,
-                    exit_code=3,
-                )
-                return
-        else:
-            destination_description = "to standard output"
-            # Do not use the standard output for messages, otherwise we would
-            # taint the output stream
-            logger = _logger
-            try:
-                # Python 3.x
-                destination = sys.stdout.buffer
-            except AttributeError:
-                # Python 2.x
-                destination = sys.stdout
-
-        # Get the list of WAL file possible paths
-        wal_paths = self.get_wal_possible_paths(wal_name, partial)
-
-        for wal_file in wal_paths:
-            # Check for file existence
-            if not os.path.exists(wal_file):
-                continue
-
-            logger.info(
-                "Sending WAL '%s' for server '%s' %s%s",
-                os.path.basename(wal_file),
-                self.config.name,
-                destination_description,
-                source_suffix,
-            )
-
-            try:
-                # Try returning the wal_file to the client
-                self.get_wal_sendfile(
-                    wal_file, compression, keep_compression, destination
-                )
-                # We are done, return to the caller
-                return
-            except CommandFailedException:
-                # If an external command fails we cannot really know why,
-                # but if the WAL file disappeared, we assume
-                # it has been moved in the archive so we ignore the error.
-                # This file will be retrieved later, as the last entry
-                # returned by get_wal_possible_paths() is the archive position
-                if not os.path.exists(wal_file):
-                    pass
-                else:
-                    raise
-            except OSError as exc:
-                # If the WAL file disappeared just ignore the error
-                # This file will be retrieved later, as the last entry
-                # returned by get_wal_possible_paths() is the archive
-                # position
-                if exc.errno == errno.ENOENT and exc.filename == wal_file:
-                    pass
-                else:
-                    raise
-
-            logger.info("Skipping vanished WAL file '%s'%s", wal_file, source_suffix)
-
-        output.error(
-            "WAL file '%s' not found in server '%s'%s",
-            wal_name,
-            self.config.name,
-            source_suffix,
-        )
-
-    def get_wal_sendfile(self, wal_file, compression, keep_compression, destination):
-        """
-        Send a WAL file to the destination file, using the required compression
-
-        :param str wal_file: WAL file path
-        :param str compression: required compression
-        :param bool keep_compression: if True, do not decompress compressed WAL files
-        :param destination: file stream to use to write the data
-        """
-        backup_manager = self.backup_manager
-        # Identify the wal file
-        wal_info = backup_manager.get_wal_file_info(wal_file)
-
-        # Initially our source is the stored WAL file and we do not have
-        # any temporary file.
-        source_file = wal_file
-        uncompressed_file = None
-        compressed_file = None
-        tempdir = None
-
-        # Check if it is not a partial file. In this case, the WAL file is still being
-        # written by pg_receivewal, and surely has not yet been compressed nor encrypted
-        # by the Barman archiver.
-        if not xlog.is_partial_file(wal_info.fullpath(self)):
-            wal_file_compression = None
-            # Before any decompression operation, check for encryption.
-            if wal_info.encryption:
-                # We need to check if `encryption_passphrase_command` is set.
-                if not self.config.encryption_passphrase_command:
-                    output.error(
-                        "Encrypted WAL file '%s' detected, but no "
-                        "'encryption_passphrase_command' is configured. "
-                        "Please set 'encryption_passphrase_command' in the configuration "
-                        "so the correct private key can be identified for decryption.",
-                        wal_info.name,
-                    )
-                    output.close_and_exit()
-
-                passphrase = get_passphrase_from_command(
-                    self.config.encryption_passphrase_command
-                )
-
-                encryption_handler = backup_manager.encryption_manager.get_encryption(
-                    encryption=wal_info.encryption
-                )
-
-                tempdir = tempfile.mkdtemp(
-                    dir=self.config.wals_directory,
-                    prefix=".%s." % os.path.basename(wal_file),
-                )
-                # Decrypt wal to a tmp directory.
-                decrypted_file = encryption_handler.decrypt(
-                    file=source_file, dest=tempdir, passphrase=passphrase
-                )
-                # Now, check compression info.
-                wal_file_compression = (
-                    backup_manager.compression_manager.identify_compression(
-                        decrypted_file
-                    )
-                )
-
-                source_file = decrypted_file
-
-            wal_info_compression = wal_info.compression or wal_file_compression
-            # Get a decompressor for the file (None if not compressed)
-            wal_compressor = backup_manager.compression_manager.get_compressor(
-                wal_info_compression
-            )
-
-            # Get a compressor for the output (None if not compressed)
-            out_compressor = backup_manager.compression_manager.get_compressor(
-                compression
-            )
-
-            # Ignore compression/decompression when:
-            # * It's a partial WAL file; and
-            # * The user wants to decompress on the client side.
-            if not keep_compression:
-                # If the required compression is different from the source we
-                # decompress/compress it into the required format (getattr is
-                # used here to gracefully handle None objects)
-                if getattr(wal_compressor, "compression", None) != getattr(
-                    out_compressor, "compression", None
-                ):
-                    # If source is compressed, decompress it into a temporary file
-                    if wal_compressor is not None:
-                        uncompressed_file = NamedTemporaryFile(
-                            dir=self.config.wals_directory,
-                            prefix=".%s." % os.path.basename(wal_file),
-                            suffix=".uncompressed",
-                        )
-                        # If a custom decompression filter is set, we prioritize using it
-                        # instead of the compression guessed by Barman based on the magic
-                        # number.
-                        is_decompressed = False
-                        if (
-                            self.config.custom_decompression_filter is not None
-                            and not isinstance(wal_compressor, CustomCompressor)
-                        ):
-                            try:
-                                backup_manager.compression_manager.get_compressor(
-                                    "custom"
-                                ).decompress(source_file, uncompressed_file.name)
-                            except CommandFailedException as exc:
-                                output.debug("Error decompressing WAL: %s", str(exc))
-                            else:
-                                is_decompressed = True
-                        # But if a custom decompression filter is not set, or if using the
-                        # custom decompression filter was not successful, then try using
-                        # the decompressor identified by the magic number
-                        if not is_decompressed:
-                            try:
-                                wal_compressor.decompress(
-                                    source_file, uncompressed_file.name
-                                )
-                            except CommandFailedException as exc:
-                                output.error("Error decompressing WAL: %s", str(exc))
-                                return
-
-                        source_file = uncompressed_file.name
-
-                    # If output compression is required compress the source
-                    # into a temporary file
-                    if out_compressor is not None:
-                        compressed_file = NamedTemporaryFile(
-                            dir=self.config.wals_directory,
-                            prefix=".%s." % os.path.basename(wal_file),
-                            suffix=".compressed",
-                        )
-                        out_compressor.compress(source_file, compressed_file.name)
-                        source_file = compressed_file.name
-
-        # Copy the prepared source file to destination
-        with open(source_file, "rb") as input_file:
-            shutil.copyfileobj(input_file, destination)
-
-        # Remove file
-        if tempdir is not None:
-            fs.LocalLibPathDeletionCommand(tempdir).delete()
-        # Remove temp files
-        if uncompressed_file is not None:
-            uncompressed_file.close()
-        if compressed_file is not None:
-            compressed_file.close()
-
     def put_wal(self, fileobj):
         """
         Receive a WAL file from SERVER_NAME and securely store it in the
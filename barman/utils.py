@@ -25,6 +25,7 @@ import decimal
 import errno
 import grp
 import hashlib
+import io
 import json
 import logging
 import logging.handlers
@@ -32,11 +33,11 @@ import os
 import pwd
 import re
 import signal
+import stat
 import sys
 from abc import ABCMeta, abstractmethod
 from argparse import ArgumentTypeError
 from contextlib import contextmanager
-from distutils.version import Version
 from glob import glob
 
 from dateutil import tz
@@ -417,7 +418,10 @@ class BarmanEncoder(json.JSONEncoder):
         :param obj:
         :return: None|str
         """
-        if isinstance(obj, Version):
+        # distutils is slow to import, and there cannot be any Version
+        # object to encode until some other module has imported it
+        version_module = sys.modules.get("distutils.version")
+        if version_module is not None and isinstance(obj, version_module.Version):
             return str(obj)
 
 
@@ -494,6 +498,94 @@ def fsync_file(file_path):
     return file_stat
 
 
+# Errors meaning that a zero-copy system call is not available for the
+# given pair of file descriptors, so another copy method must be used
+_ZERO_COPY_FALLBACK_ERRNOS = frozenset(
+    (
+        errno.EINVAL,
+        errno.ENOSYS,
+        errno.EXDEV,
+        errno.EBADF,
+        errno.EOPNOTSUPP,
+        errno.ENOTSUP,
+    )
+)
+
+
+def _zero_copy_loop(copy_func, length):
+    """
+    Call *copy_func* until *length* bytes have been copied.
+
+    :param callable copy_func: function taking the number of bytes still to
+        copy and returning the number of bytes actually copied
+    :param int length: total number of bytes to copy
+    :return bool: ``False`` if the system call is not supported for the
+        given file descriptors and nothing was copied, ``True`` otherwise
+    :raise OSError: if the copy fails after some data has been transferred
+    """
+    copied = 0
+    while copied < length:
+        try:
+            sent = copy_func(length - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in _ZERO_COPY_FALLBACK_ERRNOS:
+                return False
+            raise
+        if sent == 0:
+            # The source has been truncated while we were copying it
+            break
+        copied += sent
+    return True
+
+
+def zero_copy_file(source, destination):
+    """
+    Copy the remaining content of *source* into *destination* in kernel space.
+
+    :func:`os.copy_file_range` is used when *destination* is a regular file and
+    :func:`os.sendfile` when it is a pipe or a socket. The function does nothing
+    and returns ``False`` when none of them can be used (for example when one
+    of the two objects is not backed by a file descriptor), so that the caller
+    can fall back to a userspace copy such as :func:`shutil.copyfileobj`.
+
+    :param source: binary file object open for reading, backed by a regular file
+    :param destination: binary file object open for writing
+    :return bool: ``True`` if the content has been copied, ``False`` otherwise
+    """
+    try:
+        out_fd = destination.fileno()
+        in_fd = source.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return False
+
+    in_stat = os.fstat(in_fd)
+    if not stat.S_ISREG(in_stat.st_mode):
+        return False
+    out_mode = os.fstat(out_fd).st_mode
+
+    if stat.S_ISREG(out_mode) and hasattr(os, "copy_file_range"):
+
+        def copy_func(count):
+            return os.copy_file_range(in_fd, out_fd, count)
+
+    elif (stat.S_ISFIFO(out_mode) or stat.S_ISSOCK(out_mode)) and hasattr(
+        os, "sendfile"
+    ):
+
+        def copy_func(count):
+            return os.sendfile(out_fd, in_fd, None, count)
+
+    else:
+        return False
+
+    # Anything still sitting in the userspace buffers must reach the
+    # file descriptors before the kernel starts moving data around them
+    destination.flush()
+    position = source.tell()
+    os.lseek(in_fd, position, os.SEEK_SET)
+    return _zero_copy_loop(copy_func, in_stat.st_size - position)
+
+
 def simplify_version(version_string):
     """
     Simplify a version number by removing the patch level
@@ -958,6 +1050,21 @@ def check_size(value):
     return int_value
 
 
+def check_tablespace_bandwidth(value):
+    """
+    Check user input for a tablespace bandwidth in the ``name:size`` format
+
+    :param value: str containing the value to check
+    :return: a tuple of the tablespace name and the size
+    """
+    name, _, size = value.rpartition(":")
+    if not name or not size:
+        raise ArgumentTypeError(
+            "'%s' is not a valid tablespace bandwidth, expected 'name:size'" % value
+        )
+    return name, check_size(size)
+
+
 def check_backup_name(backup_name):
     """
     Verify that a backup name is not a backup ID or reserved identifier.
@@ -1317,3 +1424,23 @@ def is_subdirectory(path1, path2):
     path1 = os.path.abspath(path1)
     path2 = os.path.abspath(path2)
     return os.path.commonpath([path1, path2]) == path1
+
+
+def map_concurrently(func, items, jobs):
+    """
+    Apply a function to every item with a pool of threads.
+
+    :param callable func: the function
+    :param list items: the items
+    :param int jobs: the maximum number of threads, the items are processed by
+      the calling thread if it is 1
+    :return list: the results of the function, in the order of the items
+    """
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    # Imported here so that the commands which never run anything concurrently,
+    # such as get-wal, do not pay for it
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        return list(executor.map(func, items))
@@ -140,7 +140,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "barman=barman.cli:main",
+            "barman=barman.launcher:main",
             "barman-cloud-backup=barman.clients.cloud_backup:main",
             "barman-cloud-wal-archive=barman.clients.cloud_walarchive:main",
             "barman-cloud-restore=barman.clients.cloud_restore:main",
@@ -289,8 +289,10 @@ class TestAnnotationManagerCloud(object):
             is None
         )
         # The AnnotationManager did not have to open the annotation to determine it
-        # was missing
-        mock_cloud_interface.remote_open.assert_not_called()
+        # was missing, it only read the annotation which exists
+        mock_cloud_interface.remote_open.assert_called_once_with(
+            "test_server/base/%s/annotations/test_annotation" % test_backup_id
+        )
 
     @mock.patch("barman.cloud.CloudInterface")
     def test_get_missing_annotation_bypass_cache_optimisation(
@@ -339,6 +341,48 @@ class TestAnnotationManagerCloud(object):
             "test_server/base/%s/annotations/test_annotation" % (test_backup_id)
         )
 
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_annotations_read_concurrently(self, mock_cloud_interface):
+        """
+        Tests the annotations found walking the bucket are all read up front
+        when the cloud interface can be shared by threads.
+        """
+        mock_cloud_interface.path = None
+        mock_cloud_interface.THREAD_SAFE = True
+        backup_ids = ["20210723T%06d" % i for i in range(20)]
+        mock_cloud_interface.list_bucket.return_value = iter(
+            ["test_server/base/%s/annotations/keep" % b for b in backup_ids]
+        )
+        mock_cloud_interface.remote_open.side_effect = lambda key: io.BytesIO(
+            key.split("/")[2].encode("utf-8")
+        )
+        annotation_manager = AnnotationManagerCloud(mock_cloud_interface, "test_server")
+
+        # WHEN the annotations are read
+        values = [annotation_manager.get_annotation(b, "keep") for b in backup_ids]
+
+        # THEN each annotation is returned with its own value
+        assert values == backup_ids
+        # AND each annotation was read once, while populating the cache
+        assert mock_cloud_interface.remote_open.call_count == len(backup_ids)
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_cache_follows_put_and_delete(self, mock_cloud_interface):
+        """
+        Tests the cached annotations are updated by put and delete.
+        """
+        mock_cloud_interface.path = None
+        mock_cloud_interface.list_bucket.return_value = iter([])
+        annotation_manager = AnnotationManagerCloud(mock_cloud_interface, "test_server")
+        assert annotation_manager.get_annotation(test_backup_id, "keep") is None
+
+        annotation_manager.put_annotation(test_backup_id, "keep", "full")
+        assert annotation_manager.get_annotation(test_backup_id, "keep") == "full"
+
+        annotation_manager.delete_annotation(test_backup_id, "keep")
+        assert annotation_manager.get_annotation(test_backup_id, "keep") is None
+        mock_cloud_interface.remote_open.assert_not_called()
+
     @mock.patch("barman.cloud.CloudInterface")
     def test_put_annotation(self, mock_cloud_interface):
         """
@@ -22,7 +22,9 @@ import mock
 import pytest
 
 from barman.clients import cloud_backup
+from barman.cloud import CloudBackupManifest, CloudChunkStore
 from barman.exceptions import ConfigurationException
+from barman.infofile import BackupInfo
 
 EXAMPLE_BACKUP_DIR = "/path/to/backup"
 EXAMPLE_BACKUP_ID = "20210707T132804"
@@ -96,10 +98,48 @@ class TestCloudBackup(object):
             max_archive_size=expected_max_archive_size,
             min_chunk_size=expected_min_chunk_size,
             max_bandwidth=expected_max_bandwidth,
+            tar_streams=1,
+            compression_workers=0,
+            long_distance_matching=False,
+            in_memory_buffers=False,
+            parent_manifest=None,
+            chunk_store=None,
+            drop_page_cache=False,
+            tablespace_bandwidth={},
             cloud_interface=cloud_interface_mock.return_value,
         )
         uploader.backup.assert_called_once()
 
+    @mock.patch.dict(
+        os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
+    )
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploader")
+    def test_tablespace_max_bandwidth(
+        self,
+        uploader_mock,
+        _cloud_interface_mock,
+        _postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+    ):
+        # WHEN barman-cloud-backup limits the bandwidth of two tablespaces
+        cloud_backup.main(
+            [
+                "cloud_storage_url",
+                "test_server",
+                "--tablespace-max-bandwidth=tbs1:10MB",
+                "--tablespace-max-bandwidth=tbs2:1024",
+            ]
+        )
+
+        # THEN the limit of each tablespace is passed to the uploader
+        assert uploader_mock.call_args[1]["tablespace_bandwidth"] == {
+            "tbs1": 10 << 20,
+            "tbs2": 1024,
+        }
+
     @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
     @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
     @mock.patch("barman.clients.cloud_backup.CloudBackupUploader")
@@ -383,6 +423,7 @@ class TestCloudBackup(object):
             url="cloud_storage_url",
             jobs=2,
             tags=None,
+            upload_engine=None,
             profile_name=None,
             endpoint_url=None,
             read_timeout=None,
@@ -438,6 +479,7 @@ class TestCloudBackup(object):
             url="cloud_storage_url",
             jobs=1,
             tags=None,
+            upload_engine=None,
             **expected_cloud_interface_kwargs
         )
 
@@ -460,6 +502,97 @@ class TestCloudBackup(object):
         assert "Compression options cannot be used with snapshot backups" in str(
             excinfo.value
         )
+        # Test zstd options without zstd compression
+        for option in ({"zstd_workers": 4}, {"zstd_long": True}):
+            config = SimpleNamespace(compression="gz", **option)
+            with pytest.raises(ConfigurationException) as excinfo:
+                cloud_backup._validate_config(config)
+            assert (
+                "'zstd_workers' and 'zstd_long' can only be used with zstd "
+                "compression" in str(excinfo.value)
+            )
+        config = SimpleNamespace(compression="zstd", zstd_workers=4, zstd_long=True)
+        cloud_backup._validate_config(config)
+        # Test resume outside of a hook script and with several tar streams
+        config = SimpleNamespace(resume=True, tar_streams=1)
+        with pytest.raises(ConfigurationException) as excinfo:
+            cloud_backup._validate_config(config)
+        assert "'resume' can only be used when running as a hook script" in str(
+            excinfo.value
+        )
+        with mock.patch.dict(
+            os.environ, {"BARMAN_HOOK": "backup_script", "BARMAN_PHASE": "post"}
+        ):
+            config = SimpleNamespace(resume=True, tar_streams=2)
+            with pytest.raises(ConfigurationException) as excinfo:
+                cloud_backup._validate_config(config)
+            assert "'resume' cannot be used with 'tar_streams'" in str(excinfo.value)
+            config = SimpleNamespace(resume=True, tar_streams=1)
+            cloud_backup._validate_config(config)
+        # Test incremental_from with snapshot backups and with resume
+        config = SimpleNamespace(
+            snapshot_disks="any", snapshot_instance="any", incremental_from="latest"
+        )
+        with pytest.raises(ConfigurationException) as excinfo:
+            cloud_backup._validate_config(config)
+        assert "'incremental_from' cannot be used with snapshot backups" in str(
+            excinfo.value
+        )
+        config = SimpleNamespace(resume=True, tar_streams=1, incremental_from="latest")
+        with pytest.raises(ConfigurationException) as excinfo:
+            cloud_backup._validate_config(config)
+        assert "'incremental_from' cannot be used with 'resume'" in str(excinfo.value)
+        # Test the postgres backup method
+        config = SimpleNamespace(backup_method="concurrent", incremental="latest")
+        with pytest.raises(ConfigurationException) as excinfo:
+            cloud_backup._validate_config(config)
+        assert (
+            "'incremental' can only be used with the 'postgres' backup method"
+            in str(excinfo.value)
+        )
+        for config in (
+            SimpleNamespace(snapshot_disks="any", backup_method="postgres"),
+            SimpleNamespace(snapshot_disks="any", incremental="latest"),
+        ):
+            with pytest.raises(ConfigurationException) as excinfo:
+                cloud_backup._validate_config(config)
+            assert (
+                "'backup_method' = 'postgres' cannot be used with snapshot backups"
+                in str(excinfo.value)
+            )
+        config = SimpleNamespace(backup_method="postgres", incremental_from="latest")
+        with pytest.raises(ConfigurationException) as excinfo:
+            cloud_backup._validate_config(config)
+        assert (
+            "'incremental_from' cannot be used with 'backup_method' = 'postgres'"
+            in str(excinfo.value)
+        )
+        with mock.patch.dict(
+            os.environ, {"BARMAN_HOOK": "backup_script", "BARMAN_PHASE": "post"}
+        ):
+            config = SimpleNamespace(backup_method="postgres")
+            with pytest.raises(ConfigurationException) as excinfo:
+                cloud_backup._validate_config(config)
+            assert "cannot be used when running as a hook script" in str(excinfo.value)
+        # Test the chunk store
+        for config_dict, expected_error in (
+            (
+                {"chunk_store": True, "snapshot_disks": ["disk0"]},
+                "'chunk_store' cannot be used with snapshot backups",
+            ),
+            (
+                {"chunk_store": True, "incremental_from": "latest"},
+                "'chunk_store' cannot be used with 'incremental_from'",
+            ),
+            (
+                {"chunk_store": True, "resume": True},
+                "'chunk_store' cannot be used with 'resume'",
+            ),
+        ):
+            config = SimpleNamespace(**config_dict)
+            with pytest.raises(ConfigurationException) as excinfo:
+                cloud_backup._validate_config(config)
+            assert expected_error in str(excinfo.value)
         # Test aws_snapshot_lock_mode + aws_snapshot_lock_cool_off_period
         config_dict = {
             "aws_snapshot_lock_mode": "governance",
@@ -496,6 +629,193 @@ class TestCloudBackup(object):
             "tags per object." in str(excinfo.value)
         )
 
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploader")
+    def test_incremental_from(
+        self,
+        uploader_mock,
+        catalog_mock,
+        cloud_interface_mock,
+        postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+    ):
+        """Verify the manifest of the parent backup is passed to the uploader."""
+        # GIVEN a catalog with a backup in DONE status which has a manifest
+        catalog = catalog_mock.return_value
+        catalog.parse_backup_id.return_value = "20250101T000000"
+        catalog.get_backup_info.return_value.status = BackupInfo.DONE
+
+        # WHEN barman-cloud-backup is run with --incremental-from
+        cloud_backup.main(
+            ["cloud_storage_url", "test_server", "--incremental-from", "latest"]
+        )
+
+        # THEN the backup shortcut was resolved in the catalog
+        catalog_mock.assert_called_once_with(
+            cloud_interface_mock.return_value, "test_server"
+        )
+        catalog.parse_backup_id.assert_called_once_with("latest")
+        # AND the manifest of the parent backup was passed to the uploader
+        catalog.get_backup_manifest.assert_called_once_with("20250101T000000")
+        assert (
+            uploader_mock.call_args[1]["parent_manifest"]
+            == catalog.get_backup_manifest.return_value
+        )
+
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploader")
+    def test_chunk_store(
+        self,
+        uploader_mock,
+        cloud_interface_mock,
+        _postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+    ):
+        """Verify the uploader uses a chunk store when requested."""
+        cloud_interface_mock.return_value.path = "bucket"
+
+        # WHEN barman-cloud-backup is run with --chunk-store
+        cloud_backup.main(
+            ["cloud_storage_url", "test_server", "--chunk-store", "--gzip"]
+        )
+
+        # THEN the uploader receives a chunk store of the server
+        chunk_store = uploader_mock.call_args[1]["chunk_store"]
+        assert isinstance(chunk_store, CloudChunkStore)
+        assert chunk_store.prefix == "bucket/test_server/chunks"
+        # AND the chunks are compressed like the archives
+        assert chunk_store.compression == "gz"
+
+    @pytest.mark.parametrize(
+        ("barman_cloud_args", "expected_parent_backup_id"),
+        (
+            (["--backup-method", "postgres"], None),
+            (["--incremental", "latest"], "20250101T000000"),
+        ),
+    )
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploaderPostgres")
+    def test_uses_pg_basebackup_uploader(
+        self,
+        uploader_mock,
+        catalog_mock,
+        cloud_interface_mock,
+        postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+        barman_cloud_args,
+        expected_parent_backup_id,
+    ):
+        """Verify backups are taken with pg_basebackup when requested."""
+        # GIVEN a catalog with a backup taken with pg_basebackup
+        catalog = catalog_mock.return_value
+        catalog.parse_backup_id.return_value = "20250101T000000"
+        catalog.get_backup_info.return_value.status = BackupInfo.DONE
+        catalog.get_backup_manifest.return_value = CloudBackupManifest(
+            "20250101T000000", backup_method="postgres"
+        )
+
+        # WHEN barman-cloud-backup is run with the postgres backup method
+        cloud_backup.main(["cloud_storage_url", "test_server"] + barman_cloud_args)
+
+        # THEN the backup is taken with pg_basebackup
+        uploader_mock.assert_called_once()
+        uploader_mock.return_value.backup.assert_called_once()
+        # AND block-level incremental backups are taken from the parent backup
+        uploader_kwargs = uploader_mock.call_args[1]
+        assert uploader_kwargs["parent_backup_id"] == expected_parent_backup_id
+        # AND no file-level incremental backup is taken
+        assert uploader_kwargs["parent_manifest"] is None
+
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploaderPostgres")
+    def test_incremental_parent_not_taken_with_pg_basebackup(
+        self,
+        uploader_mock,
+        catalog_mock,
+        _cloud_interface_mock,
+        _postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+        caplog,
+    ):
+        """Verify a block-level incremental backup requires a pg_basebackup parent."""
+        # GIVEN a catalog with a backup not taken with pg_basebackup
+        catalog = catalog_mock.return_value
+        catalog.parse_backup_id.return_value = "20250101T000000"
+        catalog.get_backup_info.return_value.status = BackupInfo.DONE
+        catalog.get_backup_manifest.return_value = CloudBackupManifest(
+            "20250101T000000"
+        )
+
+        # WHEN barman-cloud-backup is run with --incremental
+        # THEN it exits with an error
+        with pytest.raises(SystemExit):
+            cloud_backup.main(
+                ["cloud_storage_url", "test_server", "--incremental", "latest"]
+            )
+
+        # AND no backup was taken
+        uploader_mock.assert_not_called()
+        assert "was not taken with the 'postgres' backup method" in caplog.text
+
+    @pytest.mark.parametrize(
+        ("parent_status", "parent_manifest", "expected_error"),
+        (
+            (BackupInfo.FAILED, mock.Mock(), "is not in DONE status"),
+            (BackupInfo.DONE, None, "the backup has no manifest"),
+        ),
+    )
+    @mock.patch("barman.clients.cloud_backup.PostgreSQLConnection")
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploader")
+    def test_incremental_from_invalid_parent(
+        self,
+        uploader_mock,
+        catalog_mock,
+        _cloud_interface_mock,
+        _postgres_connection,
+        _rmtree_mock,
+        _tempfile_mock,
+        parent_status,
+        parent_manifest,
+        expected_error,
+        caplog,
+    ):
+        """Verify no backup is taken when the parent backup cannot be used."""
+        # GIVEN a catalog with a backup which cannot be used as a parent
+        catalog = catalog_mock.return_value
+        catalog.parse_backup_id.return_value = "20250101T000000"
+        catalog.get_backup_info.return_value.status = parent_status
+        catalog.get_backup_manifest.return_value = parent_manifest
+
+        # WHEN barman-cloud-backup is run with --incremental-from
+        # THEN it exits with an error
+        with pytest.raises(SystemExit):
+            cloud_backup.main(
+                [
+                    "cloud_storage_url",
+                    "test_server",
+                    "--incremental-from",
+                    "20250101T000000",
+                ]
+            )
+
+        # AND no backup was taken
+        uploader_mock.assert_not_called()
+        # AND the reason is logged
+        assert expected_error in caplog.text
+
     def test_tag_and_tags_are_mutually_exclusive(
         self, _rmtree_mock, _tempfile_mock, capsys
     ):
@@ -582,13 +902,69 @@ class TestCloudBackupHookScript(object):
             max_archive_size=expected_max_archive_size,
             min_chunk_size=expected_min_chunk_size,
             max_bandwidth=expected_max_bandwidth,
+            tar_streams=1,
+            compression_workers=0,
+            long_distance_matching=False,
+            in_memory_buffers=False,
+            parent_manifest=None,
+            chunk_store=None,
+            drop_page_cache=False,
+            tablespace_bandwidth={},
             cloud_interface=cloud_interface_mock.return_value,
             backup_dir=EXAMPLE_BACKUP_DIR,
             backup_id=EXAMPLE_BACKUP_ID,
             backup_info_path=EXAMPLE_BACKUP_INFO_PATH,
+            journal=None,
         )
         uploader.backup.assert_called_once()
 
+    @mock.patch.dict(
+        os.environ,
+        {
+            "AZURE_STORAGE_CONNECTION_STRING": "connection_string",
+            "BARMAN_HOOK": "backup_retry_script",
+            "BARMAN_PHASE": "post",
+            "BARMAN_BACKUP_DIR": EXAMPLE_BACKUP_DIR,
+            "BARMAN_BACKUP_ID": EXAMPLE_BACKUP_ID,
+            "BARMAN_BACKUP_INFO_PATH": EXAMPLE_BACKUP_INFO_PATH,
+            "BARMAN_STATUS": "DONE",
+        },
+    )
+    @mock.patch("barman.clients.cloud_backup.get_cloud_interface")
+    @mock.patch("barman.clients.cloud_backup.CloudBackupUploaderBarman")
+    def test_resume_opens_journal_when_running_as_hook(
+        self,
+        uploader_mock,
+        cloud_interface_mock,
+        rmtree_mock,
+        tempfile_mock,
+        tmpdir,
+    ):
+        # GIVEN a journal directory which does not exist yet
+        journal_dir = os.path.join(tmpdir.strpath, "journals")
+
+        # WHEN barman-cloud-backup runs as a hook script with --resume
+        cloud_backup.main(
+            [
+                "cloud_storage_url",
+                "test_server",
+                "--resume",
+                "--journal-dir",
+                journal_dir,
+            ]
+        )
+
+        # THEN the journal directory is created
+        assert os.path.isdir(journal_dir)
+        # AND the uploader is created with the journal of the backup
+        journal = uploader_mock.call_args[1]["journal"]
+        assert journal.path == os.path.join(
+            journal_dir, "test_server-%s.json" % EXAMPLE_BACKUP_ID
+        )
+        assert journal.destination_url == "cloud_storage_url"
+        assert journal.backup_id == EXAMPLE_BACKUP_ID
+        uploader_mock.return_value.backup.assert_called_once()
+
     @mock.patch.dict(
         os.environ,
         {
@@ -619,10 +995,19 @@ class TestCloudBackupHookScript(object):
             max_archive_size=107374182400,
             min_chunk_size=None,
             max_bandwidth=None,
+            tar_streams=1,
+            compression_workers=0,
+            long_distance_matching=False,
+            in_memory_buffers=False,
+            parent_manifest=None,
+            chunk_store=None,
+            drop_page_cache=False,
+            tablespace_bandwidth={},
             cloud_interface=cloud_interface_mock.return_value,
             backup_dir=EXAMPLE_BACKUP_DIR,
             backup_id=EXAMPLE_BACKUP_ID,
             backup_info_path=EXAMPLE_BACKUP_INFO_PATH,
+            journal=None,
         )
         uploader.backup.assert_called_once()
 
@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import datetime
 
 import mock
@@ -25,7 +26,7 @@ from testing_helpers import interpolate_wals
 from barman.annotations import KeepManager
 from barman.clients import cloud_backup_delete
 from barman.clients.cloud_cli import OperationErrorExit
-from barman.cloud import CloudBackupCatalog
+from barman.cloud import CloudBackupCatalog, CloudBackupManifest, CloudProviderError
 from barman.utils import is_backup_id
 
 
@@ -217,6 +218,35 @@ class TestCloudBackupDelete(object):
         def get_backup_files(backup_info, allow_missing=False):
             return backup_state[backup_info.backup_id]["files"]
 
+        def get_backup_manifest(backup_id):
+            return backup_state[backup_id].get("manifest")
+
+        def get_backup_manifests(backup_ids):
+            return dict(
+                (backup_id, get_backup_manifest(backup_id)) for backup_id in backup_ids
+            )
+
+        def get_referenced_backups():
+            return dict(
+                (
+                    b_id,
+                    (
+                        backup["manifest"].referenced_backup_ids
+                        if backup.get("manifest") is not None
+                        else []
+                    ),
+                )
+                for b_id, backup in sorted(backup_state.items())
+            )
+
+        def get_referencing_backups(backup_id):
+            return [
+                b_id
+                for b_id, backup in sorted(backup_state.items())
+                if backup.get("manifest") is not None
+                and backup_id in backup["manifest"].referenced_backup_ids
+            ]
+
         def get_wal_prefixes():
             for wal in sorted(
                 set(wal[0:16] for wal in wals if not wal.endswith("history"))
@@ -252,6 +282,10 @@ class TestCloudBackupDelete(object):
                 "get_backup_list.side_effect": get_backup_list,
                 "remove_backup_from_cache.side_effect": remove_backup_from_cache,
                 "get_backup_files.side_effect": get_backup_files,
+                "get_backup_manifest.side_effect": get_backup_manifest,
+                "get_backup_manifests.side_effect": get_backup_manifests,
+                "get_referenced_backups.side_effect": get_referenced_backups,
+                "get_referencing_backups.side_effect": get_referencing_backups,
                 "get_wal_paths.side_effect": get_wal_paths,
                 "remove_wal_from_cache.side_effect": remove_wal_from_cache,
                 "parse_backup_id.side_effect": parse_backup_id,
@@ -272,8 +306,8 @@ class TestCloudBackupDelete(object):
         Verify that:
         - cloud_interface.delete_objects was called only with the arguments provided
           in expected_delete_object_calls and only in that order.
-        - cloud_interface.delete_under_prefix was called only with the arguments provided
-          in expected_delete_under_prefix_calls and only in that order.
+        - cloud_interface.delete_under_prefixes was called only with the prefixes
+          provided in expected_delete_under_prefix_calls and only in that order.
         """
         cloud_interface_mock = get_cloud_interface_mock.return_value
         assert len(cloud_interface_mock.delete_objects.call_args_list) == len(
@@ -283,14 +317,12 @@ class TestCloudBackupDelete(object):
             assert (
                 call_args == cloud_interface_mock.delete_objects.call_args_list[i][0][0]
             )
-        assert len(cloud_interface_mock.delete_under_prefix.call_args_list) == len(
-            expected_delete_under_prefix_calls
-        )
-        for i, call_args in enumerate(expected_delete_under_prefix_calls):
-            assert (
-                call_args
-                == cloud_interface_mock.delete_under_prefix.call_args_list[i][0][0]
-            )
+        delete_under_prefix_calls = [
+            prefix
+            for call_args in cloud_interface_mock.delete_under_prefixes.call_args_list
+            for prefix in call_args[0][0]
+        ]
+        assert delete_under_prefix_calls == expected_delete_under_prefix_calls
 
     def _verify_only_these_backups_deleted(
         self,
@@ -300,6 +332,7 @@ class TestCloudBackupDelete(object):
         wals={},
         wal_prefixes={},
         is_snapshot_backup=False,
+        one_pass=False,
     ):
         """
         Helper function which allows tests to verify that the provided list of
@@ -313,7 +346,20 @@ class TestCloudBackupDelete(object):
           2. Then, the backup.info file for the backup was deleted.
           3. Optionally (if a list of WALs exists in `wals` for the backup being
              deleted) that the expected WALs were deleted.
-        """
+
+        If one_pass is set, the backups are expected to have been deleted in one
+        pass, as done for a retention policy: the files of all the backups first,
+        then all the backup.info files and finally all the WALs.
+        """
+        if one_pass:
+            return self._verify_backups_deleted_in_one_pass(
+                get_cloud_interface_mock,
+                backup_metadata,
+                backup_ids,
+                wals,
+                wal_prefixes,
+                is_snapshot_backup,
+            )
         delete_objects_calls = []
         delete_under_prefix_calls = []
         for backup_id in backup_ids:
@@ -344,6 +390,49 @@ class TestCloudBackupDelete(object):
             delete_under_prefix_calls,
         )
 
+    def _verify_backups_deleted_in_one_pass(
+        self,
+        get_cloud_interface_mock,
+        backup_metadata,
+        backup_ids,
+        wals,
+        wal_prefixes,
+        is_snapshot_backup,
+    ):
+        """
+        Helper function which verifies that the provided list of backup_ids were
+        fully deleted in one pass, and that no other deletions were made.
+        """
+        if not backup_ids:
+            return self._verify_cloud_interface_calls(get_cloud_interface_mock, [], [])
+        backup_files = []
+        for backup_id in backup_ids:
+            if is_snapshot_backup:
+                backup_files.append("%s/backup_label" % backup_id)
+            backup_files += self._get_sorted_files_for_backup(
+                backup_metadata, backup_id
+            )
+        delete_objects_calls = [
+            backup_files,
+            ["%s/backup.info" % backup_id for backup_id in backup_ids],
+        ]
+        deleted_wals = sorted(
+            set(wal for backup_id in backup_ids for wal in wals.get(backup_id, []))
+        )
+        if deleted_wals:
+            delete_objects_calls.append(deleted_wals)
+        self._verify_cloud_interface_calls(
+            get_cloud_interface_mock,
+            delete_objects_calls,
+            sorted(
+                set(
+                    wal_prefix
+                    for backup_id in backup_ids
+                    for wal_prefix in wal_prefixes.get(backup_id, [])
+                )
+            ),
+        )
+
     @pytest.mark.parametrize("backup_id_arg", ("20210723T095432", "backup name"))
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
     @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
@@ -370,6 +459,10 @@ class TestCloudBackupDelete(object):
         self._verify_only_these_backups_deleted(
             get_cloud_interface_mock, backup_metadata, [backup_id]
         )
+        # AND the index of the catalog was updated
+        cloud_backup_catalog_mock.return_value.update_index.assert_called_once_with()
+        # AND the WAL listing cache was updated
+        cloud_backup_catalog_mock.return_value.save_wal_cache.assert_called_once_with()
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
     @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
@@ -477,7 +570,10 @@ class TestCloudBackupDelete(object):
         # THEN only the expected backups are deleted
         expected_deleted_backups = out_of_policy_backup_ids[:num_backups_deleted]
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, expected_deleted_backups
+            get_cloud_interface_mock,
+            backup_metadata,
+            expected_deleted_backups,
+            one_pass=True,
         )
 
     @pytest.mark.parametrize(
@@ -543,7 +639,10 @@ class TestCloudBackupDelete(object):
         # THEN only the expected backups are deleted
         expected_deleted_backups = out_of_policy_backup_ids[:num_backups_deleted]
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, expected_deleted_backups
+            get_cloud_interface_mock,
+            backup_metadata,
+            expected_deleted_backups,
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -642,6 +741,9 @@ class TestCloudBackupDelete(object):
         # THEN the cloud provider does not request any deletions
         cloud_interface_mock = get_cloud_interface_mock.return_value
         assert len(cloud_interface_mock.delete_objects.call_args_list) == 0
+        # AND the index of the catalog and the WAL listing cache are left untouched
+        cloud_backup_catalog_mock.return_value.update_index.assert_not_called()
+        cloud_backup_catalog_mock.return_value.save_wal_cache.assert_not_called()
         # AND delete_snapshot_backup was not called for the backup
         mock_snapshots_interface = get_snapshot_interface_mock.return_value
         mock_snapshots_interface.delete_snapshot_backup.assert_not_called()
@@ -833,6 +935,424 @@ class TestCloudBackupDelete(object):
             get_cloud_interface_mock, backup_metadata, [backup_id]
         )
 
+    def _add_incremental_manifest(self, backup_metadata, backup_id, parent_id):
+        """
+        Helper for tests which makes backup_id an incremental backup which
+        references a file stored by parent_id.
+        """
+        manifest = CloudBackupManifest(backup_id, parent_id)
+        manifest.add_file("data", "base/1/1", 8192, 1.0, parent_id)
+        backup_metadata[backup_id]["manifest"] = manifest
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_referenced_backup(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock, caplog
+    ):
+        """
+        Tests that a backup referenced by an incremental backup is not deleted.
+        """
+        # GIVEN a backup catalog with a full backup and an incremental backup
+        # which references its files
+        backup_metadata = self._create_backup_metadata(
+            ["20210723T095432", "20210724T095432"]
+        )
+        self._add_incremental_manifest(
+            backup_metadata, "20210724T095432", "20210723T095432"
+        )
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+
+        # WHEN barman-cloud-backup-delete runs, specifying the full backup
+        # THEN an OperationErrorExit is raised
+        with pytest.raises(OperationErrorExit):
+            cloud_backup_delete.main(
+                ["cloud_storage_url", "test_server", "--backup-id", "20210723T095432"]
+            )
+
+        # AND nothing was deleted
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.delete_objects.assert_not_called()
+
+        # AND the logs explain which backups reference it
+        assert (
+            "as the incremental backups 20210724T095432 reference its files"
+            in caplog.text
+        )
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_incremental_backup(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock
+    ):
+        """
+        Tests that the manifest of an incremental backup is deleted with it.
+        """
+        # GIVEN a backup catalog with a full backup and an incremental backup
+        backup_metadata = self._create_backup_metadata(
+            ["20210723T095432", "20210724T095432"]
+        )
+        self._add_incremental_manifest(
+            backup_metadata, "20210724T095432", "20210723T095432"
+        )
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+
+        # WHEN barman-cloud-backup-delete runs, specifying the incremental backup
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--backup-id", "20210724T095432"]
+        )
+
+        # THEN the backup files and its manifest were deleted
+        self._verify_cloud_interface_calls(
+            get_cloud_interface_mock,
+            [
+                self._get_sorted_files_for_backup(backup_metadata, "20210724T095432")
+                + ["20210724T095432/manifest.json"],
+                ["20210724T095432/backup.info"],
+            ],
+            [],
+        )
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_block_incremental_backup_chain(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock, caplog
+    ):
+        """
+        Tests that backups taken with pg_basebackup are deleted with their
+        backup_manifest and that the parent of a block-level incremental backup
+        is only deleted after it.
+        """
+        # GIVEN a full backup and a block-level incremental backup, both taken
+        # with pg_basebackup
+        backup_metadata = self._create_backup_metadata(
+            ["20210723T095432", "20210724T095432"]
+        )
+        backup_metadata["20210723T095432"]["manifest"] = CloudBackupManifest(
+            "20210723T095432", backup_method="postgres"
+        )
+        backup_metadata["20210724T095432"]["manifest"] = CloudBackupManifest(
+            "20210724T095432", "20210723T095432", backup_method="postgres"
+        )
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+
+        # WHEN barman-cloud-backup-delete runs, specifying the full backup
+        # THEN an OperationErrorExit is raised
+        with pytest.raises(OperationErrorExit):
+            cloud_backup_delete.main(
+                ["cloud_storage_url", "test_server", "--backup-id", "20210723T095432"]
+            )
+        assert (
+            "as the incremental backups 20210724T095432 reference its files"
+            in caplog.text
+        )
+
+        # WHEN barman-cloud-backup-delete runs, specifying the incremental backup
+        # and then the full backup
+        for backup_id in ("20210724T095432", "20210723T095432"):
+            cloud_backup_delete.main(
+                ["cloud_storage_url", "test_server", "--backup-id", backup_id]
+            )
+
+        # THEN both backups were deleted with their manifests
+        expected_delete_object_calls = []
+        for backup_id in ("20210724T095432", "20210723T095432"):
+            expected_delete_object_calls += [
+                self._get_sorted_files_for_backup(backup_metadata, backup_id)
+                + ["%s/manifest.json" % backup_id, "%s/backup_manifest" % backup_id],
+                ["%s/backup.info" % backup_id],
+            ]
+        self._verify_cloud_interface_calls(
+            get_cloud_interface_mock, expected_delete_object_calls, []
+        )
+
+    @pytest.mark.parametrize("dry_run", (False, True))
+    @mock.patch("barman.clients.cloud_backup_delete.CloudChunkStore")
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_chunk_store_backup(
+        self,
+        get_cloud_interface_mock,
+        cloud_backup_catalog_mock,
+        chunk_store_mock,
+        dry_run,
+        capsys,
+    ):
+        """
+        Tests that the chunks no longer referenced by any backup are deleted
+        after a backup which uses the chunk store.
+        """
+        # GIVEN two backups with files uploaded to the chunk store
+        backup_metadata = self._create_backup_metadata(
+            ["20210723T095432", "20210724T095432"]
+        )
+        for backup_id, chunks in (
+            ("20210723T095432", ["aaaa", "bbbb"]),
+            ("20210724T095432", ["bbbb", "cccc"]),
+        ):
+            manifest = CloudBackupManifest(backup_id)
+            manifest.add_file("data", "base/1/1", 8, 1.0, chunks=chunks)
+            backup_metadata[backup_id]["manifest"] = manifest
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+        # AND the chunk store finds a chunk which is no longer referenced
+        chunk_store = chunk_store_mock.return_value
+        chunk_store.get_unreferenced_chunks.return_value = ["chunks/aa/aaaa"]
+        # AND no backup is adding chunks to the chunk store
+        chunk_store.get_pending_backups.return_value = {}
+
+        # WHEN barman-cloud-backup-delete deletes the oldest backup
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--backup-id", "20210723T095432"]
+            + (["--dry-run"] if dry_run else [])
+        )
+
+        # THEN the references to the chunks are counted in the remaining backup
+        chunk_store.get_unreferenced_chunks.assert_called_once_with(
+            [backup_metadata["20210724T095432"]["manifest"]]
+        )
+        if not dry_run:
+            # AND the unreferenced chunks are deleted after the backup
+            self._verify_cloud_interface_calls(
+                get_cloud_interface_mock,
+                [
+                    self._get_sorted_files_for_backup(
+                        backup_metadata, "20210723T095432"
+                    )
+                    + ["20210723T095432/manifest.json"],
+                    ["20210723T095432/backup.info"],
+                    ["chunks/aa/aaaa"],
+                ],
+                [],
+            )
+        else:
+            # AND nothing is deleted with --dry-run
+            self._verify_cloud_interface_calls(get_cloud_interface_mock, [], [])
+            assert (
+                "Skipping deletion of objects ['chunks/aa/aaaa'] due to --dry-run "
+                "option" in capsys.readouterr().out
+            )
+
+    @pytest.mark.parametrize(
+        ("marker_age", "chunks_removed"),
+        ((datetime.timedelta(hours=1), False), (datetime.timedelta(hours=25), True)),
+    )
+    @mock.patch("barman.clients.cloud_backup_delete.CloudChunkStore")
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_chunk_store_backup_pending_backups(
+        self,
+        get_cloud_interface_mock,
+        cloud_backup_catalog_mock,
+        chunk_store_mock,
+        marker_age,
+        chunks_removed,
+        caplog,
+    ):
+        """
+        Tests that the unreferenced chunks are kept while a backup which is not
+        in the catalog may still be adding chunks to the chunk store.
+        """
+        # GIVEN two backups with files uploaded to the chunk store
+        backup_metadata = self._create_backup_metadata(
+            ["20210723T095432", "20210724T095432"]
+        )
+        for backup_id in backup_metadata:
+            manifest = CloudBackupManifest(backup_id)
+            manifest.add_file("data", "base/1/1", 8, 1.0, chunks=["aaaa"])
+            backup_metadata[backup_id]["manifest"] = manifest
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+        chunk_store = chunk_store_mock.return_value
+        chunk_store.get_unreferenced_chunks.return_value = ["chunks/aa/aaaa"]
+        # AND the markers of both backups and of a backup missing from the
+        # catalog are in the chunk store
+        now = datetime.datetime.now()
+        chunk_store.get_pending_backups.return_value = {
+            "20210723T095432": now - datetime.timedelta(days=2),
+            "20210724T095432": now - datetime.timedelta(days=1),
+            "20210725T095432": now - marker_age,
+        }
+
+        # WHEN barman-cloud-backup-delete deletes the oldest backup
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--backup-id", "20210723T095432"]
+        )
+
+        # THEN the markers of the deleted and of the remaining backup are
+        # removed, with the marker of the missing backup once it has expired
+        chunk_store.unregister_backups.assert_called_once_with(
+            ["20210723T095432", "20210724T095432"]
+            + (["20210725T095432"] if chunks_removed else [])
+        )
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        deleted_objects = [
+            call[0][0] for call in cloud_interface_mock.delete_objects.call_args_list
+        ]
+        if chunks_removed:
+            # AND the unreferenced chunks are deleted
+            assert deleted_objects[-1] == ["chunks/aa/aaaa"]
+            assert "the backup is assumed to have failed" in caplog.text
+        else:
+            # AND the unreferenced chunks are kept while the backup may be running
+            assert ["chunks/aa/aaaa"] not in deleted_objects
+            assert (
+                "Skipping removal of unreferenced chunks as the backups "
+                "20210725T095432 may still be adding chunks" in caplog.text
+            )
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_by_retention_policy_with_incremental_backups(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock, caplog
+    ):
+        """
+        Tests that retention policies delete incremental backups before the
+        backups they reference and skip backups referenced by kept backups.
+        """
+        # GIVEN a backup catalog where the obsolete backup 20210722T095432 is
+        # referenced by the obsolete incremental backup 20210723T095432
+        # AND the obsolete backup 20210721T095432 is referenced by the kept
+        # incremental backup 20210725T095432
+        backup_metadata = self._create_backup_metadata(
+            [
+                "20210721T095432",
+                "20210722T095432",
+                "20210723T095432",
+                "20210724T095432",
+                "20210725T095432",
+            ]
+        )
+        self._add_incremental_manifest(
+            backup_metadata, "20210723T095432", "20210722T095432"
+        )
+        self._add_incremental_manifest(
+            backup_metadata, "20210725T095432", "20210721T095432"
+        )
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+
+        # WHEN barman-cloud-backup-delete runs with a redundancy policy of two
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--retention-policy", "REDUNDANCY 2"]
+        )
+
+        # THEN the incremental backup, including its backup.info, was deleted
+        # before the files of the backup it references
+        self._verify_cloud_interface_calls(
+            get_cloud_interface_mock,
+            [
+                self._get_sorted_files_for_backup(backup_metadata, "20210723T095432")
+                + ["20210723T095432/manifest.json"],
+                ["20210723T095432/backup.info"],
+                self._get_sorted_files_for_backup(backup_metadata, "20210722T095432"),
+                ["20210722T095432/backup.info"],
+            ],
+            [],
+        )
+
+        # AND the backup referenced by a kept backup was skipped with a warning
+        assert (
+            "Skipping delete of backup 20210721T095432 for server test_server "
+            "as the incremental backups 20210725T095432 reference its files"
+            in caplog.text
+        )
+        # AND the references were read once for the whole catalog
+        catalog = cloud_backup_catalog_mock.return_value
+        catalog.get_referencing_backups.assert_not_called()
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_by_retention_policy_with_incremental_backups_failure(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock
+    ):
+        """
+        Tests that the files of a backup are kept when the backup.info of an
+        incremental backup referencing them could not be deleted.
+        """
+        # GIVEN a backup catalog where the obsolete backup 20210722T095432 is
+        # referenced by the obsolete incremental backup 20210723T095432
+        backup_metadata = self._create_backup_metadata(
+            ["20210722T095432", "20210723T095432", "20210724T095432"]
+        )
+        self._add_incremental_manifest(
+            backup_metadata, "20210723T095432", "20210722T095432"
+        )
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+        # AND the deletion of the backup.info of the incremental backup fails
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.delete_objects.side_effect = [
+            None,
+            CloudProviderError("something went wrong"),
+        ]
+
+        # WHEN barman-cloud-backup-delete runs with a redundancy policy of one
+        # THEN an OperationErrorExit is raised
+        with pytest.raises(OperationErrorExit):
+            cloud_backup_delete.main(
+                [
+                    "cloud_storage_url",
+                    "test_server",
+                    "--retention-policy",
+                    "REDUNDANCY 1",
+                ]
+            )
+
+        # AND nothing of the referenced backup was deleted
+        assert [
+            call[0][0] for call in cloud_interface_mock.delete_objects.call_args_list
+        ] == [
+            self._get_sorted_files_for_backup(backup_metadata, "20210723T095432")
+            + ["20210723T095432/manifest.json"],
+            ["20210723T095432/backup.info"],
+        ]
+
+    def test_get_referencing_backups(self):
+        """
+        Tests the backups referencing each backup are found in one pass.
+        """
+        # GIVEN a catalog with a backup referenced by two incremental backups
+        catalog = mock.Mock(CloudBackupCatalog)
+        catalog.get_referenced_backups.return_value = {
+            "20210722T095432": [],
+            "20210723T095432": ["20210722T095432"],
+            "20210724T095432": ["20210722T095432", "20210723T095432"],
+        }
+
+        # WHEN the referencing backups are requested
+        referencing_backups = cloud_backup_delete._get_referencing_backups(catalog)
+
+        # THEN they are keyed by the referenced backup
+        assert referencing_backups == {
+            "20210722T095432": {"20210723T095432", "20210724T095432"},
+            "20210723T095432": {"20210724T095432"},
+        }
+        # AND the backups referenced by no backup are referenced by none
+        assert referencing_backups["20210724T095432"] == set()
+
+    def test_get_deletion_waves(self):
+        """
+        Tests the backups are deleted after the backups referencing them.
+        """
+        # GIVEN a chain of three incremental backups, a backup referenced by two
+        # of them and a backup referenced by none
+        referenced_backups = collections.OrderedDict(
+            [
+                ("20210726T095432", ["20210722T095432", "20210725T095432"]),
+                ("20210725T095432", ["20210722T095432", "20210724T095432"]),
+                ("20210724T095432", ["20210722T095432"]),
+                ("20210723T095432", []),
+                ("20210722T095432", []),
+            ]
+        )
+
+        # WHEN the deletion waves are planned
+        waves = cloud_backup_delete._get_deletion_waves(referenced_backups)
+
+        # THEN each backup comes after all the backups referencing it
+        assert waves == [
+            ["20210726T095432", "20210723T095432"],
+            ["20210725T095432"],
+            ["20210724T095432"],
+            ["20210722T095432"],
+        ]
+
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
     @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
     def test_deletion_of_missing_backup(
@@ -845,6 +1365,7 @@ class TestCloudBackupDelete(object):
         catalog = cloud_backup_catalog_mock.return_value
         catalog.get_backup_info.return_value = None
         catalog.should_keep_backup.return_value = False
+        catalog.get_referencing_backups.return_value = []
 
         # AND a backup_id which is not in the catalog
         backup_id = "20210723T095432"
@@ -890,7 +1411,10 @@ class TestCloudBackupDelete(object):
         # THEN the cloud interface was only used to delete the files associated with
         # the backups which are not required to meet the policy
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, sorted(out_of_policy_backup_ids)
+            get_cloud_interface_mock,
+            backup_metadata,
+            sorted(out_of_policy_backup_ids),
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -931,7 +1455,10 @@ class TestCloudBackupDelete(object):
         # THEN the cloud interface was only used to delete the files associated with
         # the backup which is not required to meet the policy and is not archival
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, ["20210723T095432"]
+            get_cloud_interface_mock,
+            backup_metadata,
+            ["20210723T095432"],
+            one_pass=True,
         )
 
     @mock.patch("barman.retention_policies.datetime")
@@ -971,7 +1498,10 @@ class TestCloudBackupDelete(object):
         # THEN the cloud interface was only used to delete the files associated with
         # the backups which are not required to meet the policy
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, sorted(out_of_policy_backup_ids)
+            get_cloud_interface_mock,
+            backup_metadata,
+            sorted(out_of_policy_backup_ids),
+            one_pass=True,
         )
 
     @mock.patch("barman.retention_policies.datetime")
@@ -1021,7 +1551,10 @@ class TestCloudBackupDelete(object):
         # THEN the cloud interface was only used to delete the files associated with
         # the backup which is not required to meet the policy and is not archival
         self._verify_only_these_backups_deleted(
-            get_cloud_interface_mock, backup_metadata, ["20210723T095432"]
+            get_cloud_interface_mock,
+            backup_metadata,
+            ["20210723T095432"],
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -1134,23 +1667,25 @@ class TestCloudBackupDelete(object):
                 ]
             )
 
-        # THEN an error was logged when the first backup could not be deleted
+        # THEN an error was logged when the backups could not be deleted
         assert (
-            "Could not delete backup 20210722T095432: Something went wrong on delete"
-            in caplog.text
+            "Could not delete backups 20210722T095432, 20210723T095432: "
+            "Something went wrong on delete" in caplog.text
         )
 
         # AND we exit with status 1
         assert exc.value.code == 1
 
         # AND the cloud interface was used to delete objects only once - for
-        # the backup that failed. It was not called to delete the backup.info file
-        # of that backup, nor was it called to clean up WALs associated
-        # with that backup. It was also not called to delete subsequent backups.
+        # the files of the obsolete backups. It was not called to delete their
+        # backup.info files, nor was it called to clean up WALs associated
+        # with those backups.
         assert len(cloud_interface_mock.delete_objects.call_args_list) == 1
 
         expected_deleted_objects = self._get_sorted_files_for_backup(
             backup_metadata, out_of_policy_backup_ids[1]
+        ) + self._get_sorted_files_for_backup(
+            backup_metadata, out_of_policy_backup_ids[0]
         )
         assert (
             mock.call(expected_deleted_objects, check_locks=False, atomic=True)
@@ -1465,6 +2000,34 @@ class TestCloudBackupDelete(object):
             "due to --dry-run option"
         ) in out
 
+    @pytest.mark.parametrize(
+        ("delete_jobs_args", "delete_jobs"), (([], 1), (["--delete-jobs", "4"], 4))
+    )
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_jobs(
+        self,
+        get_cloud_interface_mock,
+        cloud_backup_catalog_mock,
+        delete_jobs_args,
+        delete_jobs,
+    ):
+        """Tests the number of delete jobs is passed to the cloud interface."""
+        # GIVEN a backup catalog with one backup
+        backup_id = "20210723T095432"
+        backup_metadata = self._create_backup_metadata([backup_id])
+        cloud_backup_catalog_mock.return_value = self._create_catalog(backup_metadata)
+
+        # WHEN barman-cloud-backup-delete runs with the delete jobs arguments
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--backup-id", backup_id]
+            + delete_jobs_args
+        )
+
+        # THEN the cloud interface is created with the expected delete jobs
+        config = get_cloud_interface_mock.call_args[0][0]
+        assert config.delete_jobs == delete_jobs
+
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
     @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
     def test_wals_cleaned_up_after_deleting_by_retention_policy(
@@ -1527,6 +2090,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/000000010000000000000079.gz",
                 ],
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -1888,6 +2452,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/00000001000000000000007A.gz",
                 ]
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -1972,6 +2537,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/00000001000000000000007A.gz",
                 ]
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -2060,6 +2626,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/00000001000000000000007A.gz",
                 ],
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -2133,6 +2700,7 @@ class TestCloudBackupDelete(object):
             [target_backup_id],
             # AND no WALs are cleaned up
             wals={},
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -2210,6 +2778,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/00000001000000000000007A.gz",
                 ]
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -2219,7 +2788,7 @@ class TestCloudBackupDelete(object):
     ):
         """
         Test that when the cloud interface returns an error when deleting WALs
-        we log the error but continue deleting backups.
+        we log the error but the backups are still deleted.
         """
         # GIVEN a backup catalog with four backups with begin_wal values
         out_of_policy_backup_ids = ["20210722T095432", "20210723T095432"]
@@ -2270,11 +2839,13 @@ class TestCloudBackupDelete(object):
             ["cloud_storage_url", "test_server", "--retention-policy", "REDUNDANCY 2"]
         )
 
-        # THEN an error was logged when the first backup could not be deleted
+        # THEN an error was logged when the WALs could not be deleted
         assert (
-            "Could not delete the following WALs for backup 20210722T095432: "
+            "Could not delete the following WALs for backup 20210722T095432, "
+            "20210723T095432: "
             "['wals/0000000100000000/000000010000000000000075.gz', 'wals/0000000100000000/000000010000000000000076.gz', "
-            "'wals/0000000100000000/000000010000000000000077.gz'], Reason: Something went wrong on "
+            "'wals/0000000100000000/000000010000000000000077.gz', 'wals/0000000100000000/000000010000000000000078.gz', "
+            "'wals/0000000100000000/000000010000000000000079.gz'], Reason: Something went wrong on "
             "delete" in caplog.text
         )
 
@@ -2284,24 +2855,75 @@ class TestCloudBackupDelete(object):
             get_cloud_interface_mock,
             backup_metadata,
             out_of_policy_backup_ids,
-            # AND we expect the WALs for each backup to have been cleaned up after each
-            # backup deletion
+            # AND we expect the WALs of both backups to have been deleted in one
+            # request once the backups were deleted
             wals={
-                out_of_policy_backup_ids[0]: [
+                out_of_policy_backup_ids[1]: [
                     "wals/0000000100000000/000000010000000000000075.gz",
                     "wals/0000000100000000/000000010000000000000076.gz",
                     "wals/0000000100000000/000000010000000000000077.gz",
+                    "wals/0000000100000000/000000010000000000000078.gz",
+                    "wals/0000000100000000/000000010000000000000079.gz",
                 ],
-                # AND the WALs which could not be deleted with the first backup are cleaned
-                # up after deletion of the second backup
+            },
+            one_pass=True,
+        )
+
+    @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_backup_delete.get_cloud_interface")
+    def test_delete_by_retention_policy_in_one_pass(
+        self, get_cloud_interface_mock, cloud_backup_catalog_mock
+    ):
+        """
+        Test that the backups which are not needed to meet the retention policy
+        are deleted in one pass over the catalog.
+        """
+        # GIVEN a backup catalog with four backups with begin_wal values
+        out_of_policy_backup_ids = ["20210722T095432", "20210723T095432"]
+        in_policy_backup_ids = ["20210724T095432", "20210725T095432"]
+        begin_wals = {
+            out_of_policy_backup_ids[0]: "000000010000000000000076",
+            out_of_policy_backup_ids[1]: "000000010000000000000078",
+            in_policy_backup_ids[0]: "00000001000000000000007A",
+            in_policy_backup_ids[1]: "00000001000000000000007C",
+        }
+        backup_metadata = self._create_backup_metadata(
+            out_of_policy_backup_ids + in_policy_backup_ids, begin_wals=begin_wals
+        )
+
+        # AND a CloudBackupCatalog which returns the backup_info for only those backups
+        # and a list of WALs spread over two prefixes
+        wals = [
+            "000000010000000000000075",
+            "000000010000000000000079",
+            "00000001000000000000007C",
+            "000000010000000100000001",
+        ]
+        catalog = self._create_catalog(backup_metadata, wals=wals)
+        cloud_backup_catalog_mock.return_value = catalog
+
+        # WHEN barman-cloud-backup-delete runs, specifying a redundancy policy with
+        # two copies
+        cloud_backup_delete.main(
+            ["cloud_storage_url", "test_server", "--retention-policy", "REDUNDANCY 2"]
+        )
+
+        # THEN the WAL prefixes were listed only once
+        assert catalog.get_wal_prefixes.call_count == 1
+
+        # AND the objects of both backups were deleted in one request, followed by
+        # their backup.info files and the WALs they no longer need
+        self._verify_only_these_backups_deleted(
+            get_cloud_interface_mock,
+            backup_metadata,
+            out_of_policy_backup_ids,
+            wals={
                 out_of_policy_backup_ids[1]: [
                     "wals/0000000100000000/000000010000000000000075.gz",
-                    "wals/0000000100000000/000000010000000000000076.gz",
-                    "wals/0000000100000000/000000010000000000000077.gz",
-                    "wals/0000000100000000/000000010000000000000078.gz",
                     "wals/0000000100000000/000000010000000000000079.gz",
                 ],
             },
+            one_pass=True,
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -2388,6 +3010,7 @@ class TestCloudBackupDelete(object):
                     "wals/0000000100000000/000000010000000000000079.gz",
                 ]
             },
+            one_pass=True,
         )
 
     @pytest.mark.parametrize(
@@ -2957,14 +3580,14 @@ class TestCloudBackupDelete(object):
             ]
         )
 
-        # THEN delete_under_prefix was called with check_locks=True and atomic=False
+        # THEN delete_under_prefixes was called with the prefix
         cloud_interface_mock = get_cloud_interface_mock.return_value
-        assert cloud_interface_mock.delete_under_prefix.call_count >= 1
+        assert cloud_interface_mock.delete_under_prefixes.call_count >= 1
 
         # Check that the prefix deletion includes the correct kwargs
         assert (
-            mock.call("wals/0000000100000000/")
-            in cloud_interface_mock.delete_under_prefix.call_args_list
+            mock.call(["wals/0000000100000000/"])
+            in cloud_interface_mock.delete_under_prefixes.call_args_list
         )
 
     @mock.patch("barman.clients.cloud_backup_delete.CloudBackupCatalog")
@@ -62,6 +62,34 @@ class TestCloudCheckWalArchive(object):
             timeline=None,
         )
 
+    @mock.patch("barman.clients.cloud_check_wal_archive.check_archive_usable")
+    @mock.patch("barman.clients.cloud_check_wal_archive.CloudBackupCatalog")
+    @mock.patch("barman.clients.cloud_check_wal_archive.get_cloud_interface")
+    def test_check_wal_archive_wal_listing_cache(
+        self,
+        mock_cloud_interface,
+        mock_cloud_backup_catalog,
+        mock_check_archive_usable,
+        cloud_backup_catalog,
+    ):
+        """Verify the WAL listing cache options are passed to the catalog."""
+        mock_cloud_backup_catalog.return_value = cloud_backup_catalog
+        cloud_check_wal_archive.main(
+            [
+                "cloud_storage_url",
+                "test_server",
+                "--wal-listing-cache",
+                "/var/cache/wals.json",
+                "--refresh-wal-listing-cache",
+            ]
+        )
+        mock_cloud_backup_catalog.assert_called_once_with(
+            mock_cloud_interface.return_value,
+            "test_server",
+            wal_cache_path="/var/cache/wals.json",
+            refresh_wal_cache=True,
+        )
+
     @mock.patch("barman.clients.cloud_check_wal_archive.check_archive_usable")
     @mock.patch("barman.clients.cloud_check_wal_archive.CloudBackupCatalog")
     @mock.patch("barman.clients.cloud_check_wal_archive.get_cloud_interface")
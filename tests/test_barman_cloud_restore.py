@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+
 import mock
 import pytest
 from testing_helpers import build_test_backup_info
@@ -26,7 +28,7 @@ from barman.clients.cloud_restore import (
     CloudBackupDownloaderObjectStore,
     CloudBackupDownloaderSnapshot,
 )
-from barman.cloud import BackupFileInfo
+from barman.cloud import BackupFileInfo, CloudBackupManifest
 from barman.exceptions import RecoveryPreconditionException
 from barman.infofile import load_datetime_tz
 
@@ -92,7 +94,7 @@ class TestCloudRestore(object):
 
         # THEN the backup downloader is called with the expected mock backup_info
         mock_downloader.return_value.download_backup.assert_called_once_with(
-            mock_backup_info, recovery_dir, {}
+            mock_backup_info, recovery_dir, {}, None
         )
 
     @pytest.mark.parametrize(
@@ -655,6 +657,8 @@ class TestCloudBackupDownloaderObjectStore(TestCloudBackupDownloader):
         mock_catalog.get_backup_files.return_value = {
             None: BackupFileInfo(oid=None, path=backup_file_path)
         }
+        # AND the backup has no manifest
+        mock_catalog.get_backup_manifest.return_value = None
         # AND a CloudBackupObjectStoreDownloader
         downloader = CloudBackupDownloaderObjectStore(
             mock_cloud_interface, mock_catalog
@@ -669,9 +673,306 @@ class TestCloudBackupDownloaderObjectStore(TestCloudBackupDownloader):
 
         # THEN the data.tar file is extracted into the recovery dir
         mock_cloud_interface.extract_tar.assert_called_once_with(
-            backup_file_path, recovery_dir
+            backup_file_path, recovery_dir, None, write_jobs=1, preallocate=False
+        )
+
+    @mock.patch("barman.clients.cloud_restore.os.path.exists")
+    def test_download_incremental_backup(
+        self,
+        mock_os_path_exists,
+        backup_info,
+        mock_cloud_interface,
+        mock_catalog,
+    ):
+        """Verify the unchanged files are extracted from the parent backup."""
+        # GIVEN an incremental backup referencing unchanged files of its parent
+        parent_backup_id = "20380119T031407"
+        manifest = CloudBackupManifest(self.backup_id, parent_backup_id, 0)
+        manifest.add_file("data", "base/1/1", 8192, 1.0)
+        manifest.add_file("data", "base/1/2", 8192, 1.0, parent_backup_id)
+        manifest.add_file("16384", "PG_16/1/3", 8192, 1.0, parent_backup_id)
+        mock_catalog.get_backup_manifest.return_value = manifest
+        # AND each backup has a data.tar file and a tablespace tar file
+        backup_info.tablespaces = [mock.Mock(oid=16384, location="/tbs")]
+        backup_info.tablespaces[0].name = "tbs"
+        parent_backup_info = mock.Mock(backup_id=parent_backup_id)
+        mock_catalog.get_backup_info.return_value = parent_backup_info
+
+        def get_backup_files(info):
+            return {
+                None: BackupFileInfo(oid=None, path="%s/data.tar" % info.backup_id),
+                16384: BackupFileInfo(oid=16384, path="%s/16384.tar" % info.backup_id),
+            }
+
+        mock_catalog.get_backup_files.side_effect = get_backup_files
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog
+        )
+        recovery_dir = "/path/to/restore_dir"
+        mock_os_path_exists.side_effect = lambda x: x not in (recovery_dir, "/tbs")
+
+        # WHEN download_backup is called
+        with mock.patch("barman.clients.cloud_restore.os.symlink"):
+            downloader.download_backup(backup_info, recovery_dir, {})
+
+        # THEN the tar files of the backup are extracted first
+        # AND the unchanged files are then extracted from the parent backup
+        mock_catalog.get_backup_info.assert_called_once_with(parent_backup_id)
+        kwargs = {"write_jobs": 1, "preallocate": False}
+        assert mock_cloud_interface.extract_tar.call_args_list == [
+            mock.call("%s/data.tar" % self.backup_id, recovery_dir, None, **kwargs),
+            mock.call("%s/16384.tar" % self.backup_id, "/tbs", None, **kwargs),
+            mock.call(
+                "%s/data.tar" % parent_backup_id, recovery_dir, {"base/1/2"}, **kwargs
+            ),
+            mock.call(
+                "%s/16384.tar" % parent_backup_id, "/tbs", {"PG_16/1/3"}, **kwargs
+            ),
+        ]
+
+    @mock.patch("barman.clients.cloud_restore.CloudChunkStore")
+    def test_download_backup_chunk_store(
+        self,
+        mock_chunk_store,
+        backup_info,
+        mock_cloud_interface,
+        mock_catalog,
+        tmpdir,
+    ):
+        """Verify the files uploaded to the chunk store are rebuilt."""
+        # GIVEN a backup with a relation file uploaded to the chunk store
+        manifest = CloudBackupManifest(self.backup_id, chunk_compression="gz")
+        manifest.add_file("data", "base/1/1", 8, 1.0, chunks=["c1", "c2"], mode=0o640)
+        manifest.add_file("data", "base/1/2", 3, 1.0)
+        mock_catalog.get_backup_manifest.return_value = manifest
+        mock_catalog.get_backup_files.return_value = {
+            None: BackupFileInfo(oid=None, path="data.tar")
+        }
+        backup_info.tablespaces = []
+        backup_info.wal_directory.return_value = "pg_wal"
+        # AND extracting the tar archive creates the directory of the file
+        recovery_dir = tmpdir.join("restore_dir").strpath
+        mock_cloud_interface.extract_tar.side_effect = (
+            lambda key, dst, members, **kwargs: (
+                os.makedirs(os.path.join(dst, "base", "1"))
+            )
+        )
+        # AND the chunk store holds the content of the file
+        mock_chunk_store.return_value.read_file.side_effect = (
+            lambda checksums, fileobj: fileobj.write(
+                b"".join(checksum.encode() for checksum in checksums)
+            )
+        )
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog
+        )
+
+        # WHEN download_backup is called
+        downloader.download_backup(backup_info, recovery_dir, {})
+
+        # THEN the file is rebuilt from the chunks compressed like the backup
+        mock_chunk_store.assert_called_once_with(
+            mock_cloud_interface, "test_server", "gz"
+        )
+        path = os.path.join(recovery_dir, "base", "1", "1")
+        with open(path, "rb") as fileobj:
+            assert fileobj.read() == b"c1c2"
+        # AND its permissions and modification time are restored
+        assert os.stat(path).st_mode & 0o777 == 0o640
+        assert os.stat(path).st_mtime == 1.0
+        # AND the other file is only extracted from the tar archive
+        assert not os.path.exists(os.path.join(recovery_dir, "base", "1", "2"))
+
+    @pytest.fixture
+    def split_backup(self, backup_info, mock_catalog):
+        """A backup whose data directory is split in three tar archives."""
+        file_info = BackupFileInfo(oid=None, path="data.tar")
+        file_info.additional_files = [
+            BackupFileInfo(oid=None, path="data_%04d.tar" % n) for n in (1, 2)
+        ]
+        mock_catalog.get_backup_files.return_value = {None: file_info}
+        mock_catalog.get_backup_manifest.return_value = None
+        backup_info.tablespaces = []
+        backup_info.wal_directory.return_value = "pg_wal"
+        yield backup_info
+
+    def test_download_backup_jobs(
+        self, split_backup, mock_cloud_interface, mock_catalog, tmpdir
+    ):
+        """Verify the tar archives are extracted concurrently with several jobs."""
+        # GIVEN extracting an archive writes a file named after it, recording
+        # the process which extracted it
+        recovery_dir = tmpdir.join("restore_dir").strpath
+
+        def extract_tar(key, dst, members, **kwargs):
+            with open(os.path.join(dst, key), "w") as fileobj:
+                fileobj.write(str(os.getpid()))
+
+        mock_cloud_interface.extract_tar.side_effect = extract_tar
+        os.mkdir(recovery_dir)
+        # AND a downloader running two jobs
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog, jobs=2
         )
 
+        # WHEN download_backup is called
+        downloader.download_backup(split_backup, recovery_dir, {})
+
+        # THEN all the archives are extracted
+        for key in ("data.tar", "data_0001.tar", "data_0002.tar"):
+            with open(os.path.join(recovery_dir, key)) as fileobj:
+                # AND they are extracted by the worker processes
+                assert int(fileobj.read()) != os.getpid()
+
+    def test_download_backup_jobs_error(
+        self, split_backup, mock_cloud_interface, mock_catalog, tmpdir, caplog
+    ):
+        """Verify the errors of the concurrent extractions are reported."""
+        # GIVEN the extraction of two archives fails
+        recovery_dir = tmpdir.join("restore_dir").strpath
+
+        def extract_tar(key, dst, members, **kwargs):
+            if key != "data.tar":
+                raise ValueError("cannot read %s" % key)
+
+        mock_cloud_interface.extract_tar.side_effect = extract_tar
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog, jobs=3
+        )
+
+        # WHEN download_backup is called
+        # THEN the restore fails
+        with pytest.raises(OperationErrorExit):
+            downloader.download_backup(split_backup, recovery_dir, {})
+
+        # AND the failed archives are logged, the ones not started after the
+        # first failure being skipped
+        assert "Cannot extract data_000" in caplog.text
+        assert "Cannot extract data.tar" not in caplog.text
+        assert "of 3 archives could not be extracted" in caplog.text
+        # AND the WAL directory is not created
+        assert not os.path.exists(os.path.join(recovery_dir, "pg_wal"))
+
+    @mock.patch("barman.clients.cloud_restore.PgCombineBackup")
+    def test_download_block_incremental_backup(
+        self, mock_pg_combinebackup, mock_cloud_interface, mock_catalog, tmpdir
+    ):
+        """Verify the backups of the chain are combined with pg_combinebackup."""
+        # GIVEN a full backup and two block-level incremental backups
+        chain_ids = ["20250101T000000", "20250102T000000", "20250103T000000"]
+        manifests = {}
+        backup_infos = {}
+        parent_backup_id = None
+        for backup_id in chain_ids:
+            manifests[backup_id] = CloudBackupManifest(
+                backup_id, parent_backup_id, backup_method="postgres"
+            )
+            backup_infos[backup_id] = build_test_backup_info(
+                backup_id=backup_id,
+                version=170002,
+                tablespaces=[("tbs", 16384, "/tbs")],
+            )
+            parent_backup_id = backup_id
+        tablespace = backup_infos[chain_ids[-1]].tablespaces[0]
+        mock_catalog.get_backup_manifest.side_effect = manifests.get
+        mock_catalog.get_backup_info.side_effect = backup_infos.get
+        mock_catalog.get_backup_files.side_effect = lambda info: {
+            None: BackupFileInfo(oid=None, path="%s/data.tar" % info.backup_id),
+            tablespace.oid: BackupFileInfo(
+                oid=tablespace.oid, path="%s/%s.tar" % (info.backup_id, tablespace.oid)
+            ),
+        }
+
+        # AND a cloud interface extracting the tar files
+        def extract_tar(key, dst, members, **kwargs):
+            os.makedirs(os.path.join(dst, "pg_tblspc"), exist_ok=True)
+
+        mock_cloud_interface.extract_tar.side_effect = extract_tar
+        # AND a pg_combinebackup of the same major version
+        mock_pg_combinebackup.get_version_info.return_value = {
+            "full_path": "/usr/bin/pg_combinebackup",
+            "full_version": "17.2",
+            "major_version": "17",
+        }
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog
+        )
+        recovery_dir = tmpdir.join("recovery").strpath
+        staging_dir = tmpdir.mkdir("staging").strpath
+        tablespace_dir = tmpdir.join("tbs").strpath
+
+        # WHEN download_backup is called for the last backup of the chain,
+        # relocating its tablespace
+        downloader.download_backup(
+            backup_infos[chain_ids[-1]],
+            recovery_dir,
+            {tablespace.name: tablespace_dir},
+            staging_dir,
+        )
+
+        # THEN every backup of the chain was extracted in the staging directory
+        combine_kwargs = mock_pg_combinebackup.call_args[1]
+        backup_dirs = combine_kwargs["args"]
+        assert [os.path.basename(os.path.dirname(d)) for d in backup_dirs] == (
+            chain_ids
+        )
+        kwargs = {"write_jobs": 1, "preallocate": False}
+        extract_tar_calls = []
+        for backup_id, backup_dir in zip(chain_ids, backup_dirs):
+            extract_tar_calls += [
+                mock.call("%s/data.tar" % backup_id, backup_dir, None, **kwargs),
+                mock.call(
+                    "%s/%s.tar" % (backup_id, tablespace.oid),
+                    os.path.join(os.path.dirname(backup_dir), str(tablespace.oid)),
+                    None,
+                    **kwargs
+                ),
+            ]
+        assert mock_cloud_interface.extract_tar.call_args_list == extract_tar_calls
+        # AND pg_combinebackup combined them into the recovery dir
+        assert combine_kwargs["destination"] == recovery_dir
+        assert combine_kwargs["command"] == "/usr/bin/pg_combinebackup"
+        mock_pg_combinebackup.return_value.assert_called_once_with()
+        # AND the tablespace was relocated from its staging location
+        assert combine_kwargs["tbs_mapping"] == {
+            os.path.join(
+                os.path.dirname(backup_dirs[-1]), str(tablespace.oid)
+            ): tablespace_dir
+        }
+        # AND the staging directory was emptied
+        assert os.listdir(staging_dir) == []
+
+    @mock.patch("barman.clients.cloud_restore.PgCombineBackup")
+    def test_download_block_incremental_backup_wrong_version(
+        self, mock_pg_combinebackup, mock_cloud_interface, mock_catalog, tmpdir, caplog
+    ):
+        """Verify pg_combinebackup must match the version of the backup."""
+        # GIVEN a block-level incremental backup of PostgreSQL 17
+        backup_info = build_test_backup_info(
+            backup_id="20250102T000000", version=170002
+        )
+        mock_catalog.get_backup_manifest.return_value = CloudBackupManifest(
+            "20250102T000000", "20250101T000000", backup_method="postgres"
+        )
+        # AND a pg_combinebackup of another major version
+        mock_pg_combinebackup.get_version_info.return_value = {
+            "full_path": "/usr/bin/pg_combinebackup",
+            "full_version": "18.0",
+            "major_version": "18",
+        }
+        downloader = CloudBackupDownloaderObjectStore(
+            mock_cloud_interface, mock_catalog
+        )
+
+        # WHEN download_backup is called
+        # THEN an OperationErrorExit is raised
+        with pytest.raises(OperationErrorExit):
+            downloader.download_backup(backup_info, tmpdir.join("recovery").strpath, {})
+
+        # AND nothing was downloaded
+        mock_cloud_interface.extract_tar.assert_not_called()
+        assert "but pg_combinebackup version is 18" in caplog.text
+
     @mock.patch("barman.clients.cloud_restore.os.listdir")
     @mock.patch("barman.clients.cloud_restore.os.path.exists")
     def test_download_backup_recovery_dir_exists(
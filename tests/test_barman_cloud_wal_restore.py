@@ -16,6 +16,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
+import bz2
+import gzip
+import io
 import logging
 
 import mock
@@ -172,3 +175,270 @@ class TestMain(object):
         assert (
             "Barman cloud WAL restore exception: something went wrong\n" in caplog.text
         )
+
+
+class TestParallelRestore(object):
+    """Tests for the WAL prefetching of barman-cloud-wal-restore."""
+
+    @staticmethod
+    def _list_bucket(available):
+        """Build a list_bucket side effect which only finds the given WALs."""
+
+        def list_bucket(prefix):
+            wal_name = prefix.rsplit("/", 1)[-1]
+            if wal_name in available:
+                return [prefix + available[wal_name]]
+            return []
+
+        return list_bucket
+
+    @staticmethod
+    def _remote_open(available):
+        """Build a remote_open side effect which only opens the given WALs."""
+
+        def remote_open(key, decompressor=None):
+            for wal_name, suffix in available.items():
+                if key.endswith("/" + wal_name + suffix):
+                    return io.BytesIO(key.encode())
+            return None
+
+        return remote_open
+
+    @staticmethod
+    def _download_file(key, dest_path, decompress):
+        with open(dest_path, "w") as dest:
+            dest.write(key)
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_prefetch_next_wals(self, get_cloud_interface_mock, tmpdir):
+        """The following WAL files are downloaded in the spool directory."""
+        # GIVEN a cloud interface with four consecutive WAL files, one of
+        # them partial
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.path = "testfolder/"
+        cloud_interface_mock.list_bucket.side_effect = self._list_bucket(
+            {
+                "000000010000000000000001": "",
+                "000000010000000000000002": ".gz",
+                "000000010000000000000003": "",
+                "000000010000000000000004": ".partial",
+            }
+        )
+        cloud_interface_mock.remote_open.side_effect = self._remote_open(
+            {
+                "000000010000000000000001": "",
+                "000000010000000000000003": "",
+            }
+        )
+        cloud_interface_mock.download_file.side_effect = self._download_file
+        spool_dir = tmpdir.join("spool")
+        wal_dest = tmpdir.join("000000010000000000000001")
+
+        # WHEN the first WAL file is requested with --parallel 5
+        cloud_walrestore.main(
+            [
+                "s3://test-bucket/testfolder/",
+                "test-server",
+                "000000010000000000000001",
+                wal_dest.strpath,
+                "--parallel",
+                "5",
+                "--spool-dir",
+                spool_dir.strpath,
+            ]
+        )
+
+        # THEN the requested WAL file is delivered
+        assert wal_dest.read() == (
+            "testfolder/test-server/wals/0000000100000000/000000010000000000000001"
+        )
+        # AND the following complete WAL files are in the spool directory
+        assert sorted(spool_dir.listdir()) == [
+            spool_dir.join("000000010000000000000002"),
+            spool_dir.join("000000010000000000000003"),
+        ]
+        cloud_interface_mock.download_file.assert_any_call(
+            "testfolder/test-server/wals/0000000100000000/"
+            "000000010000000000000002.gz",
+            mock.ANY,
+            "gzip",
+        )
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_deliver_from_spool(self, get_cloud_interface_mock, tmpdir):
+        """A prefetched WAL file is delivered without contacting the cloud."""
+        spool_dir = tmpdir.mkdir("spool")
+        spool_dir.join("000000010000000000000002").write("prefetched")
+        wal_dest = tmpdir.join("dest")
+
+        cloud_walrestore.main(
+            [
+                "s3://test-bucket/testfolder/",
+                "test-server",
+                "000000010000000000000002",
+                wal_dest.strpath,
+                "--parallel",
+                "3",
+                "--spool-dir",
+                spool_dir.strpath,
+            ]
+        )
+
+        assert wal_dest.read() == "prefetched"
+        assert spool_dir.listdir() == []
+        get_cloud_interface_mock.assert_not_called()
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_prefetch_errors_are_ignored(
+        self, get_cloud_interface_mock, tmpdir, caplog
+    ):
+        """A failure prefetching a WAL file does not fail the restore."""
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.path = "testfolder/"
+        cloud_interface_mock.list_bucket.side_effect = self._list_bucket(
+            {"000000010000000000000001": "", "000000010000000000000002": ""}
+        )
+        cloud_interface_mock.remote_open.return_value = None
+
+        def download_file(key, dest_path, decompress):
+            self._download_file(key, dest_path, decompress)
+            if key.endswith("2"):
+                raise Exception("connection reset")
+
+        cloud_interface_mock.download_file.side_effect = download_file
+        spool_dir = tmpdir.join("spool")
+        wal_dest = tmpdir.join("dest")
+
+        cloud_walrestore.main(
+            [
+                "s3://test-bucket/testfolder/",
+                "test-server",
+                "000000010000000000000001",
+                wal_dest.strpath,
+                "--parallel",
+                "2",
+                "--spool-dir",
+                spool_dir.strpath,
+            ]
+        )
+
+        assert wal_dest.check()
+        # The incomplete download has been removed from the spool directory
+        assert spool_dir.listdir() == []
+        assert (
+            "Error prefetching WAL 000000010000000000000002: connection reset"
+            in caplog.text
+        )
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_fails_if_wal_not_found(self, get_cloud_interface_mock, tmpdir):
+        """A missing WAL file is reported even when prefetching."""
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.path = "testfolder/"
+        cloud_interface_mock.list_bucket.return_value = []
+
+        with pytest.raises(SystemExit) as exc:
+            cloud_walrestore.main(
+                [
+                    "s3://test-bucket/testfolder/",
+                    "test-server",
+                    "000000010000000000000001",
+                    tmpdir.join("dest").strpath,
+                    "--parallel",
+                    "4",
+                    "--spool-dir",
+                    tmpdir.join("spool").strpath,
+                ]
+            )
+        assert exc.value.code == 1
+        cloud_interface_mock.download_file.assert_not_called()
+
+
+class TestCompressionHint(object):
+    """Tests for the listing-free lookup of barman-cloud-wal-restore."""
+
+    wal_dir = "testfolder/test-server/wals/000000080000ABFF/"
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_download_without_listing(self, get_cloud_interface_mock, tmpdir):
+        """The WAL file is fetched directly from the key implied by the hint."""
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.path = "testfolder/"
+        cloud_interface_mock.remote_open.return_value = io.BytesIO(
+            gzip.compress(b"wal content")
+        )
+        wal_dest = tmpdir.join("000000080000ABFF000000C1")
+
+        cloud_walrestore.main(
+            [
+                "s3://test-bucket/testfolder/",
+                "test-server",
+                "000000080000ABFF000000C1",
+                wal_dest.strpath,
+                "--compression-hint",
+                "gzip",
+            ]
+        )
+
+        assert wal_dest.read_binary() == b"wal content"
+        cloud_interface_mock.remote_open.assert_called_once_with(
+            self.wal_dir + "000000080000ABFF000000C1.gz"
+        )
+        cloud_interface_mock.list_bucket.assert_not_called()
+        cloud_interface_mock.download_file.assert_not_called()
+
+    @mock.patch("barman.clients.cloud_walrestore.get_cloud_interface")
+    def test_fallback_to_listing(self, get_cloud_interface_mock, tmpdir):
+        """The archive is listed when the guessed key does not exist."""
+        cloud_interface_mock = get_cloud_interface_mock.return_value
+        cloud_interface_mock.path = "testfolder/"
+        cloud_interface_mock.remote_open.return_value = None
+        cloud_interface_mock.list_bucket.return_value = [
+            self.wal_dir + "000000080000ABFF000000C1.partial"
+        ]
+        wal_dest = tmpdir.join("000000080000ABFF000000C1")
+
+        cloud_walrestore.main(
+            [
+                "s3://test-bucket/testfolder/",
+                "test-server",
+                "000000080000ABFF000000C1",
+                wal_dest.strpath,
+                "--compression-hint",
+                "none",
+            ]
+        )
+
+        cloud_interface_mock.remote_open.assert_called_once_with(
+            self.wal_dir + "000000080000ABFF000000C1"
+        )
+        cloud_interface_mock.download_file.assert_called_once_with(
+            self.wal_dir + "000000080000ABFF000000C1.partial", wal_dest.strpath, None
+        )
+
+    def test_last_seen_compression(self, tmpdir):
+        """The compression found by listing is guessed for the next WAL."""
+        cloud_interface_mock = mock.Mock(path="testfolder/")
+        cloud_interface_mock.list_bucket.return_value = [
+            self.wal_dir + "000000080000ABFF000000C1.bz2"
+        ]
+        cloud_interface_mock.remote_open.return_value = io.BytesIO(
+            bz2.compress(b"wal content")
+        )
+        downloader = cloud_walrestore.CloudWalDownloader(
+            cloud_interface_mock, "test-server"
+        )
+
+        downloader.download_wal(
+            "000000080000ABFF000000C1", tmpdir.join("C1").strpath, False
+        )
+        cloud_interface_mock.remote_open.assert_not_called()
+
+        downloader.download_wal(
+            "000000080000ABFF000000C2", tmpdir.join("C2").strpath, False
+        )
+        cloud_interface_mock.remote_open.assert_called_once_with(
+            self.wal_dir + "000000080000ABFF000000C2.bz2"
+        )
+        cloud_interface_mock.list_bucket.assert_called_once()
+        assert tmpdir.join("C2").read_binary() == b"wal content"
@@ -19,23 +19,38 @@
 import bz2
 import datetime
 import gzip
+import hashlib
+import json
 import logging
+import lzma
 import os
 import shutil
+import stat
 import sys
+import tarfile
+import threading
+import time
 from argparse import Namespace
+from contextlib import contextmanager
 from functools import partial
 from io import BytesIO
+from multiprocessing import shared_memory
 from tarfile import TarFile, TarInfo
 from tarfile import open as open_tar
 from tempfile import NamedTemporaryFile
 from unittest import TestCase
 
 import botocore
+import lz4.frame
 import mock
 import pytest
 import snappy
-from azure.core.exceptions import ResourceNotFoundError, ServiceRequestError
+import zstandard
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+)
 from azure.identity import (
     AzureCliCredential,
     DefaultAzureCredential,
@@ -44,32 +59,57 @@ from azure.identity import (
 from azure.storage.blob import PartialBatchErrorException
 from boto3.exceptions import Boto3Error
 from botocore.exceptions import ClientError, EndpointConnectionError
-from google.api_core.exceptions import Conflict, GoogleAPIError
+from google.api_core.exceptions import (
+    Conflict,
+    GoogleAPIError,
+    NotFound,
+    ServiceUnavailable,
+    TooManyRequests,
+)
 from mock.mock import MagicMock
 
 from barman.annotations import KeepManager
+from barman.clients import cloud_compression
 from barman.clients.cloud_cli import NetworkErrorExit, OperationErrorExit
 from barman.cloud import (
     DEFAULT_DELIMITER,
+    READ_BUFSIZE,
+    BandwidthLimiter,
     CloudBackupCatalog,
+    CloudBackupManifest,
     CloudBackupSnapshot,
     CloudBackupUploader,
     CloudBackupUploaderBarman,
+    CloudBackupUploaderPostgres,
+    CloudChunkStore,
+    CloudPostgresBackupStrategy,
     CloudProviderError,
+    CloudTarExtractor,
     CloudTarUploader,
     CloudUploadController,
     CloudUploadingError,
+    CloudUploadJournal,
+    FileReadahead,
     FileUploadStatistics,
+    PipelinedStreamingIO,
+    RangedReadIO,
+    SharedMemoryPart,
+    ThrottledReader,
 )
 from barman.cloud_providers import (
     CloudProviderOptionUnsupported,
     CloudProviderUnsupported,
     get_cloud_interface,
 )
-from barman.cloud_providers.aws_s3 import S3CloudInterface
+from barman.cloud_providers.aws_s3 import S3CloudInterface, StreamingBodyIO
 from barman.cloud_providers.azure_blob_storage import AzureCloudInterface
 from barman.cloud_providers.google_cloud_storage import GoogleCloudInterface
-from barman.exceptions import BackupPreconditionException
+from barman.exceptions import (
+    BackupException,
+    BackupPreconditionException,
+    BarmanException,
+    ConfigurationException,
+)
 from barman.infofile import BackupInfo, WalFileInfo
 
 if sys.version_info.major > 2:
@@ -110,6 +150,10 @@ def _compression_helper(src, compression):
             shutil.copyfileobj(src, gz)
     elif compression == "bzip2" or compression == "bz2":
         dest = BytesIO(bz2.compress(src.read()))
+    elif compression == "zstd":
+        dest = BytesIO(zstandard.ZstdCompressor().compress(src.read()))
+    elif compression == "lz4":
+        dest = BytesIO(lz4.frame.compress(src.read()))
     elif compression is None:
         dest = BytesIO()
         dest.write(src.read())
@@ -146,7 +190,10 @@ class TestCloudInterface(object):
     def test_ensure_async(self, mp):
         jobs_count = 30
         interface = S3CloudInterface(
-            url="s3://bucket/path/to/dir", encryption=None, jobs=jobs_count
+            url="s3://bucket/path/to/dir",
+            encryption=None,
+            jobs=jobs_count,
+            upload_engine="process",
         )
 
         # Test that the asynchronous uploading infrastructure is getting
@@ -170,6 +217,174 @@ class TestCloudInterface(object):
         assert not mp.Queue.called
         assert not mp.Process.called
 
+    @mock.patch("barman.cloud.multiprocessing")
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface._reinit_session")
+    def test_ensure_async_threads(self, reinit_session_mock, mp):
+        # GIVEN a cloud interface using the thread upload engine
+        interface = S3CloudInterface(
+            url="s3://bucket/path/to/dir",
+            encryption=None,
+            jobs=3,
+            upload_engine="thread",
+        )
+        reinit_session_mock.reset_mock()
+
+        # WHEN the asynchronous uploading infrastructure is created
+        interface._ensure_async()
+
+        # THEN worker threads are started instead of processes
+        assert interface.worker_threads is not None
+        assert len(interface.worker_processes) == 0
+        assert not mp.Manager.called
+        assert not mp.Process.called
+        # AND the queue is bounded by the number of jobs
+        assert interface.queue.maxsize == 3
+
+        # WHEN the interface is closed
+        worker_threads = interface.worker_threads
+        interface.close()
+
+        # THEN the worker threads are stopped without creating new sessions
+        assert worker_threads._shutdown
+        reinit_session_mock.assert_not_called()
+        # AND new workers are started by the next upload
+        assert interface.worker_threads is None
+        assert interface.queue is None
+
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface._upload_part")
+    def test_upload_after_abort_threads(self, upload_part_mock):
+        # GIVEN a cloud interface using the thread upload engine
+        interface = S3CloudInterface(
+            url="s3://bucket/path/to/dir",
+            encryption=None,
+            jobs=1,
+            upload_engine="thread",
+        )
+        upload_part_mock.return_value = {"PartNumber": 1, "ETag": "etag"}
+
+        # AND the uploads have been aborted
+        interface._ensure_async()
+        interface._abort()
+        assert not interface.abort_requested
+
+        # WHEN a part of another upload is uploaded on the same interface
+        interface.async_upload_part(
+            {"UploadId": "upload_id"}, "test/key", BytesIO(b"part content"), 1
+        )
+        interface._retrieve_results()
+        interface.close()
+
+        # THEN the part is uploaded rather than skipped
+        upload_part_mock.assert_called_once()
+        assert interface.parts_db["test/key"] == [{"PartNumber": 1, "ETag": "etag"}]
+
+    @pytest.mark.parametrize(
+        ("interface_class", "url", "upload_engine", "expected_upload_engine"),
+        (
+            (S3CloudInterface, "s3://bucket/path", None, "process"),
+            (S3CloudInterface, "s3://bucket/path", "thread", "thread"),
+            (
+                AzureCloudInterface,
+                "https://account.blob.core.windows.net/container/path",
+                None,
+                "process",
+            ),
+            (
+                AzureCloudInterface,
+                "https://account.blob.core.windows.net/container/path",
+                "thread",
+                "thread",
+            ),
+            (GoogleCloudInterface, "gs://bucket/path", None, "process"),
+            (GoogleCloudInterface, "gs://bucket/path", "thread", "process"),
+        ),
+    )
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage")
+    @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_upload_engine(
+        self,
+        _mock_boto3,
+        _mock_container_client,
+        _mock_storage,
+        interface_class,
+        url,
+        upload_engine,
+        expected_upload_engine,
+    ):
+        # WHEN a cloud interface is created with the specified upload engine
+        interface = interface_class(url=url, upload_engine=upload_engine)
+
+        # THEN the expected engine is used, falling back to the process engine
+        # when the provider does not support threads
+        assert interface.upload_engine == expected_upload_engine
+
+    def test_retrieve_results_throughput(self):
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.queue = Queue()
+        interface.done_queue = Queue()
+        interface.result_queue = Queue()
+        interface.errors_queue = Queue()
+        # GIVEN an upload of two parts, started at a known time
+        stats = FileUploadStatistics(
+            start_time=datetime.datetime(2016, 3, 30, 17, 1, 0),
+        )
+        stats.set_part_size(1, 6 << 20)
+        stats.set_part_size(2, 4 << 20)
+        interface.upload_stats["test/file"] = stats
+
+        # WHEN the upload is completed 10 seconds later
+        interface.done_queue.put(
+            {
+                "key": "test/file",
+                "end_time": datetime.datetime(2016, 3, 30, 17, 1, 10),
+                "status": "done",
+            }
+        )
+        interface._retrieve_results()
+
+        # THEN the statistics report the size and the achieved throughput
+        assert stats["status"] == "done"
+        assert stats["size"] == 10 << 20
+        assert stats["throughput"] == 1 << 20
+
+    def test_wait_for_multipart_upload_with_lock(self):
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.RESULTS_POLL_INTERVAL = 0
+        interface.queue = mock.Mock()
+        interface.done_queue = Queue()
+        interface.result_queue = Queue()
+        interface.errors_queue = Queue()
+        interface.upload_stats["test/file"] = FileUploadStatistics(
+            status="uploading",
+            start_time=datetime.datetime(2016, 3, 30, 17, 1, 0),
+        )
+        lock = threading.RLock()
+
+        # GIVEN an upload which is completed by a worker after a few polls
+        polls = []
+
+        def sleep(interval):
+            polls.append(interval)
+            if len(polls) == 3:
+                interface.done_queue.put(
+                    {
+                        "key": "test/file",
+                        "end_time": datetime.datetime(2016, 3, 30, 17, 1, 10),
+                        "status": "done",
+                    }
+                )
+
+        # WHEN waiting for the upload with a lock shared with other threads
+        with mock.patch("barman.cloud.time.sleep", side_effect=sleep):
+            stats = interface.wait_for_multipart_upload("test/file", lock=lock)
+
+        # THEN the upload statistics are returned once it is done
+        assert stats["status"] == "done"
+        assert len(polls) == 3
+        # AND we never waited for the jobs queued by the other threads
+        interface.queue.join.assert_not_called()
+
     def test_retrieve_results(self):
         interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
         interface.queue = Queue()
@@ -423,8 +638,237 @@ class TestCloudInterface(object):
             "key": "test/key",
             "body": tmp_file.name,
             "part_number": 1,
+            "bandwidth_group": None,
         }
 
+    @mock.patch("barman.cloud.CloudInterface._handle_async_errors")
+    @mock.patch("barman.cloud.CloudInterface._ensure_async")
+    def test_async_upload_part_in_memory(
+        self, _ensure_async_mock, _handle_async_errors_mock
+    ):
+        # GIVEN a part buffered in memory
+        body = BytesIO(b"part content")
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.queue = Queue()
+        interface.result_queue = Queue()
+        interface.done_queue = Queue()
+
+        # WHEN the part is uploaded asynchronously
+        interface.async_upload_part({"UploadId": "upload_id"}, "test/key", body, 1)
+
+        # THEN the task references a shared memory segment instead of a file
+        task = interface.queue.get()
+        assert "body" not in task
+        assert task["size"] == len(b"part content")
+        # AND the segment holds the content of the part
+        with SharedMemoryPart(task["shared_memory"], task["size"]) as part:
+            assert part.read() == b"part content"
+        # AND the segment is kept by the parent until the part is uploaded
+        assert interface.shared_memory_parts == {("test/key", 1): task["shared_memory"]}
+        shared_memory.SharedMemory(name=task["shared_memory"]).close()
+
+        # WHEN a worker reports the part as uploaded
+        interface.result_queue.put(
+            {
+                "key": "test/key",
+                "part_number": 1,
+                "end_time": datetime.datetime.now(),
+                "part": {"ETag": "etag", "PartNumber": 1},
+            }
+        )
+        interface._collect_results()
+
+        # THEN the segment is removed
+        assert interface.shared_memory_parts == {}
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=task["shared_memory"])
+
+    def test_close_unlinks_shared_memory_parts(self):
+        # GIVEN a part held in a shared memory segment which was never uploaded
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        name = SharedMemoryPart.create(BytesIO(b"part content"))
+        interface.shared_memory_parts[("test/key", 1)] = name
+
+        # WHEN the cloud interface is closed
+        interface.close()
+
+        # THEN the segment is removed
+        assert interface.shared_memory_parts == {}
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    @mock.patch("barman.cloud.CloudInterface._handle_async_errors")
+    @mock.patch("barman.cloud.CloudInterface._ensure_async")
+    def test_async_upload_part_in_memory_threads(
+        self, _ensure_async_mock, _handle_async_errors_mock
+    ):
+        # GIVEN a part buffered in memory
+        body = BytesIO(b"part content")
+        # AND a cloud interface running worker threads
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.queue = Queue()
+        interface.worker_threads = mock.Mock()
+
+        # WHEN the part is uploaded asynchronously
+        interface.async_upload_part({"UploadId": "upload_id"}, "test/key", body, 1)
+
+        # THEN the content of the part is passed directly to the workers
+        task = interface.queue.get()
+        assert task["buffer"] == b"part content"
+        assert "body" not in task
+        assert "shared_memory" not in task
+
+    @mock.patch("barman.cloud.CloudInterface._handle_async_errors")
+    @mock.patch("barman.cloud.CloudInterface._ensure_async")
+    def test_async_upload_fileobj(self, _ensure_async_mock, _handle_async_errors_mock):
+        # GIVEN an object held in memory
+        body = BytesIO(b"object content")
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.queue = Queue()
+        interface.result_queue = Queue()
+        interface.done_queue = Queue()
+
+        # WHEN the object is uploaded asynchronously
+        interface.async_upload_fileobj(body, "test/key")
+
+        # THEN the task references a shared memory segment holding the object
+        task = interface.queue.get()
+        assert task["job_type"] == "upload_fileobj"
+        with SharedMemoryPart(task["shared_memory"], task["size"]) as part:
+            assert part.read() == b"object content"
+        assert interface.shared_memory_parts == {
+            ("test/key", None): task["shared_memory"]
+        }
+        shared_memory.SharedMemory(name=task["shared_memory"]).close()
+
+        # WHEN a worker reports the object as uploaded
+        interface.done_queue.put(
+            {"key": "test/key", "end_time": datetime.datetime.now(), "status": "done"}
+        )
+        interface._collect_results()
+
+        # THEN the segment is removed
+        assert interface.shared_memory_parts == {}
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=task["shared_memory"])
+        # AND no upload statistics are kept for the object
+        assert "test/key" not in interface.upload_stats
+
+    @mock.patch("barman.cloud.BandwidthLimiter")
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface.upload_fileobj")
+    def test_async_upload_fileobj_threads(self, upload_fileobj_mock, mock_limiter):
+        # GIVEN a cloud interface using the thread upload engine
+        interface = S3CloudInterface(
+            url="s3://bucket/path/to/dir",
+            encryption=None,
+            jobs=2,
+            upload_engine="thread",
+        )
+        # AND a global bandwidth limit
+        interface.set_bandwidth_limit(100)
+        uploaded = {}
+        upload_fileobj_mock.side_effect = lambda body, key: uploaded.update(
+            {key: body.read()}
+        )
+
+        # WHEN two objects are uploaded asynchronously and awaited
+        interface.async_upload_fileobj(BytesIO(b"first"), "test/key1")
+        interface.async_upload_fileobj(BytesIO(b"second"), "test/key2")
+        interface.wait_for_async_uploads()
+        interface.close()
+
+        # THEN both objects are uploaded by the workers
+        assert uploaded == {"test/key1": b"first", "test/key2": b"second"}
+        # AND their bytes are throttled by the global limit
+        assert sum(
+            call[0][0] for call in mock_limiter.return_value.consume.call_args_list
+        ) == len(b"firstsecond")
+
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface._upload_part")
+    def test_worker_process_execute_job_shared_memory(self, upload_part_mock):
+        # GIVEN a part held in a shared memory segment
+        name = SharedMemoryPart.create(BytesIO(b"part content"))
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.result_queue = Queue()
+        uploaded = []
+        upload_part_mock.side_effect = lambda _m, _k, body, _n: uploaded.append(
+            body.read()
+        )
+
+        # WHEN the upload_part job is executed
+        interface._worker_process_execute_job(
+            {
+                "job_type": "upload_part",
+                "upload_metadata": {"UploadId": "upload_id"},
+                "part_number": 1,
+                "key": "this/key",
+                "shared_memory": name,
+                "size": len(b"part content"),
+            },
+            0,
+        )
+
+        # THEN the content of the segment is uploaded
+        assert uploaded == [b"part content"]
+        assert not interface.result_queue.empty()
+        # AND the segment is left to the parent process, which unlinks it
+        SharedMemoryPart.unlink(name)
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    @pytest.mark.parametrize(
+        ("bandwidth_group", "expected_limiters"),
+        ((None, [None]), ("tbs1", [None, "tbs1"]), ("tbs2", [None])),
+    )
+    @mock.patch("barman.cloud.BandwidthLimiter")
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface._upload_part")
+    def test_worker_process_execute_job_bandwidth_limit(
+        self, upload_part_mock, mock_limiter, bandwidth_group, expected_limiters
+    ):
+        # GIVEN a global bandwidth limit and a limit for the tbs1 group
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.result_queue = Queue()
+        limiters = {None: mock.Mock(), "tbs1": mock.Mock()}
+        mock_limiter.side_effect = [limiters[None], limiters["tbs1"]]
+        interface.set_bandwidth_limit(100)
+        interface.set_bandwidth_limit(10, group="tbs1")
+        uploaded = []
+        upload_part_mock.side_effect = lambda _m, _k, body, _n: uploaded.append(
+            body.read()
+        )
+
+        # WHEN a part of the bandwidth group is uploaded
+        interface._worker_process_execute_job(
+            {
+                "job_type": "upload_part",
+                "upload_metadata": {"UploadId": "upload_id"},
+                "part_number": 1,
+                "key": "this/key",
+                "buffer": b"part content",
+                "bandwidth_group": bandwidth_group,
+            },
+            0,
+        )
+
+        # THEN the part is uploaded
+        assert uploaded == [b"part content"]
+        # AND only the limiters of the part consume its bytes
+        for group, limiter in limiters.items():
+            if group in expected_limiters:
+                limiter.consume.assert_called_once_with(len(b"part content"))
+            else:
+                limiter.consume.assert_not_called()
+
+    def test_set_bandwidth_limit_running_workers(self):
+        # GIVEN a cloud interface whose worker processes are running
+        interface = S3CloudInterface(url="s3://bucket/path/to/dir", encryption=None)
+        interface.worker_processes = [mock.Mock()]
+
+        # WHEN a bandwidth limit is set
+        # THEN it is refused, as the workers would not share it
+        with pytest.raises(ValueError):
+            interface.set_bandwidth_limit(100)
+
     @mock.patch("barman.cloud.CloudInterface._retrieve_results")
     @mock.patch("barman.cloud.CloudInterface._handle_async_errors")
     @mock.patch("barman.cloud.CloudInterface._ensure_async")
@@ -1211,6 +1655,174 @@ class TestS3CloudInterface(object):
 
         mock_delete_obj.assert_not_called()
 
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_objects_throttled(
+        self, boto_mock, sleep_mock, client_error_factory
+    ):
+        """Test the batches throttled by S3 are retried with a backoff."""
+        # GIVEN an S3 bucket which throttles the first two deletion requests
+        cloud_interface = S3CloudInterface("s3://bucket/path/to/dir", encryption=None)
+        s3_client = boto_mock.Session.return_value.resource.return_value.meta.client
+        s3_client.delete_objects.side_effect = [
+            client_error_factory("SlowDown", "Please reduce your request rate."),
+            client_error_factory("SlowDown", "Please reduce your request rate."),
+            {},
+        ]
+
+        # WHEN the objects are deleted
+        cloud_interface.delete_objects(["path/to/object/1"])
+
+        # THEN the request was retried until it succeeded
+        assert s3_client.delete_objects.call_count == 3
+        # AND each retry waited for the backoff delay
+        assert sleep_mock.call_count == 2
+        assert all(0 < c[0][0] <= 1 for c in sleep_mock.call_args_list)
+
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_objects_throttled_keys(self, boto_mock, sleep_mock):
+        """Test only the objects throttled in a batch response are retried."""
+        # GIVEN an S3 bucket which throttles the deletion of one of the objects
+        # of a batch in a successful response
+        cloud_interface = S3CloudInterface("s3://bucket/path/to/dir", encryption=None)
+        s3_client = boto_mock.Session.return_value.resource.return_value.meta.client
+        s3_client.delete_objects.side_effect = [
+            {
+                "Errors": [
+                    {
+                        "Key": "path/to/object/2",
+                        "Code": "SlowDown",
+                        "Message": "Please reduce your request rate.",
+                    }
+                ]
+            },
+            {},
+        ]
+
+        # WHEN the objects are deleted
+        cloud_interface.delete_objects(["path/to/object/1", "path/to/object/2"])
+
+        # THEN only the throttled object is deleted again after the backoff delay
+        assert [
+            c[1]["Delete"]["Objects"] for c in s3_client.delete_objects.call_args_list
+        ] == [
+            [{"Key": "path/to/object/1"}, {"Key": "path/to/object/2"}],
+            [{"Key": "path/to/object/2"}],
+        ]
+        assert sleep_mock.call_count == 1
+
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_objects_throttled_keys_with_errors(
+        self, boto_mock, sleep_mock, caplog
+    ):
+        """Test a batch with throttled and failed objects is not retried."""
+        # GIVEN an S3 bucket which throttles the deletion of an object of a
+        # batch and denies the deletion of another one
+        cloud_interface = S3CloudInterface("s3://bucket/path/to/dir", encryption=None)
+        s3_client = boto_mock.Session.return_value.resource.return_value.meta.client
+        s3_client.delete_objects.return_value = {
+            "Errors": [
+                {
+                    "Key": "path/to/object/1",
+                    "Code": "AccessDenied",
+                    "Message": "Access Denied",
+                },
+                {
+                    "Key": "path/to/object/2",
+                    "Code": "SlowDown",
+                    "Message": "Please reduce your request rate.",
+                },
+            ]
+        }
+
+        # WHEN the objects are deleted
+        # THEN the deletion fails without being retried
+        with pytest.raises(CloudProviderError):
+            cloud_interface.delete_objects(["path/to/object/1", "path/to/object/2"])
+        assert s3_client.delete_objects.call_count == 1
+        sleep_mock.assert_not_called()
+        # AND both errors are logged
+        assert '"AccessDenied"' in caplog.text
+        assert '"SlowDown"' in caplog.text
+
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_objects_throttled_too_many_times(
+        self, boto_mock, _sleep_mock, client_error_factory
+    ):
+        """Test the throttling errors are raised once the retries are exhausted."""
+        cloud_interface = S3CloudInterface("s3://bucket/path/to/dir", encryption=None)
+        s3_client = boto_mock.Session.return_value.resource.return_value.meta.client
+        s3_client.delete_objects.side_effect = client_error_factory(
+            "SlowDown", "Please reduce your request rate."
+        )
+
+        with pytest.raises(botocore.exceptions.ClientError):
+            cloud_interface.delete_objects(["path/to/object/1"])
+
+        assert (
+            s3_client.delete_objects.call_count
+            == cloud_interface.THROTTLING_RETRIES + 1
+        )
+
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_objects_concurrently(self, boto_mock):
+        """Test the batches are deleted by several threads with delete_jobs."""
+        # GIVEN an S3CloudInterface deleting four batches at a time
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/path/to/dir",
+            encryption=None,
+            delete_batch_size=1,
+            delete_jobs=4,
+        )
+        s3_client = boto_mock.Session.return_value.resource.return_value.meta.client
+        # AND a deletion request which is slow
+        threads = set()
+
+        def delete_objects(**kwargs):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.01)
+            return {}
+
+        s3_client.delete_objects.side_effect = delete_objects
+
+        # WHEN eight objects are deleted
+        cloud_interface.delete_objects(["path/to/object/%s" % i for i in range(8)])
+
+        # THEN each object was deleted by its own request
+        assert s3_client.delete_objects.call_count == 8
+        # AND the requests were sent by several threads
+        assert len(threads) > 1
+
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.aws_s3.S3CloudInterface.delete_under_prefix")
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_delete_under_prefixes(
+        self, _boto_mock, delete_under_prefix_mock, _sleep_mock, client_error_factory
+    ):
+        """Test each prefix is deleted, retrying the throttled deletions."""
+        # GIVEN a first deletion of a prefix which is throttled
+        cloud_interface = S3CloudInterface("s3://bucket/path/to/dir", encryption=None)
+        delete_under_prefix_mock.side_effect = [
+            client_error_factory("SlowDown", "Please reduce your request rate."),
+            None,
+            None,
+        ]
+
+        # WHEN two prefixes are deleted
+        cloud_interface.delete_under_prefixes(
+            ["wals/0000000100000000/", "wals/0000000100000001/"], check_locks=True
+        )
+
+        # THEN the throttled deletion was retried
+        assert delete_under_prefix_mock.call_args_list == [
+            mock.call("wals/0000000100000000/", check_locks=True),
+            mock.call("wals/0000000100000000/", check_locks=True),
+            mock.call("wals/0000000100000001/", check_locks=True),
+        ]
+
     @pytest.mark.parametrize("prefix", ["/", "", "/something/prefix"])
     def test_delete_under_prefix_raise_ValueError(self, prefix, caplog):
         """
@@ -1428,7 +2040,14 @@ class TestS3CloudInterface(object):
 
     @pytest.mark.parametrize(
         ("compression", "file_ext"),
-        ((None, ""), ("bzip2", ".bz2"), ("gzip", ".gz"), ("snappy", ".snappy")),
+        (
+            (None, ""),
+            ("bzip2", ".bz2"),
+            ("gzip", ".gz"),
+            ("snappy", ".snappy"),
+            ("zstd", ".zst"),
+            ("lz4", ".lz4"),
+        ),
     )
     @mock.patch("barman.cloud_providers.aws_s3.boto3")
     def test_extract_tar(self, boto_mock, compression, file_ext, tmpdir):
@@ -1461,40 +2080,154 @@ class TestS3CloudInterface(object):
         with open(os.path.join(str(tmpdir), content_filename), "r") as f:
             assert f.read() == content
 
-    @pytest.mark.parametrize(
-        # mock_page_data is a list of tuples of (CommonPrefixes, Contents) values
-        # where CommonPrefixes and Contents are lists of the prefixes and keys to
-        # be returned when `get` is called on that page.
-        ("mock_page_data", "expected_values"),
-        (
-            # If common prefixes and contents are empty then we expect no items
-            # to be returned
-            ((([], []),), []),
-            # If there are only common prefixes then we expect to see only those
-            # prefixes
-            (
-                [
-                    (["/a/common/prefix/", "/another/common/prefix/"], []),
-                ],
-                ["/a/common/prefix/", "/another/common/prefix/"],
-            ),
-            # If there are only objects then we expect to see only those objects
-            (
-                [
-                    ([], ["/an/object", "/another/object"]),
-                ],
-                ["/an/object", "/another/object"],
-            ),
-            # If there are both prefixes and objects then we expect to see the
-            # prefixes, then the objects
-            (
-                [
-                    (
-                        ["/a/common/prefix/", "/another/common/prefix/"],
-                        ["/an/object", "/another/object"],
-                    ),
-                ],
-                [
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_extract_tar_members(self, boto_mock, tmpdir):
+        """Verifies that cloud_interface.extract_tar only extracts members."""
+        # GIVEN a tar file containing two files
+        tar_fileobj = BytesIO()
+        with TarFile.open(mode="w|", fileobj=tar_fileobj) as tf:
+            for name in ("wanted", "unwanted"):
+                ti = TarInfo(name=name)
+                ti.size = len(name)
+                tf.addfile(ti, BytesIO(name.encode("utf-8")))
+        tar_fileobj.seek(0)
+        object_key = "/arbitrary/object/key.tar"
+        # AND it is returned by a cloud interface
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/%s" % object_key, encryption=None
+        )
+        session_mock = boto_mock.Session.return_value
+        s3_mock = session_mock.resource.return_value
+        s3_mock.Object.return_value.get.return_value = {"Body": tar_fileobj}
+
+        # WHEN only one member is extracted
+        cloud_interface.extract_tar(object_key, str(tmpdir), {"wanted"})
+
+        # THEN only that member is in the destination directory
+        assert os.listdir(str(tmpdir)) == ["wanted"]
+
+    @mock.patch("barman.cloud.os.makedirs", wraps=os.makedirs)
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_extract_tar_parent_directories(self, boto_mock, mock_makedirs, tmpdir):
+        """Verifies the parent directories are created before the members."""
+        # GIVEN a tar file containing a file whose directory is in another tar
+        tar_fileobj = BytesIO()
+        with TarFile.open(mode="w|", fileobj=tar_fileobj) as tf:
+            ti = TarInfo(name="base/1/1")
+            ti.size = 4
+            tf.addfile(ti, BytesIO(b"data"))
+        tar_fileobj.seek(0)
+        object_key = "/arbitrary/object/key.tar"
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/%s" % object_key, encryption=None
+        )
+        session_mock = boto_mock.Session.return_value
+        s3_mock = session_mock.resource.return_value
+        s3_mock.Object.return_value.get.return_value = {"Body": tar_fileobj}
+        # AND the directory has already been created by a concurrent extraction
+        tmpdir.mkdir("base").mkdir("1")
+
+        # WHEN the tar file is extracted
+        cloud_interface.extract_tar(object_key, str(tmpdir))
+
+        # THEN the existing directory is tolerated
+        mock_makedirs.assert_called_once_with(
+            os.path.join(str(tmpdir), "base", "1"), exist_ok=True
+        )
+        # AND the file is extracted
+        assert tmpdir.join("base", "1", "1").read() == "data"
+
+    @mock.patch.object(RangedReadIO, "RANGE_SIZE", 100)
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_remote_open_ranged(self, boto_mock):
+        """Verifies a large object is read with concurrent ranged GETs."""
+        # GIVEN an object spanning several ranges
+        content = bytes(range(256)) * 2
+        s3_mock = boto_mock.Session.return_value.resource.return_value
+        s3_mock.Object.return_value.content_length = len(content)
+
+        def get_object(Bucket, Key, Range):
+            start, end = Range[len("bytes=") :].split("-")
+            return {"Body": BytesIO(content[int(start) : int(end) + 1])}
+
+        s3_mock.meta.client.get_object.side_effect = get_object
+        # AND a cloud interface with several read jobs
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/path/to/dir", encryption=None, read_jobs=3
+        )
+
+        # WHEN the object is opened
+        resp = cloud_interface.remote_open("path/to/object")
+
+        # THEN its content is read with ranged GETs
+        assert isinstance(resp, RangedReadIO)
+        assert resp.read() == content
+        assert s3_mock.meta.client.get_object.call_count == 6
+        s3_mock.Object.return_value.get.assert_not_called()
+
+    @pytest.mark.parametrize(("read_jobs", "size"), ((1, 1000), (3, 100)))
+    @mock.patch.object(RangedReadIO, "RANGE_SIZE", 100)
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_remote_open_single_stream(self, boto_mock, read_jobs, size):
+        """Verifies an object is read in a single stream when not worth it."""
+        s3_mock = boto_mock.Session.return_value.resource.return_value
+        s3_mock.Object.return_value.content_length = size
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/path/to/dir", encryption=None, read_jobs=read_jobs
+        )
+
+        resp = cloud_interface.remote_open("path/to/object")
+
+        assert isinstance(resp, StreamingBodyIO)
+        s3_mock.meta.client.get_object.assert_not_called()
+
+    @mock.patch("barman.cloud_providers.aws_s3.boto3")
+    def test_remote_open_ranged_missing(self, boto_mock):
+        """Verifies None is returned when the object to read does not exist."""
+        s3_mock = boto_mock.Session.return_value.resource.return_value
+        type(s3_mock.Object.return_value).content_length = mock.PropertyMock(
+            side_effect=ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        )
+        cloud_interface = S3CloudInterface(
+            "s3://bucket/path/to/dir", encryption=None, read_jobs=3
+        )
+
+        assert cloud_interface.remote_open("path/to/object") is None
+
+    @pytest.mark.parametrize(
+        # mock_page_data is a list of tuples of (CommonPrefixes, Contents) values
+        # where CommonPrefixes and Contents are lists of the prefixes and keys to
+        # be returned when `get` is called on that page.
+        ("mock_page_data", "expected_values"),
+        (
+            # If common prefixes and contents are empty then we expect no items
+            # to be returned
+            ((([], []),), []),
+            # If there are only common prefixes then we expect to see only those
+            # prefixes
+            (
+                [
+                    (["/a/common/prefix/", "/another/common/prefix/"], []),
+                ],
+                ["/a/common/prefix/", "/another/common/prefix/"],
+            ),
+            # If there are only objects then we expect to see only those objects
+            (
+                [
+                    ([], ["/an/object", "/another/object"]),
+                ],
+                ["/an/object", "/another/object"],
+            ),
+            # If there are both prefixes and objects then we expect to see the
+            # prefixes, then the objects
+            (
+                [
+                    (
+                        ["/a/common/prefix/", "/another/common/prefix/"],
+                        ["/an/object", "/another/object"],
+                    ),
+                ],
+                [
                     "/a/common/prefix/",
                     "/another/common/prefix/",
                     "/an/object",
@@ -2272,6 +3005,24 @@ class TestAzureCloudInterface(object):
         )
         blob_client_mock.delete_blob.assert_called_once_with()
 
+    @pytest.mark.parametrize(
+        ("status_code", "throttled"), ((429, True), (503, True), (500, False))
+    )
+    @mock.patch.dict(
+        os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
+    )
+    @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
+    def test_is_throttling_error(self, _container_client_mock, status_code, throttled):
+        """Test the throttling responses of Azure are recognised."""
+        cloud_interface = AzureCloudInterface(
+            "https://storageaccount.blob.core.windows.net/container/path/to/blob"
+        )
+        exc = HttpResponseError(
+            message="busy", response=mock.Mock(status_code=status_code)
+        )
+        assert cloud_interface._is_throttling_error(exc) is throttled
+        assert cloud_interface._is_throttling_error(Exception("busy")) is False
+
     @mock.patch.dict(
         os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
     )
@@ -2440,6 +3191,74 @@ class TestAzureCloudInterface(object):
             'Deletion of object path/to/object/1 failed with error code: "403"'
         ) in caplog.text
 
+    @pytest.mark.parametrize("partial_batch_error", (False, True))
+    @mock.patch.dict(
+        os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
+    )
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
+    def test_delete_objects_throttled_subresponses(
+        self, container_client_mock, sleep_mock, partial_batch_error
+    ):
+        """Test only the objects throttled in the sub-responses are retried."""
+        # GIVEN a container which throttles the deletion of one of the objects
+        # of a batch
+        cloud_interface = AzureCloudInterface(
+            "https://storageaccount.blob.core.windows.net/container/path/to/blob"
+        )
+        container_client = container_client_mock.from_connection_string.return_value
+        parts = iter(
+            [
+                self._create_mock_HttpResponse(202, "path/to/object/1"),
+                self._create_mock_HttpResponse(503, "path/to/object/2"),
+            ]
+        )
+        container_client.delete_blobs.side_effect = [
+            (
+                PartialBatchErrorException("something went wrong", None, parts)
+                if partial_batch_error
+                else parts
+            ),
+            iter([self._create_mock_HttpResponse(202, "path/to/object/2")]),
+        ]
+
+        # WHEN the objects are deleted
+        cloud_interface.delete_objects(["path/to/object/1", "path/to/object/2"])
+
+        # THEN only the throttled object is deleted again after the backoff delay
+        assert [c[0] for c in container_client.delete_blobs.call_args_list] == [
+            ("path/to/object/1", "path/to/object/2"),
+            ("path/to/object/2",),
+        ]
+        assert sleep_mock.call_count == 1
+
+    @mock.patch.dict(
+        os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
+    )
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
+    def test_delete_objects_throttled_subresponses_too_many_times(
+        self, container_client_mock, _sleep_mock
+    ):
+        """Test the deletion fails once the retries are exhausted."""
+        # GIVEN a container which always throttles the deletion of an object
+        cloud_interface = AzureCloudInterface(
+            "https://storageaccount.blob.core.windows.net/container/path/to/blob"
+        )
+        container_client = container_client_mock.from_connection_string.return_value
+        container_client.delete_blobs.side_effect = lambda *paths: iter(
+            [self._create_mock_HttpResponse(429, path) for path in paths]
+        )
+
+        # WHEN the objects are deleted
+        # THEN the deletion fails after the last retry
+        with pytest.raises(CloudProviderError):
+            cloud_interface.delete_objects(["path/to/object/1"])
+        assert (
+            container_client.delete_blobs.call_count
+            == cloud_interface.THROTTLING_RETRIES + 1
+        )
+
     @mock.patch.dict(
         os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
     )
@@ -2567,6 +3386,39 @@ class TestAzureCloudInterface(object):
         with open(os.path.join(str(tmpdir), content_filename), "r") as f:
             assert f.read() == content
 
+    @mock.patch.object(RangedReadIO, "RANGE_SIZE", 100)
+    @mock.patch.dict(
+        os.environ, {"AZURE_STORAGE_CONNECTION_STRING": "connection_string"}
+    )
+    @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
+    def test_remote_open_ranged(self, container_client_mock):
+        """Verifies a large blob is read with concurrent ranged GETs."""
+        # GIVEN a blob spanning several ranges
+        content = bytes(range(256)) * 2
+        container_client = container_client_mock.from_connection_string.return_value
+        blob_client = container_client.get_blob_client.return_value
+        blob_client.get_blob_properties.return_value.size = len(content)
+
+        def download_blob(key, offset, length):
+            return mock.Mock(
+                readall=mock.Mock(return_value=content[offset : offset + length])
+            )
+
+        container_client.download_blob.side_effect = download_blob
+        # AND a cloud interface with several read jobs
+        cloud_interface = AzureCloudInterface(
+            "https://storageaccount.blob.core.windows.net/container/path/to/blob",
+            read_jobs=3,
+        )
+
+        # WHEN the blob is opened
+        resp = cloud_interface.remote_open("path/to/blob")
+
+        # THEN its content is read with ranged GETs
+        assert resp.read() == content
+        container_client.get_blob_client.assert_called_once_with("path/to/blob")
+        assert container_client.download_blob.call_count == 6
+
     @mock.patch("barman.cloud_providers.azure_blob_storage.ContainerClient")
     def test_get_prefixes(self, _container_client_mock):
         """Verify that get_prefixes raises a NotImplementedError"""
@@ -2952,6 +3804,74 @@ class TestGoogleCloudInterface(TestCase):
         mock_calls = list(map(lambda x: mock.call(x), mock_keys))
         container_client_mock.blob.assert_has_calls(mock_calls, any_order=True)
 
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage.Client")
+    def test_is_throttling_error(self, _gcs_client_mock):
+        """Test the throttling responses of Google Cloud Storage are recognised."""
+        cloud_interface = GoogleCloudInterface(
+            "https://console.cloud.google.com/storage/browser/barman-test/path/to/object/"
+        )
+        self.assertTrue(cloud_interface._is_throttling_error(TooManyRequests("busy")))
+        self.assertTrue(
+            cloud_interface._is_throttling_error(ServiceUnavailable("busy"))
+        )
+        self.assertFalse(cloud_interface._is_throttling_error(NotFound("missing")))
+
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage.Client")
+    def test_delete_objects_concurrently(self, gcs_client_mock):
+        """Test the batches of the shared storage client are sent one at a time."""
+        # GIVEN a GoogleCloudInterface deleting four batches at a time
+        cloud_interface = GoogleCloudInterface(
+            "https://console.cloud.google.com/storage/browser/barman-test/path/to/object/",
+            delete_batch_size=1,
+            delete_jobs=4,
+        )
+        # AND a storage client whose batches are slow
+        open_batches = []
+        max_open_batches = []
+
+        @contextmanager
+        def batch():
+            open_batches.append(None)
+            max_open_batches.append(len(open_batches))
+            time.sleep(0.01)
+            yield
+            open_batches.pop()
+
+        gcs_client_mock.return_value.batch.side_effect = batch
+
+        # WHEN eight objects are deleted
+        cloud_interface.delete_objects(["path/to/object/%s" % i for i in range(8)])
+
+        # THEN each object was deleted in its own batch
+        self.assertEqual(8, len(max_open_batches))
+        # AND no batch was open while another one was being sent
+        self.assertEqual(1, max(max_open_batches))
+
+    @mock.patch("barman.cloud.time.sleep")
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage.Client")
+    def test_delete_objects_throttled_blobs(self, gcs_client_mock, sleep_mock):
+        """Test only the blobs whose deletion was throttled are retried."""
+        # GIVEN a bucket which throttles the first deletion of a blob
+        mock_blob1 = mock.MagicMock()
+        mock_blob2 = mock.MagicMock()
+        mock_blob2.delete.side_effect = [TooManyRequests("busy"), None]
+        container_client_mock = gcs_client_mock.return_value.bucket.return_value
+        container_client_mock.blob.side_effect = {
+            "path/to/object/1": mock_blob1,
+            "path/to/object/2": mock_blob2,
+        }.get
+        cloud_interface = GoogleCloudInterface(
+            "https://console.cloud.google.com/storage/browser/barman-test/path/to/object/"
+        )
+
+        # WHEN the objects are deleted
+        cloud_interface.delete_objects(["path/to/object/1", "path/to/object/2"])
+
+        # THEN only the throttled blob is deleted again after the backoff delay
+        mock_blob1.delete.assert_called_once()
+        self.assertEqual(2, mock_blob2.delete.call_count)
+        self.assertEqual(1, sleep_mock.call_count)
+
     @mock.patch("barman.cloud_providers.google_cloud_storage._logger")
     @mock.patch("barman.cloud_providers.google_cloud_storage.storage.Client")
     def test_delete_objects_with_error(self, gcs_client_mock, logging_mock):
@@ -3127,6 +4047,42 @@ class TestGoogleCloudInterfaceParametrized(object):
         number_of_batches = int(round(total_objects / expected_batch_size))
         assert service_client_mock.batch.call_count == number_of_batches
 
+    @mock.patch.object(RangedReadIO, "RANGE_SIZE", 100)
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage")
+    def test_remote_open_ranged(self, gcs_storage_mock):
+        """Verifies a large object is read with concurrent ranged GETs."""
+        # GIVEN an object spanning several ranges
+        content = bytes(range(256)) * 2
+        container_client = gcs_storage_mock.Client.return_value.bucket.return_value
+        container_client.get_blob.return_value.size = len(content)
+        blob_mock = gcs_storage_mock.Blob.return_value
+        blob_mock.download_as_bytes.side_effect = lambda start, end: content[
+            start : end + 1
+        ]
+        # AND a cloud interface with several read jobs
+        cloud_interface = GoogleCloudInterface(
+            "gs://barman-test/path/to/object/", read_jobs=3
+        )
+
+        # WHEN the object is opened
+        resp = cloud_interface.remote_open("path/to/object")
+
+        # THEN its content is read with ranged GETs
+        assert resp.read() == content
+        assert blob_mock.download_as_bytes.call_count == 6
+        blob_mock.open.assert_not_called()
+
+    @mock.patch("barman.cloud_providers.google_cloud_storage.storage")
+    def test_remote_open_ranged_missing(self, gcs_storage_mock):
+        """Verifies None is returned when the object to read does not exist."""
+        container_client = gcs_storage_mock.Client.return_value.bucket.return_value
+        container_client.get_blob.return_value = None
+        cloud_interface = GoogleCloudInterface(
+            "gs://barman-test/path/to/object/", read_jobs=3
+        )
+
+        assert cloud_interface.remote_open("path/to/object") is None
+
 
 class TestGetCloudInterface(object):
     """
@@ -3320,6 +4276,302 @@ class TestGetCloudInterface(object):
         assert expected_error == str(exc.value)
 
 
+class TestCloudBackupManifest(object):
+    """Tests for the CloudBackupManifest class."""
+
+    def test_find_unchanged(self):
+        """Test only files unchanged since the backup started are found."""
+        # GIVEN the manifest of a backup started at time 100
+        manifest = CloudBackupManifest("20250101T000000", begin_time=100.0)
+        manifest.add_file("data", "base/1/1", 8192, 50.0)
+        manifest.add_file("data", "base/1/2", 8192, 150.0)
+        manifest.add_file("data", "base/1/3", 8192, 50.0, "20241231T000000")
+
+        # WHEN files are looked up
+        # THEN a file with the same size and modification time is unchanged
+        # AND its content is held by the backup
+        assert manifest.find_unchanged(
+            "data", "base/1/1", mock.Mock(st_size=8192, st_mtime=50.0)
+        ) == {
+            "size": 8192,
+            "mtime": 50.0,
+            "backup_id": "20250101T000000",
+        }
+        # AND a file referenced from another backup keeps the reference
+        assert (
+            manifest.find_unchanged(
+                "data", "base/1/3", mock.Mock(st_size=8192, st_mtime=50.0)
+            )["backup_id"]
+            == "20241231T000000"
+        )
+        # AND files with a different size or modification time are changed
+        for size, mtime in ((4096, 50.0), (8192, 60.0)):
+            assert (
+                manifest.find_unchanged(
+                    "data", "base/1/1", mock.Mock(st_size=size, st_mtime=mtime)
+                )
+                is None
+            )
+        # AND a file modified after the backup started is changed
+        assert (
+            manifest.find_unchanged(
+                "data", "base/1/2", mock.Mock(st_size=8192, st_mtime=150.0)
+            )
+            is None
+        )
+        # AND an unknown file is changed
+        assert (
+            manifest.find_unchanged(
+                "16384", "base/1/1", mock.Mock(st_size=8192, st_mtime=50.0)
+            )
+            is None
+        )
+
+    def test_dumps_loads(self):
+        """Test a manifest can be serialised and loaded."""
+        # GIVEN an incremental backup manifest
+        manifest = CloudBackupManifest(
+            "20250102T000000", "20250101T000000", begin_time=100.0
+        )
+        manifest.add_file("data", "base/1/1", 8192, 50.0)
+        manifest.add_file("data", "base/1/2", 8192, 50.0, "20250101T000000")
+        manifest.add_file("16384", "PG_16/1/3", 0, 50.0, "20241231T000000")
+
+        # WHEN it is serialised and loaded again
+        loaded = CloudBackupManifest.loads(manifest.dumps())
+
+        # THEN the loaded manifest matches the original one
+        assert loaded.backup_id == "20250102T000000"
+        assert loaded.parent_backup_id == "20250101T000000"
+        assert loaded.begin_time == 100.0
+        assert loaded.files == manifest.files
+        # AND the referenced backups and files are available
+        assert loaded.referenced_backup_ids == ["20241231T000000", "20250101T000000"]
+        assert loaded.get_referenced_files("20250101T000000") == {"data": {"base/1/2"}}
+
+    def test_block_incremental(self):
+        """Test a block-level incremental backup references its parent."""
+        # GIVEN the manifests of a full and an incremental backup taken with
+        # pg_basebackup
+        full_manifest = CloudBackupManifest("20250101T000000", backup_method="postgres")
+        manifest = CloudBackupManifest(
+            "20250102T000000", "20250101T000000", backup_method="postgres"
+        )
+
+        # WHEN the incremental manifest is serialised and loaded again
+        loaded = CloudBackupManifest.loads(manifest.dumps())
+
+        # THEN only the incremental backup is a block-level incremental backup
+        assert not full_manifest.is_block_incremental
+        assert loaded.is_block_incremental
+        assert loaded.backup_method == "postgres"
+        # AND it references its parent
+        assert full_manifest.referenced_backup_ids == []
+        assert loaded.referenced_backup_ids == ["20250101T000000"]
+
+    def test_chunked_files(self):
+        """Test the files uploaded to the chunk store are listed with their chunks."""
+        # GIVEN the manifest of a backup with a file uploaded to the chunk store
+        manifest = CloudBackupManifest(
+            "20250101T000000", begin_time=100.0, chunk_compression="gz"
+        )
+        manifest.add_file("data", "base/1/1", 8, 50.0, chunks=["a", "b", "a"])
+        manifest.add_file("data", "base/1/2", 4, 50.0)
+
+        # WHEN it is serialised and loaded again
+        loaded = CloudBackupManifest.loads(manifest.dumps())
+
+        # THEN the chunked file and its chunks are listed
+        assert loaded.chunk_compression == "gz"
+        assert list(loaded.get_chunked_files()) == ["data"]
+        assert list(loaded.get_chunked_files()["data"]) == ["base/1/1"]
+        assert loaded.chunks == ["a", "b", "a"]
+        # AND the chunked file is never unchanged, since no tar contains it
+        assert (
+            loaded.find_unchanged(
+                "data", "base/1/1", mock.Mock(st_size=8, st_mtime=50.0)
+            )
+            is None
+        )
+        assert loaded.find_unchanged(
+            "data", "base/1/2", mock.Mock(st_size=4, st_mtime=50.0)
+        )
+
+
+@mock.patch.object(CloudChunkStore, "CHUNK_SIZE", 4)
+class TestCloudChunkStore(object):
+    """Tests for the CloudChunkStore class."""
+
+    @pytest.fixture
+    def cloud_interface(self):
+        """A cloud interface storing the uploaded objects in memory."""
+        cloud_interface = MagicMock(path="bucket")
+        cloud_interface.objects = {}
+
+        def upload_fileobj(fileobj, key):
+            cloud_interface.objects[key] = fileobj.read()
+
+        def remote_open(key):
+            if key not in cloud_interface.objects:
+                return None
+            return BytesIO(cloud_interface.objects[key])
+
+        def delete_objects(keys):
+            for key in keys:
+                cloud_interface.objects.pop(key, None)
+
+        cloud_interface.upload_fileobj.side_effect = upload_fileobj
+        cloud_interface.async_upload_fileobj.side_effect = upload_fileobj
+        cloud_interface.remote_open.side_effect = remote_open
+        cloud_interface.delete_objects.side_effect = delete_objects
+        cloud_interface.list_bucket.side_effect = lambda prefix, delimiter: [
+            key for key in cloud_interface.objects if key.startswith(prefix)
+        ]
+        return cloud_interface
+
+    @staticmethod
+    def _key(data, extension=""):
+        checksum = hashlib.sha256(data).hexdigest()
+        return "bucket/main/chunks/%s/%s%s" % (checksum[:2], checksum, extension)
+
+    def test_add_file(self, cloud_interface):
+        """Test only the chunks not already stored are uploaded."""
+        # GIVEN a chunk store which already holds a chunk
+        cloud_interface.objects[self._key(b"bbbb")] = b"bbbb"
+        chunk_store = CloudChunkStore(cloud_interface, "main")
+
+        # WHEN a file with a repeated chunk and a shorter last chunk is stored
+        checksums = chunk_store.add_file(BytesIO(b"aaaabbbbaaaacc"))
+
+        # THEN the checksums of all the chunks are returned
+        assert checksums == [
+            hashlib.sha256(chunk).hexdigest()
+            for chunk in (b"aaaa", b"bbbb", b"aaaa", b"cc")
+        ]
+        # AND each new chunk is uploaded once by the upload workers
+        assert sorted(
+            call[0][1] for call in cloud_interface.async_upload_fileobj.call_args_list
+        ) == sorted([self._key(b"aaaa"), self._key(b"cc")])
+        cloud_interface.upload_fileobj.assert_not_called()
+        assert chunk_store.uploaded_chunks == 2
+        assert chunk_store.uploaded_size == 6
+        # AND the other chunks are reused
+        assert chunk_store.reused_chunks == 2
+        assert chunk_store.reused_size == 8
+        # AND the stored chunks are listed only once
+        chunk_store.add_file(BytesIO(b"dddd"))
+        cloud_interface.list_bucket.assert_called_once_with(
+            "bucket/main/chunks/", delimiter=""
+        )
+
+    def test_close(self, cloud_interface):
+        """Test the uploads are awaited and the reused chunks checked."""
+        # GIVEN a chunk store which already holds a chunk
+        cloud_interface.objects[self._key(b"bbbb")] = b"bbbb"
+        chunk_store = CloudChunkStore(cloud_interface, "main")
+        # AND a file reusing it has been stored
+        chunk_store.add_file(BytesIO(b"aaaabbbb"))
+
+        # WHEN the chunk store is closed
+        chunk_store.close()
+        # THEN it waits for the chunks to be uploaded
+        cloud_interface.wait_for_async_uploads.assert_called_once_with()
+
+        # WHEN the reused chunk is deleted before the chunk store is closed
+        del cloud_interface.objects[self._key(b"bbbb")]
+        # THEN the backup fails
+        with pytest.raises(BackupException, match="1 reused chunks have been deleted"):
+            chunk_store.close()
+
+    def test_pending_backups(self, cloud_interface):
+        """Test the markers of the backups adding chunks to the store."""
+        # GIVEN a chunk store
+        chunk_store = CloudChunkStore(cloud_interface, "main")
+
+        # WHEN two backups register themselves
+        with mock.patch("barman.cloud.time.time", return_value=1735689600.0):
+            chunk_store.register_backup("20250101T000000")
+            chunk_store.register_backup("20250102T000000")
+
+        # THEN their markers are stored outside the chunks
+        assert sorted(cloud_interface.objects) == [
+            "bucket/main/chunks_pending/20250101T000000",
+            "bucket/main/chunks_pending/20250102T000000",
+        ]
+        assert chunk_store.list_chunks() == set()
+        # AND they are returned with the time they were written
+        assert chunk_store.get_pending_backups() == {
+            "20250101T000000": datetime.datetime.fromtimestamp(1735689600.0),
+            "20250102T000000": datetime.datetime.fromtimestamp(1735689600.0),
+        }
+
+        # WHEN the marker of a backup is removed
+        chunk_store.unregister_backups(["20250101T000000"])
+        # THEN only the other one is left
+        assert list(chunk_store.get_pending_backups()) == ["20250102T000000"]
+
+    @pytest.mark.parametrize(
+        ("compression", "extension", "decompress"),
+        ((None, "", lambda data: data), ("gz", ".gz", gzip.decompress)),
+    )
+    def test_read_file(self, cloud_interface, compression, extension, decompress):
+        """Test a stored file is rebuilt from its chunks."""
+        # GIVEN a file stored in a chunk store
+        chunk_store = CloudChunkStore(cloud_interface, "main", compression)
+        checksums = chunk_store.add_file(BytesIO(b"aaaabbbbcc"))
+        # AND the chunks are compressed
+        assert decompress(cloud_interface.objects[self._key(b"aaaa", extension)]) == (
+            b"aaaa"
+        )
+
+        # WHEN the file is read
+        fileobj = BytesIO()
+        chunk_store.read_file(checksums, fileobj)
+
+        # THEN its content is rebuilt
+        assert fileobj.getvalue() == b"aaaabbbbcc"
+
+    def test_read_file_errors(self, cloud_interface):
+        """Test missing and corrupted chunks are detected."""
+        # GIVEN a file stored in a chunk store
+        chunk_store = CloudChunkStore(cloud_interface, "main")
+        checksums = chunk_store.add_file(BytesIO(b"aaaabbbb"))
+
+        # WHEN a chunk is corrupted
+        cloud_interface.objects[self._key(b"bbbb")] = b"xxxx"
+        # THEN the file cannot be read
+        with pytest.raises(BarmanException, match="is corrupted"):
+            chunk_store.read_file(checksums, BytesIO())
+
+        # WHEN a chunk is missing
+        del cloud_interface.objects[self._key(b"bbbb")]
+        # THEN the file cannot be read
+        with pytest.raises(BarmanException, match="not found"):
+            chunk_store.read_file(checksums, BytesIO())
+
+    def test_get_unreferenced_chunks(self, cloud_interface):
+        """Test the chunks no manifest references are found."""
+        # GIVEN a chunk store holding chunks of two backups
+        chunk_store = CloudChunkStore(cloud_interface, "main")
+        checksums_1 = chunk_store.add_file(BytesIO(b"aaaabbbb"))
+        checksums_2 = chunk_store.add_file(BytesIO(b"bbbbcccc"))
+        # AND only the manifest of the second backup is left
+        manifest = CloudBackupManifest("20250102T000000")
+        manifest.add_file("data", "base/1/1", 8, 50.0, chunks=checksums_2)
+
+        # WHEN the unreferenced chunks are requested
+        unreferenced_chunks = chunk_store.get_unreferenced_chunks([manifest])
+
+        # THEN only the chunk of the first backup alone is returned
+        assert checksums_1[0] not in checksums_2
+        assert unreferenced_chunks == [self._key(b"aaaa")]
+
+        # WHEN the chunks were compressed differently from the manifest
+        manifest.chunk_compression = "gz"
+        # THEN none of the chunks are referenced
+        assert len(chunk_store.get_unreferenced_chunks([manifest])) == 3
+
+
 class TestCloudBackupCatalog(object):
     """
     Tests which verify we can list backups stored in a cloud provider
@@ -3413,39 +4665,301 @@ end_time=2014-12-22 09:25:27.410470+01:00
         assert "20210723T133818" in backups
         assert "20210723T154445" not in backups
 
-    def _verify_wal_is_in_catalog(self, wal_name, wal_path):
-        """Create a catalog from the specified wal_path and verify it is listed"""
+    def _mock_cloud_interface_with_index(
+        self, backup_ids, index_backup_ids, referenced_backups=None
+    ):
+        """
+        Create a mock cloud interface listing the given backups and an index
+        holding the backup.info files of the given backups, and the given
+        references if any
+        """
         mock_cloud_interface = MagicMock()
-        mock_cloud_interface.list_bucket.return_value = [wal_path]
+        mock_cloud_interface.path = "mt-backups"
+        mock_cloud_interface.list_bucket.return_value = [
+            "mt-backups/test-server/base/%s/" % backup_id for backup_id in backup_ids
+        ] + ["mt-backups/test-server/base/catalog.json"]
+        index = {
+            "version": 1,
+            "backups": dict(
+                (
+                    backup_id,
+                    self.get_backup_info_file_object().read().decode("utf-8"),
+                )
+                for backup_id in index_backup_ids
+            ),
+        }
+        if referenced_backups is not None:
+            index["referenced_backups"] = referenced_backups
+
+        def remote_open(key):
+            if key.endswith("catalog.json"):
+                return BytesIO(json.dumps(index).encode("utf-8"))
+            return self.get_backup_info_file_object()
+
+        mock_cloud_interface.remote_open.side_effect = remote_open
+        return mock_cloud_interface
+
+    def test_backup_list_from_index(self):
+        """Test the backup.info files are read from the index of the catalog."""
+        # GIVEN an index holding the two listed backups
+        backup_ids = ["20210723T133818", "20210723T154445"]
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            backup_ids, backup_ids
+        )
         catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
-        wals = catalog.get_wal_paths()
-        assert len(wals) == 1
-        assert wal_name in wals
-        assert wals[wal_name] == wal_path
 
-    @pytest.mark.parametrize(
-        ("expected_wal", "wal_path", "suffix"),
-        [
-            spec
-            for spec_group in [
-                [
-                    # Regular WAL files
-                    (
-                        "000000010000000000000075",
-                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075",
-                        suffix,
-                    ),
-                    # Backup labels
-                    (
-                        "000000010000000000000075.00000028.backup",
-                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075.00000028.backup",
-                        suffix,
-                    ),
-                    # Partial WALs
-                    (
-                        "000000010000000000000075.partial",
-                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075.partial",
-                        suffix,
+        # WHEN the backups are listed
+        backups = catalog.get_backup_list()
+
+        # THEN their backup.info files are loaded from the index alone
+        assert sorted(backups) == backup_ids
+        assert backups["20210723T133818"].end_time is not None
+        mock_cloud_interface.remote_open.assert_called_once_with(
+            "mt-backups/test-server/base/catalog.json"
+        )
+        # AND the index is not uploaded again
+        assert catalog.update_index() is False
+        mock_cloud_interface.upload_fileobj.assert_not_called()
+
+    def test_backup_list_index_checked_against_listing(self):
+        """Test the index is completed and pruned by the listing."""
+        # GIVEN an index missing a listed backup and holding a deleted one
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            ["20210723T133818", "20210723T154445"],
+            ["20210723T133818", "20210722T000000"],
+        )
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups are listed
+        backups = catalog.get_backup_list()
+
+        # THEN only the listed backups are returned
+        assert sorted(backups) == ["20210723T133818", "20210723T154445"]
+        # AND the backup missing from the index is read from its backup.info file
+        assert mock_cloud_interface.remote_open.call_args_list == [
+            mock.call("mt-backups/test-server/base/catalog.json"),
+            mock.call("mt-backups/test-server/base/20210723T154445/backup.info"),
+        ]
+
+        # WHEN the index is updated
+        assert catalog.update_index() is True
+
+        # THEN it holds exactly the listed backups
+        fileobj, key = mock_cloud_interface.upload_fileobj.call_args[0]
+        assert key == "mt-backups/test-server/base/catalog.json"
+        index = json.loads(fileobj.read().decode("utf-8"))
+        assert index["version"] == 1
+        assert sorted(index["backups"]) == ["20210723T133818", "20210723T154445"]
+
+    def test_backup_list_without_index(self):
+        """Test the index is only read when it is listed."""
+        # GIVEN a listing without any index
+        mock_cloud_interface = MagicMock()
+        mock_cloud_interface.path = "mt-backups"
+        mock_cloud_interface.list_bucket.return_value = [
+            "mt-backups/test-server/base/20210723T133818/",
+        ]
+        mock_cloud_interface.remote_open.side_effect = (
+            lambda x: self.get_backup_info_file_object()
+        )
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups are listed
+        assert list(catalog.get_backup_list()) == ["20210723T133818"]
+
+        # THEN only the backup.info file is read
+        mock_cloud_interface.remote_open.assert_called_once_with(
+            "mt-backups/test-server/base/20210723T133818/backup.info"
+        )
+        # AND the index is created by the next update
+        assert catalog.update_index() is True
+
+    @pytest.mark.parametrize(
+        "index_content", (b"not json", b'{"version": 999, "backups": {}}')
+    )
+    def test_backup_list_invalid_index(self, index_content, caplog):
+        """Test an invalid index is ignored."""
+        # GIVEN an index which cannot be used
+        mock_cloud_interface = MagicMock()
+        mock_cloud_interface.path = "mt-backups"
+        mock_cloud_interface.list_bucket.return_value = [
+            "mt-backups/test-server/base/20210723T133818/",
+            "mt-backups/test-server/base/catalog.json",
+        ]
+        mock_cloud_interface.remote_open.side_effect = lambda key: (
+            BytesIO(index_content)
+            if key.endswith("catalog.json")
+            else self.get_backup_info_file_object()
+        )
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups are listed
+        backups = catalog.get_backup_list()
+
+        # THEN they are read from their backup.info files
+        assert list(backups) == ["20210723T133818"]
+        assert "catalog index" in caplog.text
+
+    def test_backup_info_files_read_concurrently(self):
+        """Test the backup.info files are read by several threads."""
+        # GIVEN a cloud interface whose session can be shared by threads
+        backup_ids = ["20210723T%06d" % i for i in range(40)]
+        mock_cloud_interface = MagicMock(path="mt-backups")
+        mock_cloud_interface.THREAD_SAFE = True
+        mock_cloud_interface.list_bucket.return_value = [
+            "mt-backups/test-server/base/%s/" % backup_id for backup_id in backup_ids
+        ]
+        # AND reading a backup.info file is slow, while one cannot be read
+        threads = set()
+
+        def remote_open(key):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.01)
+            if backup_ids[7] in key:
+                raise Exception("something went wrong reading backup.info")
+            return self.get_backup_info_file_object()
+
+        mock_cloud_interface.remote_open.side_effect = remote_open
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups are listed
+        backups = catalog.get_backup_list()
+
+        # THEN the files were read by several threads
+        assert len(threads) > 1
+        # AND the backups are returned in the order of the listing
+        assert list(backups) == backup_ids[:7] + backup_ids[8:]
+        # AND the unreadable backup is reported
+        assert catalog.unreadable_backups == [backup_ids[7]]
+
+    def test_referenced_backups_from_index(self):
+        """Test the references between the backups are read from the index."""
+        # GIVEN an index recording the references of the two listed backups
+        backup_ids = ["20210723T133818", "20210723T154445"]
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            backup_ids,
+            backup_ids,
+            {"20210723T133818": [], "20210723T154445": ["20210723T133818"]},
+        )
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups referencing the first backup are requested
+        referencing_backups = catalog.get_referencing_backups("20210723T133818")
+
+        # THEN the incremental backup is found
+        assert referencing_backups == ["20210723T154445"]
+        # AND no manifest is read
+        mock_cloud_interface.remote_open.assert_called_once_with(
+            "mt-backups/test-server/base/catalog.json"
+        )
+        # AND the index is not uploaded again
+        assert catalog.update_index() is False
+
+    def test_referenced_backups_missing_from_index(self):
+        """Test the references missing from the index are read from the manifests."""
+        # GIVEN an index without references, on a cloud interface whose
+        # session can be shared by threads
+        backup_ids = ["20210723T%06d" % i for i in range(40)]
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            backup_ids, backup_ids
+        )
+        mock_cloud_interface.THREAD_SAFE = True
+        # AND the second backup references the files of the first one, while
+        # the other backups have no manifest
+        manifest = CloudBackupManifest(backup_ids[1])
+        manifest.add_file("data", "base/1/1", 8192, 1.0, backup_ids[0])
+        read_index = mock_cloud_interface.remote_open.side_effect
+        threads = set()
+
+        def remote_open(key):
+            if not key.endswith(CloudBackupManifest.NAME):
+                return read_index(key)
+            threads.add(threading.current_thread().name)
+            time.sleep(0.01)
+            if backup_ids[1] in key:
+                return BytesIO(manifest.dumps())
+            return None
+
+        mock_cloud_interface.remote_open.side_effect = remote_open
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the backups referencing the first backup are requested
+        referencing_backups = catalog.get_referencing_backups(backup_ids[0])
+
+        # THEN the incremental backup is found
+        assert referencing_backups == [backup_ids[1]]
+        # AND the manifests were read by several threads
+        assert len(threads) > 1
+        # AND the references are recorded by the next update of the index
+        assert catalog.update_index() is True
+        fileobj, _ = mock_cloud_interface.upload_fileobj.call_args[0]
+        index = json.loads(fileobj.read().decode("utf-8"))
+        assert index["referenced_backups"] == dict(
+            (backup_id, [backup_ids[0]] if backup_id == backup_ids[1] else [])
+            for backup_id in backup_ids
+        )
+
+    def test_update_index_after_removal(self):
+        """Test the backups removed from the cache are removed from the index."""
+        backup_ids = ["20210723T133818", "20210723T154445"]
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            backup_ids, backup_ids
+        )
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+        catalog.get_backup_list()
+
+        # WHEN a backup is removed from the cache and the index is updated
+        catalog.remove_backup_from_cache("20210723T154445")
+        assert catalog.update_index() is True
+
+        # THEN the index no longer holds it
+        fileobj, _ = mock_cloud_interface.upload_fileobj.call_args[0]
+        index = json.loads(fileobj.read().decode("utf-8"))
+        assert list(index["backups"]) == ["20210723T133818"]
+
+    def test_update_index_error(self, caplog):
+        """Test the errors updating the index are logged and ignored."""
+        mock_cloud_interface = self._mock_cloud_interface_with_index(
+            ["20210723T133818"], []
+        )
+        mock_cloud_interface.upload_fileobj.side_effect = Exception("denied")
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+        assert catalog.update_index() is False
+        assert "Unable to update catalog index" in caplog.text
+
+    def _verify_wal_is_in_catalog(self, wal_name, wal_path):
+        """Create a catalog from the specified wal_path and verify it is listed"""
+        mock_cloud_interface = MagicMock()
+        mock_cloud_interface.list_bucket.return_value = [wal_path]
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+        wals = catalog.get_wal_paths()
+        assert len(wals) == 1
+        assert wal_name in wals
+        assert wals[wal_name] == wal_path
+
+    @pytest.mark.parametrize(
+        ("expected_wal", "wal_path", "suffix"),
+        [
+            spec
+            for spec_group in [
+                [
+                    # Regular WAL files
+                    (
+                        "000000010000000000000075",
+                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075",
+                        suffix,
+                    ),
+                    # Backup labels
+                    (
+                        "000000010000000000000075.00000028.backup",
+                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075.00000028.backup",
+                        suffix,
+                    ),
+                    # Partial WALs
+                    (
+                        "000000010000000000000075.partial",
+                        "mt-backups/test-server/wals/0000000100000000/000000010000000000000075.partial",
+                        suffix,
                     ),
                     # History files
                     (
@@ -3493,6 +5007,225 @@ end_time=2014-12-22 09:25:27.410470+01:00
         assert "000000010000000000000075" not in wals
         assert "000000010000000000000076" in wals
 
+    def _mock_wal_archive(self, keys):
+        """
+        Create a mock cloud interface whose list_bucket lists the supplied keys,
+        either recursively or one level at a time
+        """
+        mock_cloud_interface = MagicMock(
+            path="mt-backups", url="s3://bucket/mt-backups"
+        )
+
+        def list_bucket(prefix, delimiter="/"):
+            items = []
+            for key in sorted(keys):
+                if not key.startswith(prefix):
+                    continue
+                rest = key[len(prefix) :]
+                if delimiter and delimiter in rest:
+                    item = prefix + rest.split(delimiter)[0] + delimiter
+                    if item not in items:
+                        items.append(item)
+                else:
+                    items.append(key)
+            return items
+
+        mock_cloud_interface.list_bucket.side_effect = list_bucket
+        return mock_cloud_interface
+
+    def test_wal_listing_cache(self, tmpdir):
+        """Test only the new WAL directories are listed with a WAL listing cache."""
+        # GIVEN a WAL archive with WALs in two directories of timeline 1 and a
+        # history file
+        wals = "mt-backups/test-server/wals/"
+        keys = [
+            wals + "0000000100000000/000000010000000000000075.gz",
+            wals + "0000000100000001/000000010000000100000001.gz",
+            wals + "00000002.history.gz",
+        ]
+        mock_cloud_interface = self._mock_wal_archive(keys)
+        cache_path = str(tmpdir.join("wals.json"))
+
+        # WHEN the WALs are listed for the first time
+        catalog = CloudBackupCatalog(
+            mock_cloud_interface, "test-server", wal_cache_path=cache_path
+        )
+        wals_found = catalog.get_wal_paths()
+
+        # THEN all the WALs are found
+        assert sorted(wals_found.values()) == sorted(keys)
+        # AND the cache holds the WALs of each directory
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        assert cache["source"] == "s3://bucket/mt-backups/test-server"
+        assert cache["directories"] == {
+            "0000000100000000": ["000000010000000000000075.gz"],
+            "0000000100000001": ["000000010000000100000001.gz"],
+        }
+
+        # WHEN more WALs are archived on timeline 1 and on a new timeline
+        keys.append(wals + "0000000100000001/000000010000000100000002.gz")
+        keys.append(wals + "0000000200000001/000000020000000100000002.gz")
+        mock_cloud_interface.list_bucket.reset_mock()
+        catalog = CloudBackupCatalog(
+            mock_cloud_interface, "test-server", wal_cache_path=cache_path
+        )
+        wals_found = catalog.get_wal_paths()
+
+        # THEN all the WALs are found
+        assert sorted(wals_found.values()) == sorted(keys)
+        # AND the older directory of timeline 1 is not listed
+        listed = [c[0][0] for c in mock_cloud_interface.list_bucket.call_args_list]
+        assert listed == [
+            wals,
+            wals + "0000000100000001/",
+            wals + "0000000200000001/",
+        ]
+
+    @pytest.mark.parametrize("refresh", (False, True))
+    def test_wal_listing_cache_refresh(self, refresh, tmpdir):
+        """Test the WAL listing cache is ignored when a refresh is requested."""
+        # GIVEN a cache listing a WAL which was deleted from an older directory
+        wals = "mt-backups/test-server/wals/"
+        keys = [
+            wals + "0000000100000000/000000010000000000000074.gz",
+            wals + "0000000100000001/000000010000000100000001.gz",
+        ]
+        cache_path = str(tmpdir.join("wals.json"))
+        CloudBackupCatalog(
+            self._mock_wal_archive(
+                keys + [wals + "0000000100000000/000000010000000000000075.gz"]
+            ),
+            "test-server",
+            wal_cache_path=cache_path,
+        ).get_wal_paths()
+
+        # WHEN the WALs are listed with or without a refresh
+        catalog = CloudBackupCatalog(
+            self._mock_wal_archive(keys),
+            "test-server",
+            wal_cache_path=cache_path,
+            refresh_wal_cache=refresh,
+        )
+        wals_found = catalog.get_wal_paths()
+
+        # THEN the deleted WAL is only found if the cache is not refreshed
+        assert ("000000010000000000000075" in wals_found) is not refresh
+        assert "000000010000000000000074" in wals_found
+
+    def test_wal_listing_cache_other_server(self, tmpdir, caplog):
+        """Test a WAL listing cache written for another server is ignored."""
+        wals = "mt-backups/%s/wals/0000000100000000/000000010000000000000075.gz"
+        cache_path = str(tmpdir.join("wals.json"))
+        CloudBackupCatalog(
+            self._mock_wal_archive([wals % "other-server"]),
+            "other-server",
+            wal_cache_path=cache_path,
+        ).get_wal_paths()
+
+        catalog = CloudBackupCatalog(
+            self._mock_wal_archive([wals % "test-server"]),
+            "test-server",
+            wal_cache_path=cache_path,
+        )
+        assert list(catalog.get_wal_paths().values()) == [wals % "test-server"]
+        assert "does not belong to server test-server" in caplog.text
+
+    def test_save_wal_cache_after_removal(self, tmpdir):
+        """Test the WALs removed from the cached list are removed from the cache."""
+        wals = "mt-backups/test-server/wals/0000000100000000/"
+        cache_path = str(tmpdir.join("wals.json"))
+        catalog = CloudBackupCatalog(
+            self._mock_wal_archive(
+                [wals + "000000010000000000000075", wals + "000000010000000000000076"]
+            ),
+            "test-server",
+            wal_cache_path=cache_path,
+        )
+        catalog.get_wal_paths()
+
+        # WHEN a WAL is removed from the cached list and the cache is saved
+        catalog.remove_wal_from_cache("000000010000000000000075")
+        assert catalog.save_wal_cache() is True
+
+        # THEN the cache no longer holds it
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        assert cache["directories"] == {
+            "0000000100000000": ["000000010000000000000076"]
+        }
+
+    def test_wal_directories_listed_concurrently(self):
+        """Test the WAL directories are listed by several threads."""
+        # GIVEN a WAL archive with many WAL directories and a history file
+        wals = "mt-backups/test-server/wals/"
+        keys = [
+            wals + "%08X%08X/%08X%08X%08X" % (1, log, 1, log, 1) for log in range(40)
+        ] + [wals + "00000002.history"]
+        mock_cloud_interface = self._mock_wal_archive(keys)
+        # AND a cloud interface whose session can be shared by threads
+        mock_cloud_interface.THREAD_SAFE = True
+        # AND listing a WAL directory is slow
+        threads = set()
+        list_bucket = mock_cloud_interface.list_bucket.side_effect
+
+        def slow_list_bucket(prefix, delimiter="/"):
+            if delimiter == "":
+                threads.add(threading.current_thread().name)
+                time.sleep(0.01)
+            return list_bucket(prefix, delimiter)
+
+        mock_cloud_interface.list_bucket.side_effect = slow_list_bucket
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+
+        # WHEN the WALs are listed
+        wals_found = catalog.get_wal_paths()
+
+        # THEN each WAL directory was listed on its own by several threads
+        assert mock_cloud_interface.list_bucket.call_count == 41
+        assert len(threads) > 1
+        # AND the WALs are returned in order, after the history files
+        assert list(wals_found.values()) == keys[-1:] + keys[:-1]
+
+    def test_wal_archive_listed_in_one_stream(self, tmpdir):
+        """Test the whole WAL archive is listed at once without threads."""
+        # GIVEN a WAL archive with WALs in two directories and a history file
+        wals = "mt-backups/test-server/wals/"
+        keys = [
+            wals + "0000000100000000/000000010000000000000075",
+            wals + "0000000100000001/000000010000000100000000",
+            wals + "00000002.history",
+        ]
+        mock_cloud_interface = self._mock_wal_archive(keys)
+        # AND a cloud interface whose session cannot be shared by threads
+        mock_cloud_interface.THREAD_SAFE = False
+        cache_path = tmpdir.join("wals.json").strpath
+        catalog = CloudBackupCatalog(
+            mock_cloud_interface, "test-server", wal_cache_path=cache_path
+        )
+
+        # WHEN the WALs are listed without a WAL listing cache
+        wals_found = catalog.get_wal_paths()
+
+        # THEN the whole archive is listed with a single listing
+        mock_cloud_interface.list_bucket.assert_called_once_with(wals, delimiter="")
+        assert sorted(wals_found.values()) == sorted(keys)
+        # AND the WAL listing cache is written with every WAL directory
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        assert cache["directories"] == {
+            "0000000100000000": ["000000010000000000000075"],
+            "0000000100000001": ["000000010000000100000000"],
+        }
+
+    def test_save_wal_cache_without_cache(self):
+        """Test nothing is saved if the catalog has no WAL listing cache."""
+        mock_cloud_interface = MagicMock()
+        mock_cloud_interface.list_bucket.return_value = []
+        catalog = CloudBackupCatalog(mock_cloud_interface, "test-server")
+        catalog.get_wal_paths()
+        assert catalog.save_wal_cache() is False
+
     def _get_backup_files(
         self, backup_id, list_bucket_response=[], tablespaces=[], allow_missing=False
     ):
@@ -3556,6 +5289,33 @@ end_time=2014-12-22 09:25:27.410470+01:00
         # AND it has no additional files
         assert len(backup_files[16388].additional_files) == 0
 
+    @pytest.mark.parametrize(
+        ("extension", "expected_compression"),
+        (
+            ("tar.gz", "gzip"),
+            ("tar.bz2", "bzip2"),
+            ("tar.snappy", "snappy"),
+            ("tar.zst", "zstd"),
+            ("tar.lz4", "lz4"),
+        ),
+    )
+    def test_get_backup_files_compression(self, extension, expected_compression):
+        """Test the compression of backup files is inferred from their extension."""
+        # GIVEN a backup with compressed data files
+        backup_files = self._get_backup_files(
+            "20210723T133818",
+            list_bucket_response=[
+                "mt-backups/test-server/base/20210723T133818/",
+                "mt-backups/test-server/base/20210723T133818/data." + extension,
+                "mt-backups/test-server/base/20210723T133818/data_0001." + extension,
+            ],
+        )
+        # THEN the compression of the main and additional files is set
+        assert backup_files[None].compression == expected_compression
+        assert backup_files[None].additional_files[0].compression == (
+            expected_compression
+        )
+
     def test_get_backup_files_fails_if_missing(self):
         """Test we fail if any backup files are missing."""
         with pytest.raises(SystemExit) as exc:
@@ -3718,6 +5478,41 @@ end_time=2014-12-22 09:25:27.410470+01:00
         # And the recovery target is None again
         assert catalog.get_keep_target(test_backup_id) is None
 
+    def test_get_referencing_backups(self, in_memory_cloud_interface):
+        """Verifies incremental backups referencing a backup are found."""
+        # GIVEN a full backup, an incremental backup referencing its files and
+        # a backup without manifest
+        in_memory_cloud_interface.path = ""
+        full_manifest = CloudBackupManifest("20250101T000000")
+        incremental_manifest = CloudBackupManifest("20250102T000000", "20250101T000000")
+        incremental_manifest.add_file("data", "base/1/1", 8192, 1.0, "20250101T000000")
+        for backup_id, manifest in (
+            ("20250101T000000", full_manifest),
+            ("20250102T000000", incremental_manifest),
+            ("20250103T000000", None),
+        ):
+            in_memory_cloud_interface.upload_fileobj(
+                BytesIO(b"status=DONE\n"),
+                "test-server/base/%s/backup.info" % backup_id,
+            )
+            if manifest is not None:
+                in_memory_cloud_interface.upload_fileobj(
+                    BytesIO(manifest.dumps()),
+                    "test-server/base/%s/manifest.json" % backup_id,
+                )
+        catalog = CloudBackupCatalog(in_memory_cloud_interface, "test-server")
+
+        # WHEN the backups referencing each backup are requested
+        # THEN only the incremental backup references the full backup
+        assert catalog.get_referencing_backups("20250101T000000") == ["20250102T000000"]
+        assert catalog.get_referencing_backups("20250102T000000") == []
+        assert catalog.get_referencing_backups("20250103T000000") == []
+        # AND the manifests are loaded from cloud storage
+        assert catalog.get_backup_manifest("20250102T000000").files == (
+            incremental_manifest.files
+        )
+        assert catalog.get_backup_manifest("20250103T000000") is None
+
     @pytest.fixture
     def catalog_with_named_backup(self, in_memory_cloud_interface):
         backup_infos = {
@@ -3882,7 +5677,7 @@ class TestCloudTarUploader(object):
         "compression",
         # The CloudTarUploader expects the short form compression args set by the
         # cloud_backup argument parser
-        (None, "bz2", "gz", "snappy"),
+        (None, "bz2", "gz", "snappy", "zstd", "lz4"),
     )
     @mock.patch("barman.cloud.CloudInterface")
     def test_add(self, mock_cloud_interface, compression, tmpdir):
@@ -3928,6 +5723,12 @@ class TestCloudTarUploader(object):
                 tar_fileobj = BytesIO()
                 snappy.stream_decompress(uploaded_data, tar_fileobj)
                 tar_fileobj.seek(0)
+            elif compression == "zstd":
+                tar_mode = "r|"
+                tar_fileobj = zstandard.ZstdDecompressor().stream_reader(uploaded_data)
+            elif compression == "lz4":
+                tar_mode = "r|"
+                tar_fileobj = lz4.frame.open(uploaded_data, mode="rb")
             else:
                 tar_mode = "r|%s" % compression
             with open_tar(fileobj=tar_fileobj, mode=tar_mode) as tf:
@@ -3938,185 +5739,703 @@ class TestCloudTarUploader(object):
         # AND the supplied chunk_size was set
         assert uploader.chunk_size == chunk_size
 
-    @pytest.mark.parametrize(
-        (
-            "max_bandwidth",
-            "time_of_last_upload",
-            "size_of_last_upload",
-            "expected_wait_time",
-        ),
-        (
-            # 10GB/s bandwidth limit, last uploaded 5GB 0.25s ago: wait for 0.25s
-            (
-                10 << 30,
-                datetime.datetime(2023, 10, 9, 16, 43, 59, 750000),
-                5 << 30,
-                0.25,
-            ),
-            # 100MB/s bandwidth limit, last uploaded 200MB 1.5s ago: wait for 0.5s
-            (
-                100 << 20,
-                datetime.datetime(2023, 10, 9, 16, 43, 58, 500000),
-                200 << 20,
-                0.5,
-            ),
-        ),
-    )
-    @mock.patch("barman.cloud.time")
-    def test_throttle_upload(
-        self,
-        mock_time,
-        max_bandwidth,
-        time_of_last_upload,
-        size_of_last_upload,
-        expected_wait_time,
-        caplog,
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_close_waits_outside_the_lock(self, mock_cloud_interface):
+        """
+        Verifies that a tar uploader sharing a lock with other tar streams does
+        not hold it while waiting for its upload to be completed.
+        """
+        # GIVEN a CloudTarUploader sharing a lock with other tar streams
+        lock = threading.RLock()
+        uploader = CloudTarUploader(
+            mock_cloud_interface,
+            "arbitrary/path/in/the/cloud",
+            chunk_size=5 << 20,
+            lock=lock,
+        )
+
+        def wait_for_multipart_upload(key, lock):
+            # The lock can be acquired by another thread while we wait
+            acquired = []
+
+            def other_stream():
+                acquired.append(lock.acquire(timeout=1))
+                if acquired[0]:
+                    lock.release()
+
+            thread = threading.Thread(target=other_stream)
+            thread.start()
+            thread.join()
+            assert acquired == [True]
+            return "stats"
+
+        mock_cloud_interface.wait_for_multipart_upload.side_effect = (
+            wait_for_multipart_upload
+        )
+
+        # WHEN the uploader is closed
+        uploader.close()
+
+        # THEN the upload is completed holding the lock
+        mock_cloud_interface.async_complete_multipart_upload.assert_called_once()
+        # AND the shared lock is passed to wait for the upload
+        mock_cloud_interface.wait_for_multipart_upload.assert_called_once_with(
+            "arbitrary/path/in/the/cloud", lock=lock
+        )
+        assert uploader.stats == "stats"
+
+    @mock.patch("barman.cloud.NamedTemporaryFile")
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_add_in_memory_buffers(
+        self, mock_cloud_interface, mock_temporary_file, tmpdir
     ):
         """
-        Verifies that throttle will wait for the correct length of time for the
-        size and time of the last upload and the specified max_bandwidth.
+        Verifies that in memory buffers pass the parts to async_upload_part
+        without creating temporary files.
         """
-        # GIVEN two fixed points in time at a half second interval
-        mock_times = [
-            datetime.datetime(2023, 10, 9, 16, 44, 0, 0),
-            datetime.datetime(2023, 10, 9, 16, 44, 0, 500000),
+        # GIVEN a source file
+        src_file = tmpdir.join("arbitrary_file_name")
+        src_file.write("arbitrary strong representing file content")
+        # AND a CloudTarUploader using in memory buffers
+        uploader = CloudTarUploader(
+            mock_cloud_interface,
+            "arbitrary/path/in/the/cloud",
+            chunk_size=5 << 20,
+            in_memory_buffers=True,
+        )
+        uploaded_parts = []
+        mock_cloud_interface.async_upload_part.side_effect = (
+            lambda body, **_kwargs: uploaded_parts.append(body.getvalue())
+        )
+
+        # WHEN the file is added to the tar uploader
+        uploader.tar.add(src_file.strpath, arcname="arbitrary_file_name")
+        uploader.close()
+
+        # THEN no temporary file is created
+        mock_temporary_file.assert_not_called()
+        # AND the part passed to async_upload_part is a valid tar file
+        assert len(uploaded_parts) == 1
+        with open_tar(fileobj=BytesIO(uploaded_parts[0]), mode="r|") as tf:
+            member = tf.next()
+            assert member.name == "arbitrary_file_name"
+            assert (
+                tf.extractfile(member).read()
+                == b"arbitrary strong representing file content"
+            )
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_add_zstd_workers_long_distance(self, mock_cloud_interface, tmpdir):
+        """
+        Verifies that multithreaded zstd compression with long distance matching
+        produces a tar file which can be decompressed by a default decompressor.
+        """
+        # GIVEN a source file with repeated content
+        src_file = tmpdir.join("arbitrary_file_name")
+        content = os.urandom(1 << 16) * 64
+        src_file.write_binary(content)
+        # AND a CloudTarUploader using zstd with two workers and long distance
+        # matching
+        uploader = CloudTarUploader(
+            mock_cloud_interface,
+            "arbitrary/path/in/the/cloud",
+            chunk_size=64 << 20,
+            compression="zstd",
+            compression_workers=2,
+            long_distance_matching=True,
+        )
+
+        # WHEN the file is added to the tar uploader
+        uploader.tar.add(src_file.strpath, arcname="arbitrary_file_name")
+        uploader.close()
+
+        # THEN the uploaded part is much smaller than the content
+        uploaded_tar = mock_cloud_interface.async_upload_part.call_args_list[0][1][
+            "body"
         ]
-        # AND a CloudTarUploader with the specified max_bandwidth
+        assert os.path.getsize(uploaded_tar.name) < len(content) / 10
+        # AND it is a valid zstd-compressed tar containing the file
+        with open(uploaded_tar.name, "rb") as uploaded_data:
+            tar_fileobj = zstandard.ZstdDecompressor().stream_reader(uploaded_data)
+            with open_tar(fileobj=tar_fileobj, mode="r|") as tf:
+                member = tf.next()
+                assert tf.extractfile(member).read() == content
+        os.unlink(uploaded_tar.name)
+
+    @pytest.mark.parametrize("bandwidth_group", (None, "tbs1"))
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_flush_bandwidth_group(self, mock_cloud_interface, bandwidth_group):
+        """Verifies flush passes the bandwidth group to the cloud interface."""
+        # GIVEN a CloudTarUploader with a given bandwidth group
         uploader = CloudTarUploader(
+            mock_cloud_interface,
+            "test/key",
             None,
-            None,
-            None,
-            None,
-            max_bandwidth,
-        )
-        # AND the CloudTarUploader last uploaded at the specified time
-        uploader.time_of_last_upload = time_of_last_upload
-        # AND the CloudTarUploader last uploaded a part of the specified size
-        uploader.size_of_last_upload = size_of_last_upload
-        # AND with info lvel logging
-        caplog.set_level(logging.INFO)
-
-        # WHEN _throttle_upload is called with a given part size
-        with mock.patch("barman.cloud.datetime.datetime") as mock_datetime:
-            mock_datetime.now.side_effect = mock_times
-            part_size = 10 << 30
-            uploader._throttle_upload(part_size)
-
-        # THEN time.sleep was called with the expected wait time
-        mock_time.sleep.assert_called_once_with(expected_wait_time)
-        # AND the expected log messages occurred
-        assert (
-            f"Uploaded {size_of_last_upload} bytes "
-            f"{(mock_times[0] - time_of_last_upload).total_seconds()} seconds ago "
-            f"which exceeds limit of {max_bandwidth} bytes/s"
-        ) in caplog.text
+            bandwidth_group=bandwidth_group,
+        )
+        buffer = uploader.buffer = MagicMock()
+        # WHEN flush is called
+        uploader.flush()
+        # THEN the part is uploaded with the bandwidth group
+        mock_cloud_interface.async_upload_part.assert_called_once_with(
+            upload_metadata=mock_cloud_interface.create_multipart_upload.return_value,
+            key="test/key",
+            body=buffer,
+            part_number=1,
+            bandwidth_group=bandwidth_group,
+        )
+
+
+class TestBandwidthLimiter(object):
+    """Tests for the BandwidthLimiter class."""
+
+    @mock.patch("barman.cloud.time")
+    def test_consume_available_tokens(self, mock_time):
+        """Test no wait happens while the bucket holds enough tokens."""
+        # GIVEN a limiter of 100 bytes per second, created with a full bucket
+        mock_time.monotonic.return_value = 10.0
+        limiter = BandwidthLimiter(100)
+        # WHEN 60 bytes are consumed
+        limiter.consume(60)
+        # THEN there is no wait
+        mock_time.sleep.assert_not_called()
+
+    @mock.patch("barman.cloud.time")
+    def test_consume_waits_for_tokens(self, mock_time):
+        """Test the wait is proportional to the missing tokens."""
+        # GIVEN a limiter of 100 bytes per second whose bucket has been
+        # emptied
+        mock_time.monotonic.return_value = 10.0
+        limiter = BandwidthLimiter(100)
+        limiter.consume(100)
+        # WHEN 50 bytes are consumed 0.25 seconds later
+        mock_time.monotonic.return_value = 10.25
+        limiter.consume(50)
+        # THEN it waits for the 25 missing tokens
+        mock_time.sleep.assert_called_once_with(0.25)
+        # AND the next consumer waits after it
+        mock_time.sleep.reset_mock()
+        limiter.consume(50)
+        mock_time.sleep.assert_called_once_with(0.75)
+
+    @mock.patch("barman.cloud.time")
+    def test_bucket_capacity(self, mock_time):
+        """Test the bucket holds at most one second worth of tokens."""
+        # GIVEN a limiter of 100 bytes per second idle for a long time
+        mock_time.monotonic.return_value = 10.0
+        limiter = BandwidthLimiter(100)
+        mock_time.monotonic.return_value = 1000.0
+        # WHEN 300 bytes are consumed
+        limiter.consume(300)
+        # THEN it waits for the tokens exceeding the capacity of the bucket
+        mock_time.sleep.assert_called_once_with(2.0)
+
+
+class TestThrottledReader(object):
+    """Tests for the ThrottledReader class."""
+
+    def test_read(self):
+        """Test each byte read consumes the tokens of all the limiters."""
+        # GIVEN a reader throttled by two limiters
+        limiters = [mock.Mock(), mock.Mock()]
+        reader = ThrottledReader(BytesIO(b"part content"), limiters)
+        # WHEN the content is read
+        assert reader.read(4) == b"part"
+        assert reader.read() == b" content"
+        # THEN the bytes read are consumed from both limiters
+        for limiter in limiters:
+            assert limiter.consume.call_args_list == [mock.call(4), mock.call(8)]
+
+    def test_read_again(self):
+        """Test the bytes read again after a seek are not consumed twice."""
+        # GIVEN a reader throttled by a limiter whose content has been read
+        limiter = mock.Mock()
+        reader = ThrottledReader(BytesIO(b"part content"), [limiter])
+        reader.read()
+        limiter.consume.reset_mock()
+        # WHEN the content is read again
+        reader.seek(0)
+        assert reader.tell() == 0
+        assert reader.read() == b"part content"
+        # THEN no tokens are consumed
+        limiter.consume.assert_not_called()
+
+
+class TestRangedReadIO(object):
+    """Tests for the RangedReadIO class."""
+
+    content = bytes(range(256)) * 4
+
+    def _read_range(self, offset, length):
+        return self.content[offset : offset + length]
+
+    @pytest.mark.parametrize("read_size", (1, 7, 100, 1024, 5000))
+    def test_read(self, read_size):
+        """Test the ranges are returned in order whatever the read size."""
+        # GIVEN an object read with ranges of 100 bytes by 3 jobs
+        reader = RangedReadIO(self._read_range, len(self.content), 3, 100)
+
+        # WHEN the object is read
+        data = b""
+        while True:
+            buf = reader.read(read_size)
+            if not buf:
+                break
+            data += buf
+
+        # THEN the content of the object is returned
+        assert data == self.content
+        reader.close()
+
+    def test_read_all(self):
+        """Test the whole object is returned by a read without size."""
+        reader = RangedReadIO(self._read_range, len(self.content), 2, 100)
+        assert reader.read() == self.content
+        assert reader.read() == b""
+
+    def test_reorder_buffer_bounded(self):
+        """Test at most twice as many ranges as the jobs are fetched ahead."""
+        # GIVEN a read_range function recording the requested offsets
+        offsets = []
+
+        def read_range(offset, length):
+            offsets.append(offset)
+            return self._read_range(offset, length)
+
+        # WHEN an object of 11 ranges is opened by 2 jobs
+        reader = RangedReadIO(read_range, len(self.content), 2, 100)
+        for _, future in reader._pending:
+            future.result()
+
+        # THEN only the first 4 ranges are fetched
+        assert sorted(offsets) == [0, 100, 200, 300]
+        # AND each range is returned in order
+        assert reader.read(150) == self.content[:150]
+        reader.close()
+
+    def test_short_range(self):
+        """Test an error is raised when a range is truncated."""
+        reader = RangedReadIO(lambda offset, length: b"x", 200, 2, 100)
+        with pytest.raises(CloudProviderError):
+            reader.read()
+
+    def test_range_error(self):
+        """Test the errors of the ranged reads are raised by read."""
+
+        def read_range(offset, length):
+            raise ValueError("network error")
+
+        reader = RangedReadIO(read_range, 200, 2, 100)
+        with pytest.raises(ValueError, match="network error"):
+            reader.read()
+
+
+class TestPipelinedStreamingIO(object):
+    """Tests for the PipelinedStreamingIO class."""
+
+    content = bytes(range(256)) * 40
+
+    @pytest.mark.parametrize("read_size", (1, 7, 1000, 20000))
+    def test_read(self, read_size):
+        """Test the stream is returned in order whatever the read size."""
+        # GIVEN a gzip compressed stream read in chunks of 100 bytes
+        compressed = gzip.compress(self.content)
+        pipeline = PipelinedStreamingIO(
+            BytesIO(compressed),
+            cloud_compression.get_stream_decompressor("gz"),
+            chunk_size=100,
+        )
+
+        # WHEN the stream is read
+        data = b""
+        while True:
+            buf = pipeline.read(read_size)
+            if not buf:
+                break
+            data += buf
+        pipeline.close()
+
+        # THEN the uncompressed content is returned
+        assert data == self.content
+        # AND the bytes handled by each stage are recorded
+        assert pipeline.stats["download"]["size"] == len(compressed)
+        assert pipeline.stats["decompress"]["size"] == len(self.content)
+        assert pipeline.stats["extract"]["size"] == len(self.content)
+        assert set(pipeline.throughput()) == {"download", "decompress", "extract"}
+
+    def test_read_uncompressed(self):
+        """Test the stream is passed through when it is not compressed."""
+        with PipelinedStreamingIO(BytesIO(self.content), chunk_size=100) as pipeline:
+            assert pipeline.read() == self.content
+            assert pipeline.read() == b""
+        # AND no time is spent decompressing
+        assert pipeline.throughput()["decompress"] is None
+
+    def test_download_error(self):
+        """Test the errors of the download are raised by read."""
+        # GIVEN a stream failing after the first chunk
+        response = mock.Mock()
+        response.read.side_effect = [b"x" * 100, ValueError("network error")]
+
+        with PipelinedStreamingIO(response, chunk_size=100) as pipeline:
+            # WHEN the stream is read
+            # THEN the data downloaded before the error is returned
+            assert pipeline.read(100) == b"x" * 100
+            # AND the error is then raised
+            with pytest.raises(ValueError, match="network error"):
+                pipeline.read(100)
+
+    def test_decompress_error(self):
+        """Test the errors of the decompression are raised by read."""
+        # GIVEN a stream which is not valid gzip data
+        with PipelinedStreamingIO(
+            BytesIO(b"not gzip data"),
+            cloud_compression.get_stream_decompressor("gz"),
+        ) as pipeline:
+            # WHEN the stream is read
+            # THEN the decompression error is raised
+            with pytest.raises(Exception, match="header"):
+                pipeline.read()
+
+    @mock.patch.object(PipelinedStreamingIO, "QUEUE_SIZE", 1)
+    def test_close_unblocks_stages(self):
+        """Test closing the pipeline stops the stages waiting on full queues."""
+        # GIVEN a pipeline whose queues are full
+        pipeline = PipelinedStreamingIO(BytesIO(self.content), chunk_size=10)
+        assert pipeline.read(10) == self.content[:10]
+
+        # WHEN the pipeline is closed before the end of the stream
+        pipeline.close()
+
+        # THEN its threads are stopped
+        assert not any(thread.is_alive() for thread in pipeline._threads)
+        # AND the rest of the stream has not been downloaded
+        assert pipeline.stats["download"]["size"] < len(self.content)
+
+
+class TestCloudTarExtractor(object):
+    """Tests for the CloudTarExtractor class."""
+
+    @staticmethod
+    def _tar(members):
+        """
+        Build a streamed tar archive
+
+        :param list members: tuples of name, content and mode of the members,
+          the content is None for the directories and a str for the symlinks
+        """
+        tar_fileobj = BytesIO()
+        with TarFile.open(mode="w|", fileobj=tar_fileobj) as tf:
+            for name, content, mode in members:
+                ti = TarInfo(name=name)
+                ti.mode = mode
+                ti.mtime = 1000000000
+                if content is None:
+                    ti.type = tarfile.DIRTYPE
+                    tf.addfile(ti)
+                elif isinstance(content, str):
+                    ti.type = tarfile.SYMTYPE
+                    ti.linkname = content
+                    tf.addfile(ti)
+                else:
+                    ti.size = len(content)
+                    tf.addfile(ti, BytesIO(content))
+        tar_fileobj.seek(0)
+        return TarFile.open(mode="r|", fileobj=tar_fileobj)
+
+    @mock.patch.object(CloudTarExtractor, "MAX_QUEUED_FILE_SIZE", 10)
+    def test_extract(self, tmpdir):
+        """Test the members are extracted with their mode and times."""
+        # GIVEN an archive with directories, small and large files and a symlink
+        tf = self._tar(
+            [
+                ("base", None, 0o700),
+                ("base/1", None, 0o700),
+                ("base/1/small", b"small", 0o600),
+                ("base/1/large", b"x" * 100, 0o640),
+                ("base/2/implicit", b"data", 0o600),
+                ("link", "base/1/small", 0o777),
+            ]
+        )
+
+        # WHEN it is extracted by three writers
+        CloudTarExtractor(str(tmpdir), write_jobs=3).extract(tf)
+
+        # THEN the content of the files is written
+        assert tmpdir.join("base", "1", "small").read() == "small"
+        assert tmpdir.join("base", "1", "large").read() == "x" * 100
+        assert tmpdir.join("base", "2", "implicit").read() == "data"
+        assert os.readlink(tmpdir.join("link").strpath) == "base/1/small"
+        # AND the modes of the members are applied
+        assert stat.S_IMODE(os.stat(tmpdir.join("base").strpath).st_mode) == 0o700
         assert (
-            f"Throttling upload by waiting for {expected_wait_time} seconds"
-        ) in caplog.text
-        # AND size_of_last_upload is set to the new part size
-        assert uploader.size_of_last_upload == part_size
-        # AND time_of_last_upload is set to the most recent datetime returned
-        assert uploader.time_of_last_upload == mock_times[-1]
+            stat.S_IMODE(os.stat(tmpdir.join("base", "1", "large").strpath).st_mode)
+            == 0o640
+        )
+        # AND so are their times, even for the directories with content
+        for path in ("base", "base/1", "base/1/small", "base/1/large"):
+            assert os.stat(tmpdir.join(path).strpath).st_mtime == 1000000000
+
+    @pytest.mark.parametrize("write_jobs", (1, 4))
+    def test_extract_hardlink(self, write_jobs, tmpdir):
+        """Test the hard links are created once their target is written."""
+        # GIVEN a streamed archive with a file queued to the writers followed
+        # by a hard link to it
+        content = b"x" * (2 << 20)
+        tar_fileobj = BytesIO()
+        with TarFile.open(mode="w|", fileobj=tar_fileobj) as tf:
+            ti = TarInfo(name="base/1/file")
+            ti.size = len(content)
+            ti.mode = 0o600
+            tf.addfile(ti, BytesIO(content))
+            ti = TarInfo(name="base/2/link")
+            ti.type = tarfile.LNKTYPE
+            ti.linkname = "base/1/file"
+            ti.mode = 0o600
+            tf.addfile(ti)
+        tar_fileobj.seek(0)
+        tf = TarFile.open(mode="r|", fileobj=tar_fileobj)
+
+        # WHEN it is extracted
+        CloudTarExtractor(str(tmpdir), write_jobs=write_jobs).extract(tf)
+
+        # THEN the link shares the content and the inode of its target
+        target = tmpdir.join("base", "1", "file")
+        link = tmpdir.join("base", "2", "link")
+        assert link.read_binary() == content
+        assert os.stat(link.strpath).st_ino == os.stat(target.strpath).st_ino
+
+    def test_extract_members(self, tmpdir):
+        """Test only the requested members are extracted."""
+        tf = self._tar([("wanted", b"a", 0o600), ("unwanted", b"b", 0o600)])
+        CloudTarExtractor(str(tmpdir)).extract(tf, {"wanted"})
+        assert os.listdir(str(tmpdir)) == ["wanted"]
+
+    @mock.patch("barman.cloud.os.makedirs", wraps=os.makedirs)
+    def test_directories_created_once(self, mock_makedirs, tmpdir):
+        """Test the parent directories are only created once."""
+        # GIVEN an archive with several files in the same directory
+        tf = self._tar([("base/1/%s" % i, b"data", 0o600) for i in range(5)])
+        tmpdir.mkdir("base")
+
+        # WHEN it is extracted
+        CloudTarExtractor(str(tmpdir)).extract(tf)
+
+        # THEN the directory is created once
+        mock_makedirs.assert_called_once_with(
+            os.path.join(str(tmpdir), "base", "1"), exist_ok=True
+        )
+
+    @mock.patch.object(CloudTarExtractor, "MAX_QUEUED_FILE_SIZE", 10)
+    @mock.patch("barman.cloud.fallocate")
+    def test_preallocate(self, mock_fallocate, tmpdir):
+        """Test the files are preallocated when requested."""
+        tf = self._tar([("small", b"small", 0o600), ("large", b"x" * 100, 0o600)])
+        CloudTarExtractor(str(tmpdir), preallocate=True).extract(tf)
+        assert sorted(call[0][1] for call in mock_fallocate.call_args_list) == [5, 100]
+
+    @pytest.mark.parametrize("name", ("../outside", "/absolute"))
+    def test_refuse_outside_destination(self, name, tmpdir):
+        """Test the members outside of the destination are refused."""
+        tf = self._tar([(name, b"data", 0o600)])
+        with pytest.raises(tarfile.ExtractError, match="Refusing to extract"):
+            CloudTarExtractor(str(tmpdir)).extract(tf)
+
+    def test_write_error(self, tmpdir):
+        """Test the errors of the writers are raised."""
+        # GIVEN a file whose directory cannot be written
+        tf = self._tar([("file", b"data", 0o600)])
+        extractor = CloudTarExtractor(str(tmpdir))
+
+        # WHEN it is extracted
+        # THEN the error of the writer is raised
+        with mock.patch("barman.cloud.os.open", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                extractor.extract(tf)
+
+
+class TestGetStreamDecompressor(object):
+    """Tests for the cloud_compression.get_stream_decompressor function."""
 
     @pytest.mark.parametrize(
+        ("compression", "compress"),
         (
-            "max_bandwidth",
-            "time_of_last_upload",
-            "size_of_last_upload",
-        ),
-        (
-            # No time or size of last upload so we do not wait
-            (10 << 30, None, None),
-            # No time of last upload so we do not wait
-            (10 << 20, None, 5 << 20),
-            # No size of last upload so we do not wait
-            (10 << 30, datetime.datetime(2023, 10, 9, 16, 43, 59, 75000), None),
-            # 100MB/s bandwidth limit, last uploaded 100MB 1.5s ago: do not wait
-            (
-                100 << 20,
-                datetime.datetime(2023, 10, 9, 16, 43, 58, 500000),
-                100 << 20,
-            ),
-            # 100MB/s bandwidth limit, last uploaded 10MB 0.9s ago: do not wait
-            (
-                100 << 20,
-                datetime.datetime(2023, 10, 9, 16, 43, 59, 100000),
-                10 << 20,
-            ),
+            ("gz", gzip.compress),
+            ("bz2", bz2.compress),
+            ("xz", lzma.compress),
+            ("snappy", lambda data: snappy.StreamCompressor().add_chunk(data)),
+            ("zstd", lambda data: zstandard.ZstdCompressor().compress(data)),
+            ("lz4", lz4.frame.compress),
         ),
     )
-    @mock.patch("barman.cloud.time")
-    def test_throttle_upload_no_wait(
-        self,
-        mock_time,
-        max_bandwidth,
-        time_of_last_upload,
-        size_of_last_upload,
-        caplog,
+    def test_decompress_in_chunks(self, compression, compress):
+        """Test the streams are decompressed chunk by chunk."""
+        # GIVEN a compressed stream
+        content = b"arbitrary content" * 100
+        compressed = compress(content)
+        decompressor = cloud_compression.get_stream_decompressor(compression)
+
+        # WHEN it is decompressed in chunks
+        data = b"".join(
+            decompressor.decompress(compressed[i : i + 10])
+            for i in range(0, len(compressed), 10)
+        )
+
+        # THEN the content is returned
+        assert data == content
+
+    def test_no_compression(self):
+        """Test no decompressor is returned for uncompressed streams."""
+        assert cloud_compression.get_stream_decompressor("") is None
+
+
+class TestFileReadahead(object):
+    """Tests for the FileReadahead class."""
+
+    @staticmethod
+    def _wait_for(condition, timeout=5):
+        """Wait until the condition is true, failing after the timeout."""
+        deadline = time.time() + timeout
+        while not condition():
+            assert time.time() < deadline, "timed out waiting for the readahead"
+            time.sleep(0.01)
+
+    @mock.patch("barman.cloud.fadvise")
+    def test_readahead_window(self, mock_fadvise, tmpdir):
+        """Test the files are read ahead without exceeding the window."""
+        # GIVEN three files of 6 bytes
+        paths = []
+        for name in ("a", "b", "c"):
+            tmpdir.join(name).write("xxxxxx")
+            paths.append(tmpdir.join(name).strpath)
+        # AND a readahead with a window of 10 bytes
+        readahead = FileReadahead(window=10)
+        try:
+            # WHEN the files are queued
+            for path in paths:
+                readahead.add(path)
+
+            # THEN the first two files are read ahead
+            self._wait_for(lambda: mock_fadvise.call_count == 2)
+            time.sleep(0.05)
+            assert mock_fadvise.call_count == 2
+            for call in mock_fadvise.call_args_list:
+                assert call[0][1] == "POSIX_FADV_WILLNEED"
+                assert call[1] == {"length": 6}
+
+            # WHEN the first file is uploaded
+            readahead.done()
+
+            # THEN the third file is read ahead
+            self._wait_for(lambda: mock_fadvise.call_count == 3)
+        finally:
+            readahead.close()
+
+    @mock.patch("barman.cloud.fadvise")
+    def test_readahead_skips_uploaded_files(self, mock_fadvise, tmpdir):
+        """Test the files already uploaded are not read ahead."""
+        # GIVEN a readahead with a window of 10 bytes, full with a large file
+        tmpdir.join("a").write("x" * 20)
+        tmpdir.join("b").write("xxxxxx")
+        readahead = FileReadahead(window=10)
+        try:
+            readahead.add(tmpdir.join("a").strpath)
+            self._wait_for(lambda: mock_fadvise.call_count == 1)
+            # AND only the beginning of the large file was read ahead
+            assert mock_fadvise.call_args[1] == {"length": 10}
+
+            # WHEN another file is queued and both are uploaded before it is
+            # read ahead
+            readahead.add(tmpdir.join("b").strpath)
+            readahead.add(tmpdir.join("a").strpath)
+            readahead.done()
+            readahead.done()
+
+            # THEN only the file queued after them is read ahead
+            self._wait_for(lambda: mock_fadvise.call_count == 2)
+            time.sleep(0.05)
+            assert mock_fadvise.call_count == 2
+            assert mock_fadvise.call_args[1] == {"length": 10}
+        finally:
+            readahead.close()
+
+
+class TestCloudUploadController(object):
+    """Tests for the CloudUploadController class."""
+
+    @pytest.mark.parametrize("drop_page_cache", (False, True))
+    @mock.patch("barman.cloud.fadvise")
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_open_file(
+        self, mock_cloud_interface, mock_fadvise, drop_page_cache, tmpdir
     ):
-        """
-        Verifies that throttle will wait for the correct length of time for the
-        size and time of the last upload and the specified max_bandwidth.
-        """
-        # GIVEN one fixed datetime
-        mock_next_time = datetime.datetime(2023, 10, 9, 16, 44, 0, 0)
-        # AND a CloudTarUploader with the specified max_bandwidth
-        uploader = CloudTarUploader(
-            None,
-            None,
-            None,
+        """Test the uploaded files are read sequentially with large reads."""
+        # GIVEN a controller
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        controller = CloudUploadController(
+            mock_cloud_interface,
+            "prefix",
+            1 << 30,
             None,
-            max_bandwidth,
+            drop_page_cache=drop_page_cache,
         )
-        # AND the CloudTarUploader last uploaded at the specified time
-        uploader.time_of_last_upload = time_of_last_upload
-        # AND the CloudTarUploader last uploaded a part of the specified size
-        uploader.size_of_last_upload = size_of_last_upload
+        tmpdir.join("file").write("content")
 
-        # WHEN _throttle_upload is called with a given part size
-        with mock.patch("barman.cloud.datetime.datetime") as mock_datetime:
-            mock_datetime.now.return_value = mock_next_time
-            part_size = 10 << 30
-            uploader._throttle_upload(part_size)
+        # WHEN a file is opened and read
+        path = tmpdir.join("file").strpath
+        with mock.patch("barman.cloud.open", wraps=open, create=True) as mock_open:
+            with controller._open_file(path) as fileobj:
+                assert fileobj.read() == b"content"
 
-        # THEN time.sleep was not called
-        mock_time.sleep.assert_not_called()
-        # AND the log output is empty
-        assert caplog.text == ""
-
-        # AND size_of_last_upload is set to the new part size
-        assert uploader.size_of_last_upload == part_size
-        # AND time_of_last_upload is set to the latest returned datetime
-        assert uploader.time_of_last_upload == mock_next_time
+        # THEN it is read with large buffered reads
+        mock_open.assert_called_once_with(path, "rb", buffering=READ_BUFSIZE)
+        # AND the kernel is told it is read sequentially
+        advices = [call[0][1] for call in mock_fadvise.call_args_list]
+        # AND its pages are dropped from the page cache only if requested
+        assert advices == ["POSIX_FADV_SEQUENTIAL"] + (
+            ["POSIX_FADV_DONTNEED"] if drop_page_cache else []
+        )
 
-    @pytest.mark.parametrize("max_bandwidth", (10 << 20, None))
+    @mock.patch("barman.cloud.CloudTarUploader")
     @mock.patch("barman.cloud.CloudInterface")
-    def test_flush_max_bandwidth(self, mock_cloud_interface, max_bandwidth):
-        """Verifies behaviour of flush w.r.t max_bandwidth."""
-        # GIVEN a CloudTarUploader with a given max_bandwidth
-        uploader = CloudTarUploader(
+    def test_bandwidth_limits(self, mock_cloud_interface, mock_tar_uploader, tmpdir):
+        """Test the bandwidth limits are set and applied to the tablespaces."""
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        mock_tar_uploader.return_value.size = 0
+
+        # WHEN a controller is created with a global and a tablespace limit
+        controller = CloudUploadController(
             mock_cloud_interface,
+            "prefix",
+            1 << 30,
             None,
-            None,
-            None,
-            max_bandwidth,
+            max_bandwidth=100,
+            tablespace_bandwidth={"tbs1": 10},
         )
-        uploader.buffer = MagicMock()
-        # WHEN flush is called
-        with mock.patch(
-            "barman.cloud.CloudTarUploader._throttle_upload"
-        ) as mock_throttle:
-            uploader.flush()
-            # THEN _throttle was not called for a None max_bandwidth
-            if max_bandwidth is None:
-                mock_throttle.assert_not_called()
-            # AND _throttle was called when max_bandwidth was set
-            else:
-                mock_throttle.assert_called_once()
 
+        # THEN the limits are set on the cloud interface
+        assert mock_cloud_interface.set_bandwidth_limit.call_args_list == [
+            mock.call(100),
+            mock.call(10, group="tbs1"),
+        ]
 
-class TestCloudUploadController(object):
-    """Tests for the CloudUploadController class."""
+        # AND WHEN the tablespaces and the data directory are uploaded
+        for label, dst in (("tbs1", "16384"), ("tbs2", "16385"), ("pgdata", "data")):
+            controller.upload_directory(label, tmpdir.strpath, dst)
+
+        # THEN only the tar of the limited tablespace is in its bandwidth group
+        groups = {
+            call[1]["key"]: call[1]["bandwidth_group"]
+            for call in mock_tar_uploader.call_args_list
+        }
+        assert groups == {
+            "prefix/16384.tar": "tbs1",
+            "prefix/16385.tar": None,
+            "prefix/data.tar": None,
+        }
 
     @pytest.mark.parametrize(
         ("max_archive_size_arg", "max_archive_size_property"),
@@ -4198,6 +6517,393 @@ class TestCloudUploadController(object):
         # THEN the chunk_size is set to the expected value
         assert controller.chunk_size == expected_chunk_size
 
+    def test_balance_streams(self):
+        """Test files are spread among the streams balancing their size."""
+        # GIVEN files of different sizes
+        files = [
+            (10, "/pgdata/a", "a"),
+            (70, "/pgdata/b", "b"),
+            (40, "/pgdata/c", "c"),
+            (30, "/pgdata/d", "d"),
+            (20, "/pgdata/e", "e"),
+        ]
+
+        # WHEN they are split in two streams
+        streams = CloudUploadController._balance_streams(files, 2)
+
+        # THEN the largest files are assigned to the least loaded stream,
+        # resulting in total sizes of 90 and 80
+        # AND the files of each stream are sorted by path
+        assert streams == [
+            [("/pgdata/b", "b"), ("/pgdata/e", "e")],
+            [("/pgdata/a", "a"), ("/pgdata/c", "c"), ("/pgdata/d", "d")],
+        ]
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_upload_directory_streams(self, mock_cloud_interface, tmpdir):
+        """Test a directory is uploaded as several concurrent tar streams."""
+        # GIVEN a cloud interface which keeps the uploaded parts in memory
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        uploaded = {}
+
+        def async_upload_part(
+            upload_metadata, key, body, part_number, bandwidth_group=None
+        ):
+            with open(body.name, "rb") as part:
+                uploaded[key] = uploaded.get(key, b"") + part.read()
+            os.unlink(body.name)
+
+        mock_cloud_interface.async_upload_part.side_effect = async_upload_part
+        # AND a directory with some files
+        src = tmpdir.mkdir("pgdata")
+        src.mkdir("base").mkdir("1")
+        contents = {}
+        for i in range(8):
+            name = os.path.join("base", "1", str(i))
+            contents[name] = str(i) * (i + 1) * 1000
+            src.join(name).write(contents[name])
+        # AND a controller writing three tar streams
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1 << 30, None, tar_streams=3
+        )
+
+        # WHEN the directory is uploaded
+        controller.upload_directory("pgdata", src.strpath, "data")
+        controller.close()
+
+        # THEN three tar files are uploaded
+        assert sorted(uploaded) == [
+            "prefix/data.tar",
+            "prefix/data_0001.tar",
+            "prefix/data_0002.tar",
+        ]
+        # AND every file is in exactly one of them
+        # AND the directories are only in the main tar file
+        members = {}
+        for key, data in uploaded.items():
+            with open_tar(fileobj=BytesIO(data), mode="r|") as tf:
+                for member in tf:
+                    assert member.name not in members
+                    members[member.name] = key
+                    if member.isdir():
+                        assert key == "prefix/data.tar"
+                    else:
+                        content = tf.extractfile(member).read().decode()
+                        assert content == contents[member.name]
+        assert sorted(members) == [".", "base", "base/1"] + sorted(contents)
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_get_tar_rollover_releases_lock(self, mock_cloud_interface):
+        """Test a full archive is closed without holding the lock of the streams."""
+        # GIVEN a controller writing two tar streams
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1 << 30, None, tar_streams=2
+        )
+        # AND a full archive in the first stream
+        controller._get_tar("data", 0)
+        full_uploader = controller._open_tars[("data", 0)]
+        full_uploader.size = controller.max_archive_size + 1
+
+        def wait_for_multipart_upload(key, lock):
+            # Another stream can take the lock while the full archive is uploaded
+            acquired = []
+
+            def other_stream():
+                acquired.append(controller._lock.acquire(timeout=1))
+                if acquired[0]:
+                    controller._lock.release()
+
+            thread = threading.Thread(target=other_stream)
+            thread.start()
+            thread.join()
+            assert acquired == [True]
+            return FileUploadStatistics(status="done")
+
+        mock_cloud_interface.wait_for_multipart_upload.side_effect = (
+            wait_for_multipart_upload
+        )
+
+        # WHEN the next file of the stream needs a tar
+        controller._get_tar("data", 0)
+
+        # THEN the full archive is uploaded
+        mock_cloud_interface.wait_for_multipart_upload.assert_called_once_with(
+            "prefix/data.tar", lock=controller._lock
+        )
+        # AND the next archive of the stream is opened
+        assert controller._open_tars[("data", 0)].key == "prefix/data_0001.tar"
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_upload_directory_resume(self, mock_cloud_interface, tmpdir):
+        """Test an interrupted upload is resumed from the journal."""
+        # GIVEN a cloud interface which keeps the uploaded archives in memory
+        # and fails when uploading the third archive
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        uploaded = {}
+        failing_keys = ["prefix/data_0002.tar"]
+
+        def async_upload_part(
+            upload_metadata, key, body, part_number, bandwidth_group=None
+        ):
+            with open(body.name, "rb") as part:
+                data = part.read()
+            os.unlink(body.name)
+            if key in failing_keys:
+                raise CloudUploadingError("upload failed")
+            uploaded[key] = uploaded.get(key, b"") + data
+
+        mock_cloud_interface.async_upload_part.side_effect = async_upload_part
+        mock_cloud_interface.create_multipart_upload.side_effect = lambda key: {
+            "UploadId": key
+        }
+        mock_cloud_interface._abort_multipart_upload.side_effect = (
+            lambda upload_metadata, key: uploaded.pop(key, None)
+        )
+        mock_cloud_interface.wait_for_multipart_upload.side_effect = (
+            lambda key, lock=None: FileUploadStatistics(
+                status="done",
+                end_time=datetime.datetime.now(),
+                parts={1: {"part_number": 1, "end_time": datetime.datetime.now()}},
+            )
+        )
+        # AND a directory with some files
+        src = tmpdir.mkdir("pgdata")
+        src.mkdir("base").mkdir("1")
+        contents = {}
+        for i in range(4):
+            name = os.path.join("base", "1", str(i))
+            contents[name] = str(i) * (70 << 10)
+            src.join(name).write(contents[name])
+        journal_path = tmpdir.join("journal.json").strpath
+
+        # WHEN the directory is uploaded with a journal, one file per archive
+        journal = CloudUploadJournal.open(journal_path, "s3://bucket", "backup_id")
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1, None, journal=journal
+        )
+        # THEN the upload fails
+        with pytest.raises(CloudUploadingError):
+            controller.upload_directory("pgdata", src.strpath, "data")
+            controller.close()
+        # AND the interrupted archive is recorded as still uploading
+        journal = CloudUploadJournal.open(journal_path, "s3://bucket", "backup_id")
+        assert journal.archives["prefix/data_0002.tar"]["status"] == "uploading"
+
+        # WHEN the upload is resumed
+        del failing_keys[:]
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1, None, journal=journal
+        )
+        controller.upload_directory("pgdata", src.strpath, "data")
+        controller.close()
+
+        # THEN the interrupted upload is aborted
+        mock_cloud_interface._abort_multipart_upload.assert_called_once_with(
+            {"UploadId": "prefix/data_0002.tar"}, "prefix/data_0002.tar"
+        )
+        # AND every path is uploaded exactly once
+        members = []
+        for key in sorted(uploaded):
+            with open_tar(fileobj=BytesIO(uploaded[key]), mode="r|") as tf:
+                for member in tf:
+                    members.append(member.name)
+                    if member.isfile():
+                        content = tf.extractfile(member).read().decode()
+                        assert content == contents[member.name]
+        assert sorted(members) == [".", "base", "base/1"] + sorted(contents)
+        # AND the statistics of the archives uploaded by both runs are kept
+        stats = controller.upload_stats["data"]
+        assert len(stats) == len(uploaded)
+        assert all(isinstance(s["start_time"], datetime.datetime) for s in stats)
+        assert all(list(s["parts"]) == [1] for s in stats)
+        # AND the last archive is recorded as final in the journal
+        journal = CloudUploadJournal.open(journal_path, "s3://bucket", "backup_id")
+        last_key = sorted(uploaded)[-1]
+        assert journal.archives[last_key]["final"] is True
+        assert all(a["status"] == "done" for a in journal.archives.values())
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_upload_directory_incremental(self, mock_cloud_interface, tmpdir):
+        """Test unchanged files are not uploaded by incremental backups."""
+        # GIVEN a cloud interface which keeps the uploaded parts in memory
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        uploaded = {}
+
+        def async_upload_part(
+            upload_metadata, key, body, part_number, bandwidth_group=None
+        ):
+            with open(body.name, "rb") as part:
+                uploaded[key] = uploaded.get(key, b"") + part.read()
+            os.unlink(body.name)
+
+        mock_cloud_interface.async_upload_part.side_effect = async_upload_part
+        # AND a directory with two files
+        src = tmpdir.mkdir("pgdata")
+        src.mkdir("base").mkdir("1")
+        src.join("base", "1", "1").write("unchanged")
+        src.join("base", "1", "2").write("changed")
+        unchanged_stat = os.stat(src.join("base", "1", "1").strpath)
+        # AND a parent backup, started after the first file was last modified,
+        # which contains both files
+        parent_manifest = CloudBackupManifest(
+            "20250101T000000", begin_time=unchanged_stat.st_mtime + 1
+        )
+        parent_manifest.add_file("data", "base/1/1", 9, unchanged_stat.st_mtime)
+        parent_manifest.add_file("data", "base/1/2", 3, 0.0)
+        controller = CloudUploadController(
+            mock_cloud_interface,
+            "prefix",
+            1 << 30,
+            None,
+            parent_manifest=parent_manifest,
+        )
+
+        # WHEN the directory is uploaded
+        controller.upload_directory("pgdata", src.strpath, "data")
+        controller.close()
+
+        # THEN only the changed file is uploaded
+        with open_tar(fileobj=BytesIO(uploaded["prefix/data.tar"]), mode="r|") as tf:
+            assert [member.name for member in tf] == [
+                ".",
+                "base",
+                "base/1",
+                "base/1/2",
+            ]
+        # AND the manifest references the unchanged file from the parent backup
+        assert controller.manifest.parent_backup_id == "20250101T000000"
+        assert controller.manifest.files["data"]["base/1/1"] == {
+            "size": 9,
+            "mtime": unchanged_stat.st_mtime,
+            "backup_id": "20250101T000000",
+        }
+        # AND it records the changed file as uploaded by the backup
+        assert controller.manifest.files["data"]["base/1/2"] == {
+            "size": 7,
+            "mtime": os.stat(src.join("base", "1", "2").strpath).st_mtime,
+        }
+
+    @mock.patch.object(CloudChunkStore, "CHUNK_SIZE", 4)
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_upload_directory_chunk_store(self, mock_cloud_interface, tmpdir):
+        """Test large relation files are uploaded to the chunk store."""
+        # GIVEN a cloud interface which keeps the uploaded parts in memory
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        mock_cloud_interface.MAX_CHUNKS_PER_FILE = 10000
+        uploaded = {}
+
+        def async_upload_part(
+            upload_metadata, key, body, part_number, bandwidth_group=None
+        ):
+            with open(body.name, "rb") as part:
+                uploaded[key] = uploaded.get(key, b"") + part.read()
+            os.unlink(body.name)
+
+        mock_cloud_interface.async_upload_part.side_effect = async_upload_part
+        # AND a directory with a large and a small relation file and a large
+        # file which is not a relation file
+        src = tmpdir.mkdir("pgdata")
+        src.mkdir("base").mkdir("1")
+        src.join("base", "1", "1").write("aaaabbbb")
+        src.join("base", "1", "2").write("aaa")
+        src.join("postgresql.conf").write("aaaabbbb")
+        os.chmod(src.join("base", "1", "1").strpath, 0o600)
+        # AND a chunk store
+        chunk_store = mock.Mock(
+            CHUNK_SIZE=4,
+            compression="gz",
+            uploaded_chunks=1,
+            uploaded_size=8,
+            reused_chunks=0,
+            reused_size=0,
+        )
+
+        def add_file(reader, lock=None):
+            reader.read()
+            return ["c1"]
+
+        chunk_store.add_file.side_effect = add_file
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1 << 30, None, chunk_store=chunk_store
+        )
+
+        # WHEN the directory is uploaded
+        controller.upload_directory("pgdata", src.strpath, "data")
+        controller.close()
+
+        # THEN the large relation file is not in the tar
+        with open_tar(fileobj=BytesIO(uploaded["prefix/data.tar"]), mode="r|") as tf:
+            assert sorted(member.name for member in tf) == [
+                ".",
+                "./postgresql.conf",
+                "base",
+                "base/1",
+                "base/1/2",
+            ]
+        # AND the manifest records its chunks
+        assert controller.manifest.chunk_compression == "gz"
+        entry = controller.manifest.files["data"]["base/1/1"]
+        assert entry["chunks"] == ["c1"]
+        assert entry["mode"] == 0o600
+        assert entry["size"] == 8
+        assert list(controller.manifest.get_chunked_files()["data"]) == ["base/1/1"]
+        # AND the chunks are uploaded under the lock of the tar streams
+        assert chunk_store.add_file.call_args[1]["lock"] is controller._lock
+        # AND closing the controller waits for the chunks to be stored
+        chunk_store.close.assert_called_once_with()
+
+    @mock.patch("barman.cloud.CloudInterface")
+    def test_resume_skips_completed_names(self, mock_cloud_interface, tmpdir):
+        """Test files of completely uploaded tars are not uploaded again."""
+        # GIVEN a journal recording a completely uploaded pg_control tar
+        mock_cloud_interface.MIN_CHUNK_SIZE = 5 << 20
+        mock_cloud_interface.MAX_ARCHIVE_SIZE = 1 << 30
+        journal = CloudUploadJournal(
+            tmpdir.join("journal.json").strpath, "s3://bucket", "backup_id"
+        )
+        journal.archive_completed(
+            "prefix/pg_control.tar",
+            "pg_control",
+            "global/pg_control",
+            FileUploadStatistics(status="done"),
+            final=True,
+        )
+        controller = CloudUploadController(
+            mock_cloud_interface, "prefix", 1 << 30, None, journal=journal
+        )
+
+        # WHEN pg_control is added again
+        controller.add_file(
+            "pg_control", "/pgdata/global/pg_control", "pg_control", "global/pg_control"
+        )
+        controller.close()
+
+        # THEN nothing is uploaded
+        mock_cloud_interface.create_multipart_upload.assert_not_called()
+        # AND the statistics of the previous upload are kept
+        assert controller.upload_stats["pg_control"][0]["status"] == "done"
+
+    def test_journal_different_backup(self, tmpdir):
+        """Test a journal cannot be used to resume a different backup."""
+        # GIVEN a journal for a backup
+        journal_path = tmpdir.join("journal.json").strpath
+        CloudUploadJournal(journal_path, "s3://bucket", "backup_id").save()
+
+        # WHEN it is opened for a different backup
+        # THEN a ConfigurationException is raised
+        with pytest.raises(ConfigurationException):
+            CloudUploadJournal.open(journal_path, "s3://bucket", "other_backup_id")
+
 
 class TestCloudBackupUploader(object):
     """Tests for the CloudBackupUploader class."""
@@ -4252,6 +6958,14 @@ class TestCloudBackupUploader(object):
             ]
 
         mock_backup_strategy.return_value.start_backup.side_effect = mock_start_backup
+        # AND the controller records the manifest of the uploaded files
+        mock_cloud_upload_controller.return_value.manifest = CloudBackupManifest()
+        mock_cloud_upload_controller.return_value.key_prefix = (
+            "test_server/base/backup_id"
+        )
+        mock_backup_info.return_value.begin_time = datetime.datetime(
+            2025, 1, 1, tzinfo=datetime.timezone.utc
+        )
 
         # WHEN backup is called
         uploader.backup()
@@ -4272,6 +6986,12 @@ class TestCloudBackupUploader(object):
             for call in mock_cloud_upload_controller.return_value.add_file.call_args_list
         ]
         assert "/path/to/pg_ident.conf" in uploaded_file_src
+        # AND the manifest was uploaded with the start time of the backup
+        manifest_call = mock_cloud_interface.upload_fileobj.call_args_list[0]
+        assert manifest_call[1]["key"] == "test_server/base/backup_id/manifest.json"
+        manifest = CloudBackupManifest.loads(manifest_call[0][0].getvalue())
+        assert manifest.backup_id == "backup_id"
+        assert manifest.begin_time == 1735689600
         # AND the backup was coordinated with PostgreSQL
         mock_backup_strategy.return_value.start_backup.assert_called_once_with(
             mock_backup_info.return_value
@@ -4292,7 +7012,40 @@ class TestCloudBackupUploader(object):
             None,
             expected_min_chunk_size,
             expected_max_bandwidth,
+            1,
+            0,
+            False,
+            False,
+            None,
+            None,
+            None,
+            False,
+            None,
+        )
+
+    @mock.patch("barman.cloud.CloudUploadController")
+    def test_create_upload_controller_chunk_store(self, mock_cloud_upload_controller):
+        """Test the backup is registered in the chunk store it uses."""
+        # GIVEN a CloudBackupUploader using a chunk store
+        mock_cloud_interface = MagicMock(
+            MAX_ARCHIVE_SIZE=99999, MIN_CHUNK_SIZE=2, path="/"
         )
+        chunk_store = mock.Mock()
+        uploader = CloudBackupUploader(
+            self.server_name,
+            mock_cloud_interface,
+            99999,
+            MagicMock(),
+            chunk_store=chunk_store,
+        )
+
+        # WHEN the upload controller of a backup is created
+        controller = uploader._create_upload_controller("backup_id")
+
+        # THEN the backup is registered before any chunk is uploaded
+        chunk_store.register_backup.assert_called_once_with("backup_id")
+        assert controller == mock_cloud_upload_controller.return_value
+        assert mock_cloud_upload_controller.call_args[0][12] == chunk_store
 
     @pytest.mark.parametrize("backup_should_fail", (False, True))
     @mock.patch("barman.cloud.CloudBackupUploader._create_upload_controller")
@@ -4321,6 +7074,9 @@ class TestCloudBackupUploader(object):
             backup_name=backup_name,
         )
         uploader.copy_start_time = datetime.datetime.now()
+        _mock_create_upload_controller.return_value.manifest = CloudBackupManifest()
+        mock_backup_info.return_value.begin_time = None
+        mock_backup_info.return_value.backup_id = "backup_id"
 
         # WHEN backup is called and it either succeeds or fails
         if backup_should_fail:
@@ -4360,6 +7116,9 @@ class TestCloudBackupUploader(object):
             mock_postgres,
         )
         uploader.copy_start_time = datetime.datetime.now()
+        _mock_create_upload_controller.return_value.manifest = CloudBackupManifest()
+        mock_backup_info.return_value.begin_time = None
+        mock_backup_info.return_value.backup_id = "backup_id"
 
         # WHEN backup is called and it either succeeds or fails
         if backup_should_fail:
@@ -4377,6 +7136,216 @@ class TestCloudBackupUploader(object):
         assert not any([attr == "backup_name" for attr in backup_info_attrs_set])
 
 
+class TestCloudBackupUploaderPostgres(object):
+    """Tests for the CloudBackupUploaderPostgres class."""
+
+    server_name = "test_server"
+
+    @pytest.fixture
+    def mock_postgres(self):
+        return MagicMock(
+            server_version=170000,
+            server_major_version="17",
+            conninfo="host=pg",
+            immediate_checkpoint=True,
+            **{"get_setting.return_value": "on"},
+        )
+
+    def test_read_backup_label(self, tmpdir):
+        """Test the backup label is read from the staging directory."""
+        # GIVEN a backup label written by pg_basebackup
+        tmpdir.join("backup_label").write("START WAL LOCATION: 0/2000028")
+        strategy = CloudPostgresBackupStrategy(
+            MagicMock(), self.server_name, tmpdir.strpath
+        )
+        backup_info = BackupInfo("backup_id")
+
+        # WHEN the backup label is read
+        strategy._read_backup_label(backup_info)
+
+        # THEN it is set in the backup info
+        assert backup_info.backup_label == "START WAL LOCATION: 0/2000028"
+
+    @mock.patch("barman.cloud.tempfile.mkdtemp")
+    @mock.patch("barman.cloud.StreamingConnection")
+    @mock.patch("barman.cloud.PgBaseBackup")
+    @mock.patch("barman.cloud.CloudUploadController")
+    @mock.patch("barman.cloud.CloudPostgresBackupStrategy")
+    @mock.patch("barman.cloud.BackupInfo")
+    def test_backup_incremental(
+        self,
+        mock_backup_info,
+        mock_backup_strategy,
+        mock_cloud_upload_controller,
+        mock_pg_basebackup,
+        mock_streaming_connection,
+        mock_mkdtemp,
+        mock_postgres,
+        tmpdir,
+    ):
+        """Test a block-level incremental backup is taken with pg_basebackup."""
+        # GIVEN a staging directory
+        staging_dir = tmpdir.mkdir("staging").strpath
+        mock_mkdtemp.return_value = staging_dir
+        # AND a CloudBackupUploaderPostgres for an incremental backup
+        mock_cloud_interface = MagicMock(MAX_ARCHIVE_SIZE=99999, path="/")
+        uploaded = {}
+
+        def upload_fileobj(fileobj, key):
+            uploaded[key] = fileobj.read()
+
+        mock_cloud_interface.upload_fileobj.side_effect = upload_fileobj
+        uploader = CloudBackupUploaderPostgres(
+            self.server_name,
+            mock_cloud_interface,
+            99999,
+            mock_postgres,
+            parent_backup_id="parent_id",
+        )
+        mock_backup_info.return_value.backup_id = "backup_id"
+        mock_backup_info.return_value.begin_time = None
+        mock_backup_info.return_value.get_external_config_files.return_value = []
+        mock_cloud_upload_controller.return_value.manifest = CloudBackupManifest()
+        mock_cloud_upload_controller.return_value.key_prefix = (
+            "/test_server/base/backup_id"
+        )
+
+        # AND the backup strategy finds a tablespace
+        def mock_start_backup(backup_info):
+            backup_info.pgdata = "/path/to/pgdata"
+            backup_info.tablespaces = [MagicMock(location="/tbs1", oid=1234)]
+
+        mock_backup_strategy.return_value.start_backup.side_effect = mock_start_backup
+        # AND pg_basebackup writes the backup in the staging directory
+        mock_pg_basebackup.get_version_info.return_value = {
+            "full_path": "/usr/bin/pg_basebackup",
+            "full_version": "17.2",
+        }
+
+        events = []
+
+        def run_pg_basebackup():
+            os.makedirs(os.path.join(staging_dir, "data"))
+            with open(os.path.join(staging_dir, "data", "backup_manifest"), "w") as f:
+                f.write("backup manifest")
+            events.append("pg_basebackup")
+
+        mock_pg_basebackup.return_value.side_effect = run_pg_basebackup
+        mock_backup_strategy.return_value.stop_backup.side_effect = (
+            lambda backup_info: events.append("stop_backup")
+        )
+        mock_cloud_upload_controller.return_value.upload_directory.side_effect = (
+            lambda **kwargs: events.append("upload_directory")
+        )
+
+        # WHEN backup is called
+        uploader.backup()
+
+        # THEN the backup_manifest of the parent backup was downloaded
+        parent_backup_manifest_path = os.path.join(
+            staging_dir, "parent_backup_manifest"
+        )
+        mock_cloud_interface.download_file.assert_called_once_with(
+            "/test_server/base/parent_id/backup_manifest",
+            parent_backup_manifest_path,
+            None,
+        )
+        # AND pg_basebackup took an incremental backup in the staging directory
+        mock_streaming_connection.assert_called_once_with("host=pg")
+        pg_basebackup_kwargs = mock_pg_basebackup.call_args[1]
+        assert pg_basebackup_kwargs["connection"] == (
+            mock_streaming_connection.return_value
+        )
+        assert pg_basebackup_kwargs["destination"] == os.path.join(staging_dir, "data")
+        assert pg_basebackup_kwargs["tbs_mapping"] == {
+            "/tbs1": os.path.join(staging_dir, "1234")
+        }
+        assert pg_basebackup_kwargs["immediate"] is True
+        assert pg_basebackup_kwargs["parent_backup_manifest_path"] == (
+            parent_backup_manifest_path
+        )
+        # AND the backup was read from the staging directory
+        mock_backup_strategy.assert_called_once_with(
+            mock_postgres, self.server_name, os.path.join(staging_dir, "data")
+        )
+        mock_backup_strategy.return_value.stop_backup.assert_called_once_with(
+            mock_backup_info.return_value
+        )
+        # AND the backup was stopped as soon as pg_basebackup exited, before
+        # the staging directory was uploaded
+        assert events == [
+            "pg_basebackup",
+            "stop_backup",
+            "upload_directory",
+            "upload_directory",
+        ]
+        # AND the staging directory was uploaded
+        uploaded_directory_src = [
+            call[1]["src"]
+            for call in mock_cloud_upload_controller.return_value.upload_directory.call_args_list
+        ]
+        assert uploaded_directory_src == [
+            os.path.join(staging_dir, "1234"),
+            os.path.join(staging_dir, "data"),
+        ]
+        # AND the backup label was not uploaded separately
+        mock_cloud_upload_controller.return_value.add_fileobj.assert_not_called()
+        # AND the manifest records the parent of the backup
+        manifest = CloudBackupManifest.loads(
+            uploaded["/test_server/base/backup_id/manifest.json"]
+        )
+        assert manifest.backup_method == "postgres"
+        assert manifest.parent_backup_id == "parent_id"
+        # AND the PostgreSQL backup manifest was uploaded
+        assert uploaded["/test_server/base/backup_id/backup_manifest"] == (
+            b"backup manifest"
+        )
+        # AND the staging directory was removed
+        assert not os.path.exists(staging_dir)
+
+    @pytest.mark.parametrize(
+        ("server_version", "summarize_wal", "parent_has_manifest", "expected_error"),
+        (
+            (160000, "on", True, "require PostgreSQL 17 or above"),
+            (170000, "off", True, "require 'summarize_wal' to be enabled"),
+            (170000, "on", False, "it was not taken with pg_basebackup"),
+        ),
+    )
+    @mock.patch("barman.cloud.PgBaseBackup")
+    def test_backup_incremental_preconditions(
+        self,
+        mock_pg_basebackup,
+        server_version,
+        summarize_wal,
+        parent_has_manifest,
+        expected_error,
+        mock_postgres,
+    ):
+        """Test no backup is taken when an incremental backup is not possible."""
+        # GIVEN a PostgreSQL server and a parent backup
+        mock_postgres.server_version = server_version
+        mock_postgres.get_setting.return_value = summarize_wal
+        mock_cloud_interface = MagicMock(MAX_ARCHIVE_SIZE=99999, path="/")
+        if not parent_has_manifest:
+            mock_cloud_interface.remote_open.return_value = None
+        uploader = CloudBackupUploaderPostgres(
+            self.server_name,
+            mock_cloud_interface,
+            99999,
+            mock_postgres,
+            parent_backup_id="parent_id",
+        )
+
+        # WHEN backup is called
+        # THEN a BackupException is raised
+        with pytest.raises(BackupException) as exc:
+            uploader.backup()
+        assert expected_error in str(exc.value)
+
+        # AND pg_basebackup was not run
+        mock_pg_basebackup.assert_not_called()
+
+
 class TestCloudBackupUploaderBarman(object):
     """
     Test the behaviour of CloudBackupUploaderBarman.
@@ -4384,6 +7353,7 @@ class TestCloudBackupUploaderBarman(object):
 
     server_name = "test_server"
 
+    @mock.patch("barman.cloud.CloudBackupCatalog")
     @mock.patch("barman.cloud.open")
     @mock.patch("barman.cloud.CloudUploadController")
     @mock.patch("barman.cloud.ConcurrentBackupStrategy")
@@ -4394,6 +7364,7 @@ class TestCloudBackupUploaderBarman(object):
         mock_backup_strategy,
         mock_cloud_upload_controller,
         _mock_open,
+        mock_catalog,
     ):
         """Test the happy path for backups."""
         # GIVEN a CloudBackupUploaderBarman
@@ -4422,6 +7393,10 @@ class TestCloudBackupUploaderBarman(object):
             MagicMock(location="/tbs1", oid=1234),
             MagicMock(location="/path/to/pgdata/tbs2", oid=1235),
         ]
+        mock_backup_info.return_value.begin_time = None
+        mock_backup_info.return_value.backup_id = "backup_id"
+        # AND the controller records the manifest of the uploaded files
+        mock_cloud_upload_controller.return_value.manifest = CloudBackupManifest()
 
         # WHEN backup is called
         uploader.backup()
@@ -4452,7 +7427,19 @@ class TestCloudBackupUploaderBarman(object):
             None,
             expected_min_chunk_size,
             expected_max_bandwidth,
+            1,
+            0,
+            False,
+            False,
+            None,
+            None,
+            None,
+            False,
+            None,
         )
+        # AND the backup was added to the index of the catalog
+        mock_catalog.assert_called_once_with(mock_cloud_interface, self.server_name)
+        mock_catalog.return_value.update_index.assert_called_once_with()
 
 
 class TestCloudBackupSnapshot(object):
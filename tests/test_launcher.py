@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# © Copyright EnterpriseDB UK Limited 2011-2025
+#
+# This file is part of Barman.
+#
+# Barman is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Barman is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+
+import getpass
+import json
+import subprocess
+import sys
+
+import pytest
+from mock import patch
+from testing_helpers import build_config_from_dicts
+
+import barman
+from barman import launcher, output
+from barman.get_wal import GetWalServer
+
+
+class TestParseGetWalArguments(object):
+    def test_get_wal(self):
+        args = launcher.parse_get_wal_arguments(
+            [
+                "-c",
+                "/etc/barman.conf",
+                "get-wal",
+                "--peek",
+                "10",
+                "--gzip",
+                "--partial",
+                "main",
+                "000000010000000000000001",
+            ]
+        )
+        assert args.config == "/etc/barman.conf"
+        assert args.command == "get-wal"
+        assert args.server_name == "main"
+        assert args.wal_name == "000000010000000000000001"
+        assert args.peek == 10
+        assert args.compression == "gzip"
+        assert args.partial
+        assert not args.keep_compression
+        assert not hasattr(args, "output_directory")
+        assert not hasattr(args, "test")
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            [],
+            ["list-servers"],
+            ["show-servers", "get-wal"],
+            ["-v"],
+            ["get-wal", "-h"],
+            ["get-wal", "main"],
+            ["get-wal", "--peek", "0", "main", "000000010000000000000001"],
+            ["get-wal", "--unknown", "main", "000000010000000000000001"],
+        ],
+    )
+    def test_unsupported_arguments(self, argv):
+        assert launcher.parse_get_wal_arguments(argv) is None
+
+    def test_shell_completion(self, monkeypatch):
+        monkeypatch.setenv("_ARGCOMPLETE", "1")
+        argv = ["get-wal", "main", "000000010000000000000001"]
+        assert launcher.parse_get_wal_arguments(argv) is None
+
+
+class TestGetServer(object):
+    @pytest.fixture
+    def args(self):
+        return launcher.parse_get_wal_arguments(
+            ["get-wal", "main", "000000010000000000000001"]
+        )
+
+    @pytest.fixture(autouse=True)
+    def reset_globals(self):
+        config = barman.__config__
+        output.error_occurred = False
+        yield
+        output.error_occurred = False
+        barman.__config__ = config
+
+    def test_get_server(self, args):
+        barman.__config__ = build_config_from_dicts()
+        server = launcher.get_server(args)
+        assert isinstance(server, GetWalServer)
+        assert server.config.name == "main"
+
+    def test_unknown_server(self, args, capsys):
+        barman.__config__ = build_config_from_dicts()
+        args.server_name = "nowhere"
+        with pytest.raises(SystemExit):
+            launcher.get_server(args)
+        _out, err = capsys.readouterr()
+        assert "Unknown server 'nowhere'" in err
+
+    def test_all_servers(self, args, capsys):
+        args.server_name = "all"
+        with pytest.raises(SystemExit):
+            launcher.get_server(args)
+        _out, err = capsys.readouterr()
+        assert "You cannot use 'all' in a single server context" in err
+
+    def test_disabled_server(self, args, capsys):
+        barman.__config__ = build_config_from_dicts(
+            main_conf={
+                "wals_directory": "/some/barman/home/main/wals",
+                "incoming_wals_directory": "/some/barman/home/main/wals",
+            }
+        )
+        with pytest.raises(SystemExit):
+            launcher.get_server(args)
+        _out, err = capsys.readouterr()
+        assert "Conflicting path" in err
+
+
+class TestMain(object):
+    @patch("barman.cli.main")
+    @patch("barman.launcher.get_wal")
+    def test_other_commands(self, mock_get_wal, mock_cli_main, monkeypatch):
+        monkeypatch.setattr(sys, "argv", ["barman", "list-servers"])
+        launcher.main()
+        mock_cli_main.assert_called_once_with()
+        mock_get_wal.assert_not_called()
+
+    @patch("barman.cli.main")
+    @patch("barman.launcher.global_config")
+    @patch("barman.launcher.get_wal")
+    def test_get_wal(
+        self, mock_get_wal, mock_global_config, mock_cli_main, monkeypatch
+    ):
+        monkeypatch.setattr(
+            sys, "argv", ["barman", "get-wal", "main", "000000010000000000000001"]
+        )
+        with pytest.raises(SystemExit):
+            launcher.main()
+        mock_global_config.assert_called_once()
+        mock_get_wal.assert_called_once_with(mock_global_config.call_args[0][0])
+        mock_cli_main.assert_not_called()
+
+
+def test_get_wal_import_footprint(tmpdir):
+    """
+    Guard the startup time of ``barman get-wal`` against regressions.
+
+    Serving get-wal must not load the modules only needed by the other
+    commands, which account for most of the startup time of the full
+    Barman CLI.
+    """
+    # GIVEN a server with a WAL in its archive
+    barman_home = tmpdir.mkdir("home")
+    wal_dir = barman_home.mkdir("main").mkdir("wals").mkdir("0000000100000000")
+    wal_dir.join("000000010000000000000001").write("wal content")
+    config = tmpdir.join("barman.conf")
+    config.write(
+        "[barman]\n"
+        "barman_home = %s\n"
+        "barman_user = %s\n"
+        "log_file = %s\n"
+        "[main]\n"
+        "description = main\n"
+        "conninfo = host=pg\n"
+        "backup_method = postgres\n"
+        % (barman_home, getpass.getuser(), tmpdir.join("barman.log"))
+    )
+    modules = tmpdir.join("modules.json")
+
+    # WHEN barman.launcher serves get-wal in a fresh interpreter
+    script = (
+        "import json, sys\n"
+        "from barman import launcher\n"
+        "config, wal, modules_path = sys.argv[1:]\n"
+        "sys.argv = ['barman', '-c', config, 'get-wal', 'main', wal]\n"
+        "try:\n"
+        "    launcher.main()\n"
+        "finally:\n"
+        "    with open(modules_path, 'w') as modules:\n"
+        "        json.dump(list(sys.modules), modules)\n"
+    )
+    wal = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            script,
+            config.strpath,
+            "000000010000000000000001",
+            modules.strpath,
+        ]
+    )
+
+    # THEN the WAL is served
+    assert wal == b"wal content"
+    # AND the modules of the other commands were not loaded
+    loaded = set(json.loads(modules.read()))
+    for module in (
+        "barman.cli",
+        "barman.server",
+        "barman.backup",
+        "barman.backup_executor",
+        "barman.recovery_executor",
+        "barman.postgres",
+        "barman.wal_archiver",
+        "psycopg2",
+        "distutils",
+        "concurrent.futures",
+    ):
+        assert module not in loaded, "%s loaded by barman.launcher" % module
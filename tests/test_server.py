@@ -2670,9 +2670,54 @@ class TestServer(object):
         # error
         server.wait_for_wal(wal_file="00000001000000EF000000AB", archive_timeout=0.1)
 
+    def test_get_wal_peek(self, tmpdir, capsys):
+        """Verify ``get_wal`` with ``peek`` reads each directory only once"""
+        # GIVEN a server with WAL files in the archive, incoming and
+        # streaming directories, across a WAL group boundary
+        wals = tmpdir.mkdir("wals")
+        incoming = tmpdir.mkdir("incoming")
+        streaming = tmpdir.mkdir("streaming")
+        server = build_real_server(
+            main_conf={
+                "wals_directory": wals.strpath,
+                "incoming_wals_directory": incoming.strpath,
+                "streaming_wals_directory": streaming.strpath,
+            }
+        )
+        hash_dir = wals.mkdir("0000000100000000")
+        hash_dir.join("0000000100000000000000FE").write("")
+        hash_dir.join("0000000100000000000000FF").write("")
+        incoming.join("000000010000000100000000").write("")
+        streaming.join("000000010000000100000001").write("")
+        streaming.join("000000010000000100000002.partial").write("")
+
+        # WHEN get_wal is called with peek
+        with patch("barman.get_wal.os.scandir", wraps=os.scandir) as mock_scandir:
+            server.get_wal("0000000100000000000000FE", peek=10)
+
+        # THEN the existing WAL files are listed until the first missing one
+        out, _err = capsys.readouterr()
+        assert out.splitlines() == [
+            "0000000100000000000000FE",
+            "0000000100000000000000FF",
+            "000000010000000100000000",
+            "000000010000000100000001",
+        ]
+        # AND every directory has been scanned only once
+        scanned = [call[0][0] for call in mock_scandir.call_args_list]
+        assert sorted(scanned) == sorted(
+            [
+                incoming.strpath,
+                streaming.strpath,
+                hash_dir.strpath,
+                wals.join("0000000100000001").strpath,
+                wals.join("0000000100000002").strpath,
+            ]
+        )
+
     @patch("tempfile.mkdtemp")
     @patch("barman.xlog.is_partial_file", return_value=False)
-    @patch("barman.server.NamedTemporaryFile")
+    @patch("barman.get_wal.NamedTemporaryFile")
     @patch("barman.backup.CompressionManager")
     def test_get_wal_sendfile_decompress_fail(
         self,
@@ -2719,9 +2764,9 @@ class TestServer(object):
         assert "ERROR: Error decompressing WAL: an error happened" in err
 
     @patch("tempfile.mkdtemp")
-    @patch("barman.server.open")
-    @patch("barman.server.shutil")
-    @patch("barman.server.NamedTemporaryFile")
+    @patch("barman.get_wal.open")
+    @patch("barman.get_wal.shutil")
+    @patch("barman.get_wal.NamedTemporaryFile")
     @patch("barman.xlog.is_partial_file")
     @patch("barman.backup.CompressionManager")
     def test_get_wal_sendfile_ignores_partial(
@@ -2773,9 +2818,9 @@ class TestServer(object):
         mock_compressor.decompress.assert_called_once()
 
     @patch("tempfile.mkdtemp")
-    @patch("barman.server.open")
-    @patch("barman.server.shutil")
-    @patch("barman.server.NamedTemporaryFile")
+    @patch("barman.get_wal.open")
+    @patch("barman.get_wal.shutil")
+    @patch("barman.get_wal.NamedTemporaryFile")
     @patch("barman.backup.CompressionManager")
     def test_get_wal_keep_compression(
         self,
@@ -2826,9 +2871,9 @@ class TestServer(object):
         mock_compressor.decompress.assert_not_called()
 
     @patch("tempfile.mkdtemp")
-    @patch("barman.server.open")
-    @patch("barman.server.shutil")
-    @patch("barman.server.NamedTemporaryFile")
+    @patch("barman.get_wal.open")
+    @patch("barman.get_wal.shutil")
+    @patch("barman.get_wal.NamedTemporaryFile")
     @patch("barman.backup.CompressionManager")
     def test_get_wal_honoring_custom_decompression(
         self,
@@ -2906,11 +2951,11 @@ class TestServer(object):
         mock_compressor.decompress.assert_called_once()
 
     @patch("barman.fs.LocalLibPathDeletionCommand")
-    @patch("barman.server.get_passphrase_from_command")
+    @patch("barman.get_wal.get_passphrase_from_command")
     @patch("tempfile.mkdtemp")
-    @patch("barman.server.open")
-    @patch("barman.server.shutil")
-    @patch("barman.server.NamedTemporaryFile")
+    @patch("barman.get_wal.open")
+    @patch("barman.get_wal.shutil")
+    @patch("barman.get_wal.NamedTemporaryFile")
     @patch("barman.backup.CompressionManager")
     def test_get_wal_encrypted(
         self,
@@ -17,12 +17,15 @@
 # along with Barman.  If not, see <http://www.gnu.org/licenses/>.
 
 import decimal
+import errno
+import io
 import json
 import logging
 import os
 import re
 import signal
 import sys
+import threading
 from argparse import ArgumentTypeError
 from datetime import datetime, timedelta
 from distutils.version import LooseVersion
@@ -741,6 +744,59 @@ class TestPowerOfTwo(object):
         assert not barman.utils.is_power_of_two(None)
 
 
+class TestZeroCopyFile(object):
+    """
+    Test for the zero_copy_file function
+    """
+
+    @pytest.fixture
+    def source(self, tmpdir):
+        source_path = tmpdir.join("source")
+        source_path.write_binary(b"0123456789" * 1000)
+        with open(source_path.strpath, "rb") as source:
+            yield source
+
+    def test_regular_file(self, source, tmpdir):
+        dest_path = tmpdir.join("dest")
+        with open(dest_path.strpath, "wb") as destination:
+            destination.write(b"header")
+            assert barman.utils.zero_copy_file(source, destination)
+        assert dest_path.read_binary() == b"header" + b"0123456789" * 1000
+
+    def test_partially_read_source(self, source, tmpdir):
+        source.read(5)
+        dest_path = tmpdir.join("dest")
+        with open(dest_path.strpath, "wb") as destination:
+            assert barman.utils.zero_copy_file(source, destination)
+        assert dest_path.read_binary() == (b"0123456789" * 1000)[5:]
+
+    def test_pipe(self, source):
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, "rb") as reader:
+            with os.fdopen(write_fd, "wb") as destination:
+                # 10000 bytes fit in the pipe buffer, so nothing blocks here
+                assert barman.utils.zero_copy_file(source, destination)
+            assert reader.read() == b"0123456789" * 1000
+
+    def test_no_file_descriptor(self, source):
+        destination = io.BytesIO()
+        assert not barman.utils.zero_copy_file(source, destination)
+        assert destination.getvalue() == b""
+
+    @mock.patch("barman.utils.os.copy_file_range", create=True)
+    def test_unsupported_syscall(self, copy_file_range_mock, source, tmpdir):
+        copy_file_range_mock.side_effect = OSError(errno.EXDEV, "cross-device")
+        with open(tmpdir.join("dest").strpath, "wb") as destination:
+            assert not barman.utils.zero_copy_file(source, destination)
+
+    @mock.patch("barman.utils.os.copy_file_range", create=True)
+    def test_error_after_partial_copy(self, copy_file_range_mock, source, tmpdir):
+        copy_file_range_mock.side_effect = [100, OSError(errno.EXDEV, "cross-device")]
+        with open(tmpdir.join("dest").strpath, "wb") as destination:
+            with pytest.raises(OSError):
+                barman.utils.zero_copy_file(source, destination)
+
+
 class TestForceText(object):
     """
     Test for the force_text function
@@ -838,6 +894,23 @@ class TestCheckSize(object):
         assert barman.utils.check_size(None) is None
 
 
+class TestCheckTablespaceBandwidth(object):
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ["tbs1:10MB", ("tbs1", 10 << 20)],
+            ["my:tbs:1024", ("my:tbs", 1024)],
+        ],
+    )
+    def test_parse(self, value, expected):
+        assert barman.utils.check_tablespace_bandwidth(value) == expected
+
+    @pytest.mark.parametrize("value", ["tbs1", ":10MB", "tbs1:", "tbs1:1X2"])
+    def test_parse_error(self, value):
+        with pytest.raises(ArgumentTypeError):
+            barman.utils.check_tablespace_bandwidth(value)
+
+
 class TestLocksCleanup(object):
     def test_locks_cleanup(self, caplog, tmpdir):
         # Configure logging
@@ -1739,3 +1812,27 @@ class TestGetMajorVersion:
             barman.utils.get_major_version("pg_combinebackup (PostgreSQL) 18beta2")
             == "18"
         )
+
+
+class TestMapConcurrently:
+    def test_results_in_order(self):
+        items = list(range(20))
+        assert barman.utils.map_concurrently(lambda x: x * 2, items, 4) == [
+            x * 2 for x in items
+        ]
+
+    def test_single_job_runs_in_calling_thread(self):
+        caller = threading.current_thread()
+        threads = barman.utils.map_concurrently(
+            lambda _: threading.current_thread(), [1, 2, 3], 1
+        )
+        assert threads == [caller, caller, caller]
+
+    def test_error_is_raised(self):
+        def func(item):
+            if item == 3:
+                raise ValueError("failed %s" % item)
+            return item
+
+        with pytest.raises(ValueError, match="failed 3"):
+            barman.utils.map_concurrently(func, list(range(10)), 4)